@@ -10,15 +10,24 @@ air.py
 
 • merge_air_sources() — объединяет словари с приоритетом IQAir → Open-Meteo
 • get_air(lat, lon)      — {'lvl','aqi','pm25','pm10','src','src_emoji','src_icon'}
+• get_air_for_cities()   — то же по списку городов: все источники всех точек
+                            параллельно, Open-Meteo AQ одним запросом на все точки
 • get_sst(lat, lon)      — Sea Surface Temperature (по ближайшему часу)
 • get_kp()               — (kp, state, ts_unix, src) — индекс Kp с «свежестью»
 • get_solar_wind()       — {'bz','bt','speed_kms','density','ts','status','src'}
 
 Особенности:
+- AirQuality CY: страница разбирается потоково, по мере загрузки; таблица
+  станций со временем наблюдения лежит в CY_AIRQUALITY_TABLE, и в течение часа
+  после последнего наблюдения страница не скачивается и не разбирается.
 - Open-Meteo: берём значения по ближайшему прошедшему часу (UTC).
-- SST: то же правило ближайшего часа.
-- Kp: парсим ПОСЛЕДНЕЕ значение из SWPC; кэш 120 мин, жёсткий максимум 4 ч.
-- Солнечный ветер: SWPC 5-минутные продукты (mag/plasma); кэш 10 мин.
+- Ответы источников мемоизируются по координате (AIR_MEMO_TTL_SEC); параллельные
+  запросы одной точки ждут один сетевой вызов.
+- При AQ_HISTORY=1 свежие станции CY и итоговые значения городов/точек
+  дописываются в aq_history (тренды: среднее за сутки, «вчера», час пика).
+- SST: то же правило ближайшего часа; данные из marine.py (общий кэш с волнами).
+- Kp и солнечный ветер — из space_weather.py: один кэш продуктов SWPC
+  (.cache/space_weather.json) на кипрские и world-посты; здесь только подписи.
 - Источник AQI возвращаем как:
     'src' ∈ {'iqair','openmeteo','n/d'},
     'src_emoji' ∈ {'📡','🛰','⚪'},
@@ -32,16 +41,25 @@ import json
 import math
 import logging
 import re
-from html import unescape
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, Union, List
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union, List
 
 import pendulum
-import requests
 
+from http_client import (  # общий пул соединений/ретраи + ETag/Last-Modified
+    conditional_headers,
+    http_get,
+    response_validators,
+)
 from utils import _get  # HTTP-обёртка (_get_retry внутри)
+from marine import marine_value_now  # волны/SST — один marine-запрос с дисковым кэшем
+import space_weather  # Kp / солнечный ветер — общий с world-постами кэш SWPC
+import aq_history  # история наблюдений (AQ_HISTORY=1) — для трендов «за сутки / вчера»
 
-__all__ = ("get_air", "get_air_for_cities", "get_sst", "get_kp", "get_solar_wind")
+__all__ = ("collect_air", "get_air", "get_air_for_cities", "get_sst", "get_kp", "get_solar_wind")
 
 # ───────────────────────── Константы / лог / кеш ─────────────────────────
 
@@ -55,26 +73,9 @@ REQUEST_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
 CACHE_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", str(Path.home() / ".cache" / "vaybometer")))
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-# Kp cache (2 часа TTL, жёсткий максимум — 4 часа)
-KP_CACHE = CACHE_DIR / "kp.json"
-KP_TTL_SEC = 120 * 60
+# Kp: наблюдению не больше 4 часов (иначе «н/д»); сами ответы SWPC — в space_weather.py
 KP_HARD_MAX_AGE_SEC = 4 * 3600
 
-# Солнечный ветер — кэш 10 мин
-SW_CACHE = CACHE_DIR / "solar_wind.json"
-SW_TTL_SEC = 10 * 60
-
-KP_URLS = [
-    # Табличный эндпоинт (3-часовой Kp)
-    "https://services.swpc.noaa.gov/products/noaa-planetary-k-index.json",
-    # Резервный (минутные/почасовые оценки)
-    "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json",
-]
-
-# 5-минутные продукты DSCOVR/ACE
-SWP_MAG_5M = "https://services.swpc.noaa.gov/products/solar-wind/mag-5-minute.json"
-SWP_PLA_5M = "https://services.swpc.noaa.gov/products/solar-wind/plasma-5-minute.json"
-
 SRC_EMOJI = {"cy_official": "🇨🇾", "iqair": "📡", "openmeteo": "🛰", "n/d": "⚪"}
 SRC_ICON  = {"cy_official": "🇨🇾 AirQuality CY", "iqair": "📡 IQAir", "openmeteo": "🛰 OM", "n/d": "⚪ н/д"}
 
@@ -83,8 +84,19 @@ CY_AIRQUALITY_URLS = (
     "https://www.airquality.dli.mlsi.gov.cy/",
 )
 CY_AIRQUALITY_TTL_SEC = 10 * 60
+CY_AIRQUALITY_FAIL_TTL_SEC = 60  # неудачный скрейп не повторяем для каждого города запуска
+# Разобранная таблица станций + время наблюдения: станции публикуют часовые
+# значения, поэтому внутри часа после последнего наблюдения страницу не качаем.
+CY_AIRQUALITY_TABLE = CACHE_DIR / "cy_airquality_stations.json"
+CY_AIRQUALITY_OBS_STEP_MIN = 60
 CY_AIR_OBSERVATION_MAX_AGE_MIN = 180
 _CY_AIRQUALITY_CACHE: tuple[float, list[Dict[str, Any]]] | None = None
+_CY_AIRQUALITY_LOCK = threading.Lock()
+
+# Ответы IQAir / Open-Meteo по координате живут AIR_MEMO_TTL_SEC: регион и города
+# одного запуска (get_air + get_air_for_cities) делят их, а не запрашивают заново.
+AIR_MEMO_TTL_SEC = int(os.getenv("AIR_MEMO_TTL_SEC", str(10 * 60)) or "600")
+AIR_FETCH_WORKERS = int(os.getenv("AIR_FETCH_WORKERS", "6") or "6")
 
 _CY_STATION_COORDS = {
     "Nicosia - Traffic Station": (35.170, 33.360),
@@ -299,67 +311,67 @@ def _normalize_cy_station_name(line: str) -> str:
     return re.sub(r"^[#\s]+", "", line or "").strip()
 
 
-def _parse_cy_airquality_official_html(html_text: str) -> list[Dict[str, Any]]:
-    """Parse station measurements embedded in the official AirQuality CY page."""
-    if not html_text:
-        return []
-    text = re.sub(r"(?i)<br\s*/?>", "\n", html_text)
-    text = re.sub(r"<[^>]+>", "\n", text)
-    text = unescape(text)
-    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
-    lines = [line for line in lines if line]
-
-    stations: list[Dict[str, Any]] = []
-    seen: set[str] = set()
-    pollutant_re = re.compile(
-        r"^(PM\s*2[.,]?5|PM\s*10|PM₂\.₅|PM₁₀|NO₂|NO2|O₃|O3|SO₂|SO2|CO)\s*[:\-]\s*([0-9]+(?:[.,][0-9]+)?)",
-        re.IGNORECASE,
-    )
-    pollutant_label_re = re.compile(
-        r"^(PM\s*2[.,]?5|PM\s*10|PM₂\.₅|PM₁₀|NO₂|NO2|O₃|O3|SO₂|SO2|CO)\s*[:\-]?\s*$",
-        re.IGNORECASE,
-    )
-    value_re = re.compile(r"([0-9]+(?:[.,][0-9]+)?)")
-    for idx, line in enumerate(lines):
-        station_name = _normalize_cy_station_name(line)
-        if "station" not in station_name.lower() or len(station_name) > 90:
-            continue
-        if station_name.lower().startswith(("updated ", "pollution ")):
-            continue
-
-        data: Dict[str, Any] = {"station": station_name, "src": "cy_official"}
-        observed_raw = ""
-        window = lines[idx + 1: idx + 36]
-        pos = 0
-        while pos < len(window):
-            next_line = window[pos]
-            if "station" in next_line.lower() and pollutant_re.match(next_line) is None:
-                break
-            if next_line.lower().startswith("updated on"):
-                observed_raw = next_line.split(":", 1)[-1].strip()
-                break
-            match = pollutant_re.match(next_line)
-            if match:
-                key = _normalize_cy_pollutant(match.group(1))
-                value = _float_or_none(match.group(2))
-                if key and value is not None:
-                    data[key] = value
-                    pos += 1
-                    continue
-
-            label_match = pollutant_label_re.match(next_line)
-            if label_match and pos + 1 < len(window):
-                key = _normalize_cy_pollutant(label_match.group(1))
-                value_match = value_re.search(window[pos + 1])
-                value = _float_or_none(value_match.group(1) if value_match else None)
-                if key and value is not None:
-                    data[key] = value
-                    pos += 2
-                    continue
-            pos += 1
-
+_CY_POLLUTANT_RE = re.compile(
+    r"^(PM\s*2[.,]?5|PM\s*10|PM₂\.₅|PM₁₀|NO₂|NO2|O₃|O3|SO₂|SO2|CO)\s*[:\-]\s*([0-9]+(?:[.,][0-9]+)?)",
+    re.IGNORECASE,
+)
+_CY_POLLUTANT_LABEL_RE = re.compile(
+    r"^(PM\s*2[.,]?5|PM\s*10|PM₂\.₅|PM₁₀|NO₂|NO2|O₃|O3|SO₂|SO2|CO)\s*[:\-]?\s*$",
+    re.IGNORECASE,
+)
+_CY_VALUE_RE = re.compile(r"([0-9]+(?:[.,][0-9]+)?)")
+_CY_STATION_WINDOW = 35  # строк после названия станции, в которых ищем её значения
+
+
+class _CyStationRecord:
+    """Одна станция: значения собираются из следующих за названием строк, пока окно не закроется."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.data: Dict[str, Any] = {"station": name, "src": "cy_official"}
+        self.observed_raw = ""
+        self.seen = 0
+        self.pending: Optional[str] = None  # «PM₁₀:» на отдельной строке — значение в следующей
+        self.done = False
+
+    def feed(self, line: str) -> None:
+        if self.done:
+            return
+        self.seen += 1
+        if self.pending is not None:
+            key, self.pending = self.pending, None
+            value_match = _CY_VALUE_RE.search(line)
+            value = _float_or_none(value_match.group(1) if value_match else None)
+            if value is not None:
+                self.data[key] = value
+                self.done = self.seen >= _CY_STATION_WINDOW
+                return
+        self._line(line)
+        self.done = self.done or (self.seen >= _CY_STATION_WINDOW and self.pending is None)
+
+    def _line(self, line: str) -> None:
+        match = _CY_POLLUTANT_RE.match(line)
+        if "station" in line.lower() and match is None:
+            self.done = True
+            return
+        if line.lower().startswith("updated on"):
+            self.observed_raw = line.split(":", 1)[-1].strip()
+            self.done = True
+            return
+        if match:
+            key = _normalize_cy_pollutant(match.group(1))
+            value = _float_or_none(match.group(2))
+            if key and value is not None:
+                self.data[key] = value
+                return
+        label_match = _CY_POLLUTANT_LABEL_RE.match(line)
+        if label_match and self.seen < _CY_STATION_WINDOW:
+            self.pending = _normalize_cy_pollutant(label_match.group(1))
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        data = self.data
         if not any(key in data for key in _CY_LIMITS):
-            continue
+            return None
         dominant, level = _cy_dominant_pollutant(data)
         data["dominant_pollutant"] = dominant
         data["pollution_level"] = level
@@ -368,42 +380,235 @@ def _parse_cy_airquality_official_html(html_text: str) -> list[Dict[str, Any]]:
         data["aqi"] = None
         data["lvl"] = data["pollution_category"]
         data["clean_label"] = air_cleanliness_label(data)
-        observed_at, fresh_min = _parse_cy_observed_at(observed_raw)
+        observed_at, fresh_min = _parse_cy_observed_at(self.observed_raw)
         data["observed_at"] = observed_at
         data["fresh_min"] = fresh_min
         data["observation_status"] = _air_observation_status(data)
-        key = station_name.lower()
-        if key not in seen:
-            stations.append(data)
-            seen.add(key)
-    return stations
+        return data
+
+
+class _CyAirHTMLStream(HTMLParser):
+    """
+    Инкрементальный разбор официальной страницы: куски HTML подаются по мере
+    загрузки (push), готовые станции отдаются сразу, как только закрылось их
+    окно. Теги и <br> — переводы строк, сущности раскрываются, пустые строки
+    отбрасываются — те же строки, что раньше давал regex по всему тексту.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._buf: List[str] = []
+        self._open: List[_CyStationRecord] = []
+        self._ready: List[Dict[str, Any]] = []
+        self._names: set[str] = set()
+
+    # ---- HTMLParser ----
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        self._flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush()
+
+    def handle_startendtag(self, tag: str, attrs: Any) -> None:
+        self._flush()
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_data(self, data: str) -> None:
+        for part in data.splitlines(True):
+            text = part.splitlines()[0] if part.splitlines() else ""
+            self._buf.append(text)
+            if text != part:
+                self._flush()
+
+    # ---- строки → станции ----
+    def _flush(self) -> None:
+        line = re.sub(r"\s+", " ", "".join(self._buf)).strip()
+        self._buf = []
+        if not line:
+            return
+        for record in self._open:
+            record.feed(line)
+        name = _normalize_cy_station_name(line)
+        low = name.lower()
+        if "station" in low and len(name) <= 90 and not low.startswith(("updated ", "pollution ")):
+            self._open.append(_CyStationRecord(name))
+        self._emit()
+
+    def _emit(self) -> None:
+        # в порядке появления на странице: ждём, пока закроется самая ранняя
+        while self._open and self._open[0].done:
+            record = self._open.pop(0)
+            data = record.finish()
+            if data is not None and record.name.lower() not in self._names:
+                self._names.add(record.name.lower())
+                self._ready.append(data)
+
+    def push(self, chunk: str) -> List[Dict[str, Any]]:
+        self.feed(chunk)
+        out, self._ready = self._ready, []
+        return out
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self.close()
+        self._flush()
+        for record in self._open:
+            record.done = True
+        self._emit()
+        out, self._ready = self._ready, []
+        return out
+
+
+def _iter_cy_stations(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    stream = _CyAirHTMLStream()
+    for chunk in chunks:
+        if chunk:
+            yield from stream.push(chunk)
+    yield from stream.finish()
+
+
+def _parse_cy_airquality_official_html(html_text: str) -> list[Dict[str, Any]]:
+    """Parse station measurements embedded in the official AirQuality CY page."""
+    if not html_text:
+        return []
+    return list(_iter_cy_stations([html_text]))
+
+
+def _cy_airquality_cached() -> Optional[list[Dict[str, Any]]]:
+    if not _CY_AIRQUALITY_CACHE:
+        return None
+    ts, stations = _CY_AIRQUALITY_CACHE
+    ttl = CY_AIRQUALITY_TTL_SEC if stations else CY_AIRQUALITY_FAIL_TTL_SEC
+    return list(stations) if time.time() - ts <= ttl else None
 
 
 def _fetch_cy_airquality_official_stations() -> list[Dict[str, Any]]:
-    global _CY_AIRQUALITY_CACHE
-    now = time.time()
-    if _CY_AIRQUALITY_CACHE and now - _CY_AIRQUALITY_CACHE[0] <= CY_AIRQUALITY_TTL_SEC:
-        return list(_CY_AIRQUALITY_CACHE[1])
+    cached = _cy_airquality_cached()
+    if cached is not None:
+        return cached
+    # города запрашиваются параллельно — страницу скачивает один поток, остальные ждут его
+    with _CY_AIRQUALITY_LOCK:
+        cached = _cy_airquality_cached()
+        if cached is not None:
+            return cached
+        return _scrape_cy_airquality_official_stations(time.time())
+
+
+def _refresh_station_age(station: Dict[str, Any]) -> Dict[str, Any]:
+    """fresh_min / observation_status считаются от «сейчас» — пересчёт для станций из таблицы на диске."""
+    station = dict(station)
+    observed = station.get("observed_at")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 VayboMeter/1.0",
-            "Accept": "text/html,application/xhtml+xml",
-            "Accept-Language": "en,el;q=0.8",
-        }
-        for url in CY_AIRQUALITY_URLS:
-            try:
-                resp = requests.get(url, timeout=REQUEST_TIMEOUT, headers=headers)
-                resp.raise_for_status()
-                stations = _parse_cy_airquality_official_html(resp.text)
-                if stations:
-                    _CY_AIRQUALITY_CACHE = (now, stations)
-                    return stations
-            except Exception as e:
-                logging.warning("AirQuality CY official fetch error (%s): %s", url, e)
-        return []
+        dt_obj = pendulum.parse(str(observed))
+        station["fresh_min"] = max(0, int((pendulum.now("UTC") - dt_obj).total_minutes()))
+    except Exception:
+        station["fresh_min"] = None
+    station["observation_status"] = _air_observation_status(station)
+    return station
+
+
+def _latest_observation(stations: list[Dict[str, Any]]) -> Optional[pendulum.DateTime]:
+    latest = None
+    for station in stations:
+        try:
+            dt_obj = pendulum.parse(str(station.get("observed_at")))
+        except Exception:
+            continue
+        if latest is None or dt_obj > latest:
+            latest = dt_obj
+    return latest
+
+
+def _load_cy_station_table() -> Optional[Dict[str, Any]]:
+    try:
+        table = json.loads(CY_AIRQUALITY_TABLE.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(table, dict) or not isinstance(table.get("stations"), list):
+        return None
+    return table
+
+
+def _save_cy_station_table(url: str, now: float, stations: list[Dict[str, Any]], validators: Dict[str, str]) -> None:
+    latest = _latest_observation(stations)
+    table = {
+        "url": url,
+        "fetched_at": int(now),
+        "observed_at": latest.to_iso8601_string() if latest is not None else None,
+        "validators": validators,
+        "stations": stations,
+    }
+    try:
+        tmp = CY_AIRQUALITY_TABLE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(table, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(CY_AIRQUALITY_TABLE)
     except Exception as e:
-        logging.warning("AirQuality CY official fetch/parse error: %s", e)
-        return []
+        logging.warning("AirQuality CY table save error: %s", e)
+
+
+def _cy_table_current(table: Dict[str, Any], now: float) -> bool:
+    """Внутри TTL последней загрузки или внутри часа после последнего наблюдения."""
+    try:
+        if now - float(table.get("fetched_at") or 0) <= CY_AIRQUALITY_TTL_SEC:
+            return True
+        observed = pendulum.parse(str(table.get("observed_at")))
+    except Exception:
+        return False
+    age_min = (now - observed.timestamp()) / 60.0
+    return 0 <= age_min < CY_AIRQUALITY_OBS_STEP_MIN
+
+
+def _stream_cy_airquality_page(url: str, validators: Dict[str, Any]) -> tuple[Optional[list[Dict[str, Any]]], Dict[str, str]]:
+    """
+    Условный GET страницы с разбором по мере загрузки.
+    (None, валидаторы) — 304, таблица не изменилась; иначе (станции, валидаторы).
+    """
+    headers = {
+        "User-Agent": "Mozilla/5.0 VayboMeter/1.0",
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "en,el;q=0.8",
+    }
+    headers.update(conditional_headers(validators))
+    resp = http_get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True)
+    try:
+        if resp.status_code == 304:
+            return None, response_validators(resp) or dict(validators)
+        resp.raise_for_status()
+        if "charset" not in str(resp.headers.get("Content-Type") or "").lower():
+            resp.encoding = "utf-8"
+        stations = list(_iter_cy_stations(resp.iter_content(chunk_size=16 * 1024, decode_unicode=True)))
+        return stations, response_validators(resp)
+    finally:
+        resp.close()
+
+
+def _scrape_cy_airquality_official_stations(now: float) -> list[Dict[str, Any]]:
+    global _CY_AIRQUALITY_CACHE
+    table = _load_cy_station_table()
+    if table is not None and table["stations"] and _cy_table_current(table, now):
+        stations = [_refresh_station_age(station) for station in table["stations"]]
+        _CY_AIRQUALITY_CACHE = (now, stations)
+        return stations
+    for url in CY_AIRQUALITY_URLS:
+        known = table if table is not None and table.get("url") == url else None
+        try:
+            stations, validators = _stream_cy_airquality_page(url, (known or {}).get("validators") or {})
+        except Exception as e:
+            logging.warning("AirQuality CY official fetch error (%s): %s", url, e)
+            continue
+        if stations is None:
+            # 304: страница та же — берём разобранную таблицу, продлеваем её
+            stations = list(known["stations"]) if known else []
+        if stations:
+            _save_cy_station_table(url, now, stations, validators)
+            stations = [_refresh_station_age(station) for station in stations]
+            for station in stations:
+                aq_history.record_air(aq_history.series_key("station", station.get("station")), station)
+            _CY_AIRQUALITY_CACHE = (now, stations)
+            return stations
+    _CY_AIRQUALITY_CACHE = (now, [])
+    return []
 
 
 def _station_distance_km(station: Dict[str, Any], lat: float, lon: float) -> float:
@@ -411,21 +616,95 @@ def _station_distance_km(station: Dict[str, Any], lat: float, lon: float) -> flo
     if not coords:
         return 9999.0
     la, lo = coords
+    return _distance_km(lat, lon, la, lo)
+
+
+def _distance_km(lat: float, lon: float, la: float, lo: float) -> float:
+    # равнопромежуточная проекция на широте Кипра — для сотни км точнее не нужно
     return math.hypot((lat - la) * 111.0, (lon - lo) * 92.0)
 
 
+class _StationIndex:
+    """
+    Станции одного списка (по именам) с координатами + ранжированные таблицы
+    «точка → станции по расстоянию», посчитанные один раз на точку. Индекс
+    пересобирается только когда меняется сам список станций, а не их значения,
+    поэтому хранит позиции в списке, а не словари станций.
+    """
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.coords: List[Tuple[int, float, float]] = [
+            (i, *_CY_STATION_COORDS[name]) for i, name in enumerate(names) if name in _CY_STATION_COORDS
+        ]
+        lowered = [name.lower() for name in names]
+        self.by_hint: Dict[str, int] = {}
+        for hints in _CY_CITY_STATION_HINTS.values():
+            for hint in hints:
+                if hint not in self.by_hint:
+                    pos = next((i for i, name in enumerate(lowered) if hint in name), None)
+                    if pos is not None:
+                        self.by_hint[hint] = pos
+        self._ranked: Dict[Tuple[float, float], List[Tuple[float, int]]] = {}
+
+    def ranked(self, lat: float, lon: float) -> List[Tuple[float, int]]:
+        """(км, позиция) всех станций с координатами, ближайшие первыми."""
+        key = (round(float(lat), 4), round(float(lon), 4))
+        hit = self._ranked.get(key)
+        if hit is None:
+            hit = sorted((_distance_km(lat, lon, la, lo), i) for i, la, lo in self.coords)
+            self._ranked[key] = hit
+        return hit
+
+
+_CY_STATION_INDEX: Optional[_StationIndex] = None
+_CY_STATION_INDEX_LOCK = threading.Lock()
+
+
+def _cy_station_index(stations: list[Dict[str, Any]]) -> _StationIndex:
+    global _CY_STATION_INDEX
+    names = tuple(str(station.get("station") or "") for station in stations)
+    with _CY_STATION_INDEX_LOCK:
+        if _CY_STATION_INDEX is None or _CY_STATION_INDEX.names != names:
+            _CY_STATION_INDEX = _StationIndex(names)
+        return _CY_STATION_INDEX
+
+
+def _nearest_cy_stations(
+    stations: list[Dict[str, Any]],
+    lat: float,
+    lon: float,
+    k: int = 1,
+    max_km: Optional[float] = None,
+) -> list[tuple[float, Dict[str, Any]]]:
+    """До k ближайших станций с известными координатами (км, станция), не дальше max_km."""
+    if not stations or k <= 0:
+        return []
+    out: list[tuple[float, Dict[str, Any]]] = []
+    for dist, pos in _cy_station_index(stations).ranked(lat, lon):
+        if max_km is not None and dist > max_km:
+            break
+        out.append((dist, stations[pos]))
+        if len(out) >= k:
+            break
+    return out
+
+
 def _pick_cy_station(stations: list[Dict[str, Any]], lat: float, lon: float, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
     if not stations:
         return None
+    index = _cy_station_index(stations)
     city_key = (city or "").strip().lower()
     hints = _CY_CITY_STATION_HINTS.get(city_key, ())
     if hints:
         for hint in hints:
-            for station in stations:
-                if hint in str(station.get("station") or "").lower():
-                    return station
+            pos = index.by_hint.get(hint)
+            if pos is not None:
+                return stations[pos]
         return None
-    return min(stations, key=lambda station: _station_distance_km(station, lat, lon), default=None)
+    nearest = _nearest_cy_stations(stations, lat, lon, k=1)
+    # без координат ни у одной станции — первая в списке, как раньше
+    return nearest[0][1] if nearest else stations[0]
 
 
 def _src_cy_airquality_official(lat: float, lon: float, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -435,9 +714,95 @@ def _src_cy_airquality_official(lat: float, lon: float, city: Optional[str] = No
     return dict(station)
 
 
+# ───────────────────────── Мемо ответов по координате ─────────────────────────
+
+class _AirMemo:
+    """
+    (источник, lat, lon) → результат на ttl секунд. Пока точка запрашивается,
+    остальные потоки ждут тот же Future, а не шлют второй запрос. Пустой
+    результат (None) не запоминается: следующий вызов попробует снова.
+    release() снимает заявку без ответа — ждавшие запросят точку сами.
+    """
+
+    _RETRY = object()
+
+    def __init__(self, ttl_sec: int):
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._done: Dict[tuple, tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[tuple, Future] = {}
+
+    @staticmethod
+    def key(src: str, lat: float, lon: float) -> tuple:
+        return (src, round(float(lat), 4), round(float(lon), 4))
+
+    def _fresh(self, key: tuple) -> Optional[Dict[str, Any]]:
+        hit = self._done.get(key)
+        if hit and time.time() - hit[0] <= self.ttl_sec:
+            return hit[1]
+        return None
+
+    def claim(self, keys: List[tuple]) -> List[tuple]:
+        """Ключи без свежего значения и без запроса в полёте — теперь их резолвит вызывающий."""
+        owned: List[tuple] = []
+        with self._lock:
+            for key in keys:
+                if key in self._inflight or self._fresh(key) is not None or key in owned:
+                    continue
+                self._inflight[key] = Future()
+                owned.append(key)
+        return owned
+
+    def resolve(self, key: tuple, value: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if value is not None:
+                self._done[key] = (time.time(), value)
+            fut = self._inflight.pop(key, None)
+        if fut is not None:
+            fut.set_result(value)
+
+    def release(self, key: tuple) -> None:
+        with self._lock:
+            fut = self._inflight.pop(key, None)
+        if fut is not None:
+            fut.set_result(self._RETRY)
+
+    def get(self, key: tuple, fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._fresh(key)
+            fut = self._inflight.get(key) if hit is None else None
+        if hit is not None:
+            return dict(hit)
+        if fut is not None:
+            value = fut.result()
+            if value is self._RETRY:
+                return self.get(key, fetch)
+            return dict(value) if value is not None else None
+        if not self.claim([key]):
+            # кто-то успел забрать ключ между проверками — ждём его
+            return self.get(key, fetch)
+        value = None
+        try:
+            value = fetch()
+        finally:
+            self.resolve(key, value)
+        return dict(value) if value is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._done.clear()
+
+
+_AIR_MEMO = _AirMemo(AIR_MEMO_TTL_SEC)
+
+
 def _src_iqair(lat: float, lon: float) -> Optional[Dict[str, Any]]:
     if not AIR_KEY:
         return None
+    return _AIR_MEMO.get(_AirMemo.key("iqair", lat, lon), lambda: _fetch_iqair(lat, lon))
+
+
+def _fetch_iqair(lat: float, lon: float) -> Optional[Dict[str, Any]]:
     resp = _safe_http_get(
         "https://api.airvisual.com/v2/nearest_city",
         lat=lat, lon=lon, key=AIR_KEY,
@@ -465,13 +830,55 @@ def _src_iqair(lat: float, lon: float) -> Optional[Dict[str, Any]]:
         logging.warning("IQAir parse error: %s", e)
         return None
 
+OPENMETEO_AQ_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
+
+
 def _src_openmeteo(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    return _AIR_MEMO.get(_AirMemo.key("openmeteo", lat, lon), lambda: _fetch_openmeteo(lat, lon))
+
+
+def _fetch_openmeteo(lat: float, lon: float) -> Optional[Dict[str, Any]]:
     resp = _safe_http_get(
-        "https://air-quality-api.open-meteo.com/v1/air-quality",
+        OPENMETEO_AQ_URL,
         latitude=lat, longitude=lon,
         hourly="pm10,pm2_5,us_aqi", timezone="UTC",
     )
-    if not resp or "hourly" not in resp:
+    return _openmeteo_from_response(resp)
+
+
+def _prefetch_openmeteo(points: List[tuple[float, float]], owned: List[tuple]) -> None:
+    """
+    Один multi-coordinate запрос Open-Meteo AQ на все точки, ключи которых
+    забрал вызывающий (owned); ответ — список в порядке координат. Точки,
+    которых нет в полученном ответе, отпускаются (release) — их запросит по
+    одной _src_openmeteo(). Если запрос не прошёл вовсе (сеть/HTTP — _get уже
+    сделал свои повторы), ждущие получают None, как при одиночном запросе.
+    """
+    values: Dict[tuple, Optional[Dict[str, Any]]] = {}
+    answered = False
+    try:
+        resp = _safe_http_get(
+            OPENMETEO_AQ_URL,
+            latitude=",".join(f"{la:.4f}" for la, _ in points),
+            longitude=",".join(f"{lo:.4f}" for _, lo in points),
+            hourly="pm10,pm2_5,us_aqi", timezone="UTC",
+        )
+        answered = resp is not None
+        rows = resp if isinstance(resp, list) else [resp]
+        for (la, lo), row in zip(points, rows):
+            values[_AirMemo.key("openmeteo", la, lo)] = _openmeteo_from_response(row)
+    except Exception as e:
+        logging.warning("Open-Meteo AQ batch error: %s", e)
+    finally:
+        for key in owned:
+            if values.get(key) is not None or not answered:
+                _AIR_MEMO.resolve(key, values.get(key))
+            else:
+                _AIR_MEMO.release(key)
+
+
+def _openmeteo_from_response(resp: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(resp, dict) or "hourly" not in resp:
         return None
     try:
         h = resp["hourly"]
@@ -617,139 +1024,73 @@ def merge_air_sources(*sources: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         out["clean_label"] = air_cleanliness_label(out)
     return out
 
-def get_air(lat: float, lon: float) -> Dict[str, Any]:
+def _source_or_none(fn: Callable[..., Optional[Dict[str, Any]]], *args: Any, **kwargs: Any) -> Optional[Dict[str, Any]]:
     try:
-        src0 = _src_cy_airquality_official(lat, lon)
+        return fn(*args, **kwargs)
     except Exception:
-        src0 = None
-    try:
-        src1 = _src_iqair(lat, lon)
-    except Exception:
-        src1 = None
-    try:
-        src2 = _src_openmeteo(lat, lon)
-    except Exception:
-        src2 = None
-    return merge_air_sources(src0, src1, src2)
+        return None
+
+
+def collect_air(points: List[tuple[Optional[str], float, float]]) -> List[Dict[str, Any]]:
+    """
+    Сводка воздуха для каждой точки (city, lat, lon), в том же порядке.
+
+    Все источники всех точек идут в пул параллельно; официальная страница CY
+    скачивается один раз, Open-Meteo AQ для нескольких точек — одним
+    multi-coordinate запросом. Ответы остаются в мемо по координате, так что
+    повторный вызов для тех же точек (регион + города) — только поиск.
+    """
+    if not points:
+        return []
+    coords = list(dict.fromkeys((round(la, 4), round(lo, 4)) for _city, la, lo in points))
+    workers = max(1, min(AIR_FETCH_WORKERS, 3 * len(points)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="air") as pool:
+        if len(coords) > 1:
+            owned = _AIR_MEMO.claim([_AirMemo.key("openmeteo", la, lo) for la, lo in coords])
+            if owned:
+                pool.submit(_prefetch_openmeteo, [(k[1], k[2]) for k in owned], owned)
+        jobs = [
+            (
+                pool.submit(_source_or_none, _src_cy_airquality_official, la, lo, city=city),
+                pool.submit(_source_or_none, _src_iqair, la, lo),
+                pool.submit(_source_or_none, _src_openmeteo, la, lo),
+            )
+            for city, la, lo in points
+        ]
+        return [merge_air_sources(*(job.result() for job in triple)) for triple in jobs]
+
+
+def get_air(lat: float, lon: float) -> Dict[str, Any]:
+    merged = collect_air([(None, float(lat), float(lon))])[0]
+    aq_history.record_air(aq_history.point_key(lat, lon), merged)
+    return merged
 
 
 def get_air_for_cities(city_pairs: List[tuple[str, tuple[float, float]]]) -> Dict[str, Dict[str, Any]]:
-    out: Dict[str, Dict[str, Any]] = {}
+    points: List[tuple[Optional[str], float, float]] = []
     for city, coords in city_pairs or []:
         try:
-            lat, lon = float(coords[0]), float(coords[1])
+            points.append((city, float(coords[0]), float(coords[1])))
         except Exception:
             continue
-        try:
-            official = _src_cy_airquality_official(lat, lon, city=city)
-        except Exception:
-            official = None
-        try:
-            iqair = _src_iqair(lat, lon)
-        except Exception:
-            iqair = None
-        try:
-            om = _src_openmeteo(lat, lon)
-        except Exception:
-            om = None
-        merged = merge_air_sources(official, iqair, om)
+    out: Dict[str, Dict[str, Any]] = {}
+    for (city, _la, _lo), merged in zip(points, collect_air(points)):
         if merged.get("src") != "n/d" or merged.get("pm25") is not None or merged.get("pm10") is not None:
             out[str(city)] = merged
+            aq_history.record_air(aq_history.series_key("city", city), merged)
     return out
 
 # ───────────────────────── SST (по ближайшему часу) ─────────────────
 
 def get_sst(lat: float, lon: float) -> Optional[float]:
-    resp = _safe_http_get(
-        "https://marine-api.open-meteo.com/v1/marine",
-        latitude=lat, longitude=lon,
-        hourly="sea_surface_temperature", timezone="UTC",
-    )
-    if not resp or "hourly" not in resp:
-        return None
+    """SST по ближайшему прошедшему часу (UTC) из общего marine-кэша (marine.py)."""
     try:
-        h = resp["hourly"]
-        times = h.get("time", []) or []
-        vals  = h.get("sea_surface_temperature", []) or []
-        v = _pick_nearest_hour(times, vals)
-        return float(v) if isinstance(v, (int, float)) else None
+        return marine_value_now(lat, lon, "sea_surface_temperature")
     except Exception as e:
         logging.warning("Marine SST parse error: %s", e)
         return None
 
-# ───────────────────────── Kp + кеш (TTL 120 мин) ───────────────────
-
-def _load_kp_cache() -> tuple[Optional[float], Optional[int], Optional[str]]:
-    try:
-        data = json.loads(KP_CACHE.read_text(encoding="utf-8"))
-        return data.get("kp"), data.get("ts"), data.get("src")
-    except Exception:
-        return None, None, None
-
-def _save_kp_cache(kp: float, ts: int, src: str) -> None:
-    try:
-        KP_CACHE.write_text(
-            json.dumps({"kp": kp, "ts": int(ts), "src": src}, ensure_ascii=False),
-            encoding="utf-8"
-        )
-    except Exception as e:
-        logging.warning("Kp cache write error: %s", e)
-
-def _fetch_kp_data(url: str, attempts: int = 3, backoff: float = 2.0) -> Optional[Any]:
-    data = None
-    for i in range(attempts):
-        data = _safe_http_get(url)
-        if data:
-            break
-        try:
-            time.sleep(backoff ** i)
-        except Exception:
-            pass
-    return data
-
-def _parse_kp_from_table(data: Any) -> tuple[Optional[float], Optional[int]]:
-    """
-    products/noaa-planetary-k-index.json
-    Формат: [ ["time_tag","kp_index"], ["2025-08-30 09:00:00","2.67"], ... ]
-    Берём последнюю строку и преобразуем время в ts (UTC).
-    """
-    try:
-        if not isinstance(data, list) or len(data) < 2 or not isinstance(data[0], list):
-            return None, None
-        for row in reversed(data[1:]):
-            if not isinstance(row, list) or len(row) < 2:
-                continue
-            tstr = str(row[0]).replace("Z", "").replace("T", " ")
-            val  = float(str(row[-1]).replace(",", "."))
-            try:
-                dt = pendulum.parse(tstr, tz="UTC")  # 'YYYY-MM-DD HH:MM:SS'
-                ts = int(dt.int_timestamp)
-            except Exception:
-                ts = int(time.time())
-            return val, ts
-    except Exception:
-        pass
-    return None, None
-
-def _parse_kp_from_dicts(data: Any) -> tuple[Optional[float], Optional[int]]:
-    """
-    json/planetary_k_index_1m.json
-    Формат: [{time_tag:"2025-08-30T10:27:00Z", kp_index:3.0}, ...]
-    """
-    try:
-        if not isinstance(data, list) or not data or not isinstance(data[0], dict):
-            return None, None
-        for item in reversed(data):
-            raw = item.get("kp_index") or item.get("estimated_kp") or item.get("kp")
-            tstr = item.get("time_tag") or item.get("time_tag_estimated")
-            if raw is None or not tstr:
-                continue
-            val = float(str(raw).replace(",", "."))
-            dt = pendulum.parse(str(tstr).replace(" ", "T"), tz="UTC")
-            return val, int(dt.int_timestamp)
-    except Exception:
-        pass
-    return None, None
+# ───────────────────────── Kp (space_weather) ───────────────────────
 
 def _kp_state(kp: float) -> str:
     if kp < 3.0: return "спокойно"
@@ -761,91 +1102,13 @@ def get_kp() -> tuple[Optional[float], str, Optional[int], str]:
     Возвращает (kp_value, state, ts_unix, src_tag)
     src_tag ∈ {"swpc_table","swpc_1m","cache","n/d"}
     """
-    now_ts = int(time.time())
-
-    # 1) Табличный 3-часовой Kp
-    data = _fetch_kp_data(KP_URLS[0])
-    if data:
-        kp, ts = _parse_kp_from_table(data)
-        if isinstance(kp, (int, float)) and isinstance(ts, int):
-            _save_kp_cache(kp, ts, "swpc_table")
-            return kp, _kp_state(kp), ts, "swpc_table"
-
-    # 2) Резерв — 1m JSON
-    data = _fetch_kp_data(KP_URLS[1])
-    if data:
-        kp, ts = _parse_kp_from_dicts(data)
-        if isinstance(kp, (int, float)) and isinstance(ts, int):
-            _save_kp_cache(kp, ts, "swpc_1m")
-            return kp, _kp_state(kp), ts, "swpc_1m"
-
-    # 3) Кэш, если он не старый
-    c_kp, c_ts, c_src = _load_kp_cache()
-    if isinstance(c_kp, (int, float)) and isinstance(c_ts, int):
-        age = now_ts - c_ts
-        if age <= KP_TTL_SEC:
-            return c_kp, _kp_state(c_kp), c_ts, (c_src or "cache")
-        if age <= KP_HARD_MAX_AGE_SEC:
-            return c_kp, _kp_state(c_kp), c_ts, (c_src or "cache")
-
-    return None, "н/д", None, "n/d"
+    reading = space_weather.kp_observed()
+    if reading is None or (reading.src == "cache" and time.time() - reading.ts > KP_HARD_MAX_AGE_SEC):
+        return None, "н/д", None, "n/d"
+    return reading.kp, _kp_state(reading.kp), reading.ts, reading.src
 
 # ───────────────────────── Солнечный ветер (5-мин) ─────────────────
 
-def _load_sw_cache() -> Optional[Dict[str, Any]]:
-    try:
-        data = json.loads(SW_CACHE.read_text(encoding="utf-8"))
-        return data
-    except Exception:
-        return None
-
-def _save_sw_cache(obj: Dict[str, Any]) -> None:
-    try:
-        SW_CACHE.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
-    except Exception as e:
-        logging.warning("SW cache write error: %s", e)
-
-def _parse_table_latest(rowset: Any, want: List[str]) -> tuple[Optional[Dict[str, float]], Optional[int]]:
-    """
-    Универсальный парсер табличных продуктов SWPC:
-    Первый элемент — список названий колонок; далее — строки.
-    Возвращает словарь {col:value} и ts (UTC) по последней валидной строке.
-    """
-    try:
-        if not isinstance(rowset, list) or len(rowset) < 2 or not isinstance(rowset[0], list):
-            return None, None
-        header = rowset[0]
-        idx = {name: header.index(name) for name in want if name in header}
-        for row in reversed(rowset[1:]):
-            if not isinstance(row, list) or len(row) < len(header):
-                continue
-            tstr = row[idx.get("time_tag")] if "time_tag" in idx else row[0]
-            try:
-                dt = pendulum.parse(str(tstr).replace(" ", "T"), tz="UTC")
-                ts = int(dt.int_timestamp)
-            except Exception:
-                ts = int(time.time())
-            values: Dict[str, float] = {}
-            ok = False
-            for col in want:
-                if col == "time_tag":
-                    continue
-                j = idx.get(col)
-                if j is None or j >= len(row):
-                    continue
-                try:
-                    val = float(str(row[j]).replace(",", "."))
-                    if math.isfinite(val):
-                        values[col] = val
-                        ok = True
-                except Exception:
-                    continue
-            if ok:
-                return values, ts
-    except Exception:
-        pass
-    return None, None
-
 def _solar_wind_status(bz: Optional[float], v: Optional[float], n: Optional[float]) -> str:
     """
     Примитивная эвристика:
@@ -871,48 +1134,20 @@ def _solar_wind_status(bz: Optional[float], v: Optional[float], n: Optional[floa
 def get_solar_wind() -> Dict[str, Any]:
     """
     Возвращает: {'bz','bt','speed_kms','density','ts','status','src'}
-    Источник — SWPC 5-minute (mag/plasma). Кэш 10 мин.
+    Источник — SWPC 5-minute (mag/plasma) через space_weather; {} — данных нет.
     """
-    now_ts = int(time.time())
-
-    # 1) читаем оба продукта
-    mag = _safe_http_get(SWP_MAG_5M)
-    pla = _safe_http_get(SWP_PLA_5M)
-
-    bz = bt = v = n = None
-    ts_list: List[int] = []
-    src = "swpc_5m"
-
-    # магнетометр: интересны time_tag, bz_gsm, bt
-    if mag:
-        vals, ts = _parse_table_latest(mag, ["time_tag", "bz_gsm", "bt"])
-        if vals:
-            bz = vals.get("bz_gsm", bz)
-            bt = vals.get("bt", bt)
-        if ts: ts_list.append(ts)
-
-    # плазма: speed, density
-    if pla:
-        vals, ts = _parse_table_latest(pla, ["time_tag", "speed", "density"])
-        if vals:
-            v = vals.get("speed", v)
-            n = vals.get("density", n)
-        if ts: ts_list.append(ts)
-
-    if ts_list:
-        ts = max(ts_list)
-        status = _solar_wind_status(bz, v, n)
-        obj = {"bz": bz, "bt": bt, "speed_kms": v, "density": n, "ts": ts, "status": status, "src": src}
-        _save_sw_cache(obj)
-        return obj
-
-    # 2) кэш (10 мин)
-    cached = _load_sw_cache()
-    if cached and isinstance(cached.get("ts"), int) and (now_ts - int(cached["ts"]) <= SW_TTL_SEC):
-        cached["src"] = "cache"
-        return cached
-
-    return {}
+    sw = space_weather.solar_wind()
+    if sw is None:
+        return {}
+    return {
+        "bz": sw.bz,
+        "bt": sw.bt,
+        "speed_kms": sw.speed_kms,
+        "density": sw.density,
+        "ts": sw.ts,
+        "status": _solar_wind_status(sw.bz, sw.speed_kms, sw.density),
+        "src": sw.src,
+    }
 
 # ───────────────────────── CLI ─────────────────────────────────────
 
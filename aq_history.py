@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aq_history.py — local history of air-quality observations (VayboMeter).
+
+Every fresh reading air.py already fetches (official CY stations, merged
+city / region values) is appended here, so a post can talk about trends
+(«24h mean», «vs yesterday», «peak hour») without a single extra request.
+
+Storage, both under VAYBOMETER_CACHE_DIR:
+
+- aq_history.log — append-only journal, one JSON line per observation
+  {"k": series, "t": epoch hour, "pm25": …}; a torn last line is skipped;
+- aq_history.bin — compacted columnar store, in the spirit of the weather
+  binary cache: b"VBA1" | uint32 meta length | meta JSON | zero pad to 8 |
+  per series an int64 epoch column and one float32 column per field
+  (NaN = no value). meta = {"byteorder", "fields", "series": {key: [offset, n]}}.
+
+Once the journal holds COMPACT_AFTER lines it is folded into the .bin:
+one row per (series, hour) — the latest wins —, rows older than
+AQ_HISTORY_HOURLY_DAYS are downsampled to daily means, rows older than
+AQ_HISTORY_DAYS are dropped.
+
+Queries run on sorted epoch columns with per-field prefix sums, so a
+window mean is two bisects plus two subtractions, O(log n):
+
+    s = load().series("city:Limassol")
+    s.window("pm10", end_ts) → WindowStats(mean, n, peak, peak_at)
+    s.delta_vs_yesterday("pm10", end_ts) → mean(last 24h) − mean(24–48h ago)
+
+Series keys: "station:<official station name>", "city:<city key>",
+"point:<lat>,<lon>" (get_air without a city name).
+
+Env (optional):
+  AQ_HISTORY               default: 0 (off; the daily workflow turns it on)
+  AQ_HISTORY_DAYS          default: 30
+  AQ_HISTORY_HOURLY_DAYS   default: 7
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pendulum
+
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", ".cache"))
+HISTORY_PATH = CACHE_DIR / "aq_history.bin"
+JOURNAL_PATH = CACHE_DIR / "aq_history.log"
+
+FIELDS = ("pm25", "pm10", "o3", "no2", "aqi")
+RETENTION_DAYS = int(os.getenv("AQ_HISTORY_DAYS", "30") or "30")
+HOURLY_DAYS = int(os.getenv("AQ_HISTORY_HOURLY_DAYS", "7") or "7")
+COMPACT_AFTER = 256
+
+_MAGIC = b"VBA1"
+_HEAD = struct.Struct("<4sI")
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return (os.getenv("AQ_HISTORY") or "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+class WindowStats(NamedTuple):
+    mean: float
+    n: int
+    peak: float
+    peak_at: int  # epoch часа пика
+
+
+class Series:
+    """Sorted rows of one series: epochs + one column per field (NaN = no value)."""
+
+    __slots__ = ("epochs", "cols", "_prefix")
+
+    def __init__(self, epochs: array, cols: Dict[str, array]):
+        self.epochs = epochs
+        self.cols = cols
+        self._prefix: Dict[str, Tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def _sums(self, field: str) -> Tuple[array, array]:
+        hit = self._prefix.get(field)
+        if hit is None:
+            total, count = array("d", [0.0]), array("q", [0])
+            for v in self.cols[field]:
+                ok = v == v
+                total.append(total[-1] + (v if ok else 0.0))
+                count.append(count[-1] + ok)
+            hit = self._prefix[field] = (total, count)
+        return hit
+
+    def _span(self, start_ts: int, end_ts: int) -> Tuple[int, int]:
+        """Rows with start_ts < t <= end_ts."""
+        return bisect.bisect_right(self.epochs, start_ts), bisect.bisect_right(self.epochs, end_ts)
+
+    def mean(self, field: str, start_ts: int, end_ts: int) -> Optional[float]:
+        lo, hi = self._span(start_ts, end_ts)
+        total, count = self._sums(field)
+        n = count[hi] - count[lo]
+        return (total[hi] - total[lo]) / n if n else None
+
+    def window(self, field: str, end_ts: int, hours: int = 24) -> Optional[WindowStats]:
+        """Mean / peak over the hours ending at end_ts (hourly rows — at most `hours` of them)."""
+        lo, hi = self._span(end_ts - hours * 3600, end_ts)
+        col = self.cols[field]
+        best_i = None
+        for i in range(lo, hi):
+            if col[i] == col[i] and (best_i is None or col[i] > col[best_i]):
+                best_i = i
+        if best_i is None:
+            return None
+        total, count = self._sums(field)
+        n = count[hi] - count[lo]
+        return WindowStats((total[hi] - total[lo]) / n, n, col[best_i], self.epochs[best_i])
+
+    def delta_vs_yesterday(self, field: str, end_ts: int) -> Optional[float]:
+        today = self.mean(field, end_ts - 86400, end_ts)
+        yesterday = self.mean(field, end_ts - 2 * 86400, end_ts - 86400)
+        if today is None or yesterday is None:
+            return None
+        return today - yesterday
+
+    def latest(self, field: str) -> Optional[Tuple[int, float]]:
+        col = self.cols[field]
+        for i in range(len(col) - 1, -1, -1):
+            if col[i] == col[i]:
+                return self.epochs[i], col[i]
+        return None
+
+
+class History:
+    def __init__(self, series: Dict[str, Series]):
+        self._series = series
+
+    def keys(self) -> List[str]:
+        return sorted(self._series)
+
+    def series(self, key: str) -> Optional[Series]:
+        return self._series.get(key)
+
+
+# ---------- rows ----------
+Row = Tuple[int, Tuple[float, ...]]  # (epoch часа, значения в порядке FIELDS)
+
+
+def _hour(ts: float) -> int:
+    return int(ts) // 3600 * 3600
+
+
+def _value(v: Any) -> float:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return math.nan
+    return f if math.isfinite(f) and f >= 0 else math.nan
+
+
+def _compact_rows(rows: Dict[int, Tuple[float, ...]], now: float) -> Dict[int, Tuple[float, ...]]:
+    """Retention + downsampling of one series: {epoch: values} → {epoch: values}."""
+    drop_before = now - RETENTION_DAYS * 86400
+    daily_before = now - HOURLY_DAYS * 86400
+    out: Dict[int, Tuple[float, ...]] = {}
+    days: Dict[int, List[Tuple[float, ...]]] = {}
+    for ts, values in rows.items():
+        if ts < drop_before:
+            continue
+        if ts < daily_before:
+            days.setdefault(ts // 86400 * 86400, []).append(values)
+        else:
+            out[ts] = values
+    for day, group in days.items():
+        means = []
+        for i in range(len(FIELDS)):
+            vals = [g[i] for g in group if g[i] == g[i]]
+            means.append(sum(vals) / len(vals) if vals else math.nan)
+        out[day] = tuple(means)
+    return out
+
+
+# ---------- column file ----------
+def _encode(series_rows: Dict[str, Dict[int, Tuple[float, ...]]]) -> bytes:
+    blob = bytearray()
+    index: Dict[str, List[int]] = {}
+    for key in sorted(series_rows):
+        rows = series_rows[key]
+        if not rows:
+            continue
+        order = sorted(rows)
+        index[key] = [len(blob), len(order)]
+        blob.extend(array("q", order).tobytes())
+        for i in range(len(FIELDS)):
+            blob.extend(array("f", [rows[ts][i] for ts in order]).tobytes())
+        blob.extend(b"\0" * (-len(blob) % 8))
+    meta = {"byteorder": sys.byteorder, "fields": list(FIELDS), "series": index}
+    meta_raw = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = _HEAD.pack(_MAGIC, len(meta_raw)) + meta_raw
+    return head + b"\0" * (-len(head) % 8) + bytes(blob)
+
+
+def _decode(raw: bytes) -> Dict[str, Dict[int, Tuple[float, ...]]]:
+    magic, meta_len = _HEAD.unpack_from(raw)
+    if magic != _MAGIC:
+        raise ValueError("bad magic")
+    start = _HEAD.size
+    meta = json.loads(raw[start:start + meta_len].decode("utf-8"))
+    base = start + meta_len
+    base += -base % 8
+    fields = list(meta.get("fields") or [])
+    swap = meta.get("byteorder") != sys.byteorder
+    out: Dict[str, Dict[int, Tuple[float, ...]]] = {}
+    for key, (off, n) in meta["series"].items():
+        pos = base + off
+        epochs = array("q", raw[pos:pos + 8 * n])
+        pos += 8 * n
+        cols: Dict[str, array] = {}
+        for name in fields:
+            cols[name] = array("f", raw[pos:pos + 4 * n])
+            pos += 4 * n
+        if swap:
+            epochs.byteswap()
+            for col in cols.values():
+                col.byteswap()
+        nan_col = [math.nan] * n
+        per_field = [cols[f].tolist() if f in cols else nan_col for f in FIELDS]
+        out[key] = {ts: tuple(col[i] for col in per_field) for i, ts in enumerate(epochs)}
+    return out
+
+
+def _read_store() -> Dict[str, Dict[int, Tuple[float, ...]]]:
+    try:
+        raw = HISTORY_PATH.read_bytes()
+    except OSError:
+        return {}
+    try:
+        return _decode(raw)
+    except Exception as e:
+        LOG.warning("aq history: unreadable %s: %s", HISTORY_PATH.name, e)
+        return {}
+
+
+def _read_journal() -> List[Tuple[str, int, Tuple[float, ...]]]:
+    out: List[Tuple[str, int, Tuple[float, ...]]] = []
+    try:
+        lines = JOURNAL_PATH.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return out
+    for line in lines:
+        try:
+            rec = json.loads(line)
+            out.append((str(rec["k"]), int(rec["t"]), tuple(_value(rec.get(f)) for f in FIELDS)))
+        except Exception:
+            continue  # оборванная последняя строка и т.п.
+    return out
+
+
+def _merged_rows() -> Dict[str, Dict[int, Tuple[float, ...]]]:
+    rows = _read_store()
+    for key, ts, values in _read_journal():
+        rows.setdefault(key, {})[ts] = values
+    return rows
+
+
+# ---------- public ----------
+_LOADED: Optional[Tuple[tuple, History]] = None
+
+
+def _stamp() -> tuple:
+    out = []
+    for path in (HISTORY_PATH, JOURNAL_PATH):
+        try:
+            st = path.stat()
+            out.append((str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((str(path), None, None))
+    return tuple(out)
+
+
+def load() -> History:
+    """Store + journal as sorted columns; reused until either file changes."""
+    global _LOADED
+    with _LOCK:
+        stamp = _stamp()
+        if _LOADED is not None and _LOADED[0] == stamp:
+            return _LOADED[1]
+        series: Dict[str, Series] = {}
+        for key, rows in _merged_rows().items():
+            order = sorted(rows)
+            cols = {f: array("d", [rows[ts][i] for ts in order]) for i, f in enumerate(FIELDS)}
+            series[key] = Series(array("q", order), cols)
+        history = History(series)
+        _LOADED = (stamp, history)
+        return history
+
+
+def record(key: str, observed_ts: float, values: Dict[str, Any]) -> bool:
+    """Append one observation (hour-aligned). No-op when AQ_HISTORY is off or all values are empty."""
+    if not enabled():
+        return False
+    clean = {f: _value(values.get(f)) for f in FIELDS}
+    if all(v != v for v in clean.values()):
+        return False
+    line = json.dumps(
+        {"k": key, "t": _hour(observed_ts), **{f: v for f, v in clean.items() if v == v}},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    with _LOCK:
+        try:
+            JOURNAL_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with JOURNAL_PATH.open("a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        except OSError as e:
+            LOG.warning("aq history: cannot append: %s", e)
+            return False
+        try:
+            with JOURNAL_PATH.open("rb") as fh:
+                journal_lines = sum(1 for _ in fh)
+        except OSError:
+            journal_lines = 0
+        if journal_lines >= COMPACT_AFTER:
+            _compact_locked(time.time())
+    return True
+
+
+def record_air(key: str, data: Optional[Dict[str, Any]]) -> bool:
+    """Record an air.py reading (station or merged) if it is fresh and carries observed_at."""
+    if not enabled() or not isinstance(data, dict) or data.get("observation_status") not in (None, "fresh"):
+        return False
+    try:
+        observed = pendulum.parse(str(data.get("observed_at")))
+    except Exception:
+        return False
+    return record(key, observed.timestamp(), data)
+
+
+def compact(now: Optional[float] = None) -> None:
+    with _LOCK:
+        _compact_locked(time.time() if now is None else now)
+
+
+def _compact_locked(now: float) -> None:
+    rows = {key: _compact_rows(series_rows, now) for key, series_rows in _merged_rows().items()}
+    try:
+        HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = HISTORY_PATH.with_name(f"{HISTORY_PATH.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(_encode(rows))
+        os.replace(tmp, HISTORY_PATH)
+        JOURNAL_PATH.write_text("", encoding="utf-8")
+    except OSError as e:
+        LOG.warning("aq history: compaction failed: %s", e)
+
+
+def series_key(kind: str, name: Any) -> str:
+    return f"{kind}:{name}"
+
+
+def point_key(lat: float, lon: float) -> str:
+    return f"point:{float(lat):.3f},{float(lon):.3f}"
+
+
+__all__ = [
+    "FIELDS",
+    "History",
+    "Series",
+    "WindowStats",
+    "compact",
+    "enabled",
+    "load",
+    "point_key",
+    "record",
+    "record_air",
+    "series_key",
+]
@@ -11,7 +11,7 @@ import math
 import os
 from typing import Any, Dict, Iterable, List, Optional
 
-import requests
+from http_client import http_get
 
 
 EMSC_EVENT_QUERY_URL = "https://www.seismicportal.eu/fdsnws/event/1/query"
@@ -339,7 +339,7 @@ def fetch_regional_events(
         **_bbox_for_radius(float(radius_km)),
     }
     try:
-        resp = requests.get(
+        resp = http_get(
             EMSC_EVENT_QUERY_URL,
             params=params,
             timeout=REQUEST_TIMEOUT,
@@ -415,7 +415,7 @@ def fetch_usgs_events(
         "orderby": "time",
     }
     try:
-        resp = requests.get(
+        resp = http_get(
             USGS_EARTHQUAKE_QUERY_URL,
             params=params,
             timeout=REQUEST_TIMEOUT,
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+forecast_batch.py — per-day storm / UV peaks for many cities in one pass (VayboMeter).
+
+day_peaks(frames, date_obj) reduces the day's hourly rows of every ForecastFrame
+in one pass per column, for all cities that are not memoized yet:
+
+- max wind speed and max gust (km/h, as in the payload);
+- max hourly rain, thunderstorm and precipitation probability;
+- UV peak: daily uv_index_max when present, otherwise the hourly maximum
+  together with its local time.
+
+The reduction is a plain Python loop over the array('d') columns, by choice:
+a post evaluates the region plus a handful of cities, about 24 hourly rows
+each, and stacking that into NumPy arrays costs more than the scan itself.
+NumPy is installed in production (pandas pulls it in), but no post module
+imports it, and the PR checks run without it. Results are memoized on the
+frame, so a region payload that is already evaluated in a batch (or for the
+storm flags) is not scanned again for the UV line.
+
+Storm thresholds and warning texts stay in post_common.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from forecast_frame import ForecastFrame
+
+
+PEAK_COLUMNS = (
+    "wind_speed",
+    "wind_gusts",
+    "rain",
+    "thunderstorm_probability",
+    "precipitation_probability",
+    "uv_index",
+)
+_PEAK_KEYS = {
+    "wind_speed": "max_speed_kmh",
+    "wind_gusts": "max_gust_kmh",
+    "rain": "max_rain",
+    "thunderstorm_probability": "max_tprob",
+    "precipitation_probability": "max_pprob",
+    "uv_index": "uv_hourly_max",
+}
+
+
+def _memo_key(date_obj: Any) -> tuple:
+    try:
+        return ("peaks", date_obj.isoformat()[:10])
+    except Exception:
+        return ("peaks", str(date_obj)[:10])
+
+
+def _reduce(frames: Sequence[ForecastFrame], rows: List[Sequence[int]]) -> Dict[str, tuple]:
+    """column → (max per city, row of the first max per city); NaN/absent → None."""
+    out: Dict[str, tuple] = {}
+    for column in PEAK_COLUMNS:
+        maxima: List[Optional[float]] = []
+        positions: List[Optional[int]] = []
+        for frame, day_rows in zip(frames, rows):
+            col = frame.hourly[column]
+            best_v: Optional[float] = None
+            best_i: Optional[int] = None
+            for r in day_rows:
+                if r < len(col):
+                    v = col[r]
+                    if v == v and (best_v is None or v > best_v):
+                        best_v, best_i = v, r
+            maxima.append(best_v)
+            positions.append(best_i)
+        out[column] = (maxima, positions)
+    return out
+
+
+def day_peaks(frames: Sequence[ForecastFrame], date_obj: Any) -> List[Optional[Dict[str, Any]]]:
+    """
+    Peaks of date_obj for every frame, in the order of `frames`; None for a frame
+    without hourly rows on that date.
+
+    Keys: max_speed_kmh, max_gust_kmh, max_rain, max_tprob, max_pprob,
+    uv_hourly_max, uv_max (daily uv_index_max, else hourly), uv_peak_at
+    (local time of the hourly UV peak; None when uv_max comes from daily).
+    """
+    key = _memo_key(date_obj)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(frames)
+    pending: List[int] = []
+    for i, frame in enumerate(frames):
+        hit = frame.memo.get(key, frame.memo)
+        if hit is frame.memo:
+            pending.append(i)
+        else:
+            results[i] = hit
+    if not pending:
+        return results
+
+    todo = [frames[i] for i in pending]
+    rows = [frame.day_rows(date_obj) for frame in todo]
+    reduced = _reduce(todo, rows)
+    for j, i in enumerate(pending):
+        frame = todo[j]
+        if not rows[j]:
+            peaks = None
+        else:
+            peaks = {_PEAK_KEYS[c]: reduced[c][0][j] for c in PEAK_COLUMNS}
+            uv_daily = frame.daily_value("uv_index_max", date_obj)
+            if uv_daily is not None:
+                peaks["uv_max"], peaks["uv_peak_at"] = uv_daily, None
+            else:
+                peaks["uv_max"] = peaks["uv_hourly_max"]
+                peaks["uv_peak_at"] = frame.time_at(reduced["uv_index"][1][j])
+        frame.memo[key] = peaks
+        results[i] = peaks
+    return results
+
+
+__all__ = ["PEAK_COLUMNS", "day_peaks"]
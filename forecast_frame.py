@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+forecast_frame.py — typed column view over an Open‑Meteo payload (VayboMeter).
+
+ForecastFrame.of(wm, tz) is built once per (payload, timezone):
+
+- alias keys (windspeed_10m / wind_speed_10m / windspeed …) are resolved up
+  front into canonical columns, see HOURLY_COLUMNS / DAILY_COLUMNS;
+- every column is an array('d'); missing, non-numeric and non-finite values
+  are stored as NaN, so lookups never re-run float() in try/except;
+- hourly rows are grouped by local date through weather.time_index_for()
+  when the payload is indexed for this tz, otherwise the times are parsed once.
+
+Per-day aggregations: day_max, day_mean, day_circular_mean, day_argmax,
+nearest_row (nearest-hour sample). Values come back as float or None.
+Multi-city peaks (storm/UV) are computed in forecast_batch.day_peaks().
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pendulum
+
+from weather import hourly_range_for_date, nearest_hourly_index, time_index_for
+
+
+NAN = float("nan")
+
+# canonical name → alias keys, in lookup priority order
+HOURLY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "wind_speed": ("windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed"),
+    "wind_direction": ("winddirection_10m", "winddirection", "wind_dir_10m", "wind_dir"),
+    "wind_gusts": ("windgusts_10m", "wind_gusts_10m", "wind_gusts"),
+    "pressure": ("pressure_msl", "surface_pressure", "pressure"),
+    "rain": ("rain",),
+    "thunderstorm_probability": ("thunderstorm_probability",),
+    "precipitation_probability": ("precipitation_probability",),
+    "uv_index": ("uv_index", "uv_index_clear_sky", "uvindex"),
+}
+DAILY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "temperature_max": ("temperature_2m_max", "temperature_max", "temp_max"),
+    "temperature_min": ("temperature_2m_min", "temperature_min", "temp_min"),
+    "weather_code": ("weathercode", "weather_code"),
+    "uv_index_max": ("uv_index_max", "uv_index_max_clear_sky", "uv_index_clear_sky_max", "uv_index"),
+}
+HOURLY_TIME_KEYS = ("time", "time_local", "timestamp")
+
+FRAME_CACHE_SIZE = 32
+
+
+def _to_float(value: Any) -> float:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return NAN
+    return v if math.isfinite(v) else NAN
+
+
+def _column(section: Dict[str, Any], keys: Sequence[str]) -> array:
+    """First present alias wins (as post_common._pick did); a non-list value gives an empty column."""
+    for key in keys:
+        if key in section:
+            values = section[key]
+            return array("d", map(_to_float, values)) if isinstance(values, list) else array("d")
+    return array("d")
+
+
+def _at(col: array, idx: Optional[int]) -> Optional[float]:
+    if idx is None or not 0 <= idx < len(col):
+        return None
+    v = col[idx]
+    return None if v != v else v
+
+
+def _date_key(date_obj: Any) -> str:
+    try:
+        return date_obj.isoformat()[:10]
+    except Exception:
+        return str(date_obj)[:10]
+
+
+def _tz_name(tz: Any) -> str:
+    return str(getattr(tz, "name", None) or tz)
+
+
+class ForecastFrame:
+    """Array-backed hourly/daily columns of one payload in one local timezone."""
+
+    __slots__ = ("tz", "tz_name", "hourly", "daily", "memo", "_wm", "_indexed", "_times", "_row_days", "_daily_pos")
+
+    def __init__(self, wm: Dict[str, Any], tz: Any):
+        wm = wm if isinstance(wm, dict) else {}
+        hourly = wm.get("hourly") if isinstance(wm.get("hourly"), dict) else {}
+        daily = wm.get("daily") if isinstance(wm.get("daily"), dict) else {}
+        self.tz = tz
+        self.tz_name = _tz_name(tz)
+        self.hourly: Dict[str, array] = {name: _column(hourly, keys) for name, keys in HOURLY_COLUMNS.items()}
+        self.daily: Dict[str, array] = {name: _column(daily, keys) for name, keys in DAILY_COLUMNS.items()}
+        # производные по дням (forecast_batch.day_peaks) — живут столько же, сколько кадр
+        self.memo: Dict[tuple, Any] = {}
+        self._wm = wm
+        idx_map = time_index_for(wm, self.tz_name)
+        self._indexed = bool(idx_map) and isinstance(idx_map.get("hourly"), dict) and "time_epoch" in hourly
+        self._times: List[Any] = []
+        self._row_days: List[Optional[str]] = []
+        if not self._indexed:
+            raw_times = next((hourly[k] for k in HOURLY_TIME_KEYS if k in hourly), [])
+            for raw in raw_times if isinstance(raw_times, list) else []:
+                try:
+                    parsed = pendulum.parse(str(raw), tz=tz).in_tz(tz)
+                except Exception:
+                    parsed = None
+                self._times.append(parsed)
+                self._row_days.append(_date_key(parsed.date()) if parsed is not None else None)
+        self._daily_pos = self._daily_positions(wm, daily, tz)
+
+    @staticmethod
+    def _daily_positions(wm: Dict[str, Any], daily: Dict[str, Any], tz: Any) -> Dict[str, int]:
+        idx_map = time_index_for(wm)
+        if idx_map is not None:
+            return dict(idx_map["daily"])
+        out: Dict[str, int] = {}
+        for i, t in enumerate(daily.get("time") or daily.get("date") or []):
+            raw = str(t or "").strip()
+            if len(raw) == 10 and raw[4] == "-" and raw[7] == "-":
+                key = raw
+            else:
+                try:
+                    key = _date_key(pendulum.parse(raw).in_tz(tz).date())
+                except Exception:
+                    continue
+            out.setdefault(key, i)
+        return out
+
+    # ---------- construction / cache ----------
+    @classmethod
+    def of(cls, wm: Dict[str, Any], tz: Any) -> "ForecastFrame":
+        """Frame for (wm, tz), reused while the payload's hourly/daily objects live."""
+        if not isinstance(wm, dict):
+            return cls({}, tz)
+        parts = (wm.get("hourly"), wm.get("daily"), wm.get("time_index"))
+        key = tuple(id(p) for p in parts) + (_tz_name(tz),)
+        with _FRAMES_LOCK:
+            hit = _FRAMES.get(key)
+            if hit is not None:
+                _FRAMES.move_to_end(key)
+                return hit[1]
+        frame = cls(wm, tz)
+        with _FRAMES_LOCK:
+            # parts держим в кэше, чтобы id() не переиспользовались другими объектами
+            _FRAMES[key] = (parts, frame)
+            while len(_FRAMES) > FRAME_CACHE_SIZE:
+                _FRAMES.popitem(last=False)
+        return frame
+
+    # ---------- rows ----------
+    def day_rows(self, date_obj: Any) -> Sequence[int]:
+        """Hourly row indices of one local date (source order, gaps kept)."""
+        if self._indexed:
+            return hourly_range_for_date(self._wm, self.tz_name, date_obj) or range(0)
+        key = _date_key(date_obj)
+        return [i for i, day in enumerate(self._row_days) if day == key]
+
+    def daily_index(self, date_obj: Any) -> Optional[int]:
+        return self._daily_pos.get(_date_key(date_obj))
+
+    def time_at(self, idx: Optional[int]) -> Any:
+        if idx is None:
+            return None
+        if self._indexed:
+            return pendulum.from_timestamp(self._wm["hourly"]["time_epoch"][idx], tz=self.tz)
+        return self._times[idx] if 0 <= idx < len(self._times) else None
+
+    def nearest_row(
+        self,
+        date_obj: Any,
+        hour: int,
+        max_offset_minutes: int,
+    ) -> Tuple[Optional[int], Any]:
+        """(row, local time) closest to hour:00 of date_obj; ties go to the earlier row."""
+        target = pendulum.datetime(date_obj.year, date_obj.month, date_obj.day, hour, 0, tz=self.tz)
+        if self._indexed:
+            idx, diff = nearest_hourly_index(self._wm, self.tz_name, date_obj, target.int_timestamp)
+        else:
+            idx, diff = None, None
+            for i in self.day_rows(date_obj):
+                d = abs((self._times[i] - target).total_seconds())
+                if diff is None or d < diff:
+                    idx, diff = i, d
+        if idx is None or diff > max_offset_minutes * 60:
+            return None, None
+        return idx, self.time_at(idx)
+
+    # ---------- values ----------
+    def value(self, column: str, idx: Optional[int]) -> Optional[float]:
+        return _at(self.hourly[column], idx)
+
+    def daily_value(self, column: str, date_obj: Any) -> Optional[float]:
+        return _at(self.daily[column], self.daily_index(date_obj))
+
+    def day_values(self, column: str, date_obj: Any) -> List[float]:
+        col = self.hourly[column]
+        n = len(col)
+        return [v for i in self.day_rows(date_obj) if i < n and (v := col[i]) == v]
+
+    # ---------- per-day aggregations ----------
+    def day_max(self, column: str, date_obj: Any) -> Optional[float]:
+        values = self.day_values(column, date_obj)
+        return max(values) if values else None
+
+    def day_mean(self, column: str, date_obj: Any) -> Optional[float]:
+        values = self.day_values(column, date_obj)
+        return sum(values) / len(values) if values else None
+
+    def day_circular_mean(self, column: str, date_obj: Any) -> Optional[float]:
+        """Mean direction in degrees (0..360) over the day; None when undefined."""
+        values = self.day_values(column, date_obj)
+        if not values:
+            return None
+        x = sum(math.cos(math.radians(d)) for d in values)
+        y = sum(math.sin(math.radians(d)) for d in values)
+        if x == 0 and y == 0:
+            return None
+        return (math.degrees(math.atan2(y, x)) + 360.0) % 360.0
+
+    def day_argmax(self, column: str, date_obj: Any) -> Tuple[Optional[float], Optional[int]]:
+        """(max, first row holding it) over the day."""
+        col = self.hourly[column]
+        best_v: Optional[float] = None
+        best_i: Optional[int] = None
+        for i in self.day_rows(date_obj):
+            if i < len(col):
+                v = col[i]
+                if v == v and (best_v is None or v > best_v):
+                    best_v, best_i = v, i
+        return best_v, best_i
+
+
+_FRAMES: "OrderedDict[tuple, Tuple[tuple, ForecastFrame]]" = OrderedDict()
+_FRAMES_LOCK = threading.Lock()
+
+
+__all__ = [
+    "DAILY_COLUMNS",
+    "ForecastFrame",
+    "HOURLY_COLUMNS",
+]
@@ -435,11 +435,28 @@ def _normalize_evening_score_reasons(score_line: str) -> str:
     return f"{prefix.rstrip()} ; {_format_reason_list(normalized)}.".replace(" ;", ";")
 
 
-def _evening_flags(lines: list[str]) -> dict[str, bool]:
+def _evening_numbers(facts) -> tuple[float | None, float | None, float | None]:
+    """(max wind incl. gusts, max gust, max day temp) from PostFacts; None → parse the text."""
+    if facts is None:
+        return None, None, None
+    winds, gusts = facts.reported_winds()
+    day_temps = facts.day_temps()
+    return (
+        max(winds + gusts) if winds or gusts else None,
+        max(gusts) if gusts else None,
+        max(day_temps) if day_temps else None,
+    )
+
+
+def _evening_flags(lines: list[str], facts=None) -> dict[str, bool]:
     text = "\n".join(lines)
-    max_wind = _max_wind_ms(text)
-    max_gust = _max_gust_ms(text)
-    max_temp = _max_temperature_c(text)
+    max_wind, max_gust, max_temp = _evening_numbers(facts)
+    if max_wind is None:
+        max_wind = _max_wind_ms(text)
+    if max_gust is None:
+        max_gust = _max_gust_ms(text)
+    if max_temp is None:
+        max_temp = _max_temperature_c(text)
     forecast_air_text = "\n".join(_forecast_air_lines(lines))
     forecast_poor_air = _has_poor_air_signal(forecast_air_text)
     forecast_dust = _has_structured_dust_evidence(text, forecast_only=True)
@@ -955,12 +972,23 @@ def _value_at(arr, idx: int | None) -> float | None:
     return _to_float(arr[idx])
 
 
-def _source_wind_pressure_line(date_s: str) -> str:
+def _source_wind_pressure_line(date_s: str, facts=None) -> str:
     """Build wind, gust and pressure only from hourly data for the title date."""
     target_date = _parse_target_date(date_s)
     if target_date is None:
         return ""
 
+    region = getattr(facts, "region", None)
+    if region is not None and region.date == target_date.isoformat():
+        # build_message уже посчитал шапку по тем же hourly — без сети и разбора
+        return _wind_pressure_line(
+            region.wind_ms,
+            region.wind_dir,
+            region.gust_ms,
+            region.pressure_hpa,
+            region.pressure_trend or "→",
+        )
+
     try:
         from weather import get_weather  # type: ignore
         wm = get_weather(CY_LAT, CY_LON) or {}
@@ -995,6 +1023,14 @@ def _source_wind_pressure_line(date_s: str) -> str:
     if day_gusts:
         gust_ms = _kmh_to_ms(max(day_gusts))
 
+    trend = "→"
+    if isinstance(pressure, (int, float)) and isinstance(pressure_morn, (int, float)):
+        diff = float(pressure) - float(pressure_morn)
+        trend = "↑" if diff >= 0.3 else "↓" if diff <= -0.3 else "→"
+    return _wind_pressure_line(wind_ms, wind_dir, gust_ms, pressure, trend)
+
+
+def _wind_pressure_line(wind_ms, wind_dir, gust_ms, pressure, trend: str) -> str:
     parts: list[str] = []
     if isinstance(wind_ms, (int, float)):
         wind_part = f"💨 Ветер: {float(wind_ms):.1f} м/с"
@@ -1008,10 +1044,6 @@ def _source_wind_pressure_line(date_s: str) -> str:
         parts.append(f"💨 Порывы до {float(gust_ms):.0f} м/с")
 
     if isinstance(pressure, (int, float)):
-        trend = "→"
-        if isinstance(pressure_morn, (int, float)):
-            diff = float(pressure) - float(pressure_morn)
-            trend = "↑" if diff >= 0.3 else "↓" if diff <= -0.3 else "→"
         parts.append(f"🔹 {int(round(float(pressure)))} гПа {trend}")
 
     return " • ".join(parts)
@@ -1073,7 +1105,7 @@ def _safecast_private_sensor_line() -> str:
     return ""
 
 
-def build_morning_format_v2(region_name: str, safe_legacy_text: str) -> str:
+def build_morning_format_v2(region_name: str, safe_legacy_text: str, facts=None) -> str:
     """Compact morning post: only actionable weather, air, UV, valid Kp, wind/pressure and short plan."""
     lines = [x.rstrip() for x in str(safe_legacy_text or "").splitlines() if x.strip()]
     date_s = _date_from_title(safe_legacy_text)
@@ -1082,7 +1114,7 @@ def build_morning_format_v2(region_name: str, safe_legacy_text: str) -> str:
     greeting = _first_content_line(lines)
     temp_note = _temperature_note(greeting)
     warning = _storm_line(lines)
-    weather_line = _legacy_wind_pressure_line(lines) or _source_wind_pressure_line(date_s)
+    weather_line = _legacy_wind_pressure_line(lines) or _source_wind_pressure_line(date_s, facts)
     visibility = _morning_pick(lines, ("🌫 Видимость:",))
     uv = _morning_pick(lines, ("☀️", "🌞", "🔥"))
     sun = _morning_pick(lines, ("🌇",))
@@ -1140,7 +1172,7 @@ def build_morning_format_v2(region_name: str, safe_legacy_text: str) -> str:
     return "\n".join(out).strip()
 
 
-def build_evening_format_v2(region_name: str, safe_legacy_text: str) -> str:
+def build_evening_format_v2(region_name: str, safe_legacy_text: str, facts=None) -> str:
     lines = [x.rstrip() for x in str(safe_legacy_text or "").splitlines()]
     date_s = _date_from_title(safe_legacy_text)
     storm = _evening_storm_line(lines)
@@ -1150,7 +1182,7 @@ def build_evening_format_v2(region_name: str, safe_legacy_text: str) -> str:
     radiation = _critical_safecast_cy_line(lines) or _safecast_private_sensor_line()
     astro = _clean_evening_astro(lines)
     score = _first_line_starts(lines, ("✨ VayboMeter завтра:", "✨ VayboMeter:"))
-    flags = _evening_flags(lines)
+    flags = _evening_flags(lines, facts)
     if storm:
         flags["storm"] = True
     poor_air = bool(flags.get("poor_air"))
@@ -1213,8 +1245,9 @@ def build_evening_format_v2(region_name: str, safe_legacy_text: str) -> str:
     return "\n".join(out).strip()
 
 
-def build_format_v2(region_name: str, mode: str, safe_legacy_text: str) -> str:
+def build_format_v2(region_name: str, mode: str, safe_legacy_text: str, facts=None) -> str:
+    """facts — PostFacts из post_common.build_message_with_facts(); без них числа берутся из текста."""
     mode_s = (mode or "").strip().lower()
     if mode_s.startswith("morn"):
-        return build_morning_format_v2(region_name, safe_legacy_text)
-    return build_evening_format_v2(region_name, safe_legacy_text)
+        return build_morning_format_v2(region_name, safe_legacy_text, facts)
+    return build_evening_format_v2(region_name, safe_legacy_text, facts)
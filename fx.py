@@ -28,7 +28,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
 
 import json
-import requests
+from http_client import http_get, http_get_revalidated
 import pendulum
 import xml.etree.ElementTree as ET
 
@@ -39,6 +39,9 @@ FX_CACHE_PATH = Path("fx_cache.json")
 if Path("data").is_dir():
     FX_CACHE_PATH = Path("data") / "fx_cache.json"
 
+# ЕЦБ публикует курсы раз в день: XML держим час, потом — условный запрос (304 → старое тело)
+ECB_REVALIDATE_SEC = 3600
+
 # ЕЦБ — заголовки
 ECB_HEADERS = {
     "User-Agent": "VayboMeter/1.0 (+https://t.me/vaybometer)",
@@ -52,7 +55,7 @@ CODES_EUR_BASE = ("USD", "GBP", "TRY", "ILS")
 def fetch_cbr_daily(timeout: float = 10.0) -> Dict[str, Any]:
     """Тянет JSON с дневными курсами ЦБ. Возвращает {} при ошибке."""
     try:
-        r = requests.get(CBR_URL, timeout=timeout, headers={"User-Agent": "VayboMeter/1.0"})
+        r = http_get(CBR_URL, timeout=timeout, headers={"User-Agent": "VayboMeter/1.0"})
         r.raise_for_status()
         return r.json()
     except Exception:
@@ -205,7 +208,7 @@ def get_intermarket_eur() -> Dict[str, float]:
 
     # 2) exchangerate.host
     try:
-        r = requests.get(
+        r = http_get(
             "https://api.exchangerate.host/latest",
             params={"base": "EUR", "symbols": ",".join(symbols)},
             timeout=12,
@@ -221,7 +224,7 @@ def get_intermarket_eur() -> Dict[str, float]:
 
     # 3) frankfurter.app (ECB)
     try:
-        r = requests.get(
+        r = http_get(
             "https://api.frankfurter.app/latest",
             params={"from": "EUR", "to": ",".join(symbols)},
             timeout=12,
@@ -266,10 +269,9 @@ def get_ecb_eur_rates() -> Tuple[Dict[str, float], Optional[str]]:
     Возвращает (dict, 'YYYY-MM-DD') с официальными курсами ЕЦБ к EUR (USD/GBP/TRY/ILS).
     """
     try:
-        r = requests.get("https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml",
-                         headers=ECB_HEADERS, timeout=12)
-        r.raise_for_status()
-        return _parse_ecb_latest(r.content)
+        xml_text = http_get_revalidated("https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml",
+                                        ECB_REVALIDATE_SEC, headers=ECB_HEADERS, timeout=12)
+        return _parse_ecb_latest(xml_text.encode("utf-8")) if xml_text else ({}, None)
     except Exception:
         return {}, None
 
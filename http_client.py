@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_client.py — общий HTTP-слой для всех сборщиков VayboMeter.
+
+Один requests.Session на процесс: urllib3 держит пул keep-alive соединений на
+каждый хост, поэтому за один прогон open-meteo, NOAA SWPC, marine API и т.д.
+переиспользуют TLS-соединения вместо десятков новых рукопожатий.
+
+- http_get(url, params=None, headers=None, timeout=None, retries=None) → requests.Response
+- http_get_json(url, ...)  → JSON (raise_for_status внутри)
+- get_session()            → сам общий Session (если нужен прямой доступ)
+- http_get_revalidated(url, fresh_sec, ...) → тело с дисковым кэшем и условной
+  ревалидацией (ETag / Last-Modified): пока тело моложе fresh_sec — сеть не
+  трогаем, потом шлём If-None-Match / If-Modified-Since, и 304 просто продлевает
+  свежесть кэша без загрузки и разбора тела; stale_sec включает
+  stale-while-revalidate (чуть просроченное тело сразу, обновление — в фоне)
+- conditional_headers(v) / response_validators(resp) — то же для модулей со своим кэшем
+
+Политика повторов едина: сетевые ошибки/таймауты и статусы 429/5xx повторяются
+с экспоненциальным бэкофом (Retry-After учитывается, но не дольше
+HTTP_RETRY_AFTER_MAX_SEC); прочие 4xx возвращаются сразу. Одновременно к одному
+хосту уходит не больше HTTP_PER_HOST запросов (остальные ждут слот).
+
+Env (optional):
+  HTTP_TIMEOUT_SEC          default: 15
+  HTTP_RETRIES              default: 2   (дополнительные попытки после первой)
+  HTTP_BACKOFF_SEC          default: 0.5 (0.5, 1, 2 …)
+  HTTP_RETRY_AFTER_MAX_SEC  default: 10
+  HTTP_PER_HOST             default: 4
+  HTTP_POOL_SIZE            default: 10  (соединений в пуле на хост)
+  HTTP_SWR_DEADLINE_SEC     default: 15  (потолок фоновой ревалидации)
+  VAYBOMETER_CACHE_DIR      default: .cache (тела ответов — в <dir>/http/)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlencode, urlsplit
+
+try:
+    import requests  # type: ignore
+    from requests.adapters import HTTPAdapter  # type: ignore
+except Exception:
+    requests = None  # type: ignore
+    HTTPAdapter = None  # type: ignore
+
+
+LOG = logging.getLogger(__name__)
+
+TIMEOUT_SEC = float(os.getenv("HTTP_TIMEOUT_SEC", "15") or "15")
+RETRIES = int(os.getenv("HTTP_RETRIES", "2") or "2")
+BACKOFF_SEC = float(os.getenv("HTTP_BACKOFF_SEC", "0.5") or "0.5")
+RETRY_AFTER_MAX_SEC = float(os.getenv("HTTP_RETRY_AFTER_MAX_SEC", "10") or "10")
+PER_HOST = max(1, int(os.getenv("HTTP_PER_HOST", "4") or "4"))
+POOL_SIZE = max(PER_HOST, int(os.getenv("HTTP_POOL_SIZE", "10") or "10"))
+
+HTTP_CACHE_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", ".cache")) / "http"
+SWR_DEADLINE_SEC = float(os.getenv("HTTP_SWR_DEADLINE_SEC", "15") or "15")
+
+USER_AGENT = "VayboMeter/1.0"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_SESSION: Any = None
+_SESSION_LOCK = threading.Lock()
+_HOST_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_HOST_LOCK = threading.Lock()
+# фоновые ревалидации (stale-while-revalidate): не больше одной на файл кэша;
+# потоки daemon — не держат выход процесса; запись кэша атомарная
+_REFRESHING: Dict[Path, threading.Thread] = {}
+_REFRESH_LOCK = threading.Lock()
+
+
+# ---------- Session / per-host slots ----------
+def get_session() -> Any:
+    """Общий Session с пулом соединений (создаётся лениво, потокобезопасно)."""
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
+    if requests is None:
+        raise RuntimeError("requests is not installed")
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": USER_AGENT})
+            _SESSION = s
+    return _SESSION
+
+
+@contextmanager
+def _host_slot(url: str) -> Iterator[None]:
+    host = urlsplit(url).netloc.lower()
+    with _HOST_LOCK:
+        slot = _HOST_SLOTS.get(host)
+        if slot is None:
+            slot = _HOST_SLOTS[host] = threading.BoundedSemaphore(PER_HOST)
+    with slot:
+        yield
+
+
+def _retry_delay(resp: Any, attempt: int) -> float:
+    delay = BACKOFF_SEC * (2 ** attempt)
+    try:
+        retry_after = float((resp.headers or {}).get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return delay
+    return max(delay, min(retry_after, RETRY_AFTER_MAX_SEC))
+
+
+# ---------- Public API ----------
+def http_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    GET через общий Session. Возвращает Response (как requests.get) —
+    raise_for_status() остаётся на вызывающем. Если все попытки упали
+    на транспорте, пробрасывается последнее исключение.
+    """
+    tries = 1 + max(0, RETRIES if retries is None else int(retries))
+    timeout = TIMEOUT_SEC if timeout is None else timeout
+    session = get_session()
+    resp: Any = None
+    for attempt in range(tries):
+        last = attempt == tries - 1
+        try:
+            with _host_slot(url):
+                resp = session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+        except Exception as e:
+            if last:
+                raise
+            LOG.debug("http_get %s: %s (attempt %s/%s)", url, e, attempt + 1, tries)
+            time.sleep(BACKOFF_SEC * (2 ** attempt))
+            continue
+        if last or getattr(resp, "status_code", None) not in RETRY_STATUSES:
+            return resp
+        LOG.debug("http_get %s: HTTP %s (attempt %s/%s)", url, resp.status_code, attempt + 1, tries)
+        time.sleep(_retry_delay(resp, attempt))
+    return resp
+
+
+def http_get_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    **kwargs: Any,
+) -> Any:
+    """http_get() + raise_for_status() + .json()."""
+    r = http_get(url, params=params, headers=headers, timeout=timeout, retries=retries, **kwargs)
+    r.raise_for_status()
+    return r.json()
+
+
+# ---------- Conditional revalidation ----------
+def response_validators(resp: Any) -> Dict[str, str]:
+    """ETag / Last-Modified из ответа (пустой dict, если сервер их не шлёт)."""
+    headers = getattr(resp, "headers", None) or {}
+    out: Dict[str, str] = {}
+    if headers.get("ETag"):
+        out["etag"] = str(headers["ETag"])
+    if headers.get("Last-Modified"):
+        out["last_modified"] = str(headers["Last-Modified"])
+    return out
+
+
+def conditional_headers(validators: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since по сохранённым валидаторам."""
+    out: Dict[str, str] = {}
+    if not isinstance(validators, dict):
+        return out
+    if validators.get("etag"):
+        out["If-None-Match"] = str(validators["etag"])
+    if validators.get("last_modified"):
+        out["If-Modified-Since"] = str(validators["last_modified"])
+    return out
+
+
+def _revalidation_path(url: str, params: Optional[Dict[str, Any]], as_json: bool) -> Path:
+    key = url if not params else f"{url}?{urlencode(sorted(params.items()))}"
+    key = f"{'json' if as_json else 'text'}:{key}"
+    return HTTP_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}.json"
+
+
+def _read_entry(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        obj = json.loads(path.read_text("utf-8"))
+    except Exception:
+        return None
+    if isinstance(obj, dict) and isinstance(obj.get("fetched_at"), (int, float)) and "body" in obj:
+        return obj
+    return None
+
+
+def _write_entry(path: Path, entry: Dict[str, Any]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception as e:
+        LOG.debug("http cache write failed (%s): %s", path.name, e)
+
+
+def _revalidate(
+    url: str,
+    path: Path,
+    entry: Optional[Dict[str, Any]],
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: Optional[float],
+    retries: Optional[int],
+    as_json: bool,
+) -> Optional[Any]:
+    now = int(time.time())
+    req_headers = dict(headers or {})
+    req_headers.update(conditional_headers(entry))
+    try:
+        resp = http_get(url, params=params, headers=req_headers, timeout=timeout, retries=retries)
+        if resp.status_code == 304:
+            if entry is None:
+                return None
+            entry["fetched_at"] = now
+            entry.update(response_validators(resp))
+            _write_entry(path, entry)
+            LOG.debug("http 304 %s — cache extended", url)
+            return entry["body"]
+        resp.raise_for_status()
+        body = resp.json() if as_json else resp.text
+    except Exception as e:
+        LOG.debug("http_get_revalidated %s: %s", url, e)
+        return None
+    _write_entry(path, {"url": url, "fetched_at": now, "body": body, **response_validators(resp)})
+    return body
+
+
+def _revalidate_in_background(path: Path, *args: Any) -> None:
+    def run() -> None:
+        try:
+            _revalidate(*args)
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESHING.pop(path, None)
+
+    with _REFRESH_LOCK:
+        if path in _REFRESHING:
+            return
+        th = _REFRESHING[path] = threading.Thread(target=run, name=f"http-swr-{path.stem[:8]}", daemon=True)
+    th.start()
+
+
+def http_get_revalidated(
+    url: str,
+    fresh_sec: int,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    as_json: bool = False,
+    stale_sec: int = 0,
+) -> Optional[Any]:
+    """
+    Тело ответа (str, либо JSON при as_json=True) с дисковым кэшем:
+      - запись моложе fresh_sec → отдаём без сети;
+      - stale_sec > 0 и запись старше fresh_sec не более чем на stale_sec →
+        отдаём её сразу, а условный запрос уходит в фоновый поток
+        (одна попытка, не дольше HTTP_SWR_DEADLINE_SEC);
+      - иначе условный GET; 304 → та же запись, fetched_at = сейчас;
+      - 2xx → новое тело и валидаторы в кэш.
+    Сетевая ошибка, не-2xx или битый JSON → None: решения о «протухшем»
+    кэше остаются за вызывающим модулем (у каждого свои окна).
+    """
+    path = _revalidation_path(url, params, as_json)
+    entry = _read_entry(path)
+    if entry is not None:
+        age = int(time.time()) - int(entry["fetched_at"])
+        if age <= fresh_sec:
+            return entry["body"]
+        if stale_sec > 0 and age <= fresh_sec + stale_sec:
+            bg_timeout = min(TIMEOUT_SEC if timeout is None else timeout, SWR_DEADLINE_SEC)
+            _revalidate_in_background(path, url, path, dict(entry), params, headers, bg_timeout, 0, as_json)
+            return entry["body"]
+    return _revalidate(url, path, entry, params, headers, timeout, retries, as_json)
+
+
+__all__ = [
+    "conditional_headers",
+    "get_session",
+    "http_get",
+    "http_get_json",
+    "http_get_revalidated",
+    "response_validators",
+]
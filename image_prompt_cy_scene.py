@@ -329,12 +329,14 @@ def build_visual_context_cy(
     *,
     post_type: str = "evening",
     visibility_metadata: Mapping[str, Any] | None = None,
+    facts: Any = None,
 ) -> VisualContextCY:
     """Compatibility-named deterministic context step for the scene pipeline."""
     return parse_visual_context_cy(
         final_format_v2_message,
         post_type=post_type,
         visibility_metadata=visibility_metadata,
+        facts=facts,
     )
 
 
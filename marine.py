@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+marine.py — Open‑Meteo Marine wrapper with a TTL disk cache (VayboMeter).
+
+One request per location (or one request for several locations) asks for every
+hourly marine variable we use, so waves, wave period and SST share a payload:
+
+- get_marine(lat, lon)          → normalized payload (hourly time/epoch + variables)
+- get_marine_many(points)       → batched variant (comma-separated coordinates)
+- prefetch_marine(points)       → warm the per-point cache with one request
+- marine_value_now(lat, lon, k) → value at the nearest past UTC hour (SST rule from air.py)
+
+Payloads are always fetched in UTC; hourly["time"] is rewritten to ISO strings with
+an explicit +00:00 offset and hourly["time_epoch"] holds epoch seconds, so callers
+can select local hours in any timezone without re-fetching.
+
+Env (optional):
+  MARINE_URL              default: https://marine-api.open-meteo.com/v1/marine
+  MARINE_TIMEOUT_SEC      default: 18
+  MARINE_RETRIES          default: 1   (additional attempts; backoff as in http_client)
+  MARINE_CACHE_TTL_SEC    default: 3600
+  MARINE_STALE_MAX_SEC    default: 86400 (stale cache used when the API is down)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from http_client import http_get_json
+
+
+LOG = logging.getLogger(__name__)
+
+MARINE_URL = (os.getenv("MARINE_URL") or "https://marine-api.open-meteo.com/v1/marine").strip()
+TIMEOUT_SEC = float(os.getenv("MARINE_TIMEOUT_SEC", "18") or "18")
+RETRIES = int(os.getenv("MARINE_RETRIES", "1") or "1")
+CACHE_TTL_SEC = int(os.getenv("MARINE_CACHE_TTL_SEC", "3600") or "3600")
+STALE_MAX_SEC = int(os.getenv("MARINE_STALE_MAX_SEC", str(24 * 3600)) or str(24 * 3600))
+
+CACHE_DIR = Path(".cache")
+
+HOURLY_VARS = ["wave_height", "wave_period", "sea_surface_temperature"]
+
+
+# ---------- Cache helpers ----------
+def _cache_path(lat: float, lon: float) -> Path:
+    return CACHE_DIR / f"marine_{float(lat):.3f}_{float(lon):.3f}.json"
+
+
+def _now_ts() -> int:
+    return int(time.time())
+
+
+def _read_cache(path: Path) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    try:
+        obj = json.loads(path.read_text("utf-8"))
+    except Exception:
+        return None, None
+    if not isinstance(obj, dict):
+        return None, None
+    data, fetched_at = obj.get("data"), obj.get("fetched_at")
+    if isinstance(data, dict) and isinstance(fetched_at, (int, float)):
+        return data, int(fetched_at)
+    return None, None
+
+
+def _write_cache(path: Path, data: Dict[str, Any], fetched_at: int) -> None:
+    # tmp + os.replace: читатель никогда не видит наполовину записанный файл
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"fetched_at": fetched_at, "data": data}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+# ---------- HTTP / normalization ----------
+def _http_get_json(params: Dict[str, Any], timeout_sec: float, retries: int) -> Any:
+    # повторы и бэкоф — по общей политике http_client (сеть/таймаут, 429/5xx)
+    return http_get_json(MARINE_URL, params=params, timeout=timeout_sec, retries=retries)
+
+
+def _params(points: List[Tuple[float, float]]) -> Dict[str, Any]:
+    return {
+        "latitude": ",".join(str(float(la)) for la, _ in points),
+        "longitude": ",".join(str(float(lo)) for _, lo in points),
+        "hourly": ",".join(HOURLY_VARS),
+        "timezone": "UTC",
+    }
+
+
+def _normalize(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Keep hourly columns only; UTC times get an explicit offset and an epoch column."""
+    hourly = payload.get("hourly") if isinstance(payload, dict) else None
+    if not isinstance(hourly, dict) or not isinstance(hourly.get("time"), list):
+        return None
+    times: List[str] = []
+    epochs: List[int] = []
+    for t in hourly["time"]:
+        try:
+            dt = datetime.fromisoformat(str(t))
+        except (TypeError, ValueError):
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        times.append(dt.isoformat(timespec="minutes"))
+        epochs.append(int(dt.timestamp()))
+    out = {"time": times, "time_epoch": epochs}
+    for key in HOURLY_VARS:
+        values = hourly.get(key)
+        if isinstance(values, list) and len(values) == len(times):
+            out[key] = values
+    return {"latitude": payload.get("latitude"), "longitude": payload.get("longitude"), "hourly": out}
+
+
+def _split(obj: Any, expected: int) -> Optional[List[Any]]:
+    if isinstance(obj, list):
+        return obj if len(obj) == expected else None
+    if isinstance(obj, dict) and expected == 1:
+        return [obj]
+    return None
+
+
+# ---------- Public API ----------
+def prefetch_marine(
+    points: List[Tuple[float, float]],
+    cache_ttl_sec: Optional[int] = None,
+    timeout_sec: Optional[float] = None,
+    retries: Optional[int] = None,
+) -> int:
+    """
+    Fetch all stale points with one multi-location request and write each
+    payload to its .cache/marine_*.json entry. Returns the number written.
+    """
+    ttl = int(cache_ttl_sec) if isinstance(cache_ttl_sec, int) and cache_ttl_sec > 0 else CACHE_TTL_SEC
+    missing: List[Tuple[float, float]] = []
+    seen: set = set()
+    for la, lo in points or []:
+        try:
+            la, lo = float(la), float(lo)
+        except (TypeError, ValueError):
+            continue
+        path = _cache_path(la, lo)
+        if path in seen:
+            continue
+        seen.add(path)
+        _, fetched_at = _read_cache(path)
+        if isinstance(fetched_at, int) and _now_ts() - fetched_at <= ttl:
+            continue
+        missing.append((la, lo))
+    if not missing:
+        return 0
+
+    extra = max(0, RETRIES if retries is None else int(retries))
+    timeout = TIMEOUT_SEC if timeout_sec is None else float(timeout_sec)
+    try:
+        items = _split(_http_get_json(_params(missing), timeout, extra), len(missing))
+    except Exception as e:
+        LOG.warning("marine fetch failed (n=%s): %s", len(missing), e)
+        return 0
+    normalized = [_normalize(item) for item in items] if items is not None else None
+    if normalized is None or any(item is None for item in normalized):
+        LOG.warning("marine fetch: unexpected payload shape (n=%s)", len(missing))
+        return 0
+    fetched_at = _now_ts()
+    for (la, lo), data in zip(missing, normalized):
+        _write_cache(_cache_path(la, lo), data, fetched_at)
+    return len(missing)
+
+
+def get_marine(
+    lat: float,
+    lon: float,
+    cache_ttl_sec: Optional[int] = None,
+    timeout_sec: Optional[float] = None,
+    retries: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Marine payload for one point: fresh cache → network → stale cache (≤ MARINE_STALE_MAX_SEC).
+    Returns {} when nothing usable is available.
+    """
+    ttl = int(cache_ttl_sec) if isinstance(cache_ttl_sec, int) and cache_ttl_sec > 0 else CACHE_TTL_SEC
+    path = _cache_path(lat, lon)
+    data, fetched_at = _read_cache(path)
+    if data is not None and isinstance(fetched_at, int) and _now_ts() - fetched_at <= ttl:
+        return data
+    if prefetch_marine([(lat, lon)], cache_ttl_sec=ttl, timeout_sec=timeout_sec, retries=retries):
+        fresh, _ = _read_cache(path)
+        if fresh is not None:
+            return fresh
+    if data is not None and isinstance(fetched_at, int) and _now_ts() - fetched_at <= STALE_MAX_SEC:
+        LOG.info("marine: using stale cache %s", path.name)
+        return data
+    return {}
+
+
+def get_marine_many(
+    points: List[Tuple[float, float]],
+    cache_ttl_sec: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Batched get_marine(); payloads in the order of `points`."""
+    pts = list(points or [])
+    try:
+        prefetch_marine(pts, cache_ttl_sec=cache_ttl_sec)
+    except Exception as e:
+        LOG.warning("marine batch prefetch crashed: %s", e)
+    return [get_marine(la, lo, cache_ttl_sec=cache_ttl_sec) for la, lo in pts]
+
+
+def marine_value_now(lat: float, lon: float, key: str) -> Optional[float]:
+    """
+    Value of `key` at the nearest past UTC hour (first row if all are in the
+    future). Negative and non-finite values are treated as missing.
+    """
+    hourly = (get_marine(lat, lon) or {}).get("hourly") or {}
+    epochs = hourly.get("time_epoch") or []
+    values = hourly.get(key) or []
+    if not epochs or len(values) != len(epochs):
+        return None
+    now_hour = _now_ts() // 3600 * 3600
+    idx = max(0, bisect_right(epochs, now_hour) - 1)
+    try:
+        v = float(values[idx])
+    except (TypeError, ValueError):
+        return None
+    return v if (math.isfinite(v) and v >= 0) else None
+
+
+__all__ = [
+    "get_marine",
+    "get_marine_many",
+    "marine_value_now",
+    "prefetch_marine",
+]
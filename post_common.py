@@ -8,14 +8,18 @@ post_common.py — VayboMeter (Кипр/универсальный).
 Астроблок — короткий, «по-человечески». Космопогода/воздух — только утром.
 
 Важно:
-- Kp как в мировом чате (NOAA) — USE_WORLD_KP=1.
+- Kp как в мировом чате (NOAA) — USE_WORLD_KP=1; с SPACE_HISTORY=1 к нему
+  добавляется динамика из локальной истории (space_history.py).
 - Защита от перепутанных аргументов tz/mode.
 - Терпимый парсер входных списков городов.
 - ASTRO_OFFSET — сдвиг даты для астроблока (в днях, по умолчанию 0).
+- Сетевые данные поста собираются одним графом источников (source_graph.py)
+  до сборки текста: таймауты по группам — CY_SOURCE_TIMEOUTS, лимиты — CY_SOURCE_LIMITS.
 """
 
 from __future__ import annotations
 import os, re, json, html, asyncio, logging, math, datetime as dt, random, imghdr, hashlib
+import contextvars
 from pathlib import Path
 from typing import Any, Dict, List, Tuple, Optional, Sequence, Union
 
@@ -29,9 +33,15 @@ from weather      import (
     fetch_tomorrow_temps,
     get_cyprus_visibility_context,
     get_weather,
+    prefetch_weather,
     save_cyprus_visibility_diagnostics,
+    weather_budget,
 )
+from forecast_frame import ForecastFrame
+from forecast_batch import day_peaks
+from post_facts   import CityFacts, PostFacts
 from air          import get_air, get_air_for_cities, get_sst, get_solar_wind
+from marine       import get_marine, prefetch_marine
 from pollen       import get_pollen
 from radiation    import get_radiation
 from earthquakes  import build_cyprus_quake_line, get_recent_earthquakes_cyprus
@@ -39,10 +49,11 @@ from gpt          import gpt_blurb, gpt_complete
 from world_en.imagegen import generate_astro_image
 from image_prompt_cy   import build_cyprus_evening_prompt
 
-try:
-    import requests  # type: ignore
-except Exception:
-    requests = None  # type: ignore
+import section_memo
+import space_history
+import space_weather
+import sun_table
+from source_graph import Snapshot, Source, call_key, collect
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -256,7 +267,9 @@ def code_desc(c: Any) -> Optional[str]:
         return WMO_DESC.get(int(c))
     except Exception:
         return None
- # ───────────── UV helpers (утро) ─────────────
+
+
+# ───────────── UV helpers (утро) ─────────────
 def _daily_idx_for_date(
     wm: Dict[str, Any],
     tz: pendulum.tz.timezone.Timezone,
@@ -264,26 +277,11 @@ def _daily_idx_for_date(
 ) -> Optional[int]:
     """Ищет индекс нужной даты в wm['daily']['time'] / ['date']."""
     try:
-        daily = wm.get("daily") or {}
-        times = daily.get("time") or daily.get("date") or []
-        try:
-            target_key = date_obj.to_date_string()
-        except Exception:
-            target_key = str(date_obj)[:10]
-        for i, t in enumerate(times):
-            raw = str(t or "").strip()
-            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", raw):
-                if raw == target_key:
-                    return i
-                continue
-            dt_i = _parse_iso_to_tz(t, tz)
-            if dt_i and dt_i.date() == date_obj:
-                return i
+        return ForecastFrame.of(wm, tz).daily_index(date_obj)
     except Exception:
-        pass
-    return None
- 
- 
+        return None
+
+
 def _uv_max_for_date(
     wm: Dict[str, Any],
     tz_obj: pendulum.Timezone,
@@ -293,58 +291,17 @@ def _uv_max_for_date(
     Возвращает (uv_max, peak_time_HH:mm?) для указанной даты.
     Пытается взять из daily uv_index_max; если нет — из hourly uv_index.
     """
-    # 1) daily
-    try:
-        daily = wm.get("daily") or {}
-        idx = _daily_idx_for_date(wm, tz_obj, date_obj)
-        if idx is not None:
-            # наиболее вероятные ключи в Open-Meteo
-            cand_keys = [
-                "uv_index_max",
-                "uv_index_max_clear_sky",
-                "uv_index_clear_sky_max",
-                "uv_index",  # иногда отдают дневной uv как массив
-            ]
-            for k in cand_keys:
-                arr = daily.get(k)
-                if isinstance(arr, list) and idx < len(arr) and arr[idx] is not None:
-                    try:
-                        return float(arr[idx]), None
-                    except Exception:
-                        continue
-    except Exception:
-        pass
-
-    # 2) hourly fallback
     try:
-        hourly = wm.get("hourly") or {}
-        arr = _pick(hourly, "uv_index", "uv_index_clear_sky", "uvindex", default=[])
-        times = _hourly_times(wm)
-        idxs = [
-            i for i, t in enumerate(times)
-            if t and (t.in_tz(tz_obj).date() == date_obj)
-        ]
-        best_v: Optional[float] = None
-        best_i: Optional[int] = None
-        for i in idxs:
-            if i < len(arr) and arr[i] is not None:
-                try:
-                    v = float(arr[i])
-                except Exception:
-                    continue
-                if best_v is None or v > best_v:
-                    best_v, best_i = v, i
-        peak = None
-        if best_i is not None and best_i < len(times):
-            try:
-                peak = times[best_i].in_tz(tz_obj).format("HH:mm")
-            except Exception:
-                peak = None
-        return best_v, peak
+        frame = ForecastFrame.of(wm, tz_obj)
+        peaks = day_peaks([frame], date_obj)[0]
+        if peaks is None:
+            return frame.daily_value("uv_index_max", date_obj), None
+        peak_at = peaks["uv_peak_at"]
+        return peaks["uv_max"], (peak_at.format("HH:mm") if peak_at is not None else None)
     except Exception:
         return None, None
- 
- 
+
+
 def _uv_warning_line_for_morning(
     wm_region: Dict[str, Any],
     tz_obj: pendulum.Timezone,
@@ -374,6 +331,9 @@ def _uv_warning_line_for_morning(
         lvl = "Extreme"
         tip = "минимум солнца 11–16, тень/закрытая одежда, SPF 50+"
 
+    facts = _POST_FACTS.get()
+    if facts is not None:
+        facts.uv_max = uv_i
     peak_txt = f" (пик около {peak})" if peak else ""
     return f"☀️ <b>УФ-индекс {uv_i} ({lvl})</b>{peak_txt}: {tip}"
 
@@ -485,18 +445,16 @@ def _noaa_sun_times(
 def _sun_times_for_date(
     lat: float, lon: float, date_obj: pendulum.Date, tz: pendulum.tz.timezone.Timezone
 ) -> tuple[Optional[pendulum.DateTime], Optional[pendulum.DateTime]]:
+    # города поста есть в sun_times.json — готовые времена без разбора payload и расчёта
+    day = sun_table.lookup(lat, lon, date_obj, tz)
+    if day is not None and (day.sunrise or day.sunset):
+        return day.sunrise, day.sunset
     try:
-        wm = get_weather(lat, lon) or {}
+        wm = _fetched(get_weather, lat, lon) or {}
         daily = wm.get("daily") or {}
-        times = daily.get("time") or daily.get("date") or []
         sunr = daily.get("sunrise") or daily.get("sunrise_time") or []
         suns = daily.get("sunset") or daily.get("sunset_time") or []
-        idx = None
-        for i, t in enumerate(times):
-            dt_i = _parse_iso_to_tz(t, tz)
-            if dt_i and dt_i.date() == date_obj:
-                idx = i
-                break
+        idx = _daily_idx_for_date(wm, tz, date_obj)
         if idx is not None:
             sr = _parse_iso_to_tz(sunr[idx], tz) if idx < len(sunr) else None
             ss = _parse_iso_to_tz(suns[idx], tz) if idx < len(suns) else None
@@ -520,6 +478,167 @@ def _sun_times_for_date(
     return _noaa_sun_times(date_obj, lat, lon, tz)
 
 
+def _prefetch_city_weather(sea_pairs, other_pairs) -> None:
+    """Один батч-запрос Open-Meteo на все города + регион: дальше get_weather читает кэш."""
+    points = [(CY_LAT, CY_LON)] + [coords for _name, coords in list(sea_pairs) + list(other_pairs)]
+    try:
+        n = prefetch_weather(points, retries=0)
+        if n:
+            logging.info("weather prefetch: %s точек одним запросом", n)
+    except Exception as e:
+        logging.warning("weather prefetch failed: %s", e)
+
+
+# ───────────── сбор данных: граф источников (source_graph) ─────────────
+CY_FETCH_WORKERS = int(os.getenv("CY_FETCH_WORKERS", "8") or "8")
+# Общий бюджет времени на всю погоду одного build_message (префетч + get_weather
+# по городам): по исчерпании weather отдаёт stale-кэш, не начиная новых попыток.
+CY_WEATHER_BUDGET_SEC = float(os.getenv("CY_WEATHER_BUDGET_SEC", "45") or "45")
+# Потолок на один источник, по группам (сек): не ответил — в снапшоте default,
+# пост собирается с «н/д» на его месте. LLM астроблока — со своими таймаутами gpt.py.
+CY_SOURCE_TIMEOUTS: Dict[str, Optional[float]] = {
+    "open-meteo": CY_WEATHER_BUDGET_SEC + 15,
+    "marine": 60,
+    "air": 60,
+    "swpc": 30,
+    "quakes": 45,
+    "llm": None,
+}
+# Сколько запросов одной группы идут одновременно (остальные ждут в очереди графа)
+CY_SOURCE_LIMITS: Dict[str, int] = {"open-meteo": 4, "marine": 4, "air": 2, "llm": 1}
+
+# Снапшот данных текущего build_message (None — собираем без графа, прямыми вызовами)
+_RUN_SNAPSHOT: contextvars.ContextVar[Optional[Snapshot]] = contextvars.ContextVar(
+    "cy_run_snapshot",
+    default=None,
+)
+
+# Факты поста, который сейчас собирает build_message_with_facts() (None — не собираем)
+_POST_FACTS: contextvars.ContextVar[Optional[PostFacts]] = contextvars.ContextVar(
+    "cy_post_facts",
+    default=None,
+)
+
+
+def _iso_day(day: Any) -> Optional[str]:
+    try:
+        return day.isoformat()[:10]
+    except Exception:
+        return str(day)[:10] if day is not None else None
+
+
+def _fetched(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs), но из снапшота текущего build_message, если этот вызов
+    в нём объявлен: готовое значение (или то же исключение; при таймауте — default
+    источника). Необъявленные вызовы — как раньше, синхронно.
+    """
+    snap = _RUN_SNAPSHOT.get()
+    if snap is None or not snap.has(fn, args, kwargs):
+        return fn(*args, **kwargs)
+    return snap.result(fn, args, kwargs)
+
+
+def _source(name: str, group: str, fn, *args, after: Tuple[str, ...] = (), default: Any = None, **kwargs) -> Source:
+    return Source(
+        name,
+        fn,
+        args,
+        kwargs,
+        after=after,
+        timeout=CY_SOURCE_TIMEOUTS.get(group),
+        group=group,
+        default=default,
+    )
+
+
+def _quake_query() -> Optional[Dict[str, float]]:
+    """Параметры утренней сводки землетрясений (CY_QUAKES_24H=1), иначе None."""
+    if os.getenv("CY_QUAKES_24H", "").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    try:
+        hours = int(float(os.getenv("CY_QUAKE_HOURS", "24")))
+    except Exception:
+        hours = 24
+    try:
+        radius_km = float(os.getenv("CY_QUAKE_RADIUS_KM", "350"))
+    except Exception:
+        radius_km = 350.0
+    try:
+        min_mag = float(os.getenv("CY_QUAKE_MIN_MAG", "0.9"))
+    except Exception:
+        min_mag = 0.9
+    return {"hours": hours, "radius_km": radius_km, "min_mag": min_mag}
+
+
+def _collection_sources(
+    sea_pairs: Sequence[tuple[str, tuple[float, float]]],
+    other_pairs: Sequence[tuple[str, tuple[float, float]]],
+    tz_obj: pendulum.Timezone,
+    is_morning: bool,
+) -> List[Source]:
+    """
+    Всё, что сеть даёт посту, одним графом: погода (батч → города), волны/SST
+    (marine-батч → точки), воздух, а утром ещё пыльца, землетрясения, Kp и
+    солнечный ветер; вечером — астроблок с LLM. Имена — для логов и зависимостей.
+    """
+    pairs = list(sea_pairs) + list(other_pairs)
+    out: List[Source] = [
+        _source("weather:batch", "open-meteo", _prefetch_city_weather, list(sea_pairs), list(other_pairs)),
+        _source("weather:region", "open-meteo", get_weather, CY_LAT, CY_LON, after=("weather:batch",)),
+    ]
+    seen = {call_key(get_weather, (CY_LAT, CY_LON), {})}
+    for city, (la, lo) in pairs:
+        if call_key(get_weather, (la, lo), {}) not in seen:
+            seen.add(call_key(get_weather, (la, lo), {}))
+            out.append(_source(f"weather:{city}", "open-meteo", get_weather, la, lo, after=("weather:batch",)))
+
+    out.append(_source("marine:batch", "marine", prefetch_marine, [coords for _city, coords in sea_pairs]))
+    tomorrow = pendulum.today(tz_obj).add(days=1).date()
+    for city, (la, lo) in sea_pairs:
+        if call_key(get_sst_cached, (la, lo), {}) in seen:
+            continue
+        seen.add(call_key(get_sst_cached, (la, lo), {}))
+        out.append(_source(f"sst:{city}", "marine", get_sst_cached, la, lo, after=("marine:batch",)))
+        if not is_morning:
+            out.append(_source(
+                f"wave:{city}",
+                "marine",
+                _fetch_wave_for_tomorrow,
+                la,
+                lo,
+                tz_obj,
+                after=("marine:batch",),
+                default=(None, None, None),
+                prefer_hour=SUP_TARGET_HOUR,
+                target_date=tomorrow,
+            ))
+
+    # города первыми: их общий Open-Meteo-запрос покрывает и точку региона (мемо air.py по координате)
+    selected = _air_city_selection(pairs)
+    if selected:
+        out.append(_source("air:cities", "air", get_air_for_cities, selected, default={}))
+    out.append(_source("air:region", "air", get_air, CY_LAT, CY_LON))
+
+    if is_morning:
+        out.append(_source("pollen", "air", get_pollen))
+        quakes = _quake_query()
+        if quakes is not None:
+            out.append(_source("quakes", "quakes", get_recent_earthquakes_cyprus, **quakes))
+        if USE_WORLD_KP:
+            out.append(_source("kp", "swpc", _fetch_world_kp, default=(None, None)))
+        out.append(_source("solar_wind", "swpc", get_solar_wind))
+    else:
+        out.append(_source(
+            "astro",
+            "llm",
+            _astro_section_for_day,
+            _iso_day(pendulum.today(tz_obj).add(days=1)),
+            tz_obj.name,
+        ))
+    return out
+
+
 def _choose_sun_coords(sea_pairs, other_pairs) -> Tuple[float, float]:
     prim = (PRIMARY_CITY_NAME or "").strip().lower()
 
@@ -540,53 +659,76 @@ def _choose_sun_coords(sea_pairs, other_pairs) -> Tuple[float, float]:
 
 
 def sun_line_for_mode(mode: str, tz: pendulum.tz.timezone.Timezone, lat: float, lon: float) -> Optional[str]:
-    m = (mode or "evening").lower()
-    if m.startswith("morn"):
-        date_use = pendulum.today(tz)
+    morning = (mode or "evening").lower().startswith("morn")
+    date_use = pendulum.today(tz) if morning else pendulum.today(tz).add(days=1)
+    # рассвет/закат зависят только от даты и точки — повторные запуски дня берут строку с диска
+    memo_inputs = {
+        "morning": morning,
+        "date": _iso_day(date_use),
+        "lat": round(float(lat), 4),
+        "lon": round(float(lon), 4),
+        "tz": getattr(tz, "name", str(tz)),
+    }
+    cached = section_memo.lookup("sun", memo_inputs)
+    if cached is not None:
+        return cached
+
+    line = None
+    if morning:
         _, ss = _sun_times_for_date(lat, lon, date_use, tz)
         if ss:
-            return f"🌇 Закат сегодня: {ss.format('HH:mm')}"
+            line = f"🌇 Закат сегодня: {ss.format('HH:mm')}"
     else:
-        date_use = pendulum.today(tz).add(days=1)
         sr, _ = _sun_times_for_date(lat, lon, date_use, tz)
         if sr:
-            return f"🌅 Рассвет завтра: {sr.format('HH:mm')}"
-    return None
+            line = f"🌅 Рассвет завтра: {sr.format('HH:mm')}"
+    if line:
+        section_memo.store("sun", memo_inputs, line)
+    return line
+
+
+def _fact_of_day(day: Any, region_name: str) -> str:
+    """get_fact() один раз на дату: без таблицы на дату он выбирает случайно, а повторный запуск должен совпасть."""
+    memo_inputs = {"date": _iso_day(day), "region": region_name}
+    cached = section_memo.lookup("fact", memo_inputs)
+    if cached is not None:
+        return cached
+    fact = get_fact(day, region_name) or ""
+    if fact:
+        section_memo.store("fact", memo_inputs, fact)
+    return fact
 
 
 # ───────────── NOAA Kp (для утра) ─────────────
 def _fetch_world_kp() -> Tuple[Optional[float], Optional[int]]:
-    if not requests:
-        return None, None
+    """(Kp, возраст наблюдения в минутах) — тот же кэш SWPC, что у world-постов."""
     try:
-        url = "https://services.swpc.noaa.gov/products/noaa-planetary-k-index.json"
-        r = requests.get(
-            url,
-            timeout=15,
-            headers={
-                "User-Agent": "VayboMeter/1.0",
-                "Accept": "application/json",
-                "Cache-Control": "no-cache",
-            },
-        )
-        r.raise_for_status()
-        data = r.json()
-        rows = [row for row in data if isinstance(row, list) and len(row) >= 2][1:]
-        if not rows:
-            return None, None
-        last = rows[-1]
-        val = float(last[1]) if last[1] not in (None, "null", "") else None
-        ts_iso = str(last[0]) if last[0] else None
-        age_min = None
-        if ts_iso:
-            try:
-                dt_utc = pendulum.parse(ts_iso).in_tz("UTC")
-                age_min = int((pendulum.now("UTC") - dt_utc).total_minutes())
-            except Exception:
-                age_min = None
-        return val, age_min
+        reading = space_weather.kp_observed()
     except Exception:
         return None, None
+    if reading is None:
+        return None, None
+    return reading.kp, int((pendulum.now("UTC").int_timestamp - reading.ts) // 60)
+
+
+def _kp_history_tail() -> str:
+    """«; за 6 ч +1.7, буря 9 ч» из локальной истории Kp (SPACE_HISTORY), иначе пусто."""
+    if not space_history.enabled():
+        return ""
+    try:
+        summary = space_history.kp_summary()
+    except Exception:
+        return ""
+    parts = []
+    change = summary.get("change_6h")
+    if isinstance(change, (int, float)) and abs(change) >= 1.0:
+        parts.append(f"за 6 ч {change:+.1f}")
+    hours = summary.get("storm_hours")
+    if isinstance(hours, (int, float)):
+        parts.append(f"буря {hours:.0f} ч")
+    elif isinstance(summary.get("max_24h"), (int, float)) and summary["max_24h"] >= 5.0:
+        parts.append(f"max за сутки {summary['max_24h']:.1f}")
+    return "; " + ", ".join(parts) if parts else ""
 
 
 def _kp_status_label(kp: Optional[float]) -> str:
@@ -1084,6 +1226,43 @@ def build_astro_section(
     if not isinstance(rec, dict):
         rec = {}
 
+    memo_inputs = _astro_section_inputs(work_date, rec, tz_local)
+    cached = section_memo.lookup("astro", memo_inputs)
+    if cached is not None:
+        return cached
+    text = _render_astro_section(work_date, rec, tz_local)
+    # без LLM-ответа на диске (сбой/таймаут) не запоминаем: повторный запуск попробует ещё раз
+    if not USE_DAILY_LLM or _astro_llm_cache_state(work_date.format("DD.MM.YYYY")):
+        section_memo.store("astro", _astro_section_inputs(work_date, rec, tz_local), text)
+    return text
+
+
+def _astro_section_for_day(day_iso: str, tz_local: str) -> str:
+    """build_astro_section по ISO-дате: источник графа и рендер совпадают по ключу, а не по равенству DateTime."""
+    return build_astro_section(date_local=pendulum.parse(day_iso, tz=tz_local), tz_local=tz_local)
+
+
+def _astro_llm_cache_state(date_str: str) -> List[List[str]]:
+    """LLM-интерпретации этой даты на диске (имя файла + текст) — вход фингерпринта секции."""
+    try:
+        files = sorted(CACHE_DIR.glob(f"astro_{date_str}_*.txt"))
+        return [[p.name, p.read_text("utf-8")] for p in files]
+    except OSError:
+        return []
+
+
+def _astro_section_inputs(work_date: Any, rec: Dict[str, Any], tz_local: str) -> Dict[str, Any]:
+    return {
+        "date": work_date.format("YYYY-MM-DD"),
+        "tz": tz_local,
+        "rec": rec,
+        "llm": USE_DAILY_LLM,
+        "llm_cache": _astro_llm_cache_state(work_date.format("DD.MM.YYYY")) if USE_DAILY_LLM else [],
+        "header": os.getenv("ASTRO_SHOW_HEADER", "0"),
+    }
+
+
+def _render_astro_section(work_date: Any, rec: Dict[str, Any], tz_local: str) -> str:
     phase_raw = (rec.get("phase_name") or rec.get("phase") or "").strip()
     phase_name = re.sub(r"^[^\wА-Яа-яЁё]+", "", phase_raw).split(",")[0].strip()
 
@@ -1334,56 +1513,6 @@ def build_astro_section(
 
 
 # ───────────── hourly/ветер/давление ─────────────
-def _pick(d: Dict[str, Any], *keys, default=None):
-    for k in keys:
-        if k in d:
-            return d[k]
-    return default
-
-
-def _hourly_times(wm: Dict[str, Any]) -> List[pendulum.DateTime]:
-    hourly = wm.get("hourly") or {}
-    times = hourly.get("time") or hourly.get("time_local") or hourly.get("timestamp") or []
-    out: List[pendulum.DateTime] = []
-    for t in times:
-        try:
-            out.append(pendulum.parse(str(t)))
-        except Exception:
-            continue
-    return out
-
-
-def _nearest_index_for_day(
-    times: List[pendulum.DateTime], date_obj: pendulum.Date, prefer_hour: int, tz: pendulum.Timezone
-) -> Optional[int]:
-    if not times:
-        return None
-    target = pendulum.datetime(date_obj.year, date_obj.month, date_obj.day, prefer_hour, 0, tz=tz)
-    best_i, best_diff = None, None
-    for i, dt_i in enumerate(times):
-        try:
-            dt_local = dt_i.in_tz(tz)
-        except Exception:
-            dt_local = dt_i
-        if dt_local.date() != date_obj:
-            continue
-        diff = abs((dt_local - target).total_seconds())
-        if best_diff is None or diff < best_diff:
-            best_i, best_diff = i, diff
-    return best_i
-
-
-def _circular_mean_deg(deg_list: List[float]) -> Optional[float]:
-    if not deg_list:
-        return None
-    x = sum(math.cos(math.radians(d)) for d in deg_list)
-    y = sum(math.sin(math.radians(d)) for d in deg_list)
-    if x == 0 and y == 0:
-        return None
-    ang = math.degrees(math.atan2(y, x))
-    return (ang + 360.0) % 360.0
-
-
 def pick_tomorrow_header_metrics(
     wm: Dict[str, Any], tz: pendulum.Timezone
 ) -> Tuple[Optional[float], Optional[int], Optional[int], str]:
@@ -1397,73 +1526,33 @@ def pick_tomorrow_header_metrics(
 
 
 # === индексы на завтра/шторм-флаги ============================
-def _tomorrow_hourly_indices(wm: Dict[str, Any], tz: pendulum.Timezone) -> List[int]:
-    times = _hourly_times(wm)
+def _storm_flags_for_date(wm: Dict[str, Any], tz: pendulum.Timezone, day: Any) -> Dict[str, Any]:
+    return _storm_flags_from_peaks(day_peaks([ForecastFrame.of(wm, tz)], day)[0])
 
-    # FIX: today() вместо now() для консистентности с WORK_DATE
-    tom = pendulum.today(tz).add(days=1).date()
 
-    idxs: List[int] = []
-    for i, dt_i in enumerate(times):
-        try:
-            if dt_i.in_tz(tz).date() == tom:
-                idxs.append(i)
-        except Exception:
-            pass
-    return idxs
-
-
-def _today_hourly_indices(wm: Dict[str, Any], tz: pendulum.Timezone) -> List[int]:
-    times = _hourly_times(wm)
-
-    # today() вместо now() для консистентности с WORK_DATE
-    day = pendulum.today(tz).date()
-
-    idxs: List[int] = []
-    for i, dt_i in enumerate(times):
-        try:
-            if dt_i.in_tz(tz).date() == day:
-                idxs.append(i)
-        except Exception:
-            pass
-    return idxs
-
-def storm_flags_for_tomorrow(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[str, Any]:
-    hourly = wm.get("hourly") or {}
-    idxs = _tomorrow_hourly_indices(wm, tz)
-    if not idxs:
+def _storm_flags_from_peaks(peaks: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Пороги шторма поверх forecast_batch.day_peaks() одного города."""
+    if peaks is None:
         return {"warning": False}
 
-    def _arr(*names, default=None):
-        v = _pick(hourly, *names, default=default)
-        return v if isinstance(v, list) else []
+    max_speed_kmh = peaks["max_speed_kmh"]
+    max_gust_kmh = peaks["max_gust_kmh"]
+    max_rain = peaks["max_rain"]
+    max_tprob = peaks["max_tprob"]
 
-
-    def _vals(arr):
-        out = []
-        for i in idxs:
-            if i < len(arr):
-                try:
-                    out.append(float(arr[i]))
-                except Exception:
-                    pass
-        return out
-
-    speeds_kmh = _vals(_arr("windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed", default=[]))
-    gusts_kmh = _vals(_arr("windgusts_10m", "wind_gusts_10m", "wind_gusts", default=[]))
-    rain_mm_h = _vals(_arr("rain", default=[]))
-    tprob = _vals(_arr("thunderstorm_probability", default=[]))
-
-    max_speed_ms = kmh_to_ms(max(speeds_kmh)) if speeds_kmh else None
-    max_gust_ms = kmh_to_ms(max(gusts_kmh)) if gusts_kmh else None
-    heavy_rain = (max(rain_mm_h) >= 8.0) if rain_mm_h else False
-    thunder = (max(tprob) >= 60) if tprob else False
+    max_speed_ms = kmh_to_ms(max_speed_kmh) if max_speed_kmh is not None else None
+    max_gust_ms = kmh_to_ms(max_gust_kmh) if max_gust_kmh is not None else None
+    heavy_rain = max_rain is not None and max_rain >= 8.0
+    thunder = max_tprob is not None and max_tprob >= 60
 
     reasons = []
+    warning_wind = warning_gust = None
     if isinstance(max_speed_ms, (int, float)) and max_speed_ms >= 13:
         reasons.append(f"ветер до {max_speed_ms:.0f} м/с")
+        warning_wind = float(round(max_speed_ms))
     if isinstance(max_gust_ms, (int, float)) and max_gust_ms >= 17:
         reasons.append(f"порывы до {max_gust_ms:.0f} м/с")
+        warning_gust = float(round(max_gust_ms))
     if heavy_rain:
         reasons.append("сильный дождь")
     if thunder:
@@ -1475,58 +1564,19 @@ def storm_flags_for_tomorrow(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[
         "heavy_rain": heavy_rain,
         "thunder": thunder,
         "warning": bool(reasons),
+        # числа, которые попали в текст предупреждения (для PostFacts)
+        "warning_wind_ms": warning_wind,
+        "warning_gust_ms": warning_gust,
         "warning_text": "⚠️ <b>Штормовое предупреждение</b>: " + ", ".join(reasons) if reasons else "",
     }
 
+def storm_flags_for_tomorrow(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[str, Any]:
+    # FIX: today() вместо now() для консистентности с WORK_DATE
+    return _storm_flags_for_date(wm, tz, pendulum.today(tz).add(days=1).date())
 
-def storm_flags_for_today(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[str, Any]:
-    hourly = wm.get("hourly") or {}
-    idxs = _today_hourly_indices(wm, tz)
-    if not idxs:
-        return {"warning": False}
-
-    def _arr(*names, default=None):
-        v = _pick(hourly, *names, default=default)
-        return v if isinstance(v, list) else []
-
-    def _vals(arr):
-        out = []
-        for i in idxs:
-            if i < len(arr):
-                try:
-                    out.append(float(arr[i]))
-                except Exception:
-                    pass
-        return out
-
-    speeds_kmh = _vals(_arr("windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed", default=[]))
-    gusts_kmh = _vals(_arr("windgusts_10m", "wind_gusts_10m", "wind_gusts", default=[]))
-    rain_mm_h = _vals(_arr("rain", default=[]))
-    tprob = _vals(_arr("thunderstorm_probability", default=[]))
-
-    max_speed_ms = kmh_to_ms(max(speeds_kmh)) if speeds_kmh else None
-    max_gust_ms = kmh_to_ms(max(gusts_kmh)) if gusts_kmh else None
-    heavy_rain = (max(rain_mm_h) >= 8.0) if rain_mm_h else False
-    thunder = (max(tprob) >= 60) if tprob else False
-
-    reasons = []
-    if isinstance(max_speed_ms, (int, float)) and max_speed_ms >= 13:
-        reasons.append(f"ветер до {max_speed_ms:.0f} м/с")
-    if isinstance(max_gust_ms, (int, float)) and max_gust_ms >= 17:
-        reasons.append(f"порывы до {max_gust_ms:.0f} м/с")
-    if heavy_rain:
-        reasons.append("сильный дождь")
-    if thunder:
-        reasons.append("гроза")
 
-    return {
-        "max_speed_ms": max_speed_ms,
-        "max_gust_ms": max_gust_ms,
-        "heavy_rain": heavy_rain,
-        "thunder": thunder,
-        "warning": bool(reasons),
-        "warning_text": "⚠️ <b>Штормовое предупреждение</b>: " + ", ".join(reasons) if reasons else "",
-    }
+def storm_flags_for_today(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[str, Any]:
+    return _storm_flags_for_date(wm, tz, pendulum.today(tz).date())
 
 
 
@@ -1640,7 +1690,7 @@ def _air_quality_line_from_data(air: Dict[str, Any], *, include_pollen: bool = F
         parts.append(" / ".join(pm_part))
 
     if include_pollen:
-        p = get_pollen() or {}
+        p = _fetched(get_pollen) or {}
         risk = p.get("risk")
         if isinstance(risk, str) and risk:
             parts.append(f"🌿 пыльца: {risk}")
@@ -1658,15 +1708,25 @@ def _air_quality_line_from_data(air: Dict[str, Any], *, include_pollen: bool = F
     if observed_time:
         parts.append(f"данные на {observed_time}")
 
+    facts = _POST_FACTS.get()
+    if facts is not None:
+        facts.air = {
+            key: int(round(value))
+            for key, value in (("aqi", aqi_f), ("pm25", pm25_f), ("pm10", pm10_f))
+            if isinstance(value, (int, float))
+        }
+        facts.air["status"] = status or "fresh"
+        if city:
+            facts.air["city"] = city
     return "🏭 Воздух: " + " • ".join(parts)
 
 
 def _morning_combo_air_radiation_pollen(lat: float, lon: float) -> Optional[str]:
-    return _air_quality_line_from_data(get_air(lat, lon) or {}, include_pollen=True)
+    return _air_quality_line_from_data(_fetched(get_air, lat, lon) or {}, include_pollen=True)
 
 
 def _daily_air_quality_line(lat: float, lon: float) -> Optional[str]:
-    return _air_quality_line_from_data(get_air(lat, lon) or {}, include_pollen=False)
+    return _air_quality_line_from_data(_fetched(get_air, lat, lon) or {}, include_pollen=False)
 
 
 def _compact_city_air_label(label: str) -> str:
@@ -1717,9 +1777,9 @@ def _city_air_metric_hint(data: Dict[str, Any], compact_label: str) -> str:
     return "; ".join(parts)
 
 
-def _air_by_city_line(city_pairs: list[tuple[str, tuple[float, float]]]) -> Optional[str]:
+def _air_city_selection(city_pairs: list[tuple[str, tuple[float, float]]]) -> list[tuple[str, tuple[float, float]]]:
     if os.getenv("CY_AIR_BY_CITY", "1").strip().lower() in ("0", "false", "no", "off"):
-        return None
+        return []
     preferred = ("Nicosia", "Limassol", "Larnaca", "Pafos", "Paphos", "Ayia Napa", "Protaras", "Troodos")
     indexed: Dict[str, tuple[str, tuple[float, float]]] = {
         name.lower(): (name, coords) for name, coords in city_pairs or []
@@ -1735,11 +1795,16 @@ def _air_by_city_line(city_pairs: list[tuple[str, tuple[float, float]]]) -> Opti
             continue
         selected.append(item)
         seen.add(key)
+    return selected
+
+
+def _air_by_city_line(city_pairs: list[tuple[str, tuple[float, float]]]) -> Optional[str]:
+    selected = _air_city_selection(city_pairs)
     if not selected:
         return None
 
     try:
-        city_air = get_air_for_cities(selected) or {}
+        city_air = _fetched(get_air_for_cities, selected) or {}
     except Exception:
         return None
 
@@ -1767,22 +1832,11 @@ def _air_by_city_line(city_pairs: list[tuple[str, tuple[float, float]]]) -> Opti
 
 
 def _cyprus_quake_line_for_morning() -> Optional[str]:
-    if os.getenv("CY_QUAKES_24H", "").strip().lower() not in ("1", "true", "yes", "on"):
+    query = _quake_query()
+    if query is None:
         return None
     try:
-        hours = int(float(os.getenv("CY_QUAKE_HOURS", "24")))
-    except Exception:
-        hours = 24
-    try:
-        radius_km = float(os.getenv("CY_QUAKE_RADIUS_KM", "350"))
-    except Exception:
-        radius_km = 350.0
-    try:
-        min_mag = float(os.getenv("CY_QUAKE_MIN_MAG", "0.9"))
-    except Exception:
-        min_mag = 0.9
-    try:
-        events = get_recent_earthquakes_cyprus(hours=hours, radius_km=radius_km, min_mag=min_mag)
+        events = _fetched(get_recent_earthquakes_cyprus, **query)
         return build_cyprus_quake_line(events, tz=os.getenv("TZ", "Asia/Nicosia"))
     except Exception:
         logging.warning("CY quakes: all source handling failed", exc_info=True)
@@ -1852,59 +1906,18 @@ def _target_source_index(
     return best_idx, best_time
 
 
-def _number_at(values: Any, idx: Optional[int]) -> Optional[float]:
-    if idx is None or not isinstance(values, list) or idx >= len(values):
-        return None
-    try:
-        value = float(values[idx])
-    except (TypeError, ValueError):
-        return None
-    return value if math.isfinite(value) else None
-
-
-def _value_at(values: Any, idx: Optional[int]) -> Any:
-    if idx is None or not isinstance(values, list) or idx >= len(values):
-        return None
-    return values[idx]
-
-
-def _source_indices_for_date(
-    raw_times: Sequence[Any],
-    target_date: Any,
-    tz_obj: pendulum.Timezone,
-) -> List[int]:
-    """Return original source indices for one local date without compressing bad timestamps."""
-
-    indices: List[int] = []
-    for idx, raw_time in enumerate(raw_times or []):
-        try:
-            parsed = pendulum.parse(str(raw_time), tz=tz_obj).in_tz(tz_obj)
-        except Exception:
-            continue
-        if parsed.date() == target_date:
-            indices.append(idx)
-    return indices
-
-
 def _city_daily_metrics_for_date(
     wm: Dict[str, Any],
     tz_obj: pendulum.Timezone,
     target_date: Any,
 ) -> Tuple[Optional[float], Optional[float], Any]:
-    daily = wm.get("daily") or {}
-    idx = _daily_idx_for_date(wm, tz_obj, target_date)
-    if idx is None:
+    frame = ForecastFrame.of(wm, tz_obj)
+    if frame.daily_index(target_date) is None:
         return None, None, None
-    tmax = _number_at(
-        _pick(daily, "temperature_2m_max", "temperature_max", "temp_max", default=[]),
-        idx,
-    )
-    tmin = _number_at(
-        _pick(daily, "temperature_2m_min", "temperature_min", "temp_min", default=[]),
-        idx,
-    )
-    weather_code = _value_at(_pick(daily, "weathercode", "weather_code", default=[]), idx)
-    return tmax, tmin, weather_code
+    tmax = frame.daily_value("temperature_max", target_date)
+    tmin = frame.daily_value("temperature_min", target_date)
+    weather_code = frame.daily_value("weather_code", target_date)
+    return tmax, tmin, int(weather_code) if weather_code is not None else None
 
 
 def _city_header_metrics_for_date(
@@ -1914,70 +1927,26 @@ def _city_header_metrics_for_date(
 ) -> Tuple[Optional[float], Optional[int], Optional[int], str, Optional[float]]:
     """Read city wind, pressure and gusts only from the requested local forecast date."""
 
-    hourly = wm.get("hourly") or {}
-    raw_times = _pick(hourly, "time", "time_local", "timestamp", default=[])
-    indices = _source_indices_for_date(raw_times, target_date, tz_obj)
-    if not indices:
+    frame = ForecastFrame.of(wm, tz_obj)
+    if not frame.day_rows(target_date):
         return None, None, None, "→", None
 
-    idx_noon, _ = _target_source_index(
-        raw_times,
-        target_date,
-        12,
-        tz_obj,
-        max_offset_minutes=24 * 60,
-    )
-    idx_morn, _ = _target_source_index(
-        raw_times,
-        target_date,
-        6,
-        tz_obj,
-        max_offset_minutes=24 * 60,
-    )
-    speed_values = _pick(
-        hourly,
-        "windspeed_10m",
-        "windspeed",
-        "wind_speed_10m",
-        "wind_speed",
-        default=[],
-    )
-    direction_values = _pick(
-        hourly,
-        "winddirection_10m",
-        "winddirection",
-        "wind_dir_10m",
-        "wind_dir",
-        default=[],
-    )
-    pressure_values = _pick(hourly, "pressure_msl", "surface_pressure", "pressure", default=[])
-    gust_values = _pick(
-        hourly,
-        "windgusts_10m",
-        "wind_gusts_10m",
-        "wind_gusts",
-        default=[],
-    )
+    idx_noon, _ = frame.nearest_row(target_date, 12, max_offset_minutes=24 * 60)
+    idx_morn, _ = frame.nearest_row(target_date, 6, max_offset_minutes=24 * 60)
 
-    speed_kmh = _number_at(speed_values, idx_noon)
-    direction = _number_at(direction_values, idx_noon)
-    pressure_noon = _number_at(pressure_values, idx_noon)
-    pressure_morn = _number_at(pressure_values, idx_morn)
+    speed_kmh = frame.value("wind_speed", idx_noon)
+    direction = frame.value("wind_direction", idx_noon)
+    pressure_noon = frame.value("pressure", idx_noon)
+    pressure_morn = frame.value("pressure", idx_morn)
 
     if speed_kmh is None:
-        same_day_speeds = [value for i in indices if (value := _number_at(speed_values, i)) is not None]
-        if same_day_speeds:
-            speed_kmh = sum(same_day_speeds) / len(same_day_speeds)
+        speed_kmh = frame.day_mean("wind_speed", target_date)
     if direction is None:
-        same_day_dirs = [value for i in indices if (value := _number_at(direction_values, i)) is not None]
-        direction = _circular_mean_deg(same_day_dirs)
+        direction = frame.day_circular_mean("wind_direction", target_date)
     if pressure_noon is None:
-        same_day_pressures = [value for i in indices if (value := _number_at(pressure_values, i)) is not None]
-        if same_day_pressures:
-            pressure_noon = sum(same_day_pressures) / len(same_day_pressures)
+        pressure_noon = frame.day_mean("pressure", target_date)
 
-    gusts_kmh = [value for i in indices if (value := _number_at(gust_values, i)) is not None]
-    max_gust_kmh = max(gusts_kmh) if gusts_kmh else None
+    max_gust_kmh = frame.day_max("wind_gusts", target_date)
     trend = "→"
     if pressure_noon is not None and pressure_morn is not None:
         diff = pressure_noon - pressure_morn
@@ -2000,33 +1969,13 @@ def _sup_weather_sample(
 ) -> Dict[str, Any]:
     """Read wind, gust and direction from exactly one tomorrow hourly row."""
 
-    hourly = wm.get("hourly") or {}
-    raw_times = _pick(hourly, "time", "time_local", "timestamp", default=[])
-    idx, sample_at = _target_source_index(raw_times, target_date, prefer_hour, tz_obj)
-    speed_kmh = _number_at(
-        _pick(hourly, "windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed", default=[]),
-        idx,
-    )
-    gust_kmh = _number_at(
-        _pick(hourly, "windgusts_10m", "wind_gusts_10m", "wind_gusts", default=[]),
-        idx,
-    )
-    wind_dir = _number_at(
-        _pick(
-            hourly,
-            "winddirection_10m",
-            "winddirection",
-            "wind_dir_10m",
-            "wind_dir",
-            default=[],
-        ),
-        idx,
-    )
+    frame = ForecastFrame.of(wm, tz_obj)
+    idx, sample_at = frame.nearest_row(target_date, prefer_hour, SUP_SAMPLE_MAX_OFFSET_MINUTES)
     return {
         "sample_at": sample_at,
-        "wind_ms": kmh_to_ms(speed_kmh),
-        "gust_ms": kmh_to_ms(gust_kmh),
-        "wind_dir": wind_dir,
+        "wind_ms": kmh_to_ms(frame.value("wind_speed", idx)),
+        "gust_ms": kmh_to_ms(frame.value("wind_gusts", idx)),
+        "wind_dir": frame.value("wind_direction", idx),
     }
 
 
@@ -2087,6 +2036,11 @@ def _activity_number(value: float) -> str:
     return str(int(round(value))) if abs(value - round(value)) < 0.05 else f"{value:.1f}"
 
 
+def _activity_fact(value: Any) -> Optional[float]:
+    """Число так, как его показывает _activity_number()."""
+    return float(_activity_number(float(value))) if isinstance(value, (int, float)) else None
+
+
 def _sup_guidance_line(
     level: Optional[str],
     *,
@@ -2138,51 +2092,28 @@ def _fetch_wave_for_tomorrow(
     retries: int = 2,
     target_date: Any = None,
 ) -> Tuple[Optional[float], Optional[float], Optional[pendulum.DateTime]]:
-    if not requests:
+    """Волна/период на нужный час из общего marine-кэша (marine.py, один запрос на точку)."""
+    try:
+        hourly = (get_marine(lat, lon, timeout_sec=timeout_s, retries=max(0, retries - 1)) or {}).get("hourly") or {}
+        wanted_date = target_date or pendulum.today(tz_obj).add(days=1).date()
+        idx, sample_at = _target_source_index(
+            hourly.get("time") or [],
+            wanted_date,
+            prefer_hour,
+            tz_obj,
+        )
+        if idx is None:
+            return None, None, None
+
+        h = hourly.get("wave_height") or []
+        p = hourly.get("wave_period") or []
+        w_h = float(h[idx]) if idx < len(h) and h[idx] is not None else None
+        w_t = float(p[idx]) if idx < len(p) and p[idx] is not None else None
+        return w_h, w_t, sample_at
+    except Exception as e:
+        logging.warning("marine fetch failed: %s", e)
         return None, None, None
 
-    url = "https://marine-api.open-meteo.com/v1/marine"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "wave_height,wave_period",
-        "timezone": tz_obj.name,
-    }
-
-    last_exc: Optional[Exception] = None
-    for attempt in range(1, max(1, retries) + 1):
-        try:
-            r = requests.get(url, params=params, timeout=timeout_s)
-            r.raise_for_status()
-            j = r.json()
-
-            hourly = j.get("hourly") or {}
-            wanted_date = target_date or pendulum.today(tz_obj).add(days=1).date()
-            idx, sample_at = _target_source_index(
-                hourly.get("time") or [],
-                wanted_date,
-                prefer_hour,
-                tz_obj,
-            )
-            if idx is None:
-                return None, None, None
-
-            h = hourly.get("wave_height") or []
-            p = hourly.get("wave_period") or []
-            w_h = float(h[idx]) if idx < len(h) and h[idx] is not None else None
-            w_t = float(p[idx]) if idx < len(p) and p[idx] is not None else None
-            return w_h, w_t, sample_at
-
-        except Exception as e:
-            last_exc = e
-            # не спамим логами: пишем только на последней попытке
-            if attempt >= max(1, retries):
-                logging.warning("marine fetch failed: %s", e)
-                return None, None, None
-
-    logging.warning("marine fetch failed: %s", last_exc)
-    return None, None, None
-
 
 def _wetsuit_hint(sst: Optional[float]) -> Optional[str]:
     if not isinstance(sst, (int, float)):
@@ -2210,9 +2141,11 @@ def _city_detail_line(
     tz_obj: pendulum.Timezone,
     include_sst: bool,
     target_date: Any = None,
+    record: bool = True,
 ) -> tuple[Optional[float], Optional[str]]:
+    """Строка города и его tmax; record=False — строка не попадёт в пост, факты не пишем."""
     wanted_date = target_date or pendulum.today(tz_obj).add(days=1).date()
-    wm = get_weather(la, lo) or {}
+    wm = _fetched(get_weather, la, lo) or {}
     tmax, tmin, weather_code = _city_daily_metrics_for_date(wm, tz_obj, wanted_date)
     if tmax is None:
         return None, None
@@ -2240,10 +2173,26 @@ def _city_detail_line(
         parts.append(wind_part)
     if isinstance(press_val, int):
         parts.append(f" {press_val} гПа {press_trend}")
-    if include_sst:
-        sst = get_sst_cached(la, lo)
-        if isinstance(sst, (int, float)):
-            parts.append(f"🌊 {float(sst):.0f}")
+    sst = _fetched(get_sst_cached, la, lo) if include_sst else None
+    if isinstance(sst, (int, float)):
+        parts.append(f"🌊 {float(sst):.0f}")
+
+    facts = _POST_FACTS.get() if record else None
+    if facts is not None:
+        facts.add_city(CityFacts(
+            name=city,
+            label=_ru_city(city),
+            date=_iso_day(wanted_date),
+            tmax=float(round(float(tmax))),
+            tmin=float(round(float(tmin))) if isinstance(tmin, (int, float)) else None,
+            weather_code=weather_code,
+            wind_ms=round(float(wind_ms), 1) if isinstance(wind_ms, (int, float)) else None,
+            wind_dir=wind_dir if isinstance(wind_dir, int) else None,
+            gust_ms=float(round(float(gust))) if isinstance(gust, (int, float)) else None,
+            pressure_hpa=press_val if isinstance(press_val, int) else None,
+            pressure_trend=press_trend if isinstance(press_val, int) else None,
+            sst=float(round(float(sst))) if isinstance(sst, (int, float)) else None,
+        ))
     return float(tmax), " • ".join(parts)
 
 
@@ -2271,9 +2220,10 @@ def _morning_sea_city_lines(
 
 
 def _water_highlights(city: str, la: float, lo: float, tz_obj: pendulum.Timezone) -> Optional[str]:
-    wm = get_weather(la, lo) or {}
+    wm = _fetched(get_weather, la, lo) or {}
     target_date = pendulum.today(tz_obj).add(days=1).date()
-    wave_h, _, wave_at = _fetch_wave_for_tomorrow(
+    wave_h, _, wave_at = _fetched(
+        _fetch_wave_for_tomorrow,
         la,
         lo,
         tz_obj,
@@ -2284,7 +2234,7 @@ def _water_highlights(city: str, la: float, lo: float, tz_obj: pendulum.Timezone
     wind_ms = activity_sample.get("wind_ms")
     gust = activity_sample.get("gust_ms")
     wind_dir = activity_sample.get("wind_dir")
-    sst = get_sst_cached(la, lo)
+    sst = _fetched(get_sst_cached, la, lo)
     wind_val = float(wind_ms) if isinstance(wind_ms, (int, float)) else None
     gust_val = float(gust) if isinstance(gust, (int, float)) else None
     card = _cardinal(float(wind_dir)) if isinstance(wind_dir, (int, float)) else None
@@ -2366,6 +2316,16 @@ def _water_highlights(city: str, la: float, lo: float, tz_obj: pendulum.Timezone
     )
     if sup_line:
         highlights.append(sup_line)
+        facts = _POST_FACTS.get()
+        if facts is not None:
+            facts.add_city(CityFacts(
+                name=city,
+                label=_ru_city(city),
+                date=_iso_day(target_date),
+                sup_wind_ms=_activity_fact(sup_wind),
+                sup_gust_ms=_activity_fact(sup_gust),
+                wave_h=_activity_fact(wave_h),
+            ))
     return "\n   ".join(highlights) if highlights else None
 
 
@@ -2522,6 +2482,78 @@ def _build_cy_image_moods_for_evening(
 
 
 # ───────────── сообщение ─────────────
+def _record_region_facts(
+    wm_region: Dict[str, Any],
+    tz_obj: pendulum.Timezone,
+    day: Any,
+    storm: Dict[str, Any],
+) -> None:
+    """Шапка поста (CY_LAT/CY_LON на дату заголовка) и шторм — в PostFacts."""
+    facts = _POST_FACTS.get()
+    if facts is None:
+        return
+    facts.date = _iso_day(day)
+    facts.storm = {k: v for k, v in storm.items() if k != "warning_text"}
+    try:
+        tmax, tmin, weather_code = _city_daily_metrics_for_date(wm_region, tz_obj, day)
+        wind_ms, wind_dir, pressure, trend, gust = _city_header_metrics_for_date(wm_region, tz_obj, day)
+    except Exception as e:
+        logging.debug("region facts skipped: %s", e)
+        return
+    facts.region = CityFacts(
+        name="region",
+        label="Кипр",
+        date=facts.date,
+        tmax=tmax,
+        tmin=tmin,
+        weather_code=weather_code,
+        wind_ms=round(float(wind_ms), 1) if isinstance(wind_ms, (int, float)) else None,
+        wind_dir=wind_dir,
+        gust_ms=float(round(float(gust))) if isinstance(gust, (int, float)) else None,
+        pressure_hpa=pressure,
+        pressure_trend=trend if pressure is not None else None,
+    )
+
+
+def _record_city_hazards(
+    pairs: Sequence[tuple[str, tuple[float, float]]],
+    wm_region: Dict[str, Any],
+    tz_obj: pendulum.Timezone,
+    day: Any,
+) -> None:
+    """
+    Шторм/УФ/осадки на дату поста по региону и всем городам — одним проходом
+    forecast_batch.day_peaks(). Пики кэшируются на кадрах, так что флаги шторма
+    и строка УФ региона дальше не сканируют hourly повторно.
+    """
+    facts = _POST_FACTS.get()
+    if facts is None:
+        return
+    try:
+        frames = [ForecastFrame.of(wm_region, tz_obj)] + [
+            ForecastFrame.of(_fetched(get_weather, la, lo) or {}, tz_obj) for _city, (la, lo) in pairs
+        ]
+        peaks = day_peaks(frames, day)
+    except Exception as e:
+        logging.warning("city hazards skipped: %s", e)
+        return
+    for (city, _coords), city_peaks in zip(pairs, peaks[1:]):
+        if city_peaks is None:
+            continue
+        uv = city_peaks["uv_max"]
+        facts.add_city(CityFacts(
+            name=city,
+            label=_ru_city(city),
+            date=_iso_day(day),
+            storm_warning=_storm_flags_from_peaks(city_peaks)["warning"],
+            uv_max=int(round(uv)) if uv is not None else None,
+            precip_prob_max=city_peaks["max_pprob"],
+        ))
+    stormy = [c.label for c in facts.storm_cities()]
+    if stormy:
+        logging.info("city hazards: storm thresholds reached in %s", ", ".join(stormy))
+
+
 def build_message(
     region_name: str,
     sea_label: str,
@@ -2531,6 +2563,25 @@ def build_message(
     tz: Union[pendulum.Timezone, str],
     mode: Optional[str] = None,
 ) -> str:
+    return build_message_with_facts(
+        region_name, sea_label, sea_cities, other_label, other_cities, tz, mode
+    )[0]
+
+
+def build_message_with_facts(
+    region_name: str,
+    sea_label: str,
+    sea_cities,
+    other_label: str,
+    other_cities,
+    tz: Union[pendulum.Timezone, str],
+    mode: Optional[str] = None,
+) -> Tuple[str, PostFacts]:
+    """
+    build_message() + PostFacts: числа, из которых собран текст (города, воздух,
+    УФ, Kp, шторм, астро). Потребители (format_v2, safe_test_post, визуал)
+    читают их вместо разбора текста регулярками.
+    """
     # Защита от перепутанных аргументов (tz ←→ mode)
     if isinstance(tz, str) and tz.strip().lower() in ("morning", "evening", "am", "pm"):
         logging.warning("build_message: получен tz='%s' (похоже на mode). Перекладываю в mode.", tz)
@@ -2550,6 +2601,53 @@ def build_message(
     sea_pairs = _iter_city_pairs(sea_cities)
     other_pairs = _iter_city_pairs(other_cities)
 
+    # Все сетевые источники — одним графом, параллельно, до сборки текста;
+    # сборка ниже читает готовый снапшот через _fetched().
+    facts = PostFacts(mode="morning" if is_morning else "evening")
+    with weather_budget(CY_WEATHER_BUDGET_SEC):
+        snap: Optional[Snapshot] = None
+        try:
+            snap = collect(
+                _collection_sources(sea_pairs, other_pairs, tz_obj, is_morning),
+                limits=CY_SOURCE_LIMITS,
+                workers=CY_FETCH_WORKERS,
+            )
+            logging.info("data collection: %s", snap.summary())
+        except Exception as e:
+            logging.warning("data collection failed, direct calls: %s", e)
+        token = _RUN_SNAPSHOT.set(snap)
+        facts_token = _POST_FACTS.set(facts)
+        try:
+            text = _build_message_text(
+                region_name,
+                sea_label,
+                other_label,
+                sea_pairs,
+                other_pairs,
+                tz_obj,
+                mode,
+                is_morning,
+            )
+        finally:
+            _POST_FACTS.reset(facts_token)
+            _RUN_SNAPSHOT.reset(token)
+
+    coastal = {city for city, _ in sea_pairs}
+    for city_facts in facts.cities:
+        city_facts.coastal = city_facts.name in coastal
+    return text, facts
+
+
+def _build_message_text(
+    region_name: str,
+    sea_label: str,
+    other_label: str,
+    sea_pairs: list[tuple[str, tuple[float, float]]],
+    other_pairs: list[tuple[str, tuple[float, float]]],
+    tz_obj: pendulum.Timezone,
+    mode: str,
+    is_morning: bool,
+) -> str:
     P: List[str] = []
     today = pendulum.today(tz_obj)
     tom = today.add(days=1)
@@ -2558,8 +2656,10 @@ def build_message(
     title_word = "сегодня" if is_morning else "завтра"
     P.append(f"<b>{region_name}: погода на {title_word} ({title_day.format('DD.MM.YYYY')})</b>")
 
-    wm_region = get_weather(CY_LAT, CY_LON) or {}
+    wm_region = _fetched(get_weather, CY_LAT, CY_LON) or {}
+    _record_city_hazards(sea_pairs + other_pairs, wm_region, tz_obj, title_day.date())
     storm_region = storm_flags_for_today(wm_region, tz_obj) if is_morning else storm_flags_for_tomorrow(wm_region, tz_obj)
+    _record_region_facts(wm_region, tz_obj, title_day.date(), storm_region)
 
     # === УТРО ===
     if is_morning:
@@ -2574,6 +2674,7 @@ def build_message(
                     tz_obj,
                     include_sst=False,
                     target_date=today.date(),
+                    record=False,
                 )
                 if isinstance(tmax, (int, float)):
                     out.append((_ru_city(city), float(tmax)))
@@ -2583,7 +2684,7 @@ def build_message(
         warm = max(rows, key=lambda x: x[1]) if rows else None
         cool = min(rows, key=lambda x: x[1]) if rows else None
 
-        fact = get_fact(today, region_name) or ""
+        fact = _fact_of_day(today, region_name)
         fact_short = re.sub(r"\s+", " ", fact).strip()
         greeting = "👋 Доброе утро!"
         if fact_short:
@@ -2596,11 +2697,15 @@ def build_message(
                 f"Теплее всего — {_ru_city(warm[0])} ({warm[1]:.0f}°), "
                 f"прохладнее — {_ru_city(cool[0])} ({cool[1]:.0f}°){spread}."
             )
+            facts = _POST_FACTS.get()
+            if facts is not None:
+                facts.warmest = (_ru_city(warm[0]), float(f"{warm[1]:.0f}"))
+                facts.coolest = (_ru_city(cool[0]), float(f"{cool[1]:.0f}"))
         P.append(greeting.strip())
 
         if storm_region.get("warning"):
             P.append(storm_region["warning_text"] + " Берегите планы и закладывайте время.")
-        air_now = get_air(CY_LAT, CY_LON) or {}
+        air_now = _fetched(get_air, CY_LAT, CY_LON) or {}
         visibility_context = get_cyprus_visibility_context(
             wm_region,
             post_type="morning",
@@ -2647,11 +2752,14 @@ def build_message(
         kp_age = None
         kp_label = "н/д"
         if USE_WORLD_KP:
-            wv, age = _fetch_world_kp()
+            wv, age = _fetched(_fetch_world_kp)
             kp_val, kp_age = wv, age
             kp_label = _kp_status_label(kp_val)
+            facts = _POST_FACTS.get()
+            if facts is not None and isinstance(kp_val, (int, float)):
+                facts.kp, facts.kp_status = round(float(kp_val), 1), kp_label
 
-        sw = get_solar_wind() or {}
+        sw = _fetched(get_solar_wind) or {}
         v, n = sw.get("speed_kms"), sw.get("density")
         wind_status = sw.get("status", "н/д")
         parts_sw = []
@@ -2674,7 +2782,7 @@ def build_message(
                     if kp_age >= 180
                     else (f", {kp_age} мин назад" if kp_age >= 0 else "")
                 )
-            P.append(f"🧲 Космопогода: Kp {kp_val:.1f} ({kp_label}{age_txt}) • 🌬️ {sw_chunk}")
+            P.append(f"🧲 Космопогода: Kp {kp_val:.1f} ({kp_label}{age_txt}{_kp_history_tail()}) • 🌬️ {sw_chunk}")
         else:
             P.append("🧲 Космопогода: Kp н/д • 🌬️ " + sw_chunk)
 
@@ -2737,7 +2845,7 @@ def build_message(
             P.append(text)
         P.append("———")
 
-    air_now = get_air(CY_LAT, CY_LON) or {}
+    air_now = _fetched(get_air, CY_LAT, CY_LON) or {}
     air_line = _air_quality_line_from_data(air_now, include_pollen=False)
     if air_line:
         P.append(re.sub(r"^🏭\s*Воздух\s*:", "🏭 Воздух сейчас:", air_line, count=1))
@@ -2771,7 +2879,11 @@ def build_message(
     # Астроблок: используем ту же логическую дату, что и в заголовке (tomorrow),
     # плюс при необходимости дополнительный сдвиг через ASTRO_OFFSET.
     date_for_astro = tom
-    P.append(build_astro_section(date_local=date_for_astro, tz_local=tz_obj.name))
+    astro_section = _fetched(_astro_section_for_day, _iso_day(date_for_astro), tz_obj.name)
+    P.append(astro_section)
+    facts = _POST_FACTS.get()
+    if facts is not None:
+        facts.astro = [line for line in str(astro_section or "").splitlines() if line.strip()]
 
     all_rows = sea_rows + oth_rows
     warm_name = cool_name = None
@@ -3214,6 +3326,7 @@ async def main_common(
 
 __all__ = [
     "build_message",
+    "build_message_with_facts",
     "send_common_post",
     "main_common",
     "pick_tomorrow_header_metrics",
@@ -27,7 +27,7 @@ import xml.etree.ElementTree as ET
 import inspect
 
 import pendulum
-import requests
+from http_client import http_get_revalidated
 from telegram import Bot, constants
 
 from post_common import main_common
@@ -79,6 +79,7 @@ ECB_HEADERS = {
     "User-Agent": "VayboMeterBot/1.0 (+https://t.me/vaybometer)",
     "Accept": "application/xml,text/xml,application/json;q=0.9,*/*;q=0.8",
 }
+ECB_REVALIDATE_SEC = 3600  # XML ЕЦБ меняется раз в день; дальше — условный запрос (304 → кэш)
 
 CODES = ("USD", "GBP", "TRY", "ILS")
 NBSP = "\u00A0"
@@ -280,9 +281,8 @@ def _fetch_ecb_latest_and_prev() -> Tuple[Dict[str, float], Dict[str, float], Op
     # daily
     ok_latest = False
     try:
-        r = requests.get(urls[0], headers=ECB_HEADERS, timeout=12)
-        r.raise_for_status()
-        root = ET.fromstring(r.content)
+        xml_text = http_get_revalidated(urls[0], ECB_REVALIDATE_SEC, headers=ECB_HEADERS, timeout=12)
+        root = ET.fromstring(xml_text.encode("utf-8"))
         cubes = root.findall(".//{*}Cube[@time]")
         if cubes:
             c = cubes[-1]
@@ -300,9 +300,8 @@ def _fetch_ecb_latest_and_prev() -> Tuple[Dict[str, float], Dict[str, float], Op
 
     # hist-90d
     try:
-        r = requests.get(urls[1], headers=ECB_HEADERS, timeout=15)
-        r.raise_for_status()
-        root = ET.fromstring(r.content)
+        xml_text = http_get_revalidated(urls[1], ECB_REVALIDATE_SEC, headers=ECB_HEADERS, timeout=15)
+        root = ET.fromstring(xml_text.encode("utf-8"))
         cubes = root.findall(".//{*}Cube[@time]")
         if not cubes:
             return latest, prev, d_latest, d_prev
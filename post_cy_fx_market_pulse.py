@@ -16,7 +16,7 @@ import os
 from typing import Any
 
 import pendulum
-import requests
+from http_client import http_get
 from telegram import Bot, constants
 
 from post_cy import (
@@ -189,7 +189,7 @@ def _fmt_pct(value: float | None) -> str:
 
 def _fetch_crypto() -> list[str]:
     try:
-        r = requests.get(
+        r = http_get(
             "https://api.coingecko.com/api/v3/simple/price",
             params={
                 "ids": "bitcoin,ethereum",
@@ -222,7 +222,7 @@ def _fetch_crypto() -> list[str]:
 
 def _fetch_gold_from_stooq(symbol: str) -> float | None:
     try:
-        r = requests.get(
+        r = http_get(
             "https://stooq.com/q/l/",
             params={"s": symbol, "f": "sd2t2ohlcv", "h": "", "e": "csv"},
             timeout=10,
@@ -242,7 +242,7 @@ def _fetch_gold_from_stooq(symbol: str) -> float | None:
 
 def _fetch_gold_from_yahoo(symbol: str) -> float | None:
     try:
-        r = requests.get(
+        r = http_get(
             f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
             params={"range": "1d", "interval": "1d"},
             timeout=10,
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+post_facts.py — structured numbers behind one Cyprus post (VayboMeter).
+
+post_common.build_message_with_facts() fills a PostFacts while it renders the
+legacy text, so downstream stages (format_v2, safe_test_post, visual_context_cy)
+read the same values the text was rendered from instead of regex-parsing the
+text back. Every field is optional: a consumer falls back to its text parser
+for whatever is missing.
+
+Values are kept as rendered (rounded the same way as in the post), so a fact
+and the number a reader sees never disagree.
+
+This module performs no network, filesystem or model calls.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class CityFacts:
+    name: str                       # ключ из SEA_CITIES / OTHER_CITIES_ALL
+    label: str                      # русское имя, как в посте
+    date: Optional[str] = None      # YYYY-MM-DD, локальная дата прогноза
+    coastal: bool = False
+    tmax: Optional[float] = None
+    tmin: Optional[float] = None
+    weather_code: Optional[int] = None
+    wind_ms: Optional[float] = None
+    wind_dir: Optional[int] = None
+    gust_ms: Optional[float] = None
+    pressure_hpa: Optional[int] = None
+    pressure_trend: Optional[str] = None
+    sst: Optional[float] = None
+    # SUP-строка вечернего поста (ветер/порывы/волна в выбранный час)
+    sup_wind_ms: Optional[float] = None
+    sup_gust_ms: Optional[float] = None
+    wave_h: Optional[float] = None
+    # пики дня по всем городам сразу (forecast_batch.day_peaks)
+    storm_warning: Optional[bool] = None
+    uv_max: Optional[int] = None
+    precip_prob_max: Optional[float] = None
+
+    def merge(self, other: "CityFacts") -> None:
+        """Fill this record with the non-empty fields of another one."""
+        for key, value in asdict(other).items():
+            if key == "coastal":
+                self.coastal = self.coastal or bool(value)
+            elif value is not None and key not in ("name", "label"):
+                setattr(self, key, value)
+
+
+@dataclass
+class PostFacts:
+    mode: str = "evening"
+    date: Optional[str] = None
+    region: Optional[CityFacts] = None          # CY_LAT/CY_LON на дату заголовка
+    cities: List[CityFacts] = field(default_factory=list)
+    warmest: Optional[Tuple[str, float]] = None  # (label, °C) из утреннего приветствия
+    coolest: Optional[Tuple[str, float]] = None
+    uv_max: Optional[int] = None                # только если строка УФ попала в пост
+    air: Dict[str, Any] = field(default_factory=dict)
+    kp: Optional[float] = None
+    kp_status: Optional[str] = None
+    storm: Dict[str, Any] = field(default_factory=dict)
+    astro: List[str] = field(default_factory=list)
+
+    @property
+    def is_morning(self) -> bool:
+        return self.mode.startswith("morn")
+
+    # ---------- cities ----------
+    def add_city(self, city: CityFacts) -> CityFacts:
+        """Record a city; a second record for the same city and date is merged."""
+        for known in self.cities:
+            if known.name == city.name and known.date == city.date:
+                known.merge(city)
+                return known
+        self.cities.append(city)
+        return city
+
+    def city(self, name: str) -> Optional[CityFacts]:
+        low = str(name or "").strip().lower()
+        for known in self.cities:
+            if low in (known.name.lower(), known.label.lower()):
+                return known
+        return None
+
+    def day_temps(self) -> List[float]:
+        return [c.tmax for c in self.cities if c.tmax is not None]
+
+    def temps(self) -> List[float]:
+        out: List[float] = []
+        for c in self.cities:
+            out.extend(v for v in (c.tmax, c.tmin) if v is not None)
+        return out
+
+    def sea_temps(self) -> List[float]:
+        return [c.sst for c in self.cities if c.sst is not None]
+
+    def storm_cities(self) -> List[CityFacts]:
+        return [c for c in self.cities if c.storm_warning]
+
+    # ---------- wind ----------
+    def reported_winds(self) -> Tuple[List[float], List[float]]:
+        """
+        (winds, gusts) the post states in m/s: city winds, the morning headline
+        wind, SUP samples and the storm warning. City gusts are printed without
+        units («порывы 12») and are not part of the gust list, like in the text.
+        """
+        winds: List[float] = [c.wind_ms for c in self.cities if c.wind_ms is not None]
+        gusts: List[float] = []
+        if self.is_morning and self.region is not None:
+            if self.region.wind_ms is not None:
+                winds.append(self.region.wind_ms)
+            if self.region.gust_ms is not None:
+                gusts.append(self.region.gust_ms)
+        winds.extend(c.sup_wind_ms for c in self.cities if c.sup_wind_ms is not None)
+        gusts.extend(c.sup_gust_ms for c in self.cities if c.sup_gust_ms is not None)
+        if self.storm.get("warning"):
+            if self.storm.get("warning_wind_ms") is not None:
+                winds.append(float(self.storm["warning_wind_ms"]))
+            if self.storm.get("warning_gust_ms") is not None:
+                gusts.append(float(self.storm["warning_gust_ms"]))
+        return winds, gusts
+
+    # ---------- summaries ----------
+    def conditions(self) -> Dict[str, Any]:
+        """
+        Same keys as safe_test_post._cyprus_conditions(); None where the post
+        does not state the value (for example, no headline wind in the evening).
+        """
+        region = self.region if self.is_morning else None
+        aqi = self.air.get("aqi")
+        return {
+            "warm_city": self.warmest[0] if self.warmest else None,
+            "cool_city": self.coolest[0] if self.coolest else None,
+            "warm_t": float(self.warmest[1]) if self.warmest else None,
+            "cool_t": float(self.coolest[1]) if self.coolest else None,
+            "wind": region.wind_ms if region is not None else None,
+            "gust": region.gust_ms if region is not None else None,
+            "uv": float(self.uv_max) if self.uv_max is not None else None,
+            "aqi": float(aqi) if aqi is not None else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+__all__ = ["CityFacts", "PostFacts"]
@@ -7,7 +7,7 @@ from __future__ import annotations
 import json, time, math, logging, pathlib
 from typing import Dict, Any, Optional
 
-import requests
+from http_client import http_get
 
 CACHE = pathlib.Path(__file__).parent / "radiation_hourly.json"
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -24,7 +24,7 @@ def _haversine(lat1, lon1, lat2, lon2) -> float:
 def _try_radmon(lat: float, lon: float) -> Optional[float]:
     """Radmon: ищем ближайший активный датчик <100 км, не старше 3 ч. Возвращаем μSv/h."""
     try:
-        r = requests.get("https://radmon.org/radmon.php?format=json", timeout=10)
+        r = http_get("https://radmon.org/radmon.php?format=json", timeout=10)
         j = r.json()
         best, dmin = None, 1e9
         for p in j.get("users", []):
@@ -42,7 +42,7 @@ def _try_radmon(lat: float, lon: float) -> Optional[float]:
 def _try_eurdep(lat: float, lon: float) -> Optional[float]:
     """EURDEP: ближайшая станция <200 км, не старше 6 ч. Значение уже в μSv/h."""
     try:
-        r = requests.get("https://eurdep.jrc.ec.europa.eu/eurdep/json/", timeout=10)
+        r = http_get("https://eurdep.jrc.ec.europa.eu/eurdep/json/", timeout=10)
         j = r.json()
         best, dmin = None, 1e9
         for p in j.get("measurements", []):
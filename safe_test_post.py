@@ -26,7 +26,7 @@ except Exception:  # pragma: no cover - local lightweight telegram module fallba
     NetworkError = RetryAfter = ServerError = TimedOut = None  # type: ignore[assignment]
 
 from editorial_voice import build_evening_human_line, build_morning_human_line
-from post_common import build_message, sup_safety_level
+from post_common import build_message_with_facts, sup_safety_level
 from post_safety import sanitize_post_text, split_telegram_text, validation_summary
 from visibility_context import (
     has_structured_visibility_alert,
@@ -479,7 +479,16 @@ def _cy_place(city: str) -> str:
     return {"Никосия": "в Никосии", "Тродос": "на Тродосе"}.get(c, f"в {c}")
 
 
-def _cyprus_conditions(v2_text: str) -> dict[str, float | bool | str | None]:
+def _cyprus_conditions(v2_text: str, facts=None) -> dict[str, float | bool | str | None]:
+    """Числа поста: из переданных PostFacts, а чего там нет — из текста FORMAT_V2."""
+    known = facts.conditions() if facts is not None else {}
+    if known and all(value is not None for value in known.values()):
+        return known
+    parsed = _cyprus_text_conditions(v2_text)
+    return {key: known.get(key) if known.get(key) is not None else value for key, value in parsed.items()}
+
+
+def _cyprus_text_conditions(v2_text: str) -> dict[str, float | bool | str | None]:
     lines = [x.strip() for x in str(v2_text or "").splitlines() if x.strip()]
     temp_line = next((x for x in lines if x.startswith("🌡 Теплее всего")), "")
     wind_line = next((x for x in lines if x.startswith("💨")), "")
@@ -500,8 +509,8 @@ def _cyprus_conditions(v2_text: str) -> dict[str, float | bool | str | None]:
     }
 
 
-def _cyprus_feels_line(v2_text: str) -> str:
-    c = _cyprus_conditions(v2_text)
+def _cyprus_feels_line(v2_text: str, facts=None) -> str:
+    c = _cyprus_conditions(v2_text, facts)
     warm_city = str(c.get("warm_city") or "")
     cool_city = str(c.get("cool_city") or "")
     warm_t = c.get("warm_t")
@@ -547,8 +556,8 @@ def _cyprus_visibility_condition(v2_text: str) -> str:
     return visibility_condition_from_text(_plain(v2_text))
 
 
-def _cyprus_smart_plan_line(v2_text: str) -> str:
-    c = _cyprus_conditions(v2_text)
+def _cyprus_smart_plan_line(v2_text: str, facts=None) -> str:
+    c = _cyprus_conditions(v2_text, facts)
     warm_t = c.get("warm_t")
     uv = c.get("uv")
     gust = c.get("gust")
@@ -588,8 +597,8 @@ def _has_cyprus_precip_risk(text: str) -> bool:
     )
 
 
-def _cyprus_score_line(v2_text: str) -> str:
-    c = _cyprus_conditions(v2_text)
+def _cyprus_score_line(v2_text: str, facts=None) -> str:
+    c = _cyprus_conditions(v2_text, facts)
     warm_t = c.get("warm_t")
     uv = c.get("uv")
     gust = c.get("gust")
@@ -1071,8 +1080,8 @@ def _without_editorial_voice(v2_text: str) -> list[str]:
     ]
 
 
-def _cyprus_voice_conditions(v2_text: str, mode: str = "morning") -> dict[str, object]:
-    c = _cyprus_conditions(v2_text)
+def _cyprus_voice_conditions(v2_text: str, mode: str = "morning", facts=None) -> dict[str, object]:
+    c = _cyprus_conditions(v2_text, facts)
     plain = _plain(v2_text)
     text = plain.lower()
     evidence_text = text
@@ -1134,10 +1143,10 @@ def _insert_editorial_after(lines: list[str], line_to_add: str, prefixes: tuple[
     return "\n".join(out)
 
 
-def _apply_editorial_voice(v2_text: str, mode: str) -> str:
+def _apply_editorial_voice(v2_text: str, mode: str, facts=None) -> str:
     lines = _without_editorial_voice(v2_text)
     date_s = _date_from_text(v2_text)
-    conditions = _cyprus_voice_conditions(v2_text, mode)
+    conditions = _cyprus_voice_conditions(v2_text, mode, facts)
     if mode.startswith("morn"):
         line = build_morning_human_line("Кипр", date_s or "today", conditions)
         return _insert_editorial_after(lines, line, ("⚠️ Главный нюанс:", "✨ VayboMeter:"))
@@ -1548,10 +1557,10 @@ def _replace_plan(v2_text: str, new_plan: str) -> str:
     return "\n".join(out)
 
 
-def _inject_morning_feels(v2_text: str, mode: str) -> str:
+def _inject_morning_feels(v2_text: str, mode: str, facts=None) -> str:
     if not (mode.startswith("morn") and _env_on("MORNING_FEELS_LIKE")):
         return v2_text
-    feels = _cyprus_feels_line(v2_text)
+    feels = _cyprus_feels_line(v2_text, facts)
     if not feels:
         return v2_text
     lines = str(v2_text or "").splitlines()
@@ -1582,10 +1591,10 @@ def _inject_morning_best_window(v2_text: str, mode: str) -> str:
     return _inject_after_anchor(v2_text, window, ("💨", "🌡"))
 
 
-def _inject_morning_score(v2_text: str, mode: str) -> str:
+def _inject_morning_score(v2_text: str, mode: str, facts=None) -> str:
     if not (mode.startswith("morn") and _env_on("MORNING_VAYBOMETER_SCORE")):
         return v2_text
-    score = _cyprus_score_line(v2_text)
+    score = _cyprus_score_line(v2_text, facts)
     if "🕒 Лучшее окно:" in v2_text:
         return _inject_after_anchor(v2_text, score, ("🕒 Лучшее окно:",))
     if "🌡 Ощущается:" in v2_text:
@@ -1625,10 +1634,10 @@ def _inject_evening_score(v2_text: str, mode: str) -> str:
     return _insert_before_anchor(v2_text, score, ("🎯 <b>Уверенность", "🎯"))
 
 
-def _inject_morning_smart_plan(v2_text: str, mode: str) -> str:
+def _inject_morning_smart_plan(v2_text: str, mode: str, facts=None) -> str:
     if not (mode.startswith("morn") and _env_on("MORNING_SMART_PLAN")):
         return v2_text
-    return _replace_plan(v2_text, _cyprus_smart_plan_line(v2_text))
+    return _replace_plan(v2_text, _cyprus_smart_plan_line(v2_text, facts))
 
 
 def resolve_chat_id(args_chat: str, to_test: bool) -> int:
@@ -1956,6 +1965,7 @@ async def _build_safe_test_image(
     send_image_to_chat: bool,
     image_chat_id: int | None,
     image_only_recovery: bool = False,
+    facts=None,
 ) -> dict[str, object]:
     if send_image_to_test and send_image_to_chat:
         raise SystemExit(
@@ -2057,6 +2067,7 @@ async def _build_safe_test_image(
             final_text,
             post_type=mode,
             visibility_metadata=visibility_metadata,
+            facts=facts,
         )
         lifecycle_stage = "orchestration"
 
@@ -3217,7 +3228,7 @@ async def main() -> None:
     )
 
     with _TodayPatch(base_date):
-        raw_msg = build_message(
+        raw_msg, facts = build_message_with_facts(
             region_name="Кипр",
             sea_label=SEA_LABEL,
             sea_cities=SEA_CITIES_ORDERED,
@@ -3233,10 +3244,10 @@ async def main() -> None:
 
     if use_format_v2:
         from format_v2 import build_format_v2
-        v2_raw = build_format_v2("Кипр", mode, legacy_result.text)
-        v2_raw = _inject_morning_feels(v2_raw, mode)
+        v2_raw = build_format_v2("Кипр", mode, legacy_result.text, facts=facts)
+        v2_raw = _inject_morning_feels(v2_raw, mode, facts)
         v2_raw = _inject_morning_best_window(v2_raw, mode)
-        v2_raw = _inject_morning_score(v2_raw, mode)
+        v2_raw = _inject_morning_score(v2_raw, mode, facts)
         v2_raw = _inject_evening_score(v2_raw, mode)
         v2_raw = _apply_format_v2_test_polish(v2_raw)
         v2_raw = _apply_confidence_polish(v2_raw)
@@ -3245,12 +3256,12 @@ async def main() -> None:
         v2_raw = _apply_cyprus_morning_raw_context(v2_raw, raw_msg, legacy_result.text, mode)
         v2_raw = _apply_cyprus_sensor_cleanup(v2_raw)
         v2_raw = _apply_score_conclusion(v2_raw)
-        v2_raw = _inject_morning_smart_plan(v2_raw, mode)
+        v2_raw = _inject_morning_smart_plan(v2_raw, mode, facts)
         # Editorial voice is applied exactly once, after every factual transformation
         # and before compaction/sanitizing, so it reads the final factual text and
         # cannot be reshaped by later factual passes. The helper strips any existing
         # voice line first, so re-applying it never duplicates the 💬 line.
-        v2_raw = _apply_editorial_voice(v2_raw, mode)
+        v2_raw = _apply_editorial_voice(v2_raw, mode, facts)
         v2_raw = _apply_compact(v2_raw)
         final_result = sanitize_post_text(v2_raw)
         final_label = "FORMAT_V2 MESSAGE"
@@ -3303,6 +3314,7 @@ async def main() -> None:
         send_image_to_chat=args.send_image_to_chat,
         image_chat_id=resolved_text_chat_id,
         image_only_recovery=args.image_only_recovery,
+        facts=facts,
     )
     image_status = str(image_result.get("result") or "unknown")
     image_phase = cy_morning_image_phase_for_result(image_status)
@@ -38,6 +38,8 @@ import urllib.parse
 import requests
 from requests import exceptions as req_exc
 
+from http_client import http_get
+
 ISO8601 = "%Y-%m-%dT%H:%M:%SZ"
 
 def env(name: str, default: Optional[str]=None) -> Optional[str]:
@@ -105,7 +107,8 @@ def _http_get_with_retry(url: str, headers: Dict[str, str], timeout: float) -> r
     last_err: Optional[BaseException] = None
     for attempt in range(SC_RETRIES):
         try:
-            r = requests.get(url, headers=headers, timeout=timeout)
+            # пул соединений — общий; повторы по SC_RETRIES/SC_BACKOFF делаем сами
+            r = http_get(url, headers=headers, timeout=timeout, retries=0)
             # статус-коды для ретрая
             if r.status_code in (429,) or 500 <= r.status_code < 600:
                 raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
@@ -13,7 +13,13 @@ schumann.py — сбор и выдача данных для «Шумана» (v
       * сохранённый HTML (GCI_SAVED_HTML)
     Можно маппить GCI power → amp (SCHU_MAP_GCI_POWER_TO_AMP=1)
   - (опц.) TSU (страница живости, без чисел)
-• Запись в файл истории (SCHU_FILE, по умолчанию schumann_hourly.json).
+  Источники опрашиваются параллельно (collect_sources); как только лучший по
+  _src_rank из возможных (gci_json) дал амплитуду, остальные отменяются.
+  Срок на весь опрос — SCHU_COLLECT_DEADLINE. У каждого источника своя запись
+  в circuit breaker (.schu_breaker.json).
+• Запись в файл истории (SCHU_FILE, по умолчанию schumann_hourly.jsonl):
+  JSON Lines, сбор дописывает/переписывает только последнюю строку,
+  компакция (дедуп, сортировка, SCHU_MAX_LEN) — раз в сутки и по --fix-history.
 • Forward-fill амплитуды при src=='cache' (если раньше была валидная amp).
 • H7: поля h7_amp/h7_spike оставлены под будущее.
 • get_schumann() возвращает freq/amp/trend/status/h7/interpretation.
@@ -26,19 +32,21 @@ CLI:
 
 from __future__ import annotations
 import os, sys, re, json, time, math, calendar
-from typing import Any, Dict, List, Optional, Tuple
+import contextvars, threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 from urllib.parse import urljoin
 
 try:
     import requests
-    from requests.adapters import HTTPAdapter
-    from urllib3.util.retry import Retry
 except Exception:
     requests = None
 
+from http_client import http_get
+
 # ───────────────── Константы и ENV ─────────────────
 
-DEF_FILE    = os.getenv("SCHU_FILE", "schumann_hourly.json")
+DEF_FILE    = os.getenv("SCHU_FILE", "schumann_hourly.jsonl")
 DEF_MAX_LEN = int(os.getenv("SCHU_MAX_LEN", "5000"))
 ALLOW_CACHE = os.getenv("SCHU_ALLOW_CACHE_ON_FAIL", "1") == "1"
 
@@ -80,7 +88,10 @@ H7_TARGET_HZ = float(os.getenv("H7_TARGET_HZ", "54.81"))
 DEBUG = os.getenv("SCHU_DEBUG", "0") == "1"
 USER_AGENT = os.getenv("SCHU_USER_AGENT", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36")
 
-# Circuit breaker (для GCI запросов)
+# Параллельный сбор: общий срок на все источники, сек
+COLLECT_DEADLINE = float(os.getenv("SCHU_COLLECT_DEADLINE", "90"))
+
+# Circuit breaker (по источникам)
 BREAKER_FILE      = ".schu_breaker.json"
 BREAKER_THRESHOLD = int(os.getenv("SCHU_BREAKER_THRESHOLD", "3"))
 BREAKER_COOLDOWN  = int(os.getenv("SCHU_BREAKER_COOLDOWN",  "1800"))
@@ -106,19 +117,92 @@ def _now_hour_ts_utc() -> int:
     t = time.gmtime()
     return int(calendar.timegm((t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, 0, 0)))
 
+# История — JSON Lines: одна запись на строку, по возрастанию ts. Сбор трогает
+# только хвост файла (дописать / переписать последний час), поэтому git-diff
+# каждого прогона — одна строка. Старый формат (JSON-массив) читается и при
+# первой записи переводится в JSONL.
+
+TAIL_CHUNK = 4096
+
+def _is_legacy(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64).lstrip()
+    except OSError:
+        return False
+    return head.startswith(b"[")
+
+def _parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        r = json.loads(line)
+    except Exception:
+        return None  # оборванная строка и т.п.
+    return r if isinstance(r, dict) else None
+
 def _load_history(path: str) -> List[Dict[str, Any]]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            raw = f.read()
     except Exception:
         return []
+    if raw.lstrip().startswith(b"["):
+        try:
+            items = json.loads(raw)
+        except Exception:
+            return []
+        return [r for r in items if isinstance(r, dict)] if isinstance(items, list) else []
+    out = []
+    for line in raw.splitlines():
+        r = _parse_line(line) if line.strip() else None
+        if r is not None:
+            out.append(r)
+    return out
+
+def _dumps(rec: Dict[str, Any]) -> bytes:
+    return (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
 
 def _write_history(path: str, items: List[Dict[str, Any]]) -> None:
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False)
+    with open(tmp, "wb") as f:
+        f.write(b"".join(_dumps(r) for r in items))
     os.replace(tmp, path)
 
+def _tail(path: str, n: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+    """
+    Последние n валидных записей с их смещениями в файле и длина файла без
+    оборванного хвоста. Читает файл с конца блоками TAIL_CHUNK — O(n), не O(файла).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = pos = f.tell()
+            buf = b""
+            found: List[Tuple[int, Dict[str, Any]]] = []
+            while pos > 0:
+                step = min(TAIL_CHUNK, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+                complete = buf[: buf.rfind(b"\n") + 1]
+                lines = complete.split(b"\n")[:-1]
+                if pos > 0:
+                    lines = lines[1:]  # первая строка блока может быть неполной
+                found = []
+                off = pos + len(complete)
+                for line in reversed(lines):
+                    off -= len(line) + 1
+                    r = _parse_line(line) if line.strip() else None
+                    if r is not None:
+                        found.append((off, r))
+                        if len(found) >= n:
+                            break
+                if len(found) >= n:
+                    break
+            valid_end = pos + buf.rfind(b"\n") + 1
+            return list(reversed(found)), (valid_end if size else 0)
+    except OSError:
+        return [], 0
+
 def _dump(name: str, content: str | bytes):
     if not DEBUG:
         return
@@ -145,89 +229,142 @@ def _better_record(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
     if b_has and not a_has: return b
     return b
 
-def upsert_record(path: str, rec: Dict[str, Any], max_len: Optional[int] = None) -> None:
-    try:
-        ts = int(rec.get("ts"))
-    except Exception:
-        return
-    hist = _load_history(path)
+def _merge(items: List[Dict[str, Any]], max_len: Optional[int] = None) -> List[Dict[str, Any]]:
     merged: Dict[int, Dict[str, Any]] = {}
-    for r in hist:
+    for r in items:
         try:
             t = int(r.get("ts"))
         except Exception:
             continue
         merged[t] = r if t not in merged else _better_record(merged[t], r)
-    merged[ts] = rec if ts not in merged else _better_record(merged[ts], rec)
     out = [merged[t] for t in sorted(merged)]
     if isinstance(max_len, int) and max_len > 0 and len(out) > max_len:
         out = out[-max_len:]
+    return out
+
+def compact_history(path: str, max_len: Optional[int] = None, extra: Optional[Dict[str, Any]] = None) -> int:
+    """Полная перезапись: дедуп по ts, сортировка, обрезка до max_len. Возвращает число записей."""
+    items = _load_history(path)
+    if extra is not None:
+        items.append(extra)
+    out = _merge(items, max_len)
     _write_history(path, out)
+    return len(out)
+
+def upsert_record(path: str, rec: Dict[str, Any], max_len: Optional[int] = None) -> None:
+    """
+    O(1) на час: новый час дописывается в конец, повтор последнего часа
+    переписывает только последнюю строку (побеждает _better_record).
+    Полная компакция — с первой записью нового UTC-дня, для записей
+    не по порядку и для файла в старом формате.
+    """
+    try:
+        ts = int(rec.get("ts"))
+    except Exception:
+        return
+    tail, valid_end = ([], 0) if _is_legacy(path) else _tail(path, 1)
+    if not tail:
+        compact_history(path, max_len, rec)
+        return
+    last_off, last = tail[-1]
+    try:
+        last_ts = int(last.get("ts"))
+    except Exception:
+        last_ts = None
+    if last_ts is None or ts < last_ts:
+        compact_history(path, max_len, rec)
+        return
+    if ts // 86400 > last_ts // 86400:
+        compact_history(path, max_len, rec)  # периодическая компакция: раз в сутки
+        return
+    with open(path, "r+b") as f:
+        if ts == last_ts:
+            f.truncate(last_off)
+            f.seek(last_off)
+            f.write(_dumps(_better_record(last, rec)))
+        else:
+            f.truncate(valid_end)  # оборванный хвост прошлого прогона
+            f.seek(valid_end)
+            f.write(_dumps(rec))
 
 def last_known_amp(path: str) -> Optional[float]:
-    for r in reversed(_load_history(path)):
+    if _is_legacy(path):
+        records = _load_history(path)
+    else:
+        records, n = [], 8
+        while True:
+            tail, _ = _tail(path, n)
+            if any(isinstance(r.get("amp"), (int, float)) for _off, r in tail) or len(tail) < n:
+                records = [r for _off, r in tail]
+                break
+            n *= 4
+    for r in reversed(records):
         v = r.get("amp")
         if isinstance(v, (int, float)):
             return float(v)
     return None
 
-# ─────── HTTP ───────
-_SESSION = None
-def _session():
-    global _SESSION
-    if _SESSION:
-        return _SESSION
-    if not requests:
-        return None
-    s = requests.Session()
-    try:
-        retries = Retry(
-            total=2, connect=2, read=2, backoff_factor=0.6,
-            status_forcelist=(500, 502, 503, 504),
-            allowed_methods=frozenset(["GET"])
-        )
-        s.mount("https://", HTTPAdapter(max_retries=retries))
-        s.mount("http://",  HTTPAdapter(max_retries=retries))
-    except Exception:
-        pass
-    s.headers.update({"User-Agent": USER_AGENT})
-    _SESSION = s
-    return s
+def recent_records(path: str, n: int) -> List[Dict[str, Any]]:
+    """Последние n записей истории (хвост файла)."""
+    if _is_legacy(path):
+        return _load_history(path)[-n:]
+    return [r for _off, r in _tail(path, n)[0]]
 
+# ─────── HTTP ───────
 def _get(url, **params):
-    s = _session()
+    if _stopped():
+        return None  # победитель уже выбран — оставшиеся шаги источника не ходят в сеть
+    # пул keep-alive соединений и политика повторов (429/5xx, бэкоф) — общие, из http_client
     try:
-        return s.get(url, params=params, timeout=15, allow_redirects=True)
+        return http_get(url, params=params, headers={"User-Agent": USER_AGENT}, timeout=15, allow_redirects=True)
     except Exception:
         return None
 
 # ─────── Circuit breaker ───────
-def _breaker_state():
+# У каждого источника своя запись: {"gci_page": {"fail": 0, "until": 0}, ...}.
+# Старый файл с одной записью {"fail", "until"} считается записью gci_page.
+_BREAKER_LOCK = threading.Lock()
+
+def _breaker_state() -> Dict[str, Dict[str, Any]]:
     try:
         with open(BREAKER_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+            st = json.load(f)
     except Exception:
-        return {"fail": 0, "until": 0}
+        return {}
+    if not isinstance(st, dict):
+        return {}
+    if "fail" in st or "until" in st:
+        return {"gci_page": {"fail": st.get("fail", 0), "until": st.get("until", 0)}}
+    return {k: v for k, v in st.items() if isinstance(v, dict)}
 
 def _breaker_save(st):
+    # атомарно: источники пишут из разных потоков, читатель не должен увидеть пустой файл
+    tmp = f"{BREAKER_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(BREAKER_FILE, "w", encoding="utf-8") as f:
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(st, f, ensure_ascii=False)
+        os.replace(tmp, BREAKER_FILE)
     except Exception:
         pass
 
-def breaker_allow() -> bool:
-    return time.time() >= _breaker_state().get("until", 0)
-
-def breaker_ok():
-    _breaker_save({"fail": 0, "until": 0})
-
-def breaker_bad():
-    st = _breaker_state()
-    st["fail"] = st.get("fail", 0) + 1
-    if st["fail"] >= BREAKER_THRESHOLD:
-        st["until"] = int(time.time()) + BREAKER_COOLDOWN
-    _breaker_save(st)
+def breaker_allow(source: str = "gci_page") -> bool:
+    return time.time() >= _breaker_state().get(source, {}).get("until", 0)
+
+def breaker_ok(source: str = "gci_page"):
+    with _BREAKER_LOCK:
+        st = _breaker_state()
+        if st.get(source) != {"fail": 0, "until": 0}:
+            st[source] = {"fail": 0, "until": 0}
+            _breaker_save(st)
+
+def breaker_bad(source: str = "gci_page"):
+    with _BREAKER_LOCK:
+        st = _breaker_state()
+        entry = st.setdefault(source, {"fail": 0, "until": 0})
+        entry["fail"] = entry.get("fail", 0) + 1
+        if entry["fail"] >= BREAKER_THRESHOLD:
+            entry["until"] = int(time.time()) + BREAKER_COOLDOWN
+        _breaker_save(st)
 
 # ─────── HTML/JSON parse helpers ───────
 
@@ -257,47 +394,111 @@ def extract_json_from_iframe_inline(html: str | None) -> Optional[Any]:
             continue
     return None
 
-def _flatten_numbers_with_paths(obj: Any, path: Tuple[str, ...] = ()) -> List[Tuple[Tuple[str, ...], float]]:
-    """Разворачивает все числа в JSON вместе с путём до них — для эвристики по станциям."""
-    out: List[Tuple[Tuple[str, ...], float]] = []
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            out.extend(_flatten_numbers_with_paths(v, path + (str(k),)))
-    elif isinstance(obj, list):
-        for i, v in enumerate(obj):
-            out.extend(_flatten_numbers_with_paths(v, path + (str(i),)))
-    elif isinstance(obj, (int, float)) and math.isfinite(obj):
-        out.append((path, float(obj)))
-    return out
+# Числа из JSON GCI: один проход по дереву без списка (путь, число) на каждое
+# значение. Число «принадлежит» станции, если имя станции (без учёта регистра)
+# входит в какой-то ключ на пути к нему; по станции берём последнее число в
+# порядке обхода. Если станций нет — последнее число под ключом "power".
+# Найденные пути запоминаются шаблоном (индекс последнего элемента списка = -1)
+# по «форме» payload: следующий такой же payload читается по шаблонам, без обхода.
+
+_PATH_CACHE: Dict[tuple, Dict[str, tuple]] = {}
+_PATH_CACHE_MAX = 32
+_POWER_KEY = "\0power"  # ключ шаблона для фоллбэка по "power" (не совпадёт с именем станции)
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and math.isfinite(v)
 
-def _numbers_near_station(json_obj: Any, station: str) -> List[float]:
+def _station_values(json_obj: Any, stations: List[str]) -> Tuple[Dict[str, float], Dict[str, tuple]]:
     """
-    Возвращает все числа, путь до которых содержит station (без учёта регистра).
-    Подходит для структур вида {"GCI001": 12.3} или {"stations":{"GCI001":{"power":[... , 7.8]}}} и т.п.
+    Один обход: {станция: последнее число} и {станция: шаблон пути}; под
+    _POWER_KEY — последнее число под ключом "power" (для фоллбэка).
     """
-    station_lc = station.lower()
-    vals: List[float] = []
-    for path, num in _flatten_numbers_with_paths(json_obj):
-        if any(station_lc in p.lower() for p in path):
-            vals.append(num)
-    return vals
+    stations_lc = [st.lower() for st in stations]
+    key_memo: Dict[str, Tuple[Tuple[int, ...], bool]] = {}  # ключ → (станции, это "power")
+    last: Dict[int, Tuple[float, Any]] = {}  # индекс станции (-1 = power) → (число, ячейка пути)
+    # стек: (узел, совпавшие станции, под "power", ячейка пути (родитель, шаг списка?, шаг))
+    stack: List[Tuple[Any, Tuple[int, ...], bool, Any]] = [(json_obj, (), False, None)]
+    while stack:
+        node, matched, under_power, cell = stack.pop()
+        if isinstance(node, dict):
+            children = []
+            for k, v in node.items():
+                ks = str(k)
+                hit = key_memo.get(ks)
+                if hit is None:
+                    kl = ks.lower()
+                    hit = key_memo[ks] = (tuple(i for i, st in enumerate(stations_lc) if st in kl), kl == "power")
+                m = matched + tuple(i for i in hit[0] if i not in matched) if hit[0] else matched
+                children.append((v, m, under_power or hit[1], (cell, False, k)))
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            n = len(node)
+            for i in range(n - 1, -1, -1):
+                stack.append((node[i], matched, under_power, (cell, True, -1 if i == n - 1 else i)))
+        elif _is_number(node):
+            for i in matched:
+                last[i] = (float(node), cell)
+            if under_power:
+                last[-1] = (float(node), cell)
+
+    def template(c: Any) -> tuple:
+        steps = []
+        while c is not None:
+            c, is_list, step = c
+            steps.append((is_list, step))
+        return tuple(reversed(steps))
+
+    values: Dict[str, float] = {}
+    paths: Dict[str, tuple] = {}
+    for i, (num, c) in last.items():
+        name = _POWER_KEY if i < 0 else stations[i]
+        values[name], paths[name] = num, template(c)
+    return values, paths
+
+def _resolve_path(json_obj: Any, template: tuple) -> Optional[float]:
+    node = json_obj
+    for is_list, step in template:
+        if is_list:
+            if not isinstance(node, list) or not node:
+                return None
+            try:
+                node = node[step]
+            except IndexError:
+                return None
+        else:
+            if not isinstance(node, dict) or step not in node:
+                return None
+            node = node[step]
+    return float(node) if _is_number(node) else None
+
+def _shape_key(json_obj: Any, stations: List[str]) -> tuple:
+    if isinstance(json_obj, dict):
+        head: tuple = ("dict",) + tuple(sorted(str(k) for k in json_obj))
+    elif isinstance(json_obj, list):
+        head = ("list", type(json_obj[0]).__name__ if json_obj else "")
+    else:
+        head = (type(json_obj).__name__,)
+    return head + ("|",) + tuple(stations)
 
 def _aggregate_stations_power(json_obj: Any, stations: List[str]) -> Optional[float]:
     """Среднее по доступным станциям из списка. Берём последнее число по каждой станции."""
-    per_station: List[float] = []
-    for st in stations:
-        cand = _numbers_near_station(json_obj, st)
-        if cand:
-            per_station.append(cand[-1])  # последнее как «актуальное»
+    key = _shape_key(json_obj, stations)
+    values: Optional[Dict[str, float]] = None
+    cached = _PATH_CACHE.get(key)
+    if cached is not None:
+        values = {name: _resolve_path(json_obj, t) for name, t in cached.items()}
+        if any(v is None for v in values.values()):
+            values = None  # форма поменялась — полный обход
+    if values is None:
+        values, paths = _station_values(json_obj, stations)
+        if len(_PATH_CACHE) >= _PATH_CACHE_MAX:
+            _PATH_CACHE.clear()
+        _PATH_CACHE[key] = paths
+    per_station = [values[st] for st in stations if values.get(st) is not None]
     if per_station:
         return sum(per_station) / len(per_station)
-    # как фоллбэк: поле 'power' без указания станции
-    # попробуем вытащить последнее число по ключу 'power'
-    flat = _flatten_numbers_with_paths(json_obj)
-    power_like = [num for path, num in flat if any("power" == p.lower() for p in path)]
-    if power_like:
-        return power_like[-1]
-    return None
+    # как фоллбэк: последнее число под ключом 'power' без указания станции
+    return values.get(_POWER_KEY)
 
 # ─────── Источники ───────
 
@@ -347,15 +548,28 @@ def get_from_custom() -> Tuple[Optional[float], Optional[float], str]:
     amp  = deep_find_number(data, "amp", "amplitude", "power")
     return freq, amp, "custom"
 
-def get_gci_power() -> Tuple[Optional[float], str]:
+def _gci_power_from_json_url(json_url: str) -> Optional[float]:
+    rj = _get(json_url)
+    if not rj or rj.status_code != 200:
+        return None
+    try:
+        data = rj.json()
+    except Exception:
+        return None
+    try:
+        _dump("gci_json.json", json.dumps(data, ensure_ascii=False))
+    except Exception:
+        pass
+    power = _aggregate_stations_power(data, GCI_STATIONS)  # среднее по станциям
+    return float(power) if isinstance(power, (int, float)) else None
+
+def get_gci_power_from_page() -> Tuple[Optional[float], str]:
     """
     Основной путь: страница → iframe → data-load-json-from → power_levels.php JSON.
     Возвращает (power, src), где power — то, что далее маппим в amp.
     """
     if not GCI_ENABLE or not requests:
         return None, "gci_disabled"
-    if not breaker_allow():
-        return None, "gci_circuit_open"
 
     page_html = None
     # 1) страница (обёртка)
@@ -375,37 +589,14 @@ def get_gci_power() -> Tuple[Optional[float], str]:
             iframe_html = rr.text
             _dump("gci_iframe.html", iframe_html)
 
-    # 3) извлечь относительный путь к JSON (power_levels.php)
+    # 3) относительный путь к JSON (power_levels.php) → сам JSON
     json_rel = extract_json_path_from_iframe(iframe_html)
-    if not json_rel and GCI_SAVED_HTML:
-        # попробуем из сохранённого файла
-        try:
-            saved_html = open(GCI_SAVED_HTML, encoding="utf-8").read()
-            _dump("gci_saved.html", saved_html)
-            json_rel = extract_json_path_from_iframe(saved_html)
-        except Exception:
-            pass
-
-    # 4) запросить JSON напрямую
     if json_rel:
-        json_url = urljoin(iframe_url, json_rel)
-        rj = _get(json_url)
-        if rj and rj.status_code == 200:
-            try:
-                data = rj.json()
-            except Exception:
-                data = None
-            if data is not None:
-                try:
-                    _dump("gci_json.json", json.dumps(data, ensure_ascii=False))
-                except Exception:
-                    pass
-                power = _aggregate_stations_power(data, GCI_STATIONS)  # среднее по станциям
-                if isinstance(power, (int, float)):
-                    breaker_ok()
-                    return float(power), "gci_json"
-
-    # 5) глубокий фоллбэк: попытка достать inline JSON из iframe
+        power = _gci_power_from_json_url(urljoin(iframe_url, json_rel))
+        if power is not None:
+            return power, "gci_json"
+
+    # 4) глубокий фоллбэк: inline JSON в том же iframe
     data_inline = extract_json_from_iframe_inline(iframe_html)
     if data_inline is not None:
         try:
@@ -414,21 +605,37 @@ def get_gci_power() -> Tuple[Optional[float], str]:
             pass
         power = _aggregate_stations_power(data_inline, GCI_STATIONS)
         if isinstance(power, (int, float)):
-            breaker_ok()
             return float(power), "gci_iframe"
+    return None, "gci_fail"
 
-    # 6) отдельный запрос только iframe (если шаги выше не сработали)
-    rr2 = _get(GCI_IFRAME_URL)
-    if rr2 and rr2.status_code == 200:
-        _dump("gci_iframe_only.html", rr2.text)
-        data_inline2 = extract_json_from_iframe_inline(rr2.text)
-        if data_inline2 is not None:
-            power = _aggregate_stations_power(data_inline2, GCI_STATIONS)
+def get_gci_power_from_iframe() -> Tuple[Optional[float], str]:
+    """Отдельный запрос только iframe (GCI_IFRAME_URL) и inline JSON в нём."""
+    if not GCI_ENABLE or not requests or not GCI_IFRAME_URL:
+        return None, "gci_disabled"
+    rr = _get(GCI_IFRAME_URL)
+    if rr and rr.status_code == 200:
+        _dump("gci_iframe_only.html", rr.text)
+        data_inline = extract_json_from_iframe_inline(rr.text)
+        if data_inline is not None:
+            power = _aggregate_stations_power(data_inline, GCI_STATIONS)
             if isinstance(power, (int, float)):
-                breaker_ok()
                 return float(power), "gci_iframe"
+    return None, "gci_fail"
 
-    breaker_bad()
+def get_gci_power_from_saved() -> Tuple[Optional[float], str]:
+    """Путь к JSON из сохранённого HTML (SCHU_HEARTMATH_HTML), сам JSON — живой."""
+    if not GCI_ENABLE or not requests or not GCI_SAVED_HTML:
+        return None, "gci_disabled"
+    try:
+        saved_html = open(GCI_SAVED_HTML, encoding="utf-8").read()
+    except Exception:
+        return None, "gci_fail"
+    _dump("gci_saved.html", saved_html)
+    json_rel = extract_json_path_from_iframe(saved_html)
+    if json_rel:
+        power = _gci_power_from_json_url(urljoin(GCI_IFRAME_URL, json_rel))
+        if power is not None:
+            return power, "gci_saved"
     return None, "gci_fail"
 
 def get_tsu_liveness() -> Tuple[bool, str]:
@@ -462,6 +669,112 @@ def _clamp_or_none(val, lo, hi):
     except Exception:
         return None
 
+# Источники опрашиваются параллельно. Как только пришла амплитуда от источника,
+# выше которого по _src_rank никто из ещё работающих дать не может, остальные
+# отменяются: _get() перестаёт ходить в сеть, потоки доживают сами.
+
+class SourceResult(NamedTuple):
+    amp: Optional[float]  # уже в единицах amp (AMP_SCALE; GCI — при SCHU_MAP_GCI_POWER_TO_AMP)
+    freq: Optional[float]
+    src: str
+    ok: bool  # источник ответил по делу (для circuit breaker)
+
+_STOP: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("schu_stop", default=None)
+
+def _stopped() -> bool:
+    ev = _STOP.get()
+    return ev is not None and ev.is_set()
+
+def _src_custom() -> SourceResult:
+    f, a, src = get_from_custom()
+    return SourceResult(a * AMP_SCALE if a is not None else None, f, src, f is not None or a is not None)
+
+def _src_gci(fn: Callable[[], Tuple[Optional[float], str]]) -> Callable[[], SourceResult]:
+    def run() -> SourceResult:
+        power, src = fn()
+        ok = isinstance(power, (int, float))
+        amp = float(power) * AMP_SCALE if ok and MAP_GCI_TO_AMP else None
+        return SourceResult(amp, None, src, ok)
+    return run
+
+def _src_tsu() -> SourceResult:
+    ok, src = get_tsu_liveness()
+    return SourceResult(None, None, src, ok)
+
+# имя → (функция, лучший src, который она может вернуть — для ранней отмены)
+SOURCES: Dict[str, Tuple[Callable[[], SourceResult], str]] = {
+    "custom": (_src_custom, "custom"),
+    "gci_page": (_src_gci(get_gci_power_from_page), "gci_json"),
+    "gci_iframe": (_src_gci(get_gci_power_from_iframe), "gci_iframe"),
+    "gci_saved": (_src_gci(get_gci_power_from_saved), "gci_saved"),
+    "tsu": (_src_tsu, "tsu_live"),
+}
+
+def enabled_sources() -> List[str]:
+    names: List[str] = []
+    if CUSTOM_URL:
+        names.append("custom")
+    if GCI_ENABLE:
+        names += ["gci_page", "gci_iframe"] + (["gci_saved"] if GCI_SAVED_HTML else [])
+    if TSU_ENABLE:
+        names.append("tsu")
+    return names
+
+def _run_source(name: str) -> SourceResult:
+    if not breaker_allow(name):
+        return SourceResult(None, None, f"{name}_circuit_open", False)
+    try:
+        return SOURCES[name][0]()
+    except Exception:
+        return SourceResult(None, None, f"{name}_fail", False)
+
+def _breaker_update(name: str, res: SourceResult) -> None:
+    if res.ok:
+        breaker_ok(name)
+    elif not res.src.endswith(("_disabled", "_circuit_open")):
+        breaker_bad(name)
+
+def collect_sources(names: Optional[List[str]] = None, deadline: Optional[float] = None) -> Dict[str, SourceResult]:
+    """
+    Параллельный опрос источников; {имя: результат} только для успевших.
+    Время — самый медленный источник (не сумма), не больше deadline.
+    """
+    names = enabled_sources() if names is None else list(names)
+    if not names:
+        return {}
+    deadline = COLLECT_DEADLINE if deadline is None else deadline
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="schu")
+    token = _STOP.set(stop)
+    try:
+        futures = {pool.submit(contextvars.copy_context().run, _run_source, n): n for n in names}
+    finally:
+        _STOP.reset(token)
+    results: Dict[str, SourceResult] = {}
+    pending = set(futures)
+    t_end = time.monotonic() + deadline
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, t_end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                if DEBUG:
+                    print("WARN: schumann sources timed out:", ", ".join(sorted(futures[f] for f in pending)))
+                break
+            for fut in done:
+                results[futures[fut]] = fut.result()
+            best = max((_src_rank(r.src) for r in results.values() if r.amp is not None), default=None)
+            waiting = max((_src_rank(SOURCES[futures[f]][1]) for f in pending), default=-1)
+            if best is not None and best >= waiting:
+                break
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    # breaker — только по собранным ответам и из этого потока: отменённый или
+    # опоздавший источник не виноват и не пишет файл после нашего возврата
+    for name, res in results.items():
+        _breaker_update(name, res)
+    return {n: results[n] for n in names if n in results}
+
 def collect_once() -> Dict[str, Any]:
     ts = _now_hour_ts_utc()
 
@@ -471,40 +784,38 @@ def collect_once() -> Dict[str, Any]:
     h7_spike: Optional[bool] = None
     src = "none"
 
-    # 1) CUSTOM
-    if CUSTOM_URL:
-        f, a, src_c = get_from_custom()
-        if f is not None:
-            freq_val = f
-        if a is not None:
-            amp_val = a * AMP_SCALE
-        src = src_c
-
-    # 2) GCI
-    if amp_val is None and GCI_ENABLE:
-        power, src_g = get_gci_power()
-        if isinstance(power, (int, float)) and MAP_GCI_TO_AMP:
-            amp_val = float(power) * AMP_SCALE
-            src = src_g
-        elif src == "none":
-            src = src_g  # хотя бы отметим источник
-
-    # 3) TSU живость (как индикатор источника; чисел не даст)
-    if amp_val is None and TSU_ENABLE:
-        ok, src_t = get_tsu_liveness()
-        if ok and src == "none":
-            src = src_t
-
-    # 4) Частота по умолчанию: 7.83 (и нормализатор)
+    results = collect_sources()
+
+    # 1) CUSTOM даёт частоту (и статус источника)
+    custom = results.get("custom")
+    if custom is not None:
+        freq_val = custom.freq
+        src = custom.src
+
+    # 2) амплитуда — лучший по _src_rank (при равенстве — порядок SOURCES)
+    winners = [r for r in results.values() if r.amp is not None]
+    if winners:
+        best = max(winners, key=lambda r: _src_rank(r.src))
+        amp_val, src = best.amp, best.src
+    else:
+        # хотя бы отметим источник: основной путь GCI, затем живость TSU
+        gci = results.get("gci_page")
+        if gci is not None and src == "none":
+            src = gci.src
+        tsu = results.get("tsu")
+        if tsu is not None and tsu.ok and src == "none":
+            src = tsu.src
+
+    # 3) Частота по умолчанию: 7.83 (и нормализатор)
     if freq_val is None:
         freq_val = 7.83
     freq_val = _clamp_or_none(freq_val, FREQ_MIN, FREQ_MAX) or 7.83
 
-    # 5) Нормализация amp
+    # 4) Нормализация amp
     if amp_val is not None:
         amp_val = _clamp_or_none(amp_val, AMP_MIN, AMP_MAX)
 
-    # 6) Кэш-фоллбэк по amp
+    # 5) Кэш-фоллбэк по amp
     if amp_val is None and ALLOW_CACHE:
         amp_prev = last_known_amp(DEF_FILE)
         if amp_prev is not None:
@@ -561,7 +872,7 @@ def _trend_arrow(vals: List[float], delta: float = TREND_DELTA) -> str:
 # ─────── Публичное API ───────
 
 def get_schumann() -> Dict[str, Any]:
-    hist = _load_history(DEF_FILE)
+    hist = recent_records(DEF_FILE, max(TREND_WINDOW, 2))
     if not hist:
         return {
             "freq": None, "amp": None, "trend": "→", "trend_text": "стабильно",
@@ -572,7 +883,6 @@ def get_schumann() -> Dict[str, Any]:
 
     # тренд по частоте (как раньше; частота может быть константой 7.83 — тогда «стабильно»)
     freq_series = [r.get("freq") for r in hist if isinstance(r.get("freq"), (int, float))]
-    freq_series = freq_series[-max(TREND_WINDOW, 2):] if freq_series else []
     trend = _trend_arrow(freq_series) if freq_series else "→"
 
     last = hist[-1]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+section_memo.py — disk memoization of post sections (VayboMeter).
+
+A section (astro block, sun line, fact of the day …) is stored as a small text
+file keyed by a fingerprint of *all* its inputs, in the spirit of
+post_common.astro_canonical_fingerprint: same inputs → the stored text is
+returned as is, any changed input → new fingerprint → fresh render. Recovery
+runs of the same day therefore rebuild only the sections whose inputs changed
+and repeat the others byte for byte.
+
+    text = lookup("astro", inputs)
+    if text is None:
+        text = render()
+        store("astro", inputs, text)
+
+inputs — any JSON-serializable structure; dict keys are sorted before hashing.
+
+Env (optional):
+  VAYBOMETER_CACHE_DIR       default: .cache (files go to <dir>/sections/)
+  POST_SECTION_MEMO          default: 0 (off; the daily workflow turns it on)
+  POST_SECTION_MEMO_TTL_SEC  default: 259200 (3 days; older files are pruned)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+LOG = logging.getLogger(__name__)
+
+# поднимать при изменении формата любой из мемоизируемых секций
+SECTION_MEMO_VERSION = 1
+
+MEMO_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", ".cache")) / "sections"
+TTL_SEC = int(os.getenv("POST_SECTION_MEMO_TTL_SEC", str(3 * 24 * 3600)) or str(3 * 24 * 3600))
+
+
+def enabled() -> bool:
+    return (os.getenv("POST_SECTION_MEMO") or "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def section_fingerprint(name: str, inputs: Any) -> str:
+    payload = json.dumps(
+        [SECTION_MEMO_VERSION, name, inputs],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _path(name: str, inputs: Any) -> Path:
+    return MEMO_DIR / f"{name}_{section_fingerprint(name, inputs)}.txt"
+
+
+def lookup(name: str, inputs: Any) -> Optional[str]:
+    """Stored text of the section for these inputs, or None (miss / memo off)."""
+    if not enabled():
+        return None
+    path = _path(name, inputs)
+    try:
+        if time.time() - path.stat().st_mtime > TTL_SEC:
+            return None
+        text = path.read_text("utf-8")
+    except OSError:
+        return None
+    LOG.info("section memo hit: %s", path.name)
+    return text
+
+
+def store(name: str, inputs: Any, text: Optional[str]) -> None:
+    if not enabled() or text is None:
+        return
+    path = _path(name, inputs)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        LOG.warning("section memo: cannot write %s: %s", path.name, e)
+        return
+    _prune()
+
+
+def _prune() -> None:
+    now = time.time()
+    try:
+        for old in MEMO_DIR.glob("*.txt"):
+            try:
+                if now - old.stat().st_mtime > TTL_SEC:
+                    old.unlink()
+            except OSError:
+                continue
+    except OSError:
+        pass
+
+
+__all__ = ["enabled", "lookup", "section_fingerprint", "store"]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+source_graph.py — declarative graph of data sources run as one asyncio pipeline (VayboMeter).
+
+A post declares what it needs as Source entries: the call (fn, args, kwargs),
+the sources it must wait for (`after`), a per-source timeout and a
+concurrency group. collect() runs the whole graph at once — every source
+starts as soon as its dependencies are done — and returns a Snapshot, so the
+collection takes as long as the slowest chain, not the sum of all sources:
+
+    snap = collect([
+        Source("batch", prefetch_weather, (points,), group="open-meteo"),
+        Source("weather:region", get_weather, (lat, lon), after=("batch",), timeout=45),
+        Source("kp", fetch_kp, timeout=20, group="swpc"),
+    ], limits={"open-meteo": 4})
+    snap.result(get_weather, (lat, lon))  # value / the source's exception
+
+Collectors stay plain blocking functions: they run in a bounded thread pool,
+each in a copy of the caller's context (contextvars such as the weather
+budget carry over). A dependency that fails or times out does not cancel its
+dependents — they only wait for it, as the cache-warming steps are optional.
+A source that runs past its timeout is recorded with a TimeoutError and
+answers with its `default`; the thread is left to finish on its own. The
+timeout starts when the call starts: waiting for the group limit or for a
+free pool thread is not counted (a timed-out call still holds its thread,
+so later sources may queue behind it).
+
+collect() is synchronous and can be called from inside a running event loop
+(send_common_post): the pipeline then gets its own loop in a helper thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+LOG = logging.getLogger(__name__)
+
+
+def call_key(fn: Callable[..., Any], args: tuple, kwargs: Mapping[str, Any]) -> Optional[tuple]:
+    """(fn, args, kwargs) as a dict key; None for unhashable arguments."""
+    try:
+        key = (
+            fn,
+            tuple(tuple(a) if isinstance(a, list) else a for a in args),
+            tuple(sorted(kwargs.items())),
+        )
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    fn: Callable[..., Any]
+    args: tuple = ()
+    kwargs: Mapping[str, Any] = field(default_factory=dict)
+    after: Tuple[str, ...] = ()
+    timeout: Optional[float] = None  # секунды на сам вызов, без ожидания зависимостей, лимита и потока
+    group: str = "default"  # общий лимит параллельности (limits[group])
+    default: Any = None  # ответ при таймауте
+
+
+@dataclass
+class Snapshot:
+    """Results of one collect(): by source name and by (fn, args, kwargs)."""
+
+    values: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    timed_out: Set[str] = field(default_factory=set)
+    timings: Dict[str, float] = field(default_factory=dict)
+    elapsed: float = 0.0
+    _calls: Dict[tuple, str] = field(default_factory=dict, repr=False)
+
+    def has(self, fn: Callable[..., Any], args: tuple = (), kwargs: Optional[Mapping[str, Any]] = None) -> bool:
+        key = call_key(fn, args, kwargs or {})
+        return key is not None and key in self._calls
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+    def result(self, fn: Callable[..., Any], args: tuple = (), kwargs: Optional[Mapping[str, Any]] = None) -> Any:
+        """Value of the source declared with this call; re-raises its exception (not a timeout)."""
+        name = self._calls[call_key(fn, args, kwargs or {})]
+        err = self.errors.get(name)
+        if err is not None and name not in self.timed_out:
+            raise err
+        return self.values.get(name)
+
+    def summary(self) -> str:
+        slow = sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        parts = [f"{len(self.timings)} sources in {self.elapsed:.1f}s"]
+        if slow:
+            parts.append("slowest " + ", ".join(f"{name} {sec:.1f}s" for name, sec in slow))
+        if self.timed_out:
+            parts.append("timed out " + ", ".join(sorted(self.timed_out)))
+        failed = sorted(set(self.errors) - self.timed_out)
+        if failed:
+            parts.append("failed " + ", ".join(failed))
+        return "; ".join(parts)
+
+
+def _guarded(ctx: contextvars.Context, fn: Callable[..., Any], args: tuple, kwargs: Mapping[str, Any]) -> Tuple[bool, Any]:
+    # исключение источника — значением: его TimeoutError не спутать с таймаутом графа
+    try:
+        return True, ctx.run(fn, *args, **kwargs)
+    except Exception as e:
+        return False, e
+
+
+def _check_graph(sources: List[Source]) -> None:
+    names = [s.name for s in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate source names: {names}")
+    known = set(names)
+    deps = {s.name: s.after for s in sources}
+    for s in sources:
+        missing = [d for d in s.after if d not in known]
+        if missing:
+            raise ValueError(f"{s.name}: unknown dependencies {missing}")
+    # цикл = зависшие задачи; проверяем обходом в глубину
+    state: Dict[str, int] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle through {name}")
+        state[name] = 1
+        for dep in deps[name]:
+            visit(dep)
+        state[name] = 2
+
+    for name in names:
+        visit(name)
+
+
+async def run_sources(
+    sources: Iterable[Source],
+    *,
+    limits: Optional[Mapping[str, int]] = None,
+    workers: int = 8,
+    contexts: Optional[Mapping[str, contextvars.Context]] = None,
+) -> Snapshot:
+    """The pipeline itself; collect() is the synchronous entry point."""
+    sources = list(sources)
+    _check_graph(sources)
+    snap = Snapshot()
+    for s in sources:
+        key = call_key(s.fn, s.args, s.kwargs)
+        if key is not None:
+            snap._calls.setdefault(key, s.name)
+
+    loop = asyncio.get_running_loop()
+    sems = {group: asyncio.Semaphore(max(1, int(n))) for group, n in (limits or {}).items()}
+    tasks: Dict[str, asyncio.Task] = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="source")
+
+    async def _run(s: Source) -> None:
+        if s.after:
+            await asyncio.gather(*(tasks[d] for d in s.after), return_exceptions=True)
+        ctx = (contexts or {}).get(s.name)
+        if ctx is None:
+            ctx = contextvars.copy_context()
+        started = asyncio.Event()
+
+        def call() -> Tuple[bool, Any]:
+            loop.call_soon_threadsafe(started.set)
+            return _guarded(ctx, s.fn, s.args, s.kwargs)
+
+        sem = sems.get(s.group)
+        t0 = time.monotonic()
+        try:
+            if sem is not None:
+                await sem.acquire()
+            try:
+                fut = loop.run_in_executor(pool, call)
+                # таймаут считаем от старта вызова: очередь за свободным потоком пула — не вина источника
+                await started.wait()
+                t0 = time.monotonic()
+                ok, value = await asyncio.wait_for(fut, s.timeout)
+            finally:
+                if sem is not None:
+                    sem.release()
+            if ok:
+                snap.values[s.name] = value
+            else:
+                snap.errors[s.name] = value
+        except asyncio.TimeoutError as e:
+            LOG.warning("source %s: no answer in %.1fs", s.name, s.timeout or 0)
+            snap.values[s.name] = s.default
+            snap.errors[s.name] = e
+            snap.timed_out.add(s.name)
+        finally:
+            snap.timings[s.name] = time.monotonic() - t0
+
+    t_start = time.monotonic()
+    try:
+        for s in sources:
+            tasks[s.name] = loop.create_task(_run(s), name=f"source:{s.name}")
+        await asyncio.gather(*tasks.values())
+    finally:
+        # опоздавшие потоки доживают сами, их результат уже никому не нужен
+        pool.shutdown(wait=False, cancel_futures=True)
+    snap.elapsed = time.monotonic() - t_start
+    return snap
+
+
+def collect(
+    sources: Iterable[Source],
+    *,
+    limits: Optional[Mapping[str, int]] = None,
+    workers: int = 8,
+) -> Snapshot:
+    """Run the graph and wait for it; safe both with and without a running event loop."""
+    sources = list(sources)
+    # контексты снимаем здесь, в потоке вызывающего: в цикле другого потока их уже не видно
+    contexts = {s.name: contextvars.copy_context() for s in sources}
+    coro_args = dict(limits=limits, workers=workers, contexts=contexts)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_sources(sources, **coro_args))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="source-loop") as helper:
+        return helper.submit(asyncio.run, run_sources(sources, **coro_args)).result()
+
+
+__all__ = ["Snapshot", "Source", "call_key", "collect", "run_sources"]
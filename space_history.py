@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+space_history.py — local time series of Kp and solar-wind readings (VayboMeter).
+
+space_weather.py keeps only the latest SWPC bodies; every newly downloaded
+body is also ingested here, so a post can say «Kp растёт 6 ч», «max за
+сутки» or «буря идёт 9 ч» without refetching NOAA's 7-day table.
+
+One append-only file per series under VAYBOMETER_CACHE_DIR (restored with
+.cache/space_weather.json by the same actions/cache step):
+
+    space_history_kp.bin       kp                 (3-hourly observed Kp)
+    space_history_mag.bin      bz, bt             (DSCOVR/ACE magnetometer)
+    space_history_plasma.bin   speed, density     (DSCOVR/ACE plasma)
+
+Layout: b"VBS1" | uint16 field count | uint16 reserved, then fixed-size
+little-endian records: int64 epoch + one float32 per field (NaN = no value).
+Records are strictly increasing in time: ingest() appends only rows newer
+than the last stored epoch (read from the file tail, O(1)), so re-ingesting
+an overlapping SWPC table is a no-op and duplicates never reach the disk.
+A torn last record is cut off before the next append. When the first record
+falls out of the retention window the file is rewritten without the old
+rows (RETENTION_DAYS per series).
+
+Queries run on the sorted epoch column with bisect:
+
+    s = load("kp")
+    s.window("kp", hours=24)       → WindowStats(mean, n, peak, peak_at, first, last)
+    s.change("kp", hours=6)        → latest − value at the start of the window
+    storm("kp" series, threshold)  → StormSpan(start, end, hours, peak) | None
+
+Standard library only (the world workflows install just
+requests/jinja2/pytz/astral).
+
+Env (optional):
+  SPACE_HISTORY       default: 0 (off; the SWPC workflows turn it on)
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", ".cache"))
+
+SERIES: Dict[str, Tuple[str, ...]] = {
+    "kp": ("kp",),
+    "mag": ("bz", "bt"),
+    "plasma": ("speed", "density"),
+}
+RETENTION_DAYS: Dict[str, int] = {"kp": 60, "mag": 7, "plasma": 7}
+KP_STEP_SEC = 3 * 3600  # одно значение Kp покрывает 3 часа от time_tag
+
+_MAGIC = b"VBS1"
+_HEAD = struct.Struct("<4sHH")
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return (os.getenv("SPACE_HISTORY") or "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def path_for(name: str) -> Path:
+    return CACHE_DIR / f"space_history_{name}.bin"
+
+
+def _record(name: str) -> struct.Struct:
+    return struct.Struct("<q" + "f" * len(SERIES[name]))
+
+
+class WindowStats(NamedTuple):
+    mean: float
+    n: int
+    peak: float
+    peak_at: int
+    first: float  # первое значение в окне
+    last: float  # последнее значение в окне
+
+
+class StormSpan(NamedTuple):
+    start: int  # начало первого 3-часового интервала с Kp ≥ порога
+    end: int  # конец последнего такого интервала
+    hours: float
+    peak: float
+
+
+class Series:
+    """Sorted records of one series: epochs + one column per field (NaN = no value)."""
+
+    __slots__ = ("name", "epochs", "cols")
+
+    def __init__(self, name: str, epochs: array, cols: Dict[str, array]):
+        self.name = name
+        self.epochs = epochs
+        self.cols = cols
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def _span(self, start_ts: float, end_ts: float) -> Tuple[int, int]:
+        """Rows with start_ts < t <= end_ts."""
+        return bisect.bisect_right(self.epochs, start_ts), bisect.bisect_right(self.epochs, end_ts)
+
+    def _end(self, end_ts: Optional[float]) -> float:
+        if end_ts is not None:
+            return end_ts
+        return self.epochs[-1] if self.epochs else time.time()
+
+    def window(self, field: str, hours: float = 24, end_ts: Optional[float] = None) -> Optional[WindowStats]:
+        """Stats over the `hours` ending at end_ts (default: the latest record)."""
+        end = self._end(end_ts)
+        lo, hi = self._span(end - hours * 3600, end)
+        col = self.cols[field]
+        vals = [(self.epochs[i], col[i]) for i in range(lo, hi) if col[i] == col[i]]
+        if not vals:
+            return None
+        peak_at, peak = max(vals, key=lambda tv: tv[1])
+        return WindowStats(sum(v for _t, v in vals) / len(vals), len(vals), peak, peak_at, vals[0][1], vals[-1][1])
+
+    def change(self, field: str, hours: float = 6, end_ts: Optional[float] = None) -> Optional[float]:
+        """Latest value minus the value at (or just before) the start of the window."""
+        end = self._end(end_ts)
+        latest = self.latest(field, end)
+        base = self.latest(field, end - hours * 3600)
+        if latest is None or base is None or latest[0] == base[0]:
+            return None
+        return latest[1] - base[1]
+
+    def latest(self, field: str, end_ts: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        col = self.cols[field]
+        hi = len(col) if end_ts is None else bisect.bisect_right(self.epochs, end_ts)
+        for i in range(hi - 1, -1, -1):
+            if col[i] == col[i]:
+                return self.epochs[i], col[i]
+        return None
+
+
+def storm(series: Series, threshold: float = 5.0, end_ts: Optional[float] = None) -> Optional[StormSpan]:
+    """Ongoing geomagnetic storm: the unbroken run of Kp ≥ threshold ending at the latest reading."""
+    col = series.cols["kp"]
+    hi = len(col) if end_ts is None else bisect.bisect_right(series.epochs, end_ts)
+    i = hi - 1
+    while i >= 0 and col[i] != col[i]:
+        i -= 1
+    if i < 0 or col[i] < threshold:
+        return None
+    end = series.epochs[i] + KP_STEP_SEC
+    start, peak = series.epochs[i], col[i]
+    while i > 0 and col[i - 1] >= threshold and series.epochs[i] - series.epochs[i - 1] <= KP_STEP_SEC:
+        i -= 1
+        start, peak = series.epochs[i], max(peak, col[i])
+    return StormSpan(start, end, (end - start) / 3600, peak)
+
+
+# ---------- file ----------
+def _read(name: str) -> Tuple[array, Dict[str, array]]:
+    fields = SERIES[name]
+    rec = _record(name)
+    epochs, cols = array("q"), {f: array("d") for f in fields}
+    try:
+        raw = path_for(name).read_bytes()
+    except OSError:
+        return epochs, cols
+    try:
+        magic, nfields, _ = _HEAD.unpack_from(raw)
+        if magic != _MAGIC or nfields != len(fields):
+            raise ValueError(f"bad header {magic!r}/{nfields}")
+    except (struct.error, ValueError) as e:
+        LOG.warning("space history: unreadable %s: %s", path_for(name).name, e)
+        return epochs, cols
+    body = memoryview(raw)[_HEAD.size:]
+    body = body[: len(body) - len(body) % rec.size]  # оборванная последняя запись
+    for row in rec.iter_unpack(body):
+        epochs.append(row[0])
+        for f, v in zip(fields, row[1:]):
+            cols[f].append(round(v, 3) if v == v else v)  # float32 → значения SWPC (≤ 3 знака)
+    return epochs, cols
+
+
+def _tail(name: str) -> Tuple[Optional[int], Optional[int]]:
+    """(first epoch, last epoch) without reading the whole file."""
+    rec = _record(name)
+    try:
+        with path_for(name).open("rb") as fh:
+            magic, nfields, _ = _HEAD.unpack(fh.read(_HEAD.size))
+            if magic != _MAGIC or nfields != len(SERIES[name]):
+                return None, None  # битый файл — ingest() перепишет его целиком
+            fh.seek(0, os.SEEK_END)
+            body = fh.tell() - _HEAD.size
+            n = body // rec.size if body > 0 else 0
+            if n == 0:
+                return None, None
+            fh.seek(_HEAD.size)
+            first = rec.unpack(fh.read(rec.size))[0]
+            fh.seek(_HEAD.size + (n - 1) * rec.size)
+            last = rec.unpack(fh.read(rec.size))[0]
+            return first, last
+    except (OSError, struct.error):
+        return None, None
+
+
+def _rewrite(name: str, rows: Sequence[Tuple[int, Tuple[float, ...]]]) -> None:
+    rec = _record(name)
+    out = bytearray(_HEAD.pack(_MAGIC, len(SERIES[name]), 0))
+    for ts, values in rows:
+        out.extend(rec.pack(ts, *values))
+    target = path_for(name)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(bytes(out))
+    os.replace(tmp, target)
+
+
+def _value(v: Optional[float]) -> float:
+    return v if isinstance(v, (int, float)) and math.isfinite(v) else math.nan
+
+
+# ---------- public ----------
+_LOADED: Dict[str, Tuple[tuple, Series]] = {}
+
+
+def _stamp(name: str) -> tuple:
+    try:
+        st = path_for(name).stat()
+        return str(path_for(name)), st.st_mtime_ns, st.st_size
+    except OSError:
+        return str(path_for(name)), None, None
+
+
+def load(name: str) -> Series:
+    """The whole series as sorted columns; reused until the file changes."""
+    with _LOCK:
+        stamp = _stamp(name)
+        hit = _LOADED.get(name)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        epochs, cols = _read(name)
+        series = Series(name, epochs, cols)
+        _LOADED[name] = (stamp, series)
+        return series
+
+
+def last_ts(name: str) -> Optional[int]:
+    """Epoch of the newest stored record (ingest cut-off)."""
+    return _tail(name)[1]
+
+
+def ingest(name: str, rows: Iterable[Tuple[int, Sequence[Optional[float]]]], now: Optional[float] = None) -> int:
+    """
+    Append rows newer than the last stored epoch; returns how many were written.
+    rows: (epoch, values in SERIES[name] order), any order; duplicates by epoch
+    collapse to the last one given. No-op when SPACE_HISTORY is off.
+    """
+    if not enabled():
+        return 0
+    fields = SERIES[name]
+    rec = _record(name)
+    with _LOCK:
+        first, last = _tail(name)
+        fresh: Dict[int, Tuple[float, ...]] = {}
+        for ts, values in rows:
+            if last is not None and ts <= last:
+                continue
+            clean = tuple(_value(v) for v in values)
+            if len(clean) == len(fields) and any(v == v for v in clean):
+                fresh[int(ts)] = clean
+        if not fresh:
+            return 0
+        new = sorted(fresh.items())
+        drop_before = (time.time() if now is None else now) - RETENTION_DAYS[name] * 86400
+        target = path_for(name)
+        try:
+            if first is not None and first < drop_before:
+                epochs, cols = _read(name)
+                kept = [
+                    (ts, tuple(cols[f][i] for f in fields))
+                    for i, ts in enumerate(epochs)
+                    if ts >= drop_before
+                ]
+                _rewrite(name, kept + [r for r in new if r[0] >= drop_before])
+            elif first is None:
+                _rewrite(name, new)
+            else:
+                with target.open("r+b") as fh:
+                    fh.seek(0, os.SEEK_END)
+                    body = fh.tell() - _HEAD.size
+                    fh.truncate(_HEAD.size + body - body % rec.size)
+                    fh.seek(0, os.SEEK_END)
+                    fh.write(b"".join(rec.pack(ts, *values) for ts, values in new))
+        except OSError as e:
+            LOG.warning("space history: cannot write %s: %s", target.name, e)
+            return 0
+        return len(new)
+
+
+def kp_summary(now: Optional[float] = None) -> Dict[str, Optional[float]]:
+    """Numbers the posts print: 24h max, 6h change, ongoing storm length (hours, Kp ≥ 5)."""
+    series = load("kp")
+    if not len(series):
+        return {}
+    end = time.time() if now is None else now
+    day = series.window("kp", 24, end)
+    span = storm(series, 5.0, end)
+    if span is not None and end - span.end > KP_STEP_SEC:
+        span = None  # история давно не пополнялась — «идёт» уже неизвестно
+    return {
+        "max_24h": day.peak if day else None,
+        "change_6h": series.change("kp", 6, end),
+        "storm_hours": span.hours if span else None,
+    }
+
+
+__all__ = [
+    "RETENTION_DAYS",
+    "SERIES",
+    "Series",
+    "StormSpan",
+    "WindowStats",
+    "enabled",
+    "ingest",
+    "kp_summary",
+    "last_ts",
+    "load",
+    "path_for",
+    "storm",
+]
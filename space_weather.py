@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+space_weather.py — one NOAA SWPC client for every post (VayboMeter).
+
+The Cyprus morning post (air.get_kp / get_solar_wind, post_common Kp line),
+the weekly forecast and the world daily/weekly collectors all read Kp and
+solar wind through this module. Each SWPC product is fetched at most once per
+TTL into a single shared file, .cache/space_weather.json, which every
+workflow restores from the same actions/cache key, so a morning post and a
+world daily run make one set of NOAA calls between them:
+
+    {"version": 1, "products": {"kp_observed": {"fetched_at": 1760601600,
+        "validators": {"etag": "..."}, "body": [...]}, ...}}
+
+Products (PRODUCTS: url, fresh TTL, how long a stale body may stand in when
+SWPC is down):
+
+    kp_observed   products/noaa-planetary-k-index.json       (3-hourly Kp)
+    kp_1m         json/planetary_k_index_1m.json             (fallback for Kp)
+    kp_forecast   products/noaa-planetary-k-index-forecast.json
+    mag, plasma   products/solar-wind/{mag,plasma}-5-minute.json
+
+Expired bodies are revalidated with ETag/Last-Modified (304 only extends the
+freshness). SPACE_WEATHER_SWR_SEC>0 turns on stale-while-revalidate: a body
+that expired less than that many seconds ago is returned at once and
+refreshed in a background thread. A failed fetch is not retried by the same
+process for FAIL_RETRY_SEC.
+
+Typed accessors — no labels, those stay with the callers (RU / EN):
+
+    kp_observed()  → KpReading(kp, ts, src, trend) | None
+    kp_forecast()  → [KpForecastDay(date, kp_max), ...]  (from tomorrow, UTC)
+    solar_wind()   → SolarWind(bz, bt, speed_kms, density, ts, src) | None
+
+Every newly downloaded Kp / mag / plasma body is also appended to the local
+time series in space_history.py (rows newer than the stored ones only), which
+answers «max за сутки», «растёт 6 ч», «буря идёт N ч».
+
+Standard library + http_client only: the world workflows install just
+requests/jinja2/pytz/astral.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import space_history
+from http_client import conditional_headers, http_get, response_validators
+
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("VAYBOMETER_CACHE_DIR", ".cache"))
+SPACE_WEATHER_PATH = CACHE_DIR / "space_weather.json"
+SPACE_WEATHER_VERSION = 1
+
+REQUEST_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10") or "10")
+REQUEST_RETRIES = 2
+FAIL_RETRY_SEC = 60
+# Opt-in stale-while-revalidate: тело, просроченное не более чем на столько
+# секунд, отдаётся сразу, а обновляется в фоне. 0 — выкл.
+SPACE_WEATHER_SWR_SEC = int(os.getenv("SPACE_WEATHER_SWR_SEC", "0") or "0")
+
+SWPC = "https://services.swpc.noaa.gov"
+HEADERS = {"User-Agent": "VayboMeter/1.0", "Accept": "application/json"}
+
+
+class Product(NamedTuple):
+    url: str
+    ttl_sec: int  # тело свежее — без сети
+    stale_max_sec: int  # SWPC недоступен — старое тело ещё годится
+
+
+PRODUCTS: Dict[str, Product] = {
+    "kp_observed": Product(f"{SWPC}/products/noaa-planetary-k-index.json", 15 * 60, 4 * 3600),
+    "kp_1m": Product(f"{SWPC}/json/planetary_k_index_1m.json", 15 * 60, 4 * 3600),
+    "kp_forecast": Product(f"{SWPC}/products/noaa-planetary-k-index-forecast.json", 3 * 3600, 24 * 3600),
+    "mag": Product(f"{SWPC}/products/solar-wind/mag-5-minute.json", 5 * 60, 10 * 60),
+    "plasma": Product(f"{SWPC}/products/solar-wind/plasma-5-minute.json", 5 * 60, 10 * 60),
+}
+
+
+class KpReading(NamedTuple):
+    kp: float
+    ts: int  # время наблюдения, unix UTC
+    src: str  # "swpc_table" | "swpc_1m" | "cache" (SWPC недоступен, старое тело)
+    trend: str  # "↗" | "↘" | "→" — к предыдущему 3-часовому значению
+
+
+class KpForecastDay(NamedTuple):
+    date: dt.date
+    kp_max: float
+
+
+class SolarWind(NamedTuple):
+    bz: Optional[float]
+    bt: Optional[float]
+    speed_kms: Optional[float]
+    density: Optional[float]
+    ts: int
+    src: str  # "swpc_5m" | "cache"
+
+
+# ---------- shared cache ----------
+_LOCK = threading.Lock()
+_PRODUCT_LOCKS = {name: threading.Lock() for name in PRODUCTS}
+_ENTRIES: Optional[Dict[str, Dict[str, Any]]] = None
+_FAILED_AT: Dict[str, float] = {}
+_REFRESHING: set = set()
+
+
+def _entries() -> Dict[str, Dict[str, Any]]:
+    global _ENTRIES
+    with _LOCK:
+        if _ENTRIES is None:
+            try:
+                raw = json.loads(SPACE_WEATHER_PATH.read_text(encoding="utf-8"))
+                if raw.get("version") != SPACE_WEATHER_VERSION:
+                    raise ValueError(f"version {raw.get('version')!r}")
+                _ENTRIES = {k: v for k, v in (raw.get("products") or {}).items() if isinstance(v, dict)}
+            except FileNotFoundError:
+                _ENTRIES = {}
+            except Exception as e:
+                LOG.warning("space weather cache %s unreadable: %s", SPACE_WEATHER_PATH.name, e)
+                _ENTRIES = {}
+        return _ENTRIES
+
+
+def _store(name: str, entry: Dict[str, Any]) -> None:
+    entries = _entries()
+    with _LOCK:
+        entries[name] = entry
+        payload = {"version": SPACE_WEATHER_VERSION, "products": entries}
+        try:
+            SPACE_WEATHER_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = SPACE_WEATHER_PATH.with_name(f"{SPACE_WEATHER_PATH.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, SPACE_WEATHER_PATH)
+        except OSError as e:
+            LOG.warning("space weather cache write error: %s", e)
+
+
+def reset() -> None:
+    """Forget the in-process state (tests, or after the cache file was replaced)."""
+    global _ENTRIES
+    with _LOCK:
+        _ENTRIES = None
+        _FAILED_AT.clear()
+
+
+def _download(name: str, entry: Optional[Dict[str, Any]], retries: int) -> Optional[Dict[str, Any]]:
+    """Conditional GET; new entry or None. 304 keeps the body, fetched_at = now."""
+    prod = PRODUCTS[name]
+    headers = dict(HEADERS)
+    if entry is not None:
+        headers.update(conditional_headers(entry.get("validators")))
+    try:
+        resp = http_get(prod.url, headers=headers, timeout=REQUEST_TIMEOUT, retries=retries)
+        if resp.status_code == 304 and entry is not None:
+            fresh = dict(entry, fetched_at=int(time.time()))
+        else:
+            resp.raise_for_status()
+            fresh = {"fetched_at": int(time.time()), "validators": response_validators(resp), "body": resp.json()}
+            _ingest(name, fresh["body"])
+    except Exception as e:
+        LOG.warning("SWPC %s fetch error: %s", name, e)
+        _FAILED_AT[name] = time.monotonic()
+        return None
+    _FAILED_AT.pop(name, None)
+    _store(name, fresh)
+    return fresh
+
+
+def _refresh_in_background(name: str, entry: Dict[str, Any]) -> None:
+    with _LOCK:
+        if name in _REFRESHING:
+            return
+        _REFRESHING.add(name)
+
+    def _run() -> None:
+        try:
+            _download(name, entry, retries=0)
+        finally:
+            with _LOCK:
+                _REFRESHING.discard(name)
+
+    threading.Thread(target=_run, name=f"swpc-{name}", daemon=True).start()
+
+
+def product(name: str) -> Tuple[Optional[Any], bool]:
+    """
+    (JSON body, live) of one SWPC product through the shared cache.
+    live=False: SWPC did not answer and the body is an older copy within
+    stale_max_sec. (None, False) — nothing usable.
+    """
+    prod = PRODUCTS[name]
+    with _PRODUCT_LOCKS[name]:
+        entry = _entries().get(name)
+        age = int(time.time()) - int(entry.get("fetched_at") or 0) if entry is not None else None
+        if age is not None and age <= prod.ttl_sec:
+            return entry.get("body"), True
+        if age is not None and SPACE_WEATHER_SWR_SEC > 0 and age <= prod.ttl_sec + SPACE_WEATHER_SWR_SEC:
+            _refresh_in_background(name, entry)
+            return entry.get("body"), True
+        failed = _FAILED_AT.get(name)
+        if failed is None or time.monotonic() - failed > FAIL_RETRY_SEC:
+            fresh = _download(name, entry, REQUEST_RETRIES)
+            if fresh is not None:
+                return fresh.get("body"), True
+        if age is not None and age <= prod.stale_max_sec:
+            return entry.get("body"), False
+        return None, False
+
+
+# ---------- parsing ----------
+def _iter_rows(data: Any, newest_first: bool = False) -> Iterator[Dict[str, Any]]:
+    """SWPC table rows as dicts, keys lower-cased: [[header...], [row...]] or already [{...}].
+    newest_first walks from the tail, so «latest» lookups stop after a row or two."""
+    if not isinstance(data, list) or not data:
+        return
+    if isinstance(data[0], dict):
+        body, header = data, None
+    elif isinstance(data[0], list):
+        body, header = data[1:], [str(h).lower() for h in data[0]]
+    else:
+        return
+    for row in (reversed(body) if newest_first else body):
+        if header is None:
+            if isinstance(row, dict):
+                yield {str(k).lower(): v for k, v in row.items()}
+        elif isinstance(row, list) and len(row) >= len(header):
+            yield dict(zip(header, row))
+
+
+def _num(value: Any) -> Optional[float]:
+    try:
+        out = float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+def _ts(value: Any) -> Optional[int]:
+    try:
+        text = str(value).strip().replace(" ", "T").replace("Z", "")
+        stamp = dt.datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=dt.timezone.utc)
+    return int(stamp.timestamp())
+
+
+def _kp_value(row: Dict[str, Any]) -> Optional[float]:
+    for key in ("kp", "kp_index", "estimated_kp"):
+        if row.get(key) not in (None, ""):
+            return _num(row.get(key))
+    return None
+
+
+def _trend(last: float, prev: Optional[float]) -> str:
+    if prev is None:
+        return "→"
+    if last > prev + 0.1:
+        return "↗"
+    if last < prev - 0.1:
+        return "↘"
+    return "→"
+
+
+def _latest_kp(data: Any) -> Optional[Tuple[float, int, str]]:
+    values: List[Tuple[float, int]] = []
+    for row in _iter_rows(data, newest_first=True):
+        kp, ts = _kp_value(row), _ts(row.get("time_tag"))
+        if kp is not None and ts is not None:
+            values.append((kp, ts))
+            if len(values) == 2:
+                break
+    if not values:
+        return None
+    kp, ts = values[0]
+    return kp, ts, _trend(kp, values[1][0] if len(values) > 1 else None)
+
+
+def _latest_columns(data: Any, columns: Tuple[str, ...]) -> Tuple[Dict[str, float], Optional[int]]:
+    """Last row of a 5-minute product with at least one finite value among columns."""
+    for row in _iter_rows(data, newest_first=True):
+        values = {c: _num(row.get(c)) for c in columns}
+        values = {c: v for c, v in values.items() if v is not None}
+        if values:
+            return values, _ts(row.get("time_tag"))
+    return {}, None
+
+
+# ---------- history ----------
+# продукт → (серия space_history, колонки SWPC в порядке полей серии)
+HISTORY_COLUMNS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "kp_observed": ("kp", ("kp",)),
+    "mag": ("mag", ("bz_gsm", "bt")),
+    "plasma": ("plasma", ("speed", "density")),
+}
+
+
+def _ingest(name: str, body: Any) -> None:
+    """Rows of a freshly downloaded body newer than the stored history, walked from the tail."""
+    spec = HISTORY_COLUMNS.get(name)
+    if spec is None or not space_history.enabled():
+        return
+    series, columns = spec
+    try:
+        last = space_history.last_ts(series)
+        rows = []
+        for row in _iter_rows(body, newest_first=True):
+            ts = _ts(row.get("time_tag"))
+            if ts is None:
+                continue
+            if last is not None and ts <= last:
+                break
+            rows.append((ts, [_num(row.get(c)) for c in columns]))
+        space_history.ingest(series, rows)
+    except Exception as e:
+        LOG.warning("space history ingest %s: %s", name, e)
+
+
+# ---------- accessors ----------
+def kp_observed() -> Optional[KpReading]:
+    """Latest observed planetary Kp: 3-hourly table, the 1-minute product as a fallback."""
+    for name, src in (("kp_observed", "swpc_table"), ("kp_1m", "swpc_1m")):
+        body, live = product(name)
+        latest = _latest_kp(body)
+        if latest is not None:
+            kp, ts, trend = latest
+            return KpReading(kp, ts, src if live else "cache", trend)
+    return None
+
+
+def kp_forecast(days: int = 3, today: Optional[dt.date] = None) -> List[KpForecastDay]:
+    """Daily maximum of the predicted 3-hourly Kp for the next `days` UTC days."""
+    body, _live = product("kp_forecast")
+    start = today or dt.datetime.now(dt.timezone.utc).date()
+    wanted = {start + dt.timedelta(days=i + 1) for i in range(days)}
+    peaks: Dict[dt.date, float] = {}
+    for row in _iter_rows(body):
+        kp, ts = _kp_value(row), _ts(row.get("time_tag"))
+        if kp is None or ts is None or str(row.get("observed") or "predicted").lower() == "observed":
+            continue
+        day = dt.datetime.fromtimestamp(ts, dt.timezone.utc).date()
+        if day in wanted:
+            peaks[day] = max(kp, peaks.get(day, kp))
+    return [KpForecastDay(day, peaks[day]) for day in sorted(peaks)]
+
+
+def solar_wind() -> Optional[SolarWind]:
+    """Latest DSCOVR/ACE 5-minute magnetometer + plasma values."""
+    mag, mag_live = product("mag")
+    pla, pla_live = product("plasma")
+    mag_vals, mag_ts = _latest_columns(mag, ("bz_gsm", "bt"))
+    pla_vals, pla_ts = _latest_columns(pla, ("speed", "density"))
+    stamps = [ts for ts in (mag_ts, pla_ts) if ts is not None]
+    if not stamps:
+        return None
+    live = (mag_live or not mag_vals) and (pla_live or not pla_vals)
+    return SolarWind(
+        bz=mag_vals.get("bz_gsm"),
+        bt=mag_vals.get("bt"),
+        speed_kms=pla_vals.get("speed"),
+        density=pla_vals.get("density"),
+        ts=max(stamps),
+        src="swpc_5m" if live else "cache",
+    )
+
+
+__all__ = [
+    "KpForecastDay",
+    "KpReading",
+    "PRODUCTS",
+    "SolarWind",
+    "kp_forecast",
+    "kp_observed",
+    "product",
+    "reset",
+    "solar_wind",
+]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sun_table.py — precomputed sunrise / sunset / day length for the Cyprus cities (VayboMeter).
+
+sun_times.json lives in the repo root next to lunar_calendar.json and is
+regenerated by the monthly workflow (this year + next year, so the evening
+post of 31 December still finds «tomorrow»):
+
+    {"version": 1, "tz": "Asia/Nicosia", "start": "2026-01-01", "days": 730,
+     "source": "astral",
+     "cities": {"Limassol": {"lat": 34.707, "lon": 33.022,
+                             "sunrise": [25531, ...], "sunset": [61702, ...]}}}
+
+sunrise/sunset are seconds since local midnight of the day (-1: no event), so
+a lookup is one dict hit on the rounded coordinates plus one list index:
+
+    day = lookup(34.707, 33.022, pendulum.date(2026, 8, 10))
+    day.sunrise, day.sunset, day.day_length  # DateTime, DateTime, seconds
+
+The file is read lazily on the first lookup. Points, dates or time zones the
+table does not cover return None and the caller computes the times itself
+(post_common._sun_times_for_date: payload → astral → NOAA).
+
+Run `python sun_table.py [YEAR]` to rebuild the table.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import pendulum
+
+
+SUN_TABLE_PATH = Path(__file__).parent / "sun_times.json"
+SUN_TABLE_VERSION = 1
+TABLE_TZ = "Asia/Nicosia"
+TABLE_YEARS = 2
+
+# те же точки, что post_cy.SEA_CITIES + OTHER_CITIES_ALL (сверяется в tools/test_sun_table.py)
+CITIES: Dict[str, Tuple[float, float]] = {
+    "Limassol": (34.707, 33.022),
+    "Pafos": (34.776, 32.424),
+    "Ayia Napa": (34.988, 34.012),
+    "Larnaca": (34.916, 33.624),
+    "Nicosia": (35.170, 33.360),
+    "Troodos": (34.916, 32.823),
+}
+
+
+class SunDay(NamedTuple):
+    sunrise: Optional[pendulum.DateTime]
+    sunset: Optional[pendulum.DateTime]
+    day_length: Optional[int]  # секунды между рассветом и закатом
+
+
+def _coord_key(lat: float, lon: float) -> Tuple[float, float]:
+    return round(float(lat), 3), round(float(lon), 3)
+
+
+# ---------- lookup ----------
+_TABLE: Optional[Dict[str, Any]] = None
+_LOCK = threading.Lock()
+
+
+def _load() -> Dict[str, Any]:
+    global _TABLE
+    if _TABLE is not None:
+        return _TABLE
+    with _LOCK:
+        if _TABLE is not None:
+            return _TABLE
+        table: Dict[str, Any] = {"by_name": {}, "by_coords": {}}
+        try:
+            raw = json.loads(SUN_TABLE_PATH.read_text(encoding="utf-8"))
+            if raw.get("version") != SUN_TABLE_VERSION:
+                raise ValueError(f"version {raw.get('version')!r}")
+            table["tz"] = str(raw["tz"])
+            table["start"] = pendulum.parse(str(raw["start"])).date()
+            for name, rec in (raw.get("cities") or {}).items():
+                table["by_name"][name] = rec
+                table["by_coords"][_coord_key(rec["lat"], rec["lon"])] = rec
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning("sun table %s unreadable: %s", SUN_TABLE_PATH.name, e)
+            table = {"by_name": {}, "by_coords": {}}
+        _TABLE = table
+        return table
+
+
+def reset() -> None:
+    """Forget the loaded table (tests, or after regenerating the file)."""
+    global _TABLE
+    with _LOCK:
+        _TABLE = None
+
+
+def _day(rec: Optional[Dict[str, Any]], table: Dict[str, Any], date_obj: Any) -> Optional[SunDay]:
+    if not rec or "start" not in table:
+        return None
+    try:
+        day = pendulum.date(date_obj.year, date_obj.month, date_obj.day)
+    except Exception:
+        return None
+    idx = (day - table["start"]).days
+    rises, sets = rec["sunrise"], rec["sunset"]
+    if not 0 <= idx < min(len(rises), len(sets)):
+        return None
+    midnight = pendulum.datetime(day.year, day.month, day.day, tz=table["tz"])
+    sr = midnight.add(seconds=rises[idx]) if rises[idx] >= 0 else None
+    ss = midnight.add(seconds=sets[idx]) if sets[idx] >= 0 else None
+    length = sets[idx] - rises[idx] if sr is not None and ss is not None else None
+    return SunDay(sr, ss, length)
+
+
+def lookup(lat: float, lon: float, date_obj: Any, tz: Any = None) -> Optional[SunDay]:
+    """
+    Sun times of a table city at (lat, lon) on the local date, or None.
+    tz — timezone the caller counts dates in; a different zone than the
+    table's is not served (local dates would not line up).
+    """
+    table = _load()
+    if tz is not None and str(getattr(tz, "name", None) or tz) != table.get("tz"):
+        return None
+    return _day(table["by_coords"].get(_coord_key(lat, lon)), table, date_obj)
+
+
+def city_day(name: str, date_obj: Any) -> Optional[SunDay]:
+    """Same by city key (weekly / monthly builders)."""
+    table = _load()
+    return _day(table["by_name"].get(name), table, date_obj)
+
+
+# ---------- generation ----------
+def _compute(lat: float, lon: float, day: pendulum.Date, tz: Any) -> Tuple[Optional[Any], Optional[Any]]:
+    from astral import LocationInfo
+    from astral.sun import sun
+
+    loc = LocationInfo("", "", tz.name, float(lat), float(lon))
+    try:
+        s = sun(loc.observer, date=day, tzinfo=tz)
+    except ValueError:
+        # полярный день/ночь — на Кипре не бывает, но формат это допускает
+        return None, None
+    return pendulum.instance(s["sunrise"]).in_tz(tz), pendulum.instance(s["sunset"]).in_tz(tz)
+
+
+def build_table(year: int, years: int = TABLE_YEARS, tz_name: str = TABLE_TZ) -> Dict[str, Any]:
+    tz = pendulum.timezone(tz_name)
+    start = pendulum.date(year, 1, 1)
+    n_days = (pendulum.date(year + years, 1, 1) - start).days
+    cities: Dict[str, Any] = {}
+    for name, (lat, lon) in CITIES.items():
+        rises, sets = [], []
+        for i in range(n_days):
+            day = start.add(days=i)
+            midnight = pendulum.datetime(day.year, day.month, day.day, tz=tz)
+            sr, ss = _compute(lat, lon, day, tz)
+            rises.append(int((sr - midnight).total_seconds()) if sr is not None else -1)
+            sets.append(int((ss - midnight).total_seconds()) if ss is not None else -1)
+        cities[name] = {"lat": lat, "lon": lon, "sunrise": rises, "sunset": sets}
+    return {
+        "version": SUN_TABLE_VERSION,
+        "tz": tz_name,
+        "start": start.to_date_string(),
+        "days": n_days,
+        "source": "astral",
+        "cities": cities,
+    }
+
+
+def dump_table(table: Dict[str, Any]) -> str:
+    """JSON with one city per line — compact, but monthly diffs stay readable."""
+    head = {k: v for k, v in table.items() if k != "cities"}
+    lines = [json.dumps(head, ensure_ascii=False)[:-1] + ', "cities": {']
+    items = list(table["cities"].items())
+    for i, (name, rec) in enumerate(items):
+        sep = "," if i < len(items) - 1 else ""
+        lines.append(f"  {json.dumps(name)}: {json.dumps(rec, separators=(',', ':'))}{sep}")
+    lines.append("}}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[list] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    year = int(argv[0]) if argv else pendulum.today(TABLE_TZ).year
+    SUN_TABLE_PATH.write_text(dump_table(build_table(year)), encoding="utf-8")
+    reset()
+    print(f"✅ {SUN_TABLE_PATH.name}: {len(CITIES)} cities, {year}–{year + TABLE_YEARS - 1}")
+    return 0
+
+
+__all__ = ["CITIES", "SunDay", "build_table", "city_day", "lookup", "reset"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,7 @@
 """Offline checks for Cyprus official air-quality integration."""
 from __future__ import annotations
 
+import json
 import os
 import sys
 import time
@@ -83,6 +84,91 @@ def test_official_priority_and_city_mapping() -> None:
     print("PASS official_priority_and_city_mapping")
 
 
+class _FakePage:
+    def __init__(self, status: int, body: str = "", headers: dict | None = None):
+        self.status_code = status
+        self.body = body
+        self.headers = headers or {}
+        self.encoding = None
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        for i in range(0, len(self.body), 7):
+            yield self.body[i:i + 7]
+
+    def close(self) -> None:
+        pass
+
+
+def test_official_page_streamed_and_table_persisted() -> None:
+    import tempfile
+
+    import pendulum
+
+    chunks = [SAMPLE_OFFICIAL_HTML[i:i + 5] for i in range(0, len(SAMPLE_OFFICIAL_HTML), 5)]
+    assert_true("stream_equals_whole", list(air._iter_cy_stations(chunks)) == air._parse_cy_airquality_official_html(SAMPLE_OFFICIAL_HTML))
+
+    observed = pendulum.now("Asia/Nicosia").subtract(minutes=20).format("DD/MM/YYYY HH:mm")
+    page = SAMPLE_OFFICIAL_HTML.replace("25/06/2026 08:00", observed)
+    calls: list[dict] = []
+
+    def fake_get(url, headers=None, **kwargs):
+        calls.append(dict(headers or {}))
+        if "If-None-Match" in (headers or {}):
+            return _FakePage(304, headers={"ETag": '"v1"'})
+        return _FakePage(200, page, {"Content-Type": "text/html", "ETag": '"v1"'})
+
+    old = air.http_get, air.CY_AIRQUALITY_TABLE, air._CY_AIRQUALITY_CACHE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            air.http_get = fake_get
+            air.CY_AIRQUALITY_TABLE = Path(tmp) / "cy_airquality_stations.json"
+            air._CY_AIRQUALITY_CACHE = None
+            first = air._fetch_cy_airquality_official_stations()
+            assert_true("table_fetched", len(calls) == 1 and len(first) == 3 and first[0]["observation_status"] == "fresh")
+            assert_true("table_persisted", air.CY_AIRQUALITY_TABLE.exists())
+
+            air._CY_AIRQUALITY_CACHE = None
+            second = air._fetch_cy_airquality_official_stations()
+            assert_true("window_skips_download", len(calls) == 1 and [r["station"] for r in second] == [r["station"] for r in first])
+
+            table = json.loads(air.CY_AIRQUALITY_TABLE.read_text(encoding="utf-8"))
+            table["fetched_at"] -= 3 * 3600
+            table["observed_at"] = pendulum.now("UTC").subtract(hours=2).to_iso8601_string()
+            air.CY_AIRQUALITY_TABLE.write_text(json.dumps(table), encoding="utf-8")
+            air._CY_AIRQUALITY_CACHE = None
+            third = air._fetch_cy_airquality_official_stations()
+            assert_true("conditional_after_window", len(calls) == 2 and calls[1].get("If-None-Match") == '"v1"', str(calls))
+            assert_true("not_modified_reuses_table", [r["pm10"] for r in third] == [r["pm10"] for r in first])
+        finally:
+            air.http_get, air.CY_AIRQUALITY_TABLE, air._CY_AIRQUALITY_CACHE = old
+    print("PASS official_page_streamed_and_table_persisted")
+
+
+def test_station_index_ranked_and_cached() -> None:
+    rows = air._parse_cy_airquality_official_html(SAMPLE_OFFICIAL_HTML)
+    index = air._cy_station_index(rows)
+    refreshed = [dict(row, pm10=1.0) for row in rows]
+    assert_true("index_reused_for_same_list", air._cy_station_index(refreshed) is index)
+    assert_true("index_returns_current_values", air._pick_cy_station(refreshed, 34.70, 33.02)["pm10"] == 1.0)
+
+    near = air._nearest_cy_stations(rows, 34.707, 33.022, k=3)
+    assert_true("knn_order", [r["station"] for _d, r in near][:1] == ["Limassol - Traffic Station"], str(near))
+    assert_true("knn_sorted", [d for d, _r in near] == sorted(d for d, _r in near) and len(near) == 3)
+    cut = air._nearest_cy_stations(rows, 34.707, 33.022, k=3, max_km=70)
+    assert_true("knn_cutoff", [r["station"] for _d, r in cut] == ["Limassol - Traffic Station", "Nicosia - Traffic Station"], str(cut))
+    assert_true("knn_naive_agrees", near[0][1] is min(rows, key=lambda r: air._station_distance_km(r, 34.707, 33.022)))
+
+    fewer = rows[1:]
+    assert_true("index_rebuilt_on_new_list", air._cy_station_index(fewer) is not index)
+    assert_true("hint_without_station", air._pick_cy_station(fewer, 34.707, 33.022, city="Limassol") is None)
+    assert_true("hint_lookup", air._pick_cy_station(rows, 0, 0, city="Protaras")["station"] == "Paralimni - Traffic Station")
+    print("PASS station_index_ranked_and_cached")
+
+
 def test_fallback_when_official_fails() -> None:
     old_official = air._src_cy_airquality_official
     old_iqair = air._src_iqair
@@ -108,6 +194,78 @@ def test_fallback_when_official_fails() -> None:
     print("PASS fallback_when_official_fails")
 
 
+def _om_payload(aqi: float) -> dict:
+    hour = time.strftime("%Y-%m-%dT%H:00", time.gmtime())
+    return {"hourly": {"time": [hour], "us_aqi": [aqi], "pm2_5": [5.0], "pm10": [15.0]}}
+
+
+def test_collector_shares_one_fanout() -> None:
+    calls: list[dict] = []
+    om_rows = {"34.7070": 31.0, "34.9880": 42.0, "35.1700": 53.0}
+
+    def fake_http(url, **params):
+        calls.append(params)
+        lats = str(params.get("latitude")).split(",")
+        rows = [_om_payload(om_rows[f"{float(la):.4f}"]) if f"{float(la):.4f}" in om_rows else {} for la in lats]
+        return rows if len(lats) > 1 else (rows[0] or None)
+
+    old = air._safe_http_get, air._src_cy_airquality_official, air.AIR_KEY
+    air._AIR_MEMO.clear()
+    try:
+        air._safe_http_get = fake_http
+        air._src_cy_airquality_official = lambda lat, lon, city=None: None
+        air.AIR_KEY = None
+        cities = [("Limassol", (34.707, 33.022)), ("Ayia Napa", (34.988, 34.012)), ("Nicosia", (35.170, 33.360))]
+        by_city = air.get_air_for_cities(cities)
+        assert_true("collector_one_batch", len(calls) == 1 and "," in str(calls[0]["latitude"]), str(calls))
+        assert_true("collector_per_city", [by_city[c]["aqi"] for c, _ in cities] == [31.0, 42.0, 53.0], str(by_city))
+        region = air.get_air(34.707, 33.022)
+        assert_true("region_is_lookup", region["aqi"] == 31.0 and len(calls) == 1, str(calls))
+
+        # точку, которой нет в ответе батча, запрашиваем отдельно
+        air._AIR_MEMO.clear()
+        calls.clear()
+        del om_rows["34.9880"]
+        by_city = air.get_air_for_cities(cities)
+        assert_true("batch_gap_single_retry", len(calls) == 2 and "Ayia Napa" not in by_city, str(calls))
+    finally:
+        air._safe_http_get, air._src_cy_airquality_official, air.AIR_KEY = old
+        air._AIR_MEMO.clear()
+    print("PASS collector_shares_one_fanout")
+
+
+def test_memo_single_flight_and_ttl() -> None:
+    import threading
+
+    memo = air._AirMemo(ttl_sec=60)
+    key = memo.key("iqair", 34.70701, 33.02204)
+    calls: list[int] = []
+    gate = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        gate.wait(2)
+        return {"aqi": 40.0}
+
+    results: list = []
+    threads = [threading.Thread(target=lambda: results.append(memo.get(key, slow_fetch))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert_true("single_flight", calls == [1] and results == [{"aqi": 40.0}] * 4, f"{calls} {results}")
+    results[0]["aqi"] = 0
+    assert_true("memo_returns_copies", memo.get(key, slow_fetch) == {"aqi": 40.0})
+    memo.ttl_sec = -1
+    memo.get(key, slow_fetch)
+    assert_true("memo_ttl", calls == [1, 1])
+    empty = memo.key("iqair", 1, 1)
+    assert_true("memo_skips_none", memo.get(empty, lambda: None) is None and memo.get(empty, lambda: {"aqi": 1.0}) == {"aqi": 1.0})
+    print("PASS memo_single_flight_and_ttl")
+
+
 def test_official_levels_are_not_fabricated_aqi() -> None:
     html = "\n".join(
         f"<section><h4>{station}</h4><p>PM₁₀: {pm10} μg/m³</p><p>Updated on: 08/08/2026 10:00</p></section>"
@@ -311,7 +469,11 @@ def main() -> None:
     test_official_parse()
     test_official_levels_are_not_fabricated_aqi()
     test_official_priority_and_city_mapping()
+    test_official_page_streamed_and_table_persisted()
+    test_station_index_ranked_and_cached()
     test_fallback_when_official_fails()
+    test_collector_shares_one_fanout()
+    test_memo_single_flight_and_ttl()
     test_stale_and_missing_observations_are_deterministic()
     test_official_line_keeps_category_metrics_source_city_and_time()
     test_city_summary_formatting()
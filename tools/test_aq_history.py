@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the air-quality observation history (journal, columnar store, trend queries)."""
+from __future__ import annotations
+
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import air  # noqa: E402
+import aq_history  # noqa: E402
+
+NOW = pendulum.datetime(2026, 8, 10, 12, tz="UTC").int_timestamp
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+class _History:
+    """Включает AQ_HISTORY и уводит файлы истории во временный каталог."""
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.old = (os.environ.get("AQ_HISTORY"), aq_history.HISTORY_PATH, aq_history.JOURNAL_PATH)
+        os.environ["AQ_HISTORY"] = "1"
+        aq_history.HISTORY_PATH = root / "aq_history.bin"
+        aq_history.JOURNAL_PATH = root / "aq_history.log"
+        return root
+
+    def __exit__(self, *exc):
+        env, aq_history.HISTORY_PATH, aq_history.JOURNAL_PATH = self.old
+        if env is None:
+            os.environ.pop("AQ_HISTORY", None)
+        else:
+            os.environ["AQ_HISTORY"] = env
+        self.tmp.cleanup()
+        return False
+
+
+def _fill_two_days(key: str) -> None:
+    # вчера pm10 = 20, сегодня 30, пик 55 в 09:00 UTC; no2 только сегодня
+    for h in range(48):
+        ts = NOW - (47 - h) * 3600
+        pm10 = 20.0 if h < 24 else 30.0
+        if ts == NOW - 3 * 3600:
+            pm10 = 55.0
+        aq_history.record(key, ts + 120, {"pm10": pm10, "no2": 8.0 if h >= 24 else None})
+
+
+def test_window_and_delta() -> None:
+    with _History() as root:
+        _fill_two_days("city:Limassol")
+        s = aq_history.load().series("city:Limassol")
+        assert_true("rows_hour_aligned", len(s) == 48 and all(t % 3600 == 0 for t in s.epochs), str(len(s)))
+        w = s.window("pm10", NOW)
+        assert_true("window_24h", w is not None and w.n == 24 and abs(w.mean - (23 * 30 + 55) / 24) < 1e-6, str(w))
+        assert_true("peak_hour", w.peak == 55.0 and w.peak_at == NOW - 3 * 3600, str(w))
+        delta = s.delta_vs_yesterday("pm10", NOW)
+        assert_true("delta_vs_yesterday", abs(delta - ((23 * 30 + 55) / 24 - 20)) < 1e-6, str(delta))
+        assert_true("field_without_yesterday", s.delta_vs_yesterday("no2", NOW) is None)
+        assert_true("empty_field", s.window("o3", NOW) is None and s.latest("o3") is None)
+        assert_true("latest", s.latest("pm10") == (NOW, 30.0))
+
+        # та же серия/час — побеждает последняя запись
+        aq_history.record("city:Limassol", NOW + 600, {"pm10": 40})
+        s2 = aq_history.load().series("city:Limassol")
+        assert_true("reload_on_change", s2 is not s and len(s2) == 48 and s2.latest("pm10") == (NOW, 40.0))
+        assert_true("memo_without_change", aq_history.load().series("city:Limassol") is s2)
+
+        assert_true("skip_empty_values", not aq_history.record("city:Limassol", NOW, {"pm10": "н/д", "aqi": -1}))
+        with aq_history.JOURNAL_PATH.open("a", encoding="utf-8") as fh:
+            fh.write('{"k": "city:Limassol", "t": ')  # оборванная запись
+        assert_true("torn_line_skipped", len(aq_history.load().series("city:Limassol")) == 48)
+        assert_true("files_in_cache", (root / "aq_history.log").exists())
+    print("PASS window_and_delta")
+
+
+def test_compaction_retention_downsampling() -> None:
+    with _History():
+        day = 86400
+        for age_days in (40, 10):
+            for h in range(24):
+                ts = NOW - age_days * day + h * 3600
+                aq_history.record("station:Limassol", ts, {"pm25": 10.0 + h, "aqi": 30})
+        _fill_two_days("station:Limassol")
+        before = aq_history.load().series("station:Limassol")
+        aq_history.compact(now=NOW)
+
+        assert_true("journal_emptied", aq_history.JOURNAL_PATH.read_text(encoding="utf-8") == "")
+        raw = aq_history.HISTORY_PATH.read_bytes()
+        assert_true("bin_magic", raw[:4] == b"VBA1")
+        s = aq_history.load().series("station:Limassol")
+        assert_true("retention_dropped_old", s.epochs[0] >= NOW - aq_history.RETENTION_DAYS * day, str(s.epochs[0]))
+        old_days = [t for t in s.epochs if t < NOW - aq_history.HOURLY_DAYS * day]
+        assert_true("downsampled_daily", len(old_days) in (1, 2) and all(t % day == 0 for t in old_days), str(old_days))
+        mean_old = s.mean("pm25", NOW - 11 * day, NOW - 8 * day)
+        assert_true("daily_mean_kept", abs(mean_old - 21.5) < 1.5, str(mean_old))
+        assert_true("recent_hourly_kept", s.window("pm10", NOW) == before.window("pm10", NOW))
+        assert_true("nan_kept", math.isnan(s.cols["pm25"][-1]))
+
+        # после компакции журнал снова дописывается поверх .bin
+        aq_history.record("station:Limassol", NOW + 3600, {"pm10": 12})
+        assert_true("journal_over_store", aq_history.load().series("station:Limassol").latest("pm10") == (NOW + 3600, 12.0))
+
+        aq_history.HISTORY_PATH.write_bytes(b"junk")
+        assert_true("broken_store_ignored", len(aq_history.load().series("station:Limassol")) == 1)
+
+        old_after = aq_history.COMPACT_AFTER
+        try:
+            aq_history.COMPACT_AFTER = 3
+            aq_history.compact(now=NOW)
+            now = time.time()  # автокомпакция считает срок хранения от текущего времени
+            for h in range(3):
+                aq_history.record("city:Pafos", now - h * 3600, {"pm25": 5})
+            assert_true("auto_compact", aq_history.JOURNAL_PATH.read_text(encoding="utf-8") == "")
+            assert_true("auto_compact_kept_rows", len(aq_history.load().series("city:Pafos")) == 3)
+        finally:
+            aq_history.COMPACT_AFTER = old_after
+    print("PASS compaction_retention_downsampling")
+
+
+def test_air_records_fresh_results() -> None:
+    observed = pendulum.now("UTC").subtract(minutes=20).start_of("minute").to_iso8601_string()
+    fresh = {"src": "openmeteo", "pm25": 9.0, "pm10": 21.0, "aqi": 40.0, "observed_at": observed, "observation_status": "fresh"}
+    stale = dict(fresh, observation_status="stale")
+    old = air.collect_air
+    try:
+        air.collect_air = lambda points: [dict(fresh) if city in ("Limassol", None) else dict(stale) for city, _la, _lo in points]
+        with _History():
+            out = air.get_air_for_cities([("Limassol", (34.707, 33.022)), ("Pafos", (34.776, 32.424))])
+            assert_true("cities_returned", set(out) == {"Limassol", "Pafos"}, str(out))
+            air.get_air(34.707, 33.022)
+            h = aq_history.load()
+            assert_true("only_fresh_recorded", h.keys() == ["city:Limassol", "point:34.707,33.022"], str(h.keys()))
+            assert_true("values_recorded", h.series("city:Limassol").latest("pm10")[1] == 21.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            old_paths = aq_history.HISTORY_PATH, aq_history.JOURNAL_PATH
+            try:
+                aq_history.HISTORY_PATH = Path(tmp) / "aq_history.bin"
+                aq_history.JOURNAL_PATH = Path(tmp) / "aq_history.log"
+                os.environ.pop("AQ_HISTORY", None)
+                air.get_air(34.707, 33.022)
+                assert_true("off_by_default", not list(Path(tmp).iterdir()))
+            finally:
+                aq_history.HISTORY_PATH, aq_history.JOURNAL_PATH = old_paths
+    finally:
+        air.collect_air = old
+    print("PASS air_records_fresh_results")
+
+
+def main() -> None:
+    test_window_and_delta()
+    test_compaction_retention_downsampling()
+    test_air_records_fresh_results()
+    print("OK: aq history offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
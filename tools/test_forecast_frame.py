@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for ForecastFrame (alias columns, NaN gaps, per-day aggregations) and batched day peaks."""
+from __future__ import annotations
+
+import math
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import forecast_batch  # noqa: E402
+import post_common  # noqa: E402
+import weather  # noqa: E402
+from forecast_frame import ForecastFrame  # noqa: E402
+
+
+TZ = pendulum.timezone("Asia/Nicosia")
+DAY = pendulum.date(2026, 8, 10)
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _payload() -> dict:
+    times = [f"2026-08-{d:02d}T{h:02d}:00" for d in (10, 11) for h in range(0, 24, 6)]
+    return {
+        "timezone": "Asia/Nicosia",
+        "hourly": {
+            "time": times,
+            "windspeed_10m": [10.0, None, "x", 30.0, 5.0, 5.0, 5.0, 5.0],
+            "wind_speed_10m": [99.0, 20.0, 99.0, 99.0, 5.0, 5.0, 5.0, 5.0],
+            "winddirection_10m": [350.0, 10.0, None, float("inf"), 90.0, 90.0, 90.0, 90.0],
+            "surface_pressure": [1010.0, 1012.0, 1013.0, 1011.0, 1009.0, 1009.0, 1009.0, 1009.0],
+        },
+        "daily": {
+            "time": ["2026-08-10", "2026-08-11"],
+            "temperature_2m_max": [31.0, None],
+            "weather_code": [3, 61],
+        },
+    }
+
+
+def test_aliases_and_missing_values() -> None:
+    frame = ForecastFrame(_payload(), TZ)
+    speed = list(frame.hourly["wind_speed"])
+    assert_true("alias_first_key_wins", speed[0] == 10.0 and speed[3] == 30.0, str(speed))
+    # как post_common._pick: пропуски первого ключа не добираются из следующих
+    assert_true("alias_gap_kept", math.isnan(speed[1]) and math.isnan(speed[2]), str(speed))
+    assert_true("inf_is_nan", math.isnan(frame.hourly["wind_direction"][3]))
+    assert_true("pressure_surface_fallback", frame.value("pressure", 1) == 1012.0)
+    assert_true("value_nan_is_none", frame.value("wind_direction", 2) is None)
+    assert_true("value_out_of_range", frame.value("wind_speed", 99) is None)
+    assert_true("missing_column_empty", frame.value("rain", 0) is None and frame.day_max("rain", DAY) is None)
+    assert_true("daily_value", frame.daily_value("temperature_max", DAY) == 31.0)
+    assert_true("daily_missing", frame.daily_value("temperature_max", DAY.add(days=1)) is None)
+    print("PASS aliases_and_missing_values")
+
+
+def test_day_aggregations() -> None:
+    frame = ForecastFrame(_payload(), TZ)
+    assert_true("day_rows", list(frame.day_rows(DAY)) == [0, 1, 2, 3])
+    assert_true("day_max", frame.day_max("wind_speed", DAY) == 30.0)
+    assert_true("day_mean", frame.day_mean("pressure", DAY) == 1011.5)
+    direction = frame.day_circular_mean("wind_direction", DAY)
+    assert_true("circular_mean_wraps", direction is not None and min(direction, 360 - direction) < 1e-6, str(direction))
+    assert_true("argmax_skips_gaps", frame.day_argmax("wind_speed", DAY) == (30.0, 3))
+    idx, at = frame.nearest_row(DAY, 13, max_offset_minutes=90)
+    assert_true("nearest_row", idx == 2 and at.hour == 12, f"{idx} {at}")
+    assert_true("nearest_row_offset", frame.nearest_row(DAY, 15, max_offset_minutes=90) == (None, None))
+    assert_true("no_rows_day", frame.day_rows(pendulum.date(2026, 8, 12)) == [])
+    print("PASS day_aggregations")
+
+
+def test_indexed_matches_parsed_and_is_cached() -> None:
+    indexed = weather._ensure_aliases(weather._normalize_times(_payload(), "Asia/Nicosia"))
+    a = ForecastFrame.of(indexed, TZ)
+    assert_true("frame_cached", ForecastFrame.of(dict(indexed), TZ) is a)
+    assert_true("frame_per_tz", ForecastFrame.of(indexed, pendulum.timezone("UTC")) is not a)
+    b = ForecastFrame(_payload(), TZ)
+    assert_true("indexed_rows", list(a.day_rows(DAY)) == list(b.day_rows(DAY)))
+    assert_true("indexed_daily", a.daily_index(DAY) == b.daily_index(DAY) == 0)
+    for hour in (0, 7, 12, 23):
+        ia, ta = a.nearest_row(DAY, hour, 24 * 60)
+        ib, tb = b.nearest_row(DAY, hour, 24 * 60)
+        assert_true(f"indexed_nearest_{hour}", ia == ib and ta == tb, f"{ia} {ta} / {ib} {tb}")
+    print("PASS indexed_matches_parsed_and_is_cached")
+
+
+def _city_payload(gust: float, uv: list, rain: float = 0.0) -> dict:
+    payload = _payload()
+    payload["hourly"].update(
+        windgusts_10m=[gust / 2, gust, None, gust / 3, 5.0, 5.0, 5.0, 5.0],
+        uv_index=uv + [0.0] * (8 - len(uv)),
+        rain=[0.0, rain, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        precipitation_probability=[10.0, 70.0, None, 20.0, 0.0, 0.0, 0.0, 0.0],
+    )
+    return payload
+
+
+def test_day_peaks_batch() -> None:
+    frames = [
+        ForecastFrame(_city_payload(72.0, [0.0, 9.0, 9.0, 2.0], rain=9.0), TZ),
+        ForecastFrame(_city_payload(20.0, [None, 3.0, 4.0, None]), TZ),
+        ForecastFrame({}, TZ),
+    ]
+    stormy, calm, empty = forecast_batch.day_peaks(frames, DAY)
+    assert_true("peaks_empty_frame", empty is None)
+    assert_true("peaks_gust", stormy["max_gust_kmh"] == 72.0 and calm["max_gust_kmh"] == 20.0)
+    assert_true("peaks_speed_alias", stormy["max_speed_kmh"] == 30.0, str(stormy))
+    assert_true("peaks_pprob", stormy["max_pprob"] == 70.0)
+    at = stormy["uv_peak_at"]
+    assert_true("peaks_uv_first_max", stormy["uv_max"] == 9.0 and at is not None and at.hour == 6, str(at))
+    assert_true("peaks_uv_gaps", calm["uv_max"] == 4.0)
+    assert_true("peaks_memoized", forecast_batch.day_peaks(frames[:1], DAY)[0] is stormy)
+
+    one_by_one = [forecast_batch.day_peaks([ForecastFrame(f._wm, TZ)], DAY)[0] for f in frames]
+    assert_true("peaks_batch_matches_single", one_by_one == [stormy, calm, empty])
+
+    flags = post_common._storm_flags_from_peaks(stormy)
+    assert_true("storm_from_peaks", flags["warning"] and flags["heavy_rain"] and flags["warning_gust_ms"] == 20.0, str(flags))
+    calm_flags = post_common._storm_flags_from_peaks(calm)
+    assert_true("storm_wind_only", calm_flags["warning_gust_ms"] is None and not calm_flags["heavy_rain"], str(calm_flags))
+    assert_true("storm_no_rows", post_common._storm_flags_from_peaks(None) == {"warning": False})
+    print("PASS day_peaks_batch")
+
+
+def main() -> None:
+    test_aliases_and_missing_values()
+    test_day_aggregations()
+    test_indexed_matches_parsed_and_is_cached()
+    test_day_peaks_batch()
+    print("OK: forecast frame offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
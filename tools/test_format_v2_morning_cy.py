@@ -81,6 +81,7 @@ from visibility_context import (  # noqa: E402
     visibility_air_penalty,
     visibility_condition_from_text,
 )
+from visual_context_cy import parse_visual_context_cy  # noqa: E402
 from weather import save_cyprus_visibility_diagnostics  # noqa: E402
 
 
@@ -499,7 +500,7 @@ def _forecast_payload(
     }
 
 
-def _build_aligned_forecast_messages() -> tuple[str, str, list[tuple[str, date]]]:
+def _build_aligned_forecast_messages(with_facts: bool = False):
     region_weather = _forecast_payload(
         today_high=29.0,
         today_low=22.0,
@@ -560,9 +561,10 @@ def _build_aligned_forecast_messages() -> tuple[str, str, list[tuple[str, date]]
         "USE_WORLD_KP": False,
     }
 
-    def build() -> tuple[str, str, list[tuple[str, date]]]:
+    def build():
         tz_obj = types.SimpleNamespace(name="Asia/Nicosia")
-        morning = post_common_module.build_message(
+        builder = post_common_module.build_message_with_facts if with_facts else post_common_module.build_message
+        morning = builder(
             region_name="Кипр",
             sea_label="Морские города",
             sea_cities=[("Limassol", (1.0, 2.0))],
@@ -571,7 +573,7 @@ def _build_aligned_forecast_messages() -> tuple[str, str, list[tuple[str, date]]
             tz=tz_obj,
             mode="morning",
         )
-        evening = post_common_module.build_message(
+        evening = builder(
             region_name="Кипр",
             sea_label="Морские города",
             sea_cities=[("Limassol", (1.0, 2.0))],
@@ -627,6 +629,66 @@ def cy_evening_keeps_tomorrow_city_forecast() -> None:
     assert ("evening", date(2026, 8, 10)) in context_calls
 
 
+def cy_post_facts_match_rendered_text() -> None:
+    (raw_morning, morning), (raw_evening, evening), _calls = _build_aligned_forecast_messages(with_facts=True)
+    assert morning.mode == "morning" and morning.date == "2026-08-09"
+    limassol = morning.city("Limassol")
+    assert limassol is not None and limassol.label == "Лимассол" and limassol.coastal
+    assert (limassol.tmax, limassol.tmin, limassol.sst) == (28.0, 23.0, 27.0)
+    assert (limassol.wind_ms, limassol.gust_ms, limassol.pressure_hpa) == (3.0, 5.0, 1012)
+    assert not morning.city("Nicosia").coastal
+    assert morning.warmest == ("Никосия", 29.0) and morning.coolest == ("Лимассол", 28.0)
+    assert morning.uv_max == 9 and morning.region.pressure_trend == "↑"
+
+    # утренний FORMAT_V2 берёт шапку ветра/давления из фактов, без get_weather()
+    def no_network(*_args, **_kwargs):
+        raise AssertionError("format_v2 must not refetch weather when facts are given")
+
+    original = weather_module.get_weather
+    weather_module.get_weather = no_network
+    try:
+        formatted = build_format_v2("Кипр", "morning", raw_morning, facts=morning)
+    finally:
+        weather_module.get_weather = original
+    assert "💨 Ветер: 3.0 м/с (Ю) • порывы до 5 м/с • 🔹 1012 гПа ↑" in formatted
+
+    conditions = safe_module._cyprus_conditions("", facts=morning)
+    assert conditions["warm_city"] == "Никосия" and conditions["warm_t"] == 29.0
+    assert conditions["wind"] == 3.0 and conditions["gust"] == 5.0 and conditions["uv"] == 9.0
+    assert conditions["aqi"] is None
+    assert _cyprus_feels_line(formatted) == safe_module._cyprus_feels_line(formatted)
+    # без явных фактов — только текст (никакого состояния прошлого прогона)
+    assert safe_module._cyprus_conditions("")["warm_t"] is None
+    assert safe_module._cyprus_feels_line("", facts=morning) != safe_module._cyprus_feels_line("")
+
+    assert evening.date == "2026-08-10" and morning.date != evening.date
+    assert evening.warmest is None and evening.uv_max is None
+    assert [c.tmax for c in evening.cities] == [40.0, 42.0]
+    assert evening.conditions()["wind"] is None
+    # шторм/УФ по всем городам одним проходом forecast_batch
+    assert [c.label for c in evening.storm_cities()] == ["Лимассол", "Никосия"]
+    assert morning.storm_cities() == [] and limassol.uv_max == 9
+    text_flags = format_v2_module._evening_flags(raw_evening.splitlines())
+    fact_flags = format_v2_module._evening_flags(raw_evening.splitlines(), evening)
+    assert fact_flags == text_flags, (fact_flags, text_flags)
+
+    ctx_text = cy_scene_prompt.build_visual_context_cy(raw_evening, post_type="evening")
+    ctx_facts = cy_scene_prompt.build_visual_context_cy(raw_evening, post_type="evening", facts=evening)
+    assert ctx_facts.evidence["numeric_source"].startswith("post_facts:")
+    for attr in ("temp_max", "temp_min", "wind_max", "hottest_city", "inland_max_temp", "sea_temp", "hazards"):
+        assert getattr(ctx_facts, attr) == getattr(ctx_text, attr), (attr, getattr(ctx_facts, attr), getattr(ctx_text, attr))
+
+    # утренний FORMAT_V2 сворачивает строки городов: скрытые в посте числа не должны побеждать текст
+    assert [c.name for c in morning.cities if c.tmax is not None] == ["Limassol"]
+    ctx_text = parse_visual_context_cy(formatted, post_type="morning")
+    ctx_facts = parse_visual_context_cy(formatted, post_type="morning", facts=morning)
+    for attr in ("temp_max", "temp_min", "wind_max", "hottest_city", "inland_max_temp", "sea_temp", "hazards"):
+        assert getattr(ctx_facts, attr) == getattr(ctx_text, attr), (attr, getattr(ctx_facts, attr), getattr(ctx_text, attr))
+    raw_text = parse_visual_context_cy(raw_morning, post_type="morning")
+    raw_facts = parse_visual_context_cy(raw_morning, post_type="morning", facts=morning)
+    assert (raw_facts.temp_max, raw_facts.temp_min, raw_facts.sea_temp) == (raw_text.temp_max, raw_text.temp_min, raw_text.sea_temp) == (29.0, 23.0, 27.0)
+
+
 def cy_city_forecast_omits_row_when_target_daily_date_is_missing() -> None:
     payload = {
         "daily": {
@@ -3061,20 +3123,20 @@ def cy_final_orchestration_applies_editorial_voice_after_factual_passes() -> Non
     import safe_test_post as safe_module
 
     source = inspect.getsource(safe_module.main)
-    assert "_apply_editorial_voice(v2_raw, mode)" in source, (
+    assert "_apply_editorial_voice(v2_raw, mode, facts)" in source, (
         "final FORMAT_V2 orchestration no longer applies the editorial voice"
     )
     assert '"\\n".join(_without_editorial_voice(v2_raw))' not in source, (
         "final FORMAT_V2 orchestration still strips the editorial voice"
     )
 
-    voice_index = source.index("_apply_editorial_voice(v2_raw, mode)")
+    voice_index = source.index("_apply_editorial_voice(v2_raw, mode, facts)")
     for factual in (
         "_apply_astro_cleanup(v2_raw)",
         "_apply_cyprus_morning_raw_context(",
         "_apply_cyprus_sensor_cleanup(v2_raw)",
         "_apply_score_conclusion(v2_raw)",
-        "_inject_morning_smart_plan(v2_raw, mode)",
+        "_inject_morning_smart_plan(v2_raw, mode, facts)",
     ):
         assert source.index(factual) < voice_index, factual
     assert voice_index < source.index("_apply_compact(v2_raw)")
@@ -3406,6 +3468,7 @@ def main() -> None:
         cy_morning_source_rows_use_city_formatter_sst_and_preserve_evening,
         cy_morning_uses_today_for_raw_format_score_feels_and_plan,
         cy_evening_keeps_tomorrow_city_forecast,
+        cy_post_facts_match_rendered_text,
         cy_city_forecast_omits_row_when_target_daily_date_is_missing,
         cy_city_forecast_does_not_shift_incomplete_or_malformed_arrays,
         cy_city_forecast_never_uses_current_for_missing_target_hourly_date,
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the shared HTTP layer (retries, per-host limit, revalidation)."""
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import http_client  # noqa: E402
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+class _FakeSession:
+    def __init__(self, statuses=(), delay: float = 0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.calls: list[str] = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            status = self.statuses.pop(0) if self.statuses else 200
+            if isinstance(status, Exception):
+                raise status
+            return SimpleNamespace(status_code=status, headers={}, url=url)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _with_session(session, callback):
+    old = http_client._SESSION, http_client.BACKOFF_SEC, dict(http_client._HOST_SLOTS)
+    http_client._SESSION, http_client.BACKOFF_SEC = session, 0.0
+    http_client._HOST_SLOTS.clear()
+    try:
+        return callback()
+    finally:
+        http_client._SESSION, http_client.BACKOFF_SEC = old[0], old[1]
+        http_client._HOST_SLOTS.clear()
+        http_client._HOST_SLOTS.update(old[2])
+
+
+def test_retry_policy() -> None:
+    s = _FakeSession(statuses=[503, 429, 200])
+    r = _with_session(s, lambda: http_client.http_get("https://api.example/x", retries=2))
+    assert_true("retry_5xx_429", r.status_code == 200 and len(s.calls) == 3, f"{r.status_code} {len(s.calls)}")
+
+    s = _FakeSession(statuses=[404, 200])
+    r = _with_session(s, lambda: http_client.http_get("https://api.example/x", retries=2))
+    assert_true("no_retry_4xx", r.status_code == 404 and len(s.calls) == 1)
+
+    s = _FakeSession(statuses=[503, 503])
+    r = _with_session(s, lambda: http_client.http_get("https://api.example/x", retries=1))
+    assert_true("last_response_returned", r.status_code == 503 and len(s.calls) == 2)
+
+    s = _FakeSession(statuses=[OSError("reset"), OSError("reset")])
+    try:
+        _with_session(s, lambda: http_client.http_get("https://api.example/x", retries=1))
+    except OSError:
+        raised = True
+    else:
+        raised = False
+    assert_true("transport_error_raised", raised and len(s.calls) == 2)
+    print("PASS retry_policy")
+
+
+def test_per_host_concurrency_limit() -> None:
+    s = _FakeSession(delay=0.05)
+
+    def run():
+        threads = [
+            threading.Thread(target=http_client.http_get, args=(f"https://{host}/p{i}",), kwargs={"retries": 0})
+            for host in ("a.example", "b.example")
+            for i in range(http_client.PER_HOST * 2)
+        ]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join(5)
+
+    _with_session(s, run)
+    assert_true("per_host_all_done", len(s.calls) == http_client.PER_HOST * 4)
+    assert_true("per_host_limit", s.peak <= http_client.PER_HOST * 2, f"peak={s.peak}")
+    assert_true("per_host_parallel_hosts", s.peak > http_client.PER_HOST, f"peak={s.peak}")
+    print("PASS per_host_concurrency_limit")
+
+
+class _Resp:
+    def __init__(self, status: int, body: str = "", headers=None):
+        self.status_code = status
+        self.text = body
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"HTTP {self.status_code}")
+
+
+class _ValidatingSession:
+    """Отдаёт тело с ETag, на совпавший If-None-Match — 304."""
+
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.sent.append(dict(headers or {}))
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return _Resp(304, headers={"ETag": '"v1"'})
+        return _Resp(200, '{"kp": 2.3}', {"ETag": '"v1"', "Last-Modified": "Mon, 10 Aug 2026 09:00:00 GMT"})
+
+
+def test_conditional_revalidation() -> None:
+    s = _ValidatingSession()
+    url = "https://services.example/kp.json"
+
+    def run():
+        old_dir = http_client.HTTP_CACHE_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            http_client.HTTP_CACHE_DIR = Path(tmp)
+            try:
+                first = http_client.http_get_revalidated(url, 600, as_json=True)
+                assert_true("reval_first_body", first == {"kp": 2.3} and not s.sent[0].get("If-None-Match"))
+                http_client.http_get_revalidated(url, 600, as_json=True)
+                assert_true("reval_fresh_no_network", len(s.sent) == 1, f"sent={len(s.sent)}")
+
+                path = http_client._revalidation_path(url, None, True)
+                entry = json.loads(path.read_text("utf-8"))
+                entry["fetched_at"] -= 3600
+                path.write_text(json.dumps(entry), encoding="utf-8")
+                again = http_client.http_get_revalidated(url, 600, as_json=True)
+                assert_true("reval_conditional_sent", s.sent[-1].get("If-None-Match") == '"v1"', str(s.sent[-1]))
+                assert_true("reval_conditional_lm", "If-Modified-Since" in s.sent[-1])
+                assert_true("reval_304_body", again == {"kp": 2.3})
+                extended = json.loads(path.read_text("utf-8"))["fetched_at"]
+                assert_true("reval_304_extends", extended >= entry["fetched_at"] + 3600 - 1)
+                http_client.http_get_revalidated(url, 600, as_json=True)
+                assert_true("reval_extended_fresh", len(s.sent) == 2, f"sent={len(s.sent)}")
+                assert_true("reval_kind_separate", http_client.http_get_revalidated(url, 600) == '{"kp": 2.3}')
+
+                entry = json.loads(path.read_text("utf-8"))
+                entry["fetched_at"] -= 900
+                path.write_text(json.dumps(entry), encoding="utf-8")
+                sent = len(s.sent)
+                soft = http_client.http_get_revalidated(url, 600, as_json=True, stale_sec=600)
+                assert_true("swr_body_now", soft == {"kp": 2.3})
+                refresh = http_client._REFRESHING.get(path)
+                if refresh is not None:
+                    refresh.join(5)
+                assert_true("swr_background_conditional", len(s.sent) == sent + 1 and "If-None-Match" in s.sent[-1])
+                refreshed = json.loads(path.read_text("utf-8"))["fetched_at"]
+                assert_true("swr_background_extends", refreshed > entry["fetched_at"])
+            finally:
+                http_client.HTTP_CACHE_DIR = old_dir
+
+    _with_session(s, run)
+    print("PASS conditional_revalidation")
+
+
+def test_shared_session_reused() -> None:
+    if http_client.requests is None or not hasattr(http_client.requests, "Session"):
+        print("SKIP shared_session_reused (requests not installed)")
+        return
+    first = http_client.get_session()
+    assert_true("session_shared", http_client.get_session() is first)
+    adapter = first.get_adapter("https://api.open-meteo.com/")
+    assert_true("session_pool_size", adapter._pool_maxsize == http_client.POOL_SIZE)
+    print("PASS shared_session_reused")
+
+
+def main() -> None:
+    test_retry_policy()
+    test_per_host_concurrency_limit()
+    test_conditional_revalidation()
+    test_shared_session_reused()
+    print("OK: http client offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the shared marine cache (waves + SST in one request)."""
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import air  # noqa: E402
+import marine  # noqa: E402
+import post_common  # noqa: E402
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _raw(wave0: float) -> dict:
+    times = [f"2026-08-10T{h:02d}:00" for h in range(24)]
+    return {
+        "latitude": 34.7,
+        "longitude": 33.0,
+        "hourly": {
+            "time": times,
+            "wave_height": [wave0 + h / 100 for h in range(24)],
+            "wave_period": [5.0] * 24,
+            "sea_surface_temperature": [27.0 + h / 10 for h in range(24)],
+        },
+    }
+
+
+def _with_marine(fake_get, callback):
+    old = marine.CACHE_DIR, marine._http_get_json, marine._now_ts
+    with tempfile.TemporaryDirectory() as tmp:
+        marine.CACHE_DIR = Path(tmp)
+        marine._http_get_json = fake_get
+        # 2026-08-10 12:30 UTC
+        marine._now_ts = lambda: 1786365000
+        try:
+            return callback()
+        finally:
+            marine.CACHE_DIR, marine._http_get_json, marine._now_ts = old
+
+
+def test_waves_and_sst_share_one_request() -> None:
+    calls: list[dict] = []
+
+    def fake_get(params, timeout_sec, retries):
+        calls.append(params)
+        n = len(params["latitude"].split(","))
+        return _raw(0.3) if n == 1 else [_raw(0.3 + i) for i in range(n)]
+
+    def run():
+        tz = pendulum.timezone("Asia/Nicosia")
+        day = pendulum.date(2026, 8, 10)
+        wave_h, period, at = post_common._fetch_wave_for_tomorrow(34.7, 33.0, tz, prefer_hour=12, target_date=day)
+        sst = air.get_sst(34.7, 33.0)
+        assert_true("marine_single_request", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("marine_vars_requested", calls[0]["hourly"] == "wave_height,wave_period,sea_surface_temperature")
+        # 12:00 Nicosia == 09:00 UTC
+        assert_true("marine_local_hour", at == pendulum.datetime(2026, 8, 10, 12, tz=tz), str(at))
+        assert_true("marine_wave", (wave_h, period) == (0.39, 5.0), f"{wave_h}, {period}")
+        assert_true("marine_sst_nearest_past_hour", sst == 28.2, str(sst))
+
+        n = marine.prefetch_marine([(34.7, 33.0), (34.9, 33.6), (35.0, 34.0)])
+        assert_true("marine_batch_only_stale", n == 2 and len(calls) == 2, f"n={n} calls={len(calls)}")
+        assert_true("marine_batch_coords", calls[1]["latitude"] == "34.9,35.0", calls[1]["latitude"])
+        assert_true("marine_batch_split", marine.get_marine(35.0, 34.0)["hourly"]["wave_height"][0] == 1.3)
+
+    _with_marine(fake_get, run)
+    print("PASS waves_and_sst_share_one_request")
+
+
+def test_stale_cache_used_when_api_fails() -> None:
+    attempts: list[int] = []
+
+    def failing_get(params, timeout_sec, retries):
+        # повторы с бэкофом делает http_client — marine зовёт его один раз
+        attempts.append(retries)
+        raise OSError("connection refused")
+
+    def run():
+        path = marine._cache_path(34.7, 33.0)
+        marine._write_cache(path, marine._normalize(_raw(0.5)), marine._now_ts() - 2 * 3600)
+        sst = air.get_sst(34.7, 33.0)
+        assert_true("marine_stale_sst", sst == 28.2, str(sst))
+        assert_true("marine_missing_point", marine.get_marine(35.5, 34.5) == {})
+        assert_true("marine_retries_delegated", attempts == [marine.RETRIES] * 2, str(attempts))
+
+    _with_marine(failing_get, run)
+    print("PASS stale_cache_used_when_api_fails")
+
+
+def main() -> None:
+    test_waves_and_sst_share_one_request()
+    test_stale_cache_used_when_api_fails()
+    print("OK: marine offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
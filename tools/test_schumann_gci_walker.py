@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the single-pass GCI power walker and its learned path templates."""
+from __future__ import annotations
+
+import math
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann  # noqa: E402
+
+STATIONS = ["GCI001", "GCI003", "GCI006", "GCI004", "GCI005"]
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _reference(obj, stations):
+    """Прежняя реализация: все (путь, число), затем фильтр по каждой станции."""
+
+    def flatten(o, path=()):
+        out = []
+        if isinstance(o, dict):
+            for k, v in o.items():
+                out.extend(flatten(v, path + (str(k),)))
+        elif isinstance(o, list):
+            for i, v in enumerate(o):
+                out.extend(flatten(v, path + (str(i),)))
+        elif isinstance(o, (int, float)) and math.isfinite(o):
+            out.append((path, float(o)))
+        return out
+
+    flat = flatten(obj)
+    per_station = []
+    for st in stations:
+        cand = [num for path, num in flat if any(st.lower() in p.lower() for p in path)]
+        if cand:
+            per_station.append(cand[-1])
+    if per_station:
+        return sum(per_station) / len(per_station)
+    power_like = [num for path, num in flat if any("power" == p.lower() for p in path)]
+    return power_like[-1] if power_like else None
+
+
+def _random_payload(rng: random.Random, depth: int = 0):
+    if depth > 3 or rng.random() < 0.25:
+        return rng.choice([rng.uniform(-5, 50), rng.randint(0, 9), None, "x", float("nan"), True])
+    if rng.random() < 0.5:
+        keys = ["power", "Power", "time", "gci001", "GCI003_mag", "data", "GCI006", "meta", "gci004 (Lithuania)"]
+        return {rng.choice(keys) + ("" if rng.random() < 0.7 else str(i)): _random_payload(rng, depth + 1)
+                for i in range(rng.randint(0, 4))}
+    return [_random_payload(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+def test_matches_reference_semantics() -> None:
+    rng = random.Random(7)
+    for n in range(600):
+        payload = _random_payload(rng)
+        stations = rng.sample(STATIONS, rng.randint(0, len(STATIONS)))
+        schumann._PATH_CACHE.clear()
+        got, want = schumann._aggregate_stations_power(payload, stations), _reference(payload, stations)
+        same = got == want or (got is not None and want is not None and abs(got - want) < 1e-9)
+        assert_true(f"reference_{n}", same, f"{payload!r} {stations} got={got} want={want}")
+        again = schumann._aggregate_stations_power(payload, stations)
+        assert_true(f"cached_{n}", again == got, f"{payload!r} {again} vs {got}")
+
+    nested = {"stations": {"GCI001": {"power": [1.0, 7.8]}, "GCI003": {"power": [2.0, 3.5, None]}}}
+    assert_true("nested_stations", schumann._aggregate_stations_power(nested, ["GCI001", "GCI003"]) == (7.8 + 3.5) / 2)
+    assert_true("power_fallback", schumann._aggregate_stations_power({"series": {"power": [4, 6]}}, ["GCI009"]) == 6.0)
+    assert_true("nothing", schumann._aggregate_stations_power({"a": "b"}, STATIONS) is None)
+    print("PASS matches_reference_semantics")
+
+
+def _series(stations, hours: int, shift: float = 0.0) -> dict:
+    return {
+        "updated": "2026-10-16T10:00:00Z",
+        "stations": {st: {"time": list(range(hours)), "power": [i * 0.01 + shift for i in range(hours)]} for st in stations},
+    }
+
+
+def test_learned_paths_skip_the_walk() -> None:
+    calls = []
+    real = schumann._station_values
+
+    def counting(obj, stations):
+        calls.append(len(stations))
+        return real(obj, stations)
+
+    schumann._PATH_CACHE.clear()
+    schumann._station_values = counting
+    try:
+        first = schumann._aggregate_stations_power(_series(STATIONS, 500), STATIONS)
+        # тот же «вид» payload, ряд стал длиннее — шаблон с индексом -1 берёт новый последний элемент
+        grown = schumann._aggregate_stations_power(_series(STATIONS, 800, shift=1.0), STATIONS)
+        assert_true("walk_once", len(calls) == 1, str(calls))
+        assert_true("template_values", abs(first - 4.99) < 1e-9 and abs(grown - (7.99 + 1.0)) < 1e-9, f"{first} {grown}")
+
+        broken = _series(STATIONS, 10)
+        broken["stations"]["GCI003"]["power"] = []  # шаблон не резолвится → полный обход
+        value = schumann._aggregate_stations_power(broken, STATIONS)
+        assert_true("relearn_on_shape_change", len(calls) == 2 and abs(value - _reference(broken, STATIONS)) < 1e-9, str(value))
+    finally:
+        schumann._station_values = real
+    print("PASS learned_paths_skip_the_walk")
+
+
+def test_many_stations_long_series() -> None:
+    stations = [f"GCI{i:03d}" for i in range(1, 61)]
+    payload = _series(stations, 2000)
+    schumann._PATH_CACHE.clear()
+    got = schumann._aggregate_stations_power(payload, stations)
+    assert_true("many_stations", abs(got - 19.99) < 1e-9, str(got))
+    values, paths = schumann._station_values(payload, stations)
+    assert_true("template_shape", paths["GCI042"] == ((False, "stations"), (False, "GCI042"), (False, "power"), (True, -1)), str(paths["GCI042"]))
+    print("PASS many_stations_long_series")
+
+
+def main() -> None:
+    test_matches_reference_semantics()
+    test_learned_paths_skip_the_walk()
+    test_many_stations_long_series()
+    print("OK: schumann GCI walker offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the append-only Schumann history (JSON Lines tail upserts, compaction, legacy array)."""
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann  # noqa: E402
+
+DAY = 86400
+T0 = 1_760_000_400 // DAY * DAY + 3600  # 01:00 UTC
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _rec(ts: int, amp, src: str = "gci_json") -> dict:
+    return {"ts": ts, "freq": 7.83, "amp": amp, "h7_amp": None, "h7_spike": None, "ver": 2, "src": src}
+
+
+def _lines(path: Path) -> list:
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_hourly_upsert_touches_only_the_tail() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "schumann_hourly.jsonl"
+        for h in range(5):
+            schumann.upsert_record(str(path), _rec(T0 + h * 3600, 1.0 + h))
+        assert_true("one_line_per_hour", len(_lines(path)) == 5, str(_lines(path)))
+        before = _lines(path)
+
+        # повтор того же часа: худший источник не вытесняет лучший, лучший — заменяет строку
+        schumann.upsert_record(str(path), _rec(T0 + 4 * 3600, 9.0, src="cache"))
+        assert_true("worse_source_kept_out", _lines(path) == before)
+        schumann.upsert_record(str(path), _rec(T0 + 4 * 3600, None, src="gci_json"))
+        schumann.upsert_record(str(path), _rec(T0 + 4 * 3600, 7.5, src="gci_json"))
+        after = _lines(path)
+        assert_true("last_line_replaced", after[:4] == before[:4] and json.loads(after[4])["amp"] == 7.5, after[4])
+
+        # оборванная запись прошлого прогона отрезается перед дописыванием
+        with path.open("a", encoding="utf-8") as fh:
+            fh.write('{"ts": 17')
+        assert_true("torn_tail_ignored", schumann.last_known_amp(str(path)) == 7.5)
+        schumann.upsert_record(str(path), _rec(T0 + 5 * 3600, 2.0))
+        lines = _lines(path)
+        assert_true("append_after_torn", len(lines) == 6 and json.loads(lines[-1])["ts"] == T0 + 5 * 3600, str(lines[-2:]))
+
+        schumann.upsert_record(str(path), _rec(T0 + 6 * 3600, None, src="none"))
+        assert_true("last_known_amp_skips_empty", schumann.last_known_amp(str(path)) == 2.0)
+        tail = schumann.recent_records(str(path), 3)
+        assert_true("recent_records", [r["ts"] for r in tail] == [T0 + 4 * 3600, T0 + 5 * 3600, T0 + 6 * 3600])
+    print("PASS hourly_upsert_touches_only_the_tail")
+
+
+def test_tail_reads_beyond_one_chunk() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "schumann_hourly.jsonl"
+        items = [_rec(T0 + h * 3600, float(h) if h < 10 else None, src="none") for h in range(400)]
+        schumann._write_history(str(path), items)
+        assert_true("file_larger_than_chunk", path.stat().st_size > 4 * schumann.TAIL_CHUNK)
+        assert_true("amp_found_far_back", schumann.last_known_amp(str(path)) == 9.0)
+        tail = schumann.recent_records(str(path), 120)
+        assert_true("long_tail", [r["ts"] for r in tail] == [r["ts"] for r in items[-120:]])
+        assert_true("empty_file", schumann.recent_records(str(Path(tmp) / "missing.jsonl"), 3) == [])
+    print("PASS tail_reads_beyond_one_chunk")
+
+
+def test_compaction_and_legacy_array() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "schumann_hourly.json"
+        legacy = [_rec(T0, 0.5), _rec(T0 + 3600, 1.0), _rec(T0 + 3600, None, src="cache")]
+        path.write_text(json.dumps(legacy), encoding="utf-8")
+        assert_true("legacy_amp", schumann.last_known_amp(str(path)) == 1.0)
+        schumann.upsert_record(str(path), _rec(T0 + 2 * 3600, 3.0), max_len=10)
+        lines = [json.loads(l) for l in _lines(path)]
+        assert_true("legacy_converted", [r["ts"] for r in lines] == [T0, T0 + 3600, T0 + 2 * 3600], str(lines))
+        assert_true("legacy_dedup_best", lines[1]["amp"] == 1.0)
+
+        # запись не по порядку — полная компакция
+        schumann.upsert_record(str(path), _rec(T0 - 3600, 0.1), max_len=10)
+        assert_true("out_of_order_sorted", json.loads(_lines(path)[0])["ts"] == T0 - 3600)
+
+        # первая запись нового UTC-дня обрезает историю до max_len
+        for h in range(3, 20):
+            schumann.upsert_record(str(path), _rec(T0 + h * 3600, 1.0), max_len=10)
+        assert_true("grows_within_day", len(_lines(path)) == 21, str(len(_lines(path))))
+        schumann.upsert_record(str(path), _rec(T0 + DAY, 4.0), max_len=10)
+        lines = _lines(path)
+        assert_true("daily_compaction", len(lines) == 10 and json.loads(lines[-1])["ts"] == T0 + DAY, str(len(lines)))
+
+        old, new = schumann.fix_history(str(path))
+        assert_true("fix_history_jsonl", old == new == 10 and not path.read_text(encoding="utf-8").startswith("["))
+    print("PASS compaction_and_legacy_array")
+
+
+def test_get_schumann_reads_tail() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "schumann_hourly.jsonl"
+        schumann._write_history(str(path), [_rec(T0 + h * 3600, 1.0 + h) for h in range(30)] + [_rec(T0 + 30 * 3600, 5.0, src="cache")])
+        old = schumann.DEF_FILE
+        try:
+            schumann.DEF_FILE = str(path)
+            state = schumann.get_schumann()
+            assert_true("state_from_tail", state["amp"] == 5.0 and state["cached"] and state["trend"] == "→", str(state))
+            schumann.DEF_FILE = str(Path(tmp) / "none.jsonl")
+            assert_true("empty_state", schumann.get_schumann()["amp"] is None)
+        finally:
+            schumann.DEF_FILE = old
+    print("PASS get_schumann_reads_tail")
+
+
+def main() -> None:
+    test_hourly_upsert_touches_only_the_tail()
+    test_tail_reads_beyond_one_chunk()
+    test_compaction_and_legacy_array()
+    test_get_schumann_reads_tail()
+    print("OK: schumann history offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for parallel Schumann collection: early winner, per-source breaker, deadline."""
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann  # noqa: E402
+
+PAGE = "https://gci.test/page/"
+IFRAME = "https://gci.test/page/power_levels.html"
+JSON_URL = "https://gci.test/page/power_levels.php"
+TSU = "https://tsu.test/live"
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+class _Resp:
+    def __init__(self, status: int, text: str = "", data=None):
+        self.status_code = status
+        self.text = text
+        self._data = data
+
+    def json(self):
+        if self._data is None:
+            raise ValueError("no json")
+        return self._data
+
+
+class _Net:
+    """Подменяет schumann.http_get: ответ и задержка по URL, журнал запросов."""
+
+    def __init__(self, routes):
+        self.routes = routes  # url → (delay, _Resp)
+        self.calls: list[str] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, url, **_kw):
+        with self.lock:
+            self.calls.append(url)
+        delay, resp = self.routes.get(url, (0.0, _Resp(404)))
+        time.sleep(delay)
+        return resp
+
+
+IFRAME_HTML = '<div data-load-json-from="power_levels.php"></div>'
+INLINE_HTML = '<script>var levels = {"GCI001": 2.5};</script>'
+PAGE_HTML = f'<iframe src="{IFRAME}"></iframe>'
+
+
+class _Env:
+    def __init__(self, routes, saved_html: str = ""):
+        self.net = _Net(routes)
+        self.saved_html = saved_html
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        names = ("http_get", "GCI_ENABLE", "TSU_ENABLE", "MAP_GCI_TO_AMP", "GCI_PAGE_URL", "GCI_IFRAME_URL",
+                 "GCI_SAVED_HTML", "GCI_STATIONS", "TSU_URL", "TSU_SNAPSHOT", "CUSTOM_URL", "BREAKER_FILE",
+                 "DEF_FILE", "AMP_SCALE")
+        self.old = {n: getattr(schumann, n) for n in names}
+        saved = ""
+        if self.saved_html:
+            saved = str(root / "saved.html")
+            Path(saved).write_text(self.saved_html, encoding="utf-8")
+        schumann.http_get = self.net
+        schumann.GCI_ENABLE = schumann.TSU_ENABLE = schumann.MAP_GCI_TO_AMP = True
+        schumann.GCI_PAGE_URL, schumann.GCI_IFRAME_URL = PAGE, IFRAME
+        schumann.GCI_SAVED_HTML, schumann.GCI_STATIONS = saved, ["GCI001"]
+        schumann.TSU_URL, schumann.TSU_SNAPSHOT, schumann.CUSTOM_URL = TSU, "", ""
+        schumann.BREAKER_FILE = str(root / ".schu_breaker.json")
+        schumann.DEF_FILE = str(root / "schumann_hourly.jsonl")
+        schumann.AMP_SCALE = 1.0
+        return self.net
+
+    def __exit__(self, *exc):
+        for n, v in self.old.items():
+            setattr(schumann, n, v)
+        self.tmp.cleanup()
+        return False
+
+
+def _breaker() -> dict:
+    try:
+        return json.loads(Path(schumann.BREAKER_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def test_top_ranked_source_cancels_the_rest() -> None:
+    routes = {
+        PAGE: (0.05, _Resp(200, PAGE_HTML)),
+        IFRAME: (0.05, _Resp(200, IFRAME_HTML)),
+        JSON_URL: (0.05, _Resp(200, data={"GCI001": {"power": [3.0, 4.25]}})),
+        TSU: (1.5, _Resp(200, "ok")),
+    }
+    with _Env(routes) as net:
+        # отдельный источник iframe висит на том же URL дольше — делаем его медленным
+        slow_iframe = schumann.SOURCES["gci_iframe"]
+        schumann.SOURCES["gci_iframe"] = (lambda: (time.sleep(1.5), slow_iframe[0]())[1], slow_iframe[1])
+        try:
+            t0 = time.monotonic()
+            rec = schumann.collect_once()
+            elapsed = time.monotonic() - t0
+        finally:
+            schumann.SOURCES["gci_iframe"] = slow_iframe
+        assert_true("winner_gci_json", rec["src"] == "gci_json" and rec["amp"] == 4.25, str(rec))
+        assert_true("early_exit", elapsed < 1.0, f"{elapsed:.2f}s")
+        time.sleep(1.7)  # отменённые потоки доживают
+        br = _breaker()
+        assert_true("cancelled_not_blamed", br.get("gci_page") == {"fail": 0, "until": 0} and all(v["fail"] == 0 for v in br.values()), str(br))
+        # TSU ответил уже после возврата collect_sources — breaker он не трогает
+        assert_true("late_source_not_recorded", "tsu" not in br and "gci_iframe" not in br, str(br))
+        assert_true("cancelled_skip_network", net.calls.count(IFRAME) <= 2, str(net.calls))
+    print("PASS top_ranked_source_cancels_the_rest")
+
+
+def test_lower_rank_waits_for_better_then_wins() -> None:
+    routes = {
+        PAGE: (0.3, _Resp(503)),
+        IFRAME: (0.0, _Resp(200, INLINE_HTML)),
+        TSU: (2.0, _Resp(200, "ok")),
+    }
+    with _Env(routes):
+        t0 = time.monotonic()
+        results = schumann.collect_sources()
+        elapsed = time.monotonic() - t0
+        # page-путь тоже читает IFRAME и находит inline JSON → gci_iframe (ранг 2) от обоих
+        assert_true("iframe_value", results["gci_iframe"].amp == 2.5 and results["gci_iframe"].src == "gci_iframe", str(results))
+        assert_true("waited_for_page", "gci_page" in results, str(results))
+        assert_true("tsu_not_awaited", "tsu" not in results and elapsed < 1.5, f"{elapsed:.2f}s {results}")
+    print("PASS lower_rank_waits_for_better_then_wins")
+
+
+def test_saved_html_and_per_source_breaker() -> None:
+    routes = {JSON_URL: (0.0, _Resp(200, data={"GCI001": 6.0})), TSU: (0.0, _Resp(500))}
+    with _Env(routes, saved_html=IFRAME_HTML):
+        Path(schumann.BREAKER_FILE).write_text(json.dumps({"fail": 0, "until": 0}), encoding="utf-8")
+        for _ in range(schumann.BREAKER_THRESHOLD):
+            rec = schumann.collect_once()
+            assert_true("saved_html_source", rec["src"] == "gci_saved" and rec["amp"] == 6.0, str(rec))
+        assert_true("legacy_file_migrated", "fail" not in _breaker() and _breaker()["gci_saved"]["fail"] == 0, str(_breaker()))
+
+        # без амплитуды ждём всех: каждый неудачный источник копит свою запись
+        for _ in range(schumann.BREAKER_THRESHOLD):
+            res = schumann.collect_sources(["gci_page", "tsu", "gci_saved"])
+            assert_true("all_finished", set(res) == {"gci_page", "tsu", "gci_saved"}, str(res))
+        br = _breaker()
+        assert_true("failing_sources_open", all(br[n]["until"] > time.time() for n in ("gci_page", "tsu")), str(br))
+        assert_true("healthy_source_closed", br["gci_saved"] == {"fail": 0, "until": 0}, str(br))
+        assert_true("breaker_allow_per_source", not schumann.breaker_allow("gci_page") and schumann.breaker_allow("gci_saved"))
+        res = schumann.collect_sources(["gci_page"])
+        assert_true("open_breaker_skips", res["gci_page"].src == "gci_page_circuit_open", str(res))
+    print("PASS saved_html_and_per_source_breaker")
+
+
+def test_deadline_bounds_run_time() -> None:
+    routes = {PAGE: (2.0, _Resp(503)), IFRAME: (2.0, _Resp(503)), TSU: (2.0, _Resp(503))}
+    with _Env(routes):
+        schumann.upsert_record(schumann.DEF_FILE, {"ts": 1_760_000_400, "freq": 7.83, "amp": 1.5, "src": "gci_json"})
+        t0 = time.monotonic()
+        results = schumann.collect_sources(deadline=0.3)
+        assert_true("deadline", time.monotonic() - t0 < 1.0 and results == {}, str(results))
+        old = schumann.COLLECT_DEADLINE
+        try:
+            schumann.COLLECT_DEADLINE = 0.3
+            rec = schumann.collect_once()
+        finally:
+            schumann.COLLECT_DEADLINE = old
+        assert_true("cache_fallback", rec["src"] == "cache" and rec["amp"] == 1.5, str(rec))
+        assert_true("timed_out_not_blamed", _breaker() == {} or all(v["fail"] == 0 for v in _breaker().values()), str(_breaker()))
+        time.sleep(2.2)
+    print("PASS deadline_bounds_run_time")
+
+
+def main() -> None:
+    test_top_ranked_source_cancels_the_rest()
+    test_lower_rank_waits_for_better_then_wins()
+    test_saved_html_and_per_source_breaker()
+    test_deadline_bounds_run_time()
+    print("OK: schumann sources offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the per-section disk memo of build_message (astro, sun line, fact of the day)."""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import post_common  # noqa: E402
+import section_memo  # noqa: E402
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+class _Memo:
+    """Включает POST_SECTION_MEMO и уводит файлы во временные каталоги."""
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.old = (os.environ.get("POST_SECTION_MEMO"), section_memo.MEMO_DIR, post_common.CACHE_DIR)
+        os.environ["POST_SECTION_MEMO"] = "1"
+        section_memo.MEMO_DIR = root / "sections"
+        post_common.CACHE_DIR = root
+        return root
+
+    def __exit__(self, *exc):
+        env, section_memo.MEMO_DIR, post_common.CACHE_DIR = self.old
+        if env is None:
+            os.environ.pop("POST_SECTION_MEMO", None)
+        else:
+            os.environ["POST_SECTION_MEMO"] = env
+        self.tmp.cleanup()
+        return False
+
+
+def test_lookup_store_and_fingerprint() -> None:
+    a = section_memo.section_fingerprint("astro", {"date": "2026-08-10", "rec": {"b": 1, "a": 2}})
+    b = section_memo.section_fingerprint("astro", {"rec": {"a": 2, "b": 1}, "date": "2026-08-10"})
+    c = section_memo.section_fingerprint("astro", {"date": "2026-08-10", "rec": {"a": 2, "b": 3}})
+    assert_true("fingerprint_key_order", a == b)
+    assert_true("fingerprint_input_change", a != c)
+    assert_true("fingerprint_section_name", a != section_memo.section_fingerprint("sun", {"date": "2026-08-10", "rec": {"a": 2, "b": 1}}))
+
+    with _Memo():
+        section_memo.store("sun", {"d": 1}, "🌅 Рассвет завтра: 06:12")
+        assert_true("memo_hit", section_memo.lookup("sun", {"d": 1}) == "🌅 Рассвет завтра: 06:12")
+        assert_true("memo_miss_other_inputs", section_memo.lookup("sun", {"d": 2}) is None)
+        path = section_memo._path("sun", {"d": 1})
+        old = time.time() - section_memo.TTL_SEC - 10
+        os.utime(path, (old, old))
+        assert_true("memo_ttl_expired", section_memo.lookup("sun", {"d": 1}) is None)
+        section_memo.store("sun", {"d": 3}, "x")
+        assert_true("memo_pruned", not path.exists())
+
+    section_memo.store("sun", {"d": 1}, "off")
+    assert_true("memo_off_by_default", section_memo.lookup("sun", {"d": 1}) is None)
+    print("PASS lookup_store_and_fingerprint")
+
+
+def test_astro_section_memo() -> None:
+    calendar = {"2026-08-10": {"phase_name": "Полнолуние", "percent": 100, "sign": "Козерог"}}
+    renders: list[str] = []
+    answers = [""]
+    old = post_common.load_calendar, post_common.gpt_complete, post_common.USE_DAILY_LLM, post_common._render_astro_section
+    render = post_common._render_astro_section
+
+    def counting_render(*args, **kwargs):
+        renders.append("render")
+        return render(*args, **kwargs)
+
+    date_local = pendulum.date(2026, 8, 10)
+    try:
+        post_common.load_calendar = lambda *_a, **_k: calendar
+        post_common.gpt_complete = lambda **_k: answers[0]
+        post_common.USE_DAILY_LLM = True
+        post_common._render_astro_section = counting_render
+        with _Memo() as root:
+            # LLM не ответил — секция не запоминается, следующий запуск спросит снова
+            post_common.build_astro_section(date_local=date_local, tz_local="Asia/Nicosia")
+            assert_true("astro_no_memo_without_llm", not list((root / "sections").glob("astro_*.txt")))
+
+            answers[0] = "🌕 Полнолуние подводит итоги.\n✨ Эмоции ярче обычного.\n✅ Хорошо завершать дела."
+            second = post_common.build_astro_section(date_local=date_local, tz_local="Asia/Nicosia")
+            assert_true("astro_llm_retried", len(renders) == 2 and list(root.glob("astro_10.08.2026_*.txt")))
+
+            third = post_common.build_astro_section(date_local=date_local, tz_local="Asia/Nicosia")
+            assert_true("astro_memo_hit", third == second and len(renders) == 2, f"renders={len(renders)}")
+
+            calendar["2026-08-10"]["percent"] = 99
+            fourth = post_common.build_astro_section(date_local=date_local, tz_local="Asia/Nicosia")
+            assert_true("astro_input_change_rebuilds", "99%" in fourth and len(renders) == 3, f"renders={len(renders)}")
+    finally:
+        (post_common.load_calendar, post_common.gpt_complete,
+         post_common.USE_DAILY_LLM, post_common._render_astro_section) = old
+    print("PASS astro_section_memo")
+
+
+def test_sun_line_and_fact_memo() -> None:
+    tz = pendulum.timezone("Asia/Nicosia")
+    calls: list[str] = []
+    old = post_common._sun_times_for_date, post_common.get_fact
+
+    def fake_sun(lat, lon, date_obj, tz_obj):
+        calls.append("sun")
+        return pendulum.datetime(2026, 8, 10, 6, 12, tz=tz_obj), pendulum.datetime(2026, 8, 10, 19, 40, tz=tz_obj)
+
+    facts = iter(["Факт А", "Факт Б"])
+    try:
+        post_common._sun_times_for_date = fake_sun
+        post_common.get_fact = lambda *_a, **_k: next(facts)
+        with _Memo():
+            first = post_common.sun_line_for_mode("evening", tz, 34.7, 33.0)
+            again = post_common.sun_line_for_mode("evening", tz, 34.7, 33.0)
+            assert_true("sun_memo_hit", first == again == "🌅 Рассвет завтра: 06:12" and calls == ["sun"], str(calls))
+            post_common.sun_line_for_mode("morning", tz, 34.7, 33.0)
+            assert_true("sun_mode_is_input", calls == ["sun", "sun"])
+
+            day = pendulum.date(2026, 8, 10)
+            assert_true("fact_stable_across_runs", post_common._fact_of_day(day, "Кипр") == post_common._fact_of_day(day, "Кипр") == "Факт А")
+            assert_true("fact_new_date", post_common._fact_of_day(day.add(days=1), "Кипр") == "Факт Б")
+    finally:
+        post_common._sun_times_for_date, post_common.get_fact = old
+    print("PASS sun_line_and_fact_memo")
+
+
+def main() -> None:
+    test_lookup_store_and_fingerprint()
+    test_astro_section_memo()
+    test_sun_line_and_fact_memo()
+    print("OK: section memo offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the asyncio source graph and the snapshot build_message reads."""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import post_common  # noqa: E402
+from source_graph import Snapshot, Source, call_key, collect  # noqa: E402
+
+_VAR: contextvars.ContextVar[str] = contextvars.ContextVar("test_var", default="unset")
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _sleep(sec: float, value):
+    time.sleep(sec)
+    return value
+
+
+def test_parallel_dependencies_and_timeouts() -> None:
+    order: list[str] = []
+
+    def step(name: str, sec: float):
+        time.sleep(sec)
+        order.append(name)
+        return name
+
+    def boom():
+        raise RuntimeError("source down")
+
+    t0 = time.monotonic()
+    snap = collect(
+        [
+            Source("batch", step, ("batch", 0.2)),
+            Source("a", step, ("a", 0.1), after=("batch",)),
+            Source("b", _sleep, (0.3, "b")),
+            Source("c", _sleep, (0.3, "c")),
+            Source("slow", _sleep, (2.0, "late"), timeout=0.2, default="н/д"),
+            Source("broken", boom),
+            Source("after_broken", step, ("after_broken", 0.0), after=("broken",)),
+            Source("ctx", _VAR.get),
+        ],
+        workers=8,
+    )
+    elapsed = time.monotonic() - t0
+    assert_true("slowest_chain_not_sum", elapsed < 0.9, f"{elapsed:.2f}s")
+    assert_true("dependency_order", order.index("batch") < order.index("a"), str(order))
+    assert_true("values", snap.get("a") == "a" and snap.result(_sleep, (0.3, "b")) == "b")
+    assert_true("timeout_default", snap.result(_sleep, (2.0, "late")) == "н/д" and "slow" in snap.timed_out)
+    try:
+        snap.result(boom)
+        raised = False
+    except RuntimeError:
+        raised = True
+    assert_true("error_reraised", raised and "broken" not in snap.timed_out)
+    assert_true("failed_dependency_does_not_block", snap.get("after_broken") == "after_broken")
+    assert_true("unknown_call", not snap.has(_sleep, (9, "x")))
+    assert_true("summary", "timed out slow" in snap.summary() and "failed broken" in snap.summary(), snap.summary())
+
+    token = _VAR.set("caller")
+    try:
+        snap = collect([Source("ctx", _VAR.get)])
+    finally:
+        _VAR.reset(token)
+    assert_true("caller_context_copied", snap.get("ctx") == "caller")
+    print("PASS parallel_dependencies_and_timeouts")
+
+
+def test_limits_graph_errors_and_running_loop() -> None:
+    active = [0, 0]
+    lock = threading.Lock()
+
+    def tracked():
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    collect([Source(f"s{i}", tracked, (), group="api") for i in range(6)], limits={"api": 2}, workers=6)
+    assert_true("group_limit", active[1] == 2, str(active))
+
+    for bad, label in (
+        ([Source("a", tracked), Source("a", tracked)], "duplicate"),
+        ([Source("a", tracked, after=("zzz",))], "unknown"),
+        ([Source("a", tracked, after=("b",)), Source("b", tracked, after=("a",))], "cycle"),
+    ):
+        try:
+            collect(bad)
+            ok = False
+        except ValueError as e:
+            ok = label in str(e)
+        assert_true(f"graph_{label}", ok)
+
+    # пул в один поток: очередь за потоком не съедает таймаут следующих источников
+    snap = collect([Source(f"q{i}", _sleep, (0.15, i), timeout=0.3) for i in range(4)], workers=1)
+    assert_true("queue_not_timed", not snap.timed_out and [snap.get(f"q{i}") for i in range(4)] == [0, 1, 2, 3], snap.summary())
+    assert_true("timing_from_start", max(snap.timings.values()) < 0.3, str(snap.timings))
+    snap = collect([Source("busy", _sleep, (0.3, "b")), Source("late", _sleep, (0.5, "x"), timeout=0.1, default="d")], workers=1)
+    assert_true("started_call_still_timed", snap.get("late") == "d" and snap.timed_out == {"late"}, snap.summary())
+
+    async def inside_loop():
+        return collect([Source("x", _sleep, (0.01, 42))]).get("x")
+
+    assert_true("collect_inside_running_loop", asyncio.run(inside_loop()) == 42)
+    print("PASS limits_graph_errors_and_running_loop")
+
+
+def test_build_message_reads_snapshot() -> None:
+    tz = pendulum.timezone("Asia/Nicosia")
+    sea = [("Limassol", (34.707, 33.022)), ("Pafos", (34.776, 32.424))]
+    other = [("Nicosia", (35.170, 33.360))]
+    morning = {s.name for s in post_common._collection_sources(sea, other, tz, True)}
+    evening = {s.name for s in post_common._collection_sources(sea, other, tz, False)}
+    for name in ("weather:batch", "weather:region", "weather:Nicosia", "sst:Pafos", "air:region", "pollen", "solar_wind"):
+        assert_true("morning_source", name in morning, name)
+    assert_true("evening_sources", {"wave:Limassol", "astro"} <= evening and "solar_wind" not in evening, str(evening))
+    astro = [s for s in post_common._collection_sources(sea, other, tz, False) if s.name == "astro"][0]
+    # рендер считает «завтра» своим DateTime (или Date) — ключ всё равно тот же, по ISO-дате
+    tom = pendulum.today(tz).add(days=1)
+    snap = Snapshot(values={"astro": "🌙"}, _calls={call_key(astro.fn, astro.args, astro.kwargs): "astro"})
+    token = post_common._RUN_SNAPSHOT.set(snap)
+    try:
+        hits = [post_common._fetched(post_common._astro_section_for_day, post_common._iso_day(day), tz.name)
+                for day in (tom, tom.date(), tom.add(hours=5))]
+    finally:
+        post_common._RUN_SNAPSHOT.reset(token)
+    assert_true("astro_iso_key", hits == ["🌙"] * 3 and astro.args == (tom.date().isoformat(), tz.name), f"{hits} {astro.args}")
+
+    calls: list[str] = []
+    old = post_common.get_solar_wind, post_common._fetch_world_kp, post_common.USE_WORLD_KP, post_common.CY_SOURCE_TIMEOUTS
+
+    def slow_kp():
+        time.sleep(1.0)
+        return 5.0, 3
+
+    try:
+        post_common.get_solar_wind = lambda: calls.append(threading.current_thread().name) or {"speed_kms": 420.0}
+        post_common._fetch_world_kp = slow_kp
+        post_common.USE_WORLD_KP = True
+        post_common.CY_SOURCE_TIMEOUTS = dict(old[3], swpc=0.2)
+        sources = [s for s in post_common._collection_sources(sea, other, tz, True) if s.group == "swpc"]
+        snap = collect(sources)
+        token = post_common._RUN_SNAPSHOT.set(snap)
+        try:
+            sw = post_common._fetched(post_common.get_solar_wind)
+            kp = post_common._fetched(post_common._fetch_world_kp)
+        finally:
+            post_common._RUN_SNAPSHOT.reset(token)
+        assert_true("snapshot_value", sw == {"speed_kms": 420.0} and len(calls) == 1 and calls[0].startswith("source"), str(calls))
+        assert_true("timeout_default_for_render", kp == (None, None), str(kp))
+        assert_true("direct_call_without_snapshot", post_common._fetched(post_common.get_solar_wind) and len(calls) == 2)
+    finally:
+        (post_common.get_solar_wind, post_common._fetch_world_kp,
+         post_common.USE_WORLD_KP, post_common.CY_SOURCE_TIMEOUTS) = old
+    print("PASS build_message_reads_snapshot")
+
+
+def main() -> None:
+    test_parallel_dependencies_and_timeouts()
+    test_limits_graph_errors_and_running_loop()
+    test_build_message_reads_snapshot()
+    print("OK: source graph offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the Kp / solar-wind time series (append-only files, incremental ingest, window queries)."""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import post_common  # noqa: E402
+import space_history  # noqa: E402
+import space_weather  # noqa: E402
+
+H = 3600
+NOW = int(time.time()) // (3 * H) * (3 * H)
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+class _History:
+    """Включает SPACE_HISTORY и уводит файлы серий во временный каталог."""
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old = (os.environ.get("SPACE_HISTORY"), space_history.CACHE_DIR)
+        os.environ["SPACE_HISTORY"] = "1"
+        space_history.CACHE_DIR = Path(self.tmp.name)
+        return Path(self.tmp.name)
+
+    def __exit__(self, *exc):
+        env, space_history.CACHE_DIR = self.old
+        if env is None:
+            os.environ.pop("SPACE_HISTORY", None)
+        else:
+            os.environ["SPACE_HISTORY"] = env
+        self.tmp.cleanup()
+        return False
+
+
+def _kp_rows(values, end=NOW):
+    return [(end - (len(values) - 1 - i) * 3 * H, [v]) for i, v in enumerate(values)]
+
+
+def test_ingest_is_incremental_and_deduplicated() -> None:
+    with _History() as root:
+        rows = _kp_rows([2.0, 2.3, 3.0, 5.3, 6.0, 5.7])
+        assert_true("first_ingest", space_history.ingest("kp", rows) == 6)
+        size = (root / "space_history_kp.bin").stat().st_size
+        assert_true("fixed_records", size == 8 + 6 * 12, str(size))
+        assert_true("overlap_noop", space_history.ingest("kp", rows[2:]) == 0)
+        assert_true("size_unchanged", (root / "space_history_kp.bin").stat().st_size == size)
+        assert_true("last_ts", space_history.last_ts("kp") == NOW)
+
+        later = [(NOW + 3 * H, [4.0]), (NOW + 3 * H, [4.7]), (NOW, [9.0]), (NOW + 6 * H, [None])]
+        assert_true("only_newer_rows", space_history.ingest("kp", later) == 1)
+        s = space_history.load("kp")
+        assert_true("duplicate_last_wins", s.latest("kp") == (NOW + 3 * H, 4.7) and len(s) == 7, str(s.latest("kp")))
+        assert_true("memo_without_change", space_history.load("kp") is s)
+
+        with (root / "space_history_kp.bin").open("ab") as fh:
+            fh.write(b"\x01\x02\x03")  # оборванная запись
+        assert_true("torn_tail_skipped", len(space_history.load("kp")) == 7)
+        assert_true("append_after_torn", space_history.ingest("kp", [(NOW + 6 * H, [3.3])]) == 1)
+        s = space_history.load("kp")
+        assert_true("torn_tail_cut", len(s) == 8 and (root / "space_history_kp.bin").stat().st_size == 8 + 8 * 12)
+
+        (root / "space_history_mag.bin").write_bytes(b"junk")
+        assert_true("broken_file_ignored", len(space_history.load("mag")) == 0)
+        assert_true("broken_file_rewritten", space_history.ingest("mag", [(NOW, [-3.5, 7.0])]) == 1)
+        assert_true("rewritten_readable", space_history.load("mag").latest("bz") == (NOW, -3.5))
+
+    os.environ.pop("SPACE_HISTORY", None)
+    with tempfile.TemporaryDirectory() as tmp:
+        old = space_history.CACHE_DIR
+        try:
+            space_history.CACHE_DIR = Path(tmp)
+            assert_true("off_by_default", space_history.ingest("kp", _kp_rows([3.0])) == 0 and not list(Path(tmp).iterdir()))
+        finally:
+            space_history.CACHE_DIR = old
+    print("PASS ingest_is_incremental_and_deduplicated")
+
+
+def test_windows_trend_and_storm() -> None:
+    with _History():
+        space_history.ingest("kp", _kp_rows([1.0, 2.0, 2.0, 2.3, 3.0, 3.3, 2.7, 5.0, 6.3, 5.7]))
+        s = space_history.load("kp")
+        w = s.window("kp", 24)
+        assert_true("window_24h", w.n == 8 and w.peak == 6.3 and w.peak_at == NOW - 3 * H and w.last == 5.7, str(w))
+        assert_true("change_6h", abs(s.change("kp", 6) - (5.7 - 5.0)) < 1e-6, str(s.change("kp", 6)))
+        assert_true("change_9h", abs(s.change("kp", 9) - (5.7 - 2.7)) < 1e-6)
+        span = space_history.storm(s, 5.0)
+        assert_true("storm_span", span == (NOW - 6 * H, NOW + 3 * H, 9.0, 6.3), str(span))
+        assert_true("no_storm_below", space_history.storm(s, 5.0, NOW - 9 * H) is None)
+        assert_true("window_before_data", s.window("kp", 3, NOW - 40 * H) is None)
+
+        summary = space_history.kp_summary(now=NOW + H)
+        assert_true("summary", summary["storm_hours"] == 9.0 and summary["max_24h"] == 6.3, str(summary))
+        assert_true("stale_storm_dropped", space_history.kp_summary(now=NOW + 12 * H)["storm_hours"] is None)
+        assert_true("post_tail", post_common._kp_history_tail() == "; буря 9 ч", post_common._kp_history_tail())
+
+        space_history.ingest("plasma", [(NOW - 600, [420.0, 3.1]), (NOW - 300, [None, 4.0]), (NOW, [515.0, None])])
+        p = space_history.load("plasma")
+        assert_true("nan_kept", math.isnan(p.cols["speed"][1]) and p.latest("speed") == (NOW, 515.0))
+        assert_true("wind_window", p.window("speed", 1).n == 2 and p.window("density", 1).mean == 3.55)
+    print("PASS windows_trend_and_storm")
+
+
+def test_retention_rewrites_file() -> None:
+    with _History() as root:
+        old = [(NOW - 80 * 86400 + i * 3 * H, [2.0]) for i in range(8)]
+        space_history.ingest("kp", old, now=NOW - 79 * 86400)
+        assert_true("old_rows_stored", len(space_history.load("kp")) == 8)
+        space_history.ingest("kp", _kp_rows([3.0, 4.0]), now=NOW)
+        s = space_history.load("kp")
+        assert_true("old_rows_dropped", len(s) == 2 and s.epochs[0] == NOW - 3 * H, str(list(s.epochs)))
+        assert_true("header_kept", (root / "space_history_kp.bin").read_bytes()[:4] == b"VBS1")
+    print("PASS retention_rewrites_file")
+
+
+class _Resp:
+    def __init__(self, body):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self):
+        return json.loads(json.dumps(self._body))
+
+
+def _tag(ts: int) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_space_weather_ingests_new_bodies() -> None:
+    table = [["time_tag", "Kp", "a_running", "station_count"]] + [
+        [_tag(NOW - (6 - i) * 3 * H), str(v), "9", "8"] for i, v in enumerate([2.0, 2.3, 3.0, 4.0, 5.3, 5.7, 6.0])
+    ]
+    plasma = [{"time_tag": _tag(NOW - 300), "density": "4.2", "speed": "512.3", "temperature": "9"}]
+    bodies = {"noaa-planetary-k-index.json": table, "plasma-5-minute.json": plasma, "mag-5-minute.json": []}
+    calls: list[str] = []
+
+    def fake_get(url, headers=None, **_kw):
+        calls.append(url.rsplit("/", 1)[-1])
+        return _Resp(bodies[calls[-1]])
+
+    with _History(), tempfile.TemporaryDirectory() as tmp:
+        old = space_weather.SPACE_WEATHER_PATH, space_weather.http_get
+        try:
+            space_weather.SPACE_WEATHER_PATH = Path(tmp) / "space_weather.json"
+            space_weather.http_get = fake_get
+            space_weather.reset()
+            reading = space_weather.kp_observed()
+            space_weather.solar_wind()
+            s = space_history.load("kp")
+            assert_true("kp_ingested", len(s) == 7 and s.latest("kp") == (NOW, 6.0) and reading.trend == "↗", str(len(s)))
+            assert_true("plasma_ingested", space_history.load("plasma").latest("speed") == (NOW - 300, 512.3))
+
+            # новая таблица со сдвигом на одну строку: дописывается только она
+            table.append([_tag(NOW + 3 * H), "4.67", "9", "8"])
+            space_weather.reset()
+            Path(space_weather.SPACE_WEATHER_PATH).unlink()
+            space_weather.kp_observed()
+            s = space_history.load("kp")
+            assert_true("incremental_reingest", len(s) == 8 and s.latest("kp") == (NOW + 3 * H, 4.67), str(len(s)))
+            assert_true("calls", calls.count("noaa-planetary-k-index.json") == 2, str(calls))
+        finally:
+            space_weather.SPACE_WEATHER_PATH, space_weather.http_get = old
+            space_weather.reset()
+    print("PASS space_weather_ingests_new_bodies")
+
+
+def main() -> None:
+    test_ingest_is_incremental_and_deduplicated()
+    test_windows_trend_and_storm()
+    test_retention_rewrites_file()
+    test_space_weather_ingests_new_bodies()
+    print("OK: space history offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
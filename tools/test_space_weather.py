@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the shared SWPC space-weather cache and its typed accessors."""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import air  # noqa: E402
+import post_common  # noqa: E402
+import space_weather  # noqa: E402
+
+NOW = int(time.time())
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _tag(ts: int) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+KP_TABLE = [
+    ["time_tag", "Kp", "a_running", "station_count"],
+    [_tag(NOW - 6 * 3600), "2.33", "9", "8"],
+    [_tag(NOW - 3 * 3600), "3.67", "22", "8"],
+]
+KP_1M = [{"time_tag": _tag(NOW - 60).replace(" ", "T"), "kp_index": 4, "estimated_kp": 4.33}]
+TOMORROW = dt.datetime.fromtimestamp(NOW, dt.timezone.utc).date() + dt.timedelta(days=1)
+KP_FORECAST = [["time_tag", "kp", "observed", "noaa_scale"], [_tag(NOW - 3600), "6.00", "observed", "G2"]] + [
+    [f"{TOMORROW + dt.timedelta(days=d)} {h:02d}:00:00", str(2 + d + h / 24), "predicted", None]
+    for d in range(4)
+    for h in (0, 12, 21)
+]
+MAG = [["time_tag", "bx_gsm", "by_gsm", "bz_gsm", "lon_gsm", "lat_gsm", "bt"],
+       [_tag(NOW - 600), "1", "2", "-3.1", "0", "0", "5.5"],
+       [_tag(NOW - 300), "1", "2", "-7.2", "0", "0", "8.1"]]
+PLASMA = [{"time_tag": _tag(NOW - 300), "density": "4.2", "speed": "512.3", "temperature": "90000"},
+          {"time_tag": _tag(NOW - 60), "density": None, "speed": None, "temperature": None}]
+
+
+class _Resp:
+    def __init__(self, status: int, body=None, etag: str = ""):
+        self.status_code = status
+        self._body = body
+        self.headers = {"ETag": etag} if etag else {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return json.loads(json.dumps(self._body))
+
+
+class _SWPC:
+    """Подменяет space_weather.http_get; считает запросы по продуктам."""
+
+    BODIES = {"noaa-planetary-k-index.json": KP_TABLE, "planetary_k_index_1m.json": KP_1M,
+              "noaa-planetary-k-index-forecast.json": KP_FORECAST,
+              "mag-5-minute.json": MAG, "plasma-5-minute.json": PLASMA}
+
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+        self.down: set[str] = set()
+
+    def __call__(self, url, headers=None, **_kw):
+        name = url.rsplit("/", 1)[-1]
+        self.calls.append((name, dict(headers or {})))
+        if name in self.down or "*" in self.down:
+            raise ConnectionError("SWPC down")
+        if (headers or {}).get("If-None-Match") == f'"{name}"':
+            return _Resp(304)
+        return _Resp(200, self.BODIES[name], etag=f'"{name}"')
+
+    def count(self, name: str) -> int:
+        return sum(1 for n, _ in self.calls if n == name)
+
+
+class _Env:
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old = (space_weather.SPACE_WEATHER_PATH, space_weather.http_get, space_weather.SPACE_WEATHER_SWR_SEC)
+        space_weather.SPACE_WEATHER_PATH = Path(self.tmp.name) / "space_weather.json"
+        space_weather.SPACE_WEATHER_SWR_SEC = 0
+        self.swpc = space_weather.http_get = _SWPC()
+        space_weather.reset()
+        return self.swpc
+
+    def __exit__(self, *exc):
+        space_weather.SPACE_WEATHER_PATH, space_weather.http_get, space_weather.SPACE_WEATHER_SWR_SEC = self.old
+        space_weather.reset()
+        self.tmp.cleanup()
+        return False
+
+
+def _age_file(seconds: int) -> None:
+    raw = json.loads(space_weather.SPACE_WEATHER_PATH.read_text(encoding="utf-8"))
+    for entry in raw["products"].values():
+        entry["fetched_at"] -= seconds
+    space_weather.SPACE_WEATHER_PATH.write_text(json.dumps(raw), encoding="utf-8")
+    space_weather.reset()
+
+
+def test_accessors_parse_swpc_products() -> None:
+    with _Env():
+        kp = space_weather.kp_observed()
+        assert_true("kp_latest_row", kp is not None and kp.kp == 3.67 and kp.ts == NOW - 3 * 3600, str(kp))
+        assert_true("kp_trend_and_src", kp.trend == "↗" and kp.src == "swpc_table", str(kp))
+
+        days = space_weather.kp_forecast(3)
+        assert_true("forecast_three_days", [d.date for d in days] == [TOMORROW + dt.timedelta(days=i) for i in range(3)], str(days))
+        assert_true("forecast_daily_max", abs(days[0].kp_max - (2 + 21 / 24)) < 1e-9 and days[2].kp_max > days[0].kp_max, str(days))
+
+        sw = space_weather.solar_wind()
+        assert_true("solar_wind_values", (sw.bz, sw.bt, sw.speed_kms, sw.density) == (-7.2, 8.1, 512.3, 4.2), str(sw))
+        assert_true("solar_wind_ts_src", sw.ts == NOW - 300 and sw.src == "swpc_5m", str(sw))
+    print("PASS accessors_parse_swpc_products")
+
+
+def test_shared_file_one_set_of_calls() -> None:
+    with _Env() as swpc:
+        # утренний пост: Kp строкой post_common + get_kp + солнечный ветер
+        post_kp, age_min = post_common._fetch_world_kp()
+        air_kp = air.get_kp()
+        sw = air.get_solar_wind()
+        assert_true("post_common_kp", post_kp == 3.67 and 175 <= age_min <= 181, f"{post_kp} {age_min}")
+        assert_true("air_kp", air_kp == (3.67, "неспокойно", NOW - 3 * 3600, "swpc_table"), str(air_kp))
+        assert_true("air_solar_wind", sw["speed_kms"] == 512.3 and sw["status"] == "умеренно" and sw["src"] == "swpc_5m", str(sw))
+        first = len(swpc.calls)
+        assert_true("one_call_per_product", first == 3 and swpc.count("noaa-planetary-k-index.json") == 1, str(swpc.calls))
+
+        # другой процесс (world daily) с тем же файлом: сети нет вовсе
+        space_weather.reset()
+        assert_true("world_reads_file", space_weather.kp_observed().kp == 3.67 and space_weather.solar_wind() is not None)
+        assert_true("no_new_calls", len(swpc.calls) == first, str(swpc.calls[first:]))
+
+        # TTL истёк: условный запрос, 304 продлевает тело
+        _age_file(16 * 60)
+        assert_true("revalidated_value", space_weather.kp_observed().src == "swpc_table")
+        name, headers = swpc.calls[-1]
+        assert_true("conditional_request", name == "noaa-planetary-k-index.json" and headers.get("If-None-Match") == '"noaa-planetary-k-index.json"', str(swpc.calls[-1]))
+        n = len(swpc.calls)
+        space_weather.kp_observed()
+        assert_true("304_extends_freshness", len(swpc.calls) == n)
+    print("PASS shared_file_one_set_of_calls")
+
+
+def test_outage_falls_back_to_stale_bodies() -> None:
+    with _Env() as swpc:
+        space_weather.kp_observed()
+        space_weather.solar_wind()
+        _age_file(20 * 60)
+        swpc.down.add("*")
+        kp = space_weather.kp_observed()
+        assert_true("stale_kp_marked_cache", kp is not None and kp.kp == 3.67 and kp.src == "cache", str(kp))
+        assert_true("air_kp_from_cache", air.get_kp()[3] == "cache")
+        n = len(swpc.calls)
+        space_weather.kp_observed()
+        assert_true("failure_not_retried_at_once", len(swpc.calls) == n, str(swpc.calls[n:]))
+        assert_true("solar_wind_too_old", space_weather.solar_wind() is None and air.get_solar_wind() == {})
+
+        # табличный продукт лежит, 1-минутный отвечает
+        space_weather.reset()
+        _age_file(5 * 3600)
+        swpc.down = {"noaa-planetary-k-index.json"}
+        kp = space_weather.kp_observed()
+        assert_true("kp_1m_fallback", kp is not None and kp.src == "swpc_1m" and kp.kp == 4.0, str(kp))
+        swpc.down = {"*"}
+        space_weather.reset()
+        _age_file(5 * 3600)
+        assert_true("nothing_usable", space_weather.kp_observed() is None and post_common._fetch_world_kp() == (None, None))
+        assert_true("air_kp_nd", air.get_kp() == (None, "н/д", None, "n/d"))
+
+        space_weather.SPACE_WEATHER_PATH.write_text("{broken", encoding="utf-8")
+        space_weather.reset()
+        assert_true("broken_file_ignored", space_weather.kp_forecast() == [])
+    print("PASS outage_falls_back_to_stale_bodies")
+
+
+def main() -> None:
+    test_accessors_parse_swpc_products()
+    test_shared_file_one_set_of_calls()
+    test_outage_falls_back_to_stale_bodies()
+    print("OK: space weather offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the precomputed sun_times.json table and its lookup."""
+from __future__ import annotations
+
+import ast
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import post_common  # noqa: E402
+import sun_table  # noqa: E402
+
+TZ = pendulum.timezone("Asia/Nicosia")
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _post_cy_cities() -> dict:
+    tree = ast.parse((ROOT / "post_cy.py").read_text(encoding="utf-8"))
+    out: dict = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id in ("SEA_CITIES", "OTHER_CITIES_ALL") for t in node.targets
+        ):
+            out.update(ast.literal_eval(node.value))
+    return out
+
+
+def test_table_covers_post_cities() -> None:
+    assert_true("cities_match_post_cy", _post_cy_cities() == sun_table.CITIES, str(_post_cy_cities()))
+    sun_table.reset()
+    for name, (lat, lon) in sun_table.CITIES.items():
+        for day in (pendulum.date(2026, 1, 1), pendulum.date(2026, 6, 21), pendulum.date(2027, 12, 31)):
+            row = sun_table.lookup(lat, lon, day, TZ)
+            assert_true("table_has_city_day", row is not None and row.sunrise and row.sunset, f"{name} {day}")
+            noaa_sr, noaa_ss = post_common._noaa_sun_times(day, lat, lon, TZ)
+            for got, ref in ((row.sunrise, noaa_sr), (row.sunset, noaa_ss)):
+                assert_true("table_close_to_noaa", abs((got - ref).total_seconds()) < 180, f"{name} {got} vs {ref}")
+            assert_true("day_length", row.day_length == int((row.sunset - row.sunrise).total_seconds()))
+            assert_true("city_day_same_row", sun_table.city_day(name, day) == row)
+    summer = sun_table.city_day("Limassol", pendulum.date(2026, 6, 21)).day_length
+    winter = sun_table.city_day("Limassol", pendulum.date(2026, 12, 21)).day_length
+    assert_true("solstice_day_length", summer - winter > 4 * 3600, f"{summer} {winter}")
+    print("PASS table_covers_post_cities")
+
+
+def test_lookup_misses() -> None:
+    sun_table.reset()
+    day = pendulum.date(2026, 8, 10)
+    assert_true("unknown_point", sun_table.lookup(50.0, 10.0, day, TZ) is None)
+    assert_true("other_tz", sun_table.lookup(34.707, 33.022, day, pendulum.timezone("UTC")) is None)
+    assert_true("out_of_range", sun_table.lookup(34.707, 33.022, pendulum.date(2031, 1, 1), TZ) is None)
+    assert_true("unknown_city", sun_table.city_day("Kyrenia", day) is None)
+
+    old_path = sun_table.SUN_TABLE_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            sun_table.SUN_TABLE_PATH = Path(tmp) / "sun_times.json"
+            sun_table.reset()
+            assert_true("missing_file", sun_table.lookup(34.707, 33.022, day, TZ) is None)
+            sun_table.SUN_TABLE_PATH.write_text("{broken", encoding="utf-8")
+            sun_table.reset()
+            assert_true("broken_file", sun_table.lookup(34.707, 33.022, day, TZ) is None)
+        finally:
+            sun_table.SUN_TABLE_PATH = old_path
+            sun_table.reset()
+    print("PASS lookup_misses")
+
+
+def test_post_common_reads_table_first() -> None:
+    calls: list[tuple] = []
+    old = post_common.get_weather
+
+    def fake_weather(*args, **kwargs):
+        calls.append(args)
+        return {}
+
+    try:
+        post_common.get_weather = fake_weather
+        day = pendulum.date(2026, 8, 10)
+        sr, ss = post_common._sun_times_for_date(34.707, 33.022, day, TZ)
+        row = sun_table.lookup(34.707, 33.022, day, TZ)
+        assert_true("table_used", (sr, ss) == (row.sunrise, row.sunset) and not calls, str(calls))
+        sr2, _ = post_common._sun_times_for_date(34.5, 33.5, day, TZ)
+        assert_true("fallback_for_other_points", calls and sr2 is not None and sr2.date() == day)
+    finally:
+        post_common.get_weather = old
+    print("PASS post_common_reads_table_first")
+
+
+def main() -> None:
+    test_table_covers_post_cities()
+    test_lookup_misses()
+    test_post_common_reads_table_first()
+    print("OK: sun table offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -74,6 +74,7 @@ except Exception:  # pragma: no cover - lightweight local offline fallback
     pendulum.tz = types.SimpleNamespace(timezone=types.SimpleNamespace(Timezone=_OfflineTimezone))
     sys.modules["pendulum"] = pendulum
 
+requests_stub = None
 try:
     import requests  # noqa: F401
 except Exception:  # pragma: no cover - no network is used by this suite
@@ -94,6 +95,11 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+if requests_stub is not None:
+    import http_client  # noqa: E402
+
+    http_client._SESSION = requests_stub  # общий Session без настоящего requests
+
 import post_common as post_common_module  # noqa: E402
 from format_v2 import build_evening_format_v2  # noqa: E402
 from post_common import (  # noqa: E402
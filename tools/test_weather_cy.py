@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the Open-Meteo wrapper (batching and caching)."""
+from __future__ import annotations
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import weather  # noqa: E402
+
+
+def assert_true(name: str, cond: bool, detail: str = "") -> None:
+    if not cond:
+        raise AssertionError(f"{name}: {detail or 'assertion failed'}")
+
+
+def _payload(lat: float, lon: float, t0: float = 20.0) -> dict:
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "Asia/Nicosia",
+        "hourly": {
+            "time": ["2026-08-10T00:00", "2026-08-10T12:00", "2026-08-11T12:00"],
+            "temperature_2m": [t0, t0 + 8, t0 + 9],
+            "wind_speed_10m": [10.0, 18.0, 20.0],
+        },
+        "daily": {
+            "time": ["2026-08-10", "2026-08-11"],
+            "temperature_2m_max": [t0 + 8, t0 + 9],
+            "sunrise": ["2026-08-10T06:10", "2026-08-11T06:11"],
+        },
+    }
+
+
+class _Patched:
+    """Swap weather module attributes for the duration of a test."""
+
+    def __init__(self, **attrs):
+        self.attrs = attrs
+        self.old: dict = {}
+
+    def __enter__(self):
+        weather.clear_weather_memo()
+        for name, value in self.attrs.items():
+            self.old[name] = getattr(weather, name)
+            setattr(weather, name, value)
+        return self
+
+    def __exit__(self, *exc):
+        for name, value in self.old.items():
+            setattr(weather, name, value)
+        weather.clear_weather_memo()
+        return False
+
+
+def test_batch_request_fills_per_point_cache() -> None:
+    calls: list[str] = []
+    points = [(34.707, 33.022), (35.17, 33.36)]
+
+    def fake_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        return [_payload(la, lo, 20.0 + i) for i, (la, lo) in enumerate(points)]
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=fake_get):
+        out = weather.get_weather_many(points)
+        assert_true("batch_single_request", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("batch_coords_joined", "latitude=34.707,35.17" in calls[0], calls[0])
+        assert_true("batch_order", [p["daily"]["temperature_2m_max"][0] for p in out] == [28.0, 29.0])
+        assert_true("batch_aliases", "windspeed_10m" in out[1]["hourly"])
+        for la, lo in points:
+            path = weather._cache_path(la, lo, "auto")
+            assert_true("batch_cache_written", path.exists(), path.name)
+
+        again = weather.get_weather(35.17, 33.36)
+        assert_true("batch_cache_hit", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("batch_cache_payload", again["daily"]["temperature_2m_max"][0] == 29.0)
+    print("PASS batch_request_fills_per_point_cache")
+
+
+def test_batch_skips_fresh_points_and_stops_on_transport_error() -> None:
+    calls: list[str] = []
+
+    def failing_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        raise OSError("connection refused")
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=failing_get):
+        fresh = weather._cache_path(34.707, 33.022, "auto")
+        weather._write_cache(fresh, {"fetched_at": weather._now_ts(), "data": _payload(34.707, 33.022)})
+        assert_true("batch_all_fresh", weather.prefetch_weather([(34.707, 33.022)]) == 0)
+        assert_true("batch_all_fresh_no_http", not calls)
+
+        n = weather.prefetch_weather([(34.707, 33.022), (35.17, 33.36)], retries=0)
+        assert_true("batch_transport_error", n == 0)
+        assert_true("batch_one_attempt", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("batch_only_missing", "latitude=35.17&" in calls[0], calls[0])
+    print("PASS batch_skips_fresh_points_and_stops_on_transport_error")
+
+
+def test_batch_shape_mismatch_falls_through() -> None:
+    def short_get(url: str, timeout_sec: float, validators=None):
+        return [_payload(34.707, 33.022)]
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=short_get):
+        n = weather.prefetch_weather([(34.707, 33.022), (35.17, 33.36)], retries=0)
+        assert_true("batch_shape_mismatch", n == 0)
+        assert_true("batch_shape_no_cache", not any(Path(tmp).iterdir()))
+    print("PASS batch_shape_mismatch_falls_through")
+
+
+def _hourly_payload() -> dict:
+    times = [f"2026-08-{d:02d}T{h:02d}:00" for d in (9, 10, 11) for h in range(24)]
+    return {
+        "timezone": "Asia/Nicosia",
+        "utc_offset_seconds": 10800,
+        "hourly": {
+            "time": list(times),
+            "wind_speed_10m": [float(i % 30) for i in range(len(times))],
+            "wind_direction_10m": [float((i * 17) % 360) for i in range(len(times))],
+            "wind_gusts_10m": [float(i % 30) + 5.0 for i in range(len(times))],
+            "pressure_msl": [1000.0 + (i % 24) * 0.5 for i in range(len(times))],
+            "uv_index": [float(max(0, 12 - abs(12 - i % 24))) for i in range(len(times))],
+        },
+        "daily": {
+            "time": ["2026-08-09", "2026-08-10", "2026-08-11"],
+            "temperature_2m_max": [30.0, 31.0, 32.0],
+            "temperature_2m_min": [22.0, 23.0, 24.0],
+            "weather_code": [0, 1, 2],
+            "sunrise": ["2026-08-09T06:10", "2026-08-10T06:11", "2026-08-11T06:12"],
+            "sunset": ["2026-08-09T19:40", "2026-08-10T19:39", "2026-08-11T19:38"],
+        },
+    }
+
+
+def test_time_index_built_once_and_cached() -> None:
+    payload = weather._ensure_aliases(weather._normalize_times(_hourly_payload(), "auto"))
+    idx = weather.time_index_for(payload, "Asia/Nicosia")
+    assert_true("time_index_present", idx is not None)
+    assert_true("time_index_daily", idx["daily"] == {"2026-08-09": 0, "2026-08-10": 1, "2026-08-11": 2})
+    assert_true("time_index_range", weather.hourly_range_for_date(payload, "Asia/Nicosia", "2026-08-10") == range(24, 48))
+    assert_true("time_index_absent_date", weather.hourly_range_for_date(payload, "Asia/Nicosia", "2026-08-20") == range(0))
+    assert_true("time_index_other_tz", weather.hourly_range_for_date(payload, "UTC", "2026-08-10") is None)
+    epochs = payload["hourly"]["time_epoch"]
+    assert_true("time_index_epoch", epochs[24] == 1786309200, str(epochs[24]))
+    i, diff = weather.nearest_hourly_index(payload, "Asia/Nicosia", "2026-08-10", epochs[36] + 20 * 60)
+    assert_true("time_index_nearest", (i, diff) == (36, 1200), f"{i}, {diff}")
+
+    before = list(payload["hourly"]["time"])
+    again = weather._normalize_times(payload, "auto")
+    assert_true("time_index_skip_renormalize", again["hourly"]["time"] == before)
+    assert_true("time_index_keeps_local", again["hourly"]["time_local"][0] == "2026-08-09T00:00")
+    print("PASS time_index_built_once_and_cached")
+
+
+def test_time_index_skipped_for_malformed_hours() -> None:
+    raw = _hourly_payload()
+    raw["hourly"]["time"][5] = "not-an-hour"
+    payload = weather._normalize_times(raw, "Asia/Nicosia")
+    assert_true("time_index_malformed", "time_epoch" not in payload["hourly"])
+    assert_true("time_index_malformed_range", weather.hourly_range_for_date(payload, "Asia/Nicosia", "2026-08-10") is None)
+    assert_true("time_index_malformed_daily", weather.time_index_for(payload)["daily"]["2026-08-11"] == 2)
+    print("PASS time_index_skipped_for_malformed_hours")
+
+
+def test_post_common_indexed_lookups_match_parsing() -> None:
+    import pendulum
+    import post_common
+
+    tz = pendulum.timezone("Asia/Nicosia")
+    day = pendulum.date(2026, 8, 10)
+    indexed = weather._ensure_aliases(weather._normalize_times(_hourly_payload(), "auto"))
+    parsed = {key: value for key, value in indexed.items() if key != "time_index"}
+    parsed["hourly"] = {key: value for key, value in indexed["hourly"].items() if key != "time_epoch"}
+
+    for name, fn in (
+        ("header", lambda wm: post_common._city_header_metrics_for_date(wm, tz, day)),
+        ("daily", lambda wm: post_common._city_daily_metrics_for_date(wm, tz, day)),
+        ("sup", lambda wm: post_common._sup_weather_sample(wm, tz, day)),
+        ("uv_hourly", lambda wm: post_common._uv_max_for_date({**wm, "daily": {}}, tz, day)),
+    ):
+        assert_true(f"indexed_matches_{name}", fn(indexed) == fn(parsed), f"{fn(indexed)} != {fn(parsed)}")
+    print("PASS post_common_indexed_lookups_match_parsing")
+
+
+def test_memo_serves_repeat_calls_without_disk() -> None:
+    calls: list[str] = []
+
+    def fake_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        return _payload(34.707, 33.022)
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=fake_get):
+        first = weather.get_weather(34.707, 33.022)
+        for path in Path(tmp).iterdir():
+            path.unlink()
+        second = weather.get_weather(34.7071, 33.0219)
+        assert_true("memo_single_fetch", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("memo_same_data", second["daily"] == first["daily"])
+        second["extra"] = 1
+        assert_true("memo_top_level_copy", "extra" not in weather.get_weather(34.707, 33.022))
+        weather.get_weather(34.707, 33.022, tz_name="UTC")
+        assert_true("memo_keyed_by_tz", len(calls) == 2, f"calls={len(calls)}")
+    print("PASS memo_serves_repeat_calls_without_disk")
+
+
+def test_memo_coalesces_concurrent_fetches() -> None:
+    calls: list[str] = []
+
+    def slow_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        time.sleep(0.2)
+        return _payload(35.17, 33.36)
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=slow_get):
+        results: list[dict] = []
+        threads = [threading.Thread(target=lambda: results.append(weather.get_weather(35.17, 33.36))) for _ in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join(5)
+        assert_true("memo_coalesced", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("memo_all_served", len(results) == 4 and all(r.get("hourly") for r in results))
+    print("PASS memo_coalesces_concurrent_fetches")
+
+
+def test_not_modified_extends_cache() -> None:
+    calls: list[dict] = []
+
+    def conditional_get(url: str, timeout_sec: float, validators=None):
+        calls.append(dict(validators or {}))
+        return None  # 304
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=conditional_get):
+        url = weather._build_url(34.707, 33.022, "auto", weather.ATTEMPTS[0])
+        path = weather._cache_path(34.707, 33.022, "auto")
+        stale_ts = weather._now_ts() - 2 * weather.CACHE_TTL_SEC
+        weather._write_cache(path, {"fetched_at": stale_ts, "data": _payload(34.707, 33.022), "url": url, "etag": '"w1"'})
+        out = weather.get_weather(34.707, 33.022)
+        assert_true("not_modified_one_request", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("not_modified_validators_sent", calls[0] == {"etag": '"w1"'}, str(calls[0]))
+        assert_true("not_modified_payload", out["daily"]["temperature_2m_max"][0] == 28.0)
+        entry = weather._read_cache(path)
+        assert_true("not_modified_extended", entry["fetched_at"] > stale_ts and entry["etag"] == '"w1"')
+    print("PASS not_modified_extends_cache")
+
+
+def test_stale_while_revalidate() -> None:
+    calls: list[str] = []
+    release = threading.Event()
+
+    def slow_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        release.wait(5)
+        return _payload(34.707, 33.022, t0=25.0)
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=slow_get, SWR_SEC=3600):
+        path = weather._cache_path(34.707, 33.022, "auto")
+        soft_ts = weather._now_ts() - weather.CACHE_TTL_SEC - 60
+        weather._write_cache(path, {"fetched_at": soft_ts, "data": _payload(34.707, 33.022)})
+
+        t0 = time.monotonic()
+        out = weather.get_weather(34.707, 33.022)
+        assert_true("swr_immediate", time.monotonic() - t0 < 1.0)
+        assert_true("swr_stale_payload", out["daily"]["temperature_2m_max"][0] == 28.0)
+        assert_true("swr_prefetch_skips_soft", weather.prefetch_weather([(34.707, 33.022)]) == 0)
+        weather.get_weather(34.707, 33.022)
+        refresh = weather._REFRESHING.get(path)
+        assert_true("swr_refresh_started", refresh is not None and refresh.daemon)
+
+        release.set()
+        refresh.join(5)
+        assert_true("swr_single_refresh", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("swr_cache_refreshed", weather._read_cache(path)["fetched_at"] > soft_ts)
+        fresh = weather.get_weather(34.707, 33.022)
+        assert_true("swr_fresh_after_refresh", fresh["daily"]["temperature_2m_max"][0] == 33.0)
+
+        hard_ts = weather._now_ts() - weather.CACHE_TTL_SEC - 3600 - 60
+        weather._write_cache(path, {"fetched_at": hard_ts, "data": _payload(34.707, 33.022)})
+        weather.clear_weather_memo()
+        blocked = weather.get_weather(34.707, 33.022)
+        assert_true("swr_beyond_window_blocks", len(calls) == 2 and blocked["daily"]["temperature_2m_max"][0] == 33.0)
+    print("PASS stale_while_revalidate")
+
+
+def test_time_budget_caps_attempt_ladder() -> None:
+    timeouts: list[float] = []
+
+    def hanging_get(url: str, timeout_sec: float, validators=None):
+        timeouts.append(timeout_sec)
+        time.sleep(timeout_sec)
+        raise OSError("read timed out")
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(
+        CACHE_DIR=Path(tmp), _http_get_json=hanging_get, MIN_TRY_SEC=0.1, BACKOFF=0.05
+    ):
+        path = weather._cache_path(34.707, 33.022, "auto")
+        weather._write_cache(path, {"fetched_at": weather._now_ts() - 3 * 3600, "data": _payload(34.707, 33.022)})
+
+        t0 = time.monotonic()
+        out = weather.get_weather(34.707, 33.022, budget_sec=0.6)
+        spent = time.monotonic() - t0
+        assert_true("budget_bounded", spent < 0.9, f"spent={spent:.2f}")
+        assert_true("budget_stale_payload", out["daily"]["temperature_2m_max"][0] == 28.0)
+        n_tries = len(weather.ATTEMPTS) * (1 + weather.RETRIES)
+        assert_true("budget_fewer_tries", 0 < len(timeouts) < n_tries, f"tries={len(timeouts)}")
+        assert_true("budget_split", timeouts[0] <= 0.6 and sum(timeouts) <= 0.6 + 1e-6, str(timeouts))
+
+        # просторный бюджет: первая попытка получает обычный таймаут, повторы — долю остатка
+        weather.clear_weather_memo()
+        timeouts.clear()
+        with _Patched(_http_get_json=lambda url, timeout_sec, validators=None: timeouts.append(timeout_sec) or 1 / 0):
+            weather.get_weather(34.707, 33.022, budget_sec=45)
+        assert_true("budget_first_full_timeout", timeouts[0] == weather.TIMEOUT_SEC, str(timeouts))
+        assert_true("budget_retries_share", all(t <= weather.TIMEOUT_SEC for t in timeouts[1:]) and len(timeouts) > 1, str(timeouts))
+
+        weather.clear_weather_memo()
+        timeouts.clear()
+        with weather.weather_budget(0.05):
+            assert_true("budget_spent_prefetch", weather.prefetch_weather([(34.9, 33.6)]) == 0)
+            spent_out = weather.get_weather(34.707, 33.022)
+        assert_true("budget_spent_no_network", not timeouts, str(timeouts))
+        assert_true("budget_spent_cache", spent_out["daily"]["temperature_2m_max"][0] == 28.0)
+    print("PASS time_budget_caps_attempt_ladder")
+
+
+def test_binary_cache_round_trip() -> None:
+    raw = _hourly_payload()
+    raw["hourly"]["weather_code"] = [i % 4 for i in range(72)]
+    raw["hourly"]["temperature_2m"] = [None if i % 9 == 0 else 20.0 + (i % 12) / 10 for i in range(72)]
+    calls: list[str] = []
+
+    def fake_get(url: str, timeout_sec: float, validators=None):
+        calls.append(url)
+        return raw
+
+    with tempfile.TemporaryDirectory() as tmp, _Patched(CACHE_DIR=Path(tmp), _http_get_json=fake_get, CACHE_FORMAT="bin"):
+        first = weather.get_weather(34.707, 33.022)
+        json_path = weather._cache_path(34.707, 33.022, "auto")
+        bin_path = json_path.with_suffix(".bin")
+        assert_true("bin_written", bin_path.exists() and not json_path.exists())
+
+        weather.clear_weather_memo()
+        again = weather.get_weather(34.707, 33.022)
+        assert_true("bin_cache_hit", len(calls) == 1, f"calls={len(calls)}")
+        assert_true("bin_round_trip", again == first)
+        assert_true("bin_aliases", again["hourly"]["weathercode"] == again["hourly"]["weather_code"])
+        assert_true("bin_none_kept", again["hourly"]["temperature_2m"][0] is None)
+        assert_true("bin_ints_kept", type(again["hourly"]["weather_code"][1]) is int)
+
+        envelope = {"fetched_at": weather._now_ts(), "data": first}
+        assert_true("bin_smaller", bin_path.stat().st_size * 2 < len(weather.json.dumps(envelope)))
+        bin_path.write_bytes(b"garbage")
+        assert_true("bin_garbage_ignored", weather._read_cache(json_path) is None)
+
+    # переход на зимнее время, пропуски и «неудобные» колонки: decode == json.loads
+    times = [f"2026-10-24T{h:02d}:00" for h in range(24)] + [f"2026-10-25T{h:02d}:00" for h in range(24)]
+    odd = {
+        "timezone": "Asia/Nicosia",
+        "utc_offset_seconds": 10800,
+        "hourly": {
+            "time": times,
+            "temperature_2m": [21.5 - i / 10 for i in range(48)],
+            "precipitation": [None] * 40 + [0.25] * 8,
+            "visibility": [24140.0 + i * 1000 for i in range(48)],
+            "cloud_cover": [None if i % 7 == 0 else i for i in range(48)],
+            "cape": [i / 3 for i in range(48)],
+        },
+    }
+    payload = weather._ensure_aliases(weather._normalize_times(odd, "Asia/Nicosia"))
+    envelope = weather.json.loads(weather.json.dumps({"fetched_at": 1, "data": payload}))
+    raw_bin = weather._encode_cache_bin(envelope)
+    meta = weather.json.loads(raw_bin[8:8 + weather._BIN_HEAD.unpack_from(raw_bin)[1]])
+    assert_true("bin_dst_runs", len(meta["times"]["time"][1]) == 2 and not meta["payload"]["hourly"], str(meta["times"]))
+    codes = {k: v[0] for k, v in meta["cols"].items()}
+    assert_true("bin_codes", codes["temperature_2m"] == "h" and codes["visibility"] == "i" and codes["cape"] == "d", str(codes))
+    assert_true("bin_dst_round_trip", weather._decode_cache_bin(raw_bin) == envelope)
+    print("PASS binary_cache_round_trip")
+
+
+def main() -> None:
+    test_batch_request_fills_per_point_cache()
+    test_batch_skips_fresh_points_and_stops_on_transport_error()
+    test_batch_shape_mismatch_falls_through()
+    test_time_index_built_once_and_cached()
+    test_time_index_skipped_for_malformed_hours()
+    test_post_common_indexed_lookups_match_parsing()
+    test_memo_serves_repeat_calls_without_disk()
+    test_memo_coalesces_concurrent_fetches()
+    test_not_modified_extends_cache()
+    test_stale_while_revalidate()
+    test_time_budget_caps_attempt_ladder()
+    test_binary_cache_round_trip()
+    print("OK: weather offline checks passed")
+
+
+if __name__ == "__main__":
+    main()
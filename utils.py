@@ -22,11 +22,12 @@ utils.py  • Вспомогательные функции и констант
 """
 
 from __future__ import annotations
-import time
 import random
-import requests
 import pendulum
 from typing import Any, Dict, Optional, List
+
+from http_client import http_get_json
+
 __all__ = [
     "compass",
     "AIR_EMOJI",
@@ -484,29 +485,22 @@ _HEADERS = {
     "Accept":     "application/json",
 }
 
-def _get_retry(url: str, retries: int = 2, **params) -> Optional[dict]:
+def _get_retry(url: str, retries: int = 2, timeout: Optional[float] = None, **params) -> Optional[dict]:
     """
-    Повторяет запрос до retries раз (экспоненциальный бэкоф: 0.5, 1, 2 сек).
+    Повторяет запрос до retries раз через общий HTTP-клиент (http_client:
+    пул соединений, бэкоф 0.5, 1, 2 сек, повтор на 429/5xx).
     Возвращает JSON-словарь или None.
     """
-    attempt = 0
-    while attempt <= retries:
-        try:
-            r = requests.get(url, params=params, timeout=15, headers=_HEADERS)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            attempt += 1
-            if attempt > retries:
-                # логируем только после последней неудачной попытки
-                return None
-            time.sleep(0.5 * attempt)
-
-def _get(url: str, **params) -> Optional[dict]:
+    try:
+        return http_get_json(url, params=params, headers=_HEADERS, timeout=timeout or 15, retries=retries)
+    except Exception:
+        return None
+
+def _get(url: str, timeout: Optional[float] = None, **params) -> Optional[dict]:
     """
     Простая обёртка поверх _get_retry с двумя попытками.
     """
-    return _get_retry(url, retries=2, **params)
+    return _get_retry(url, retries=2, timeout=timeout, **params)
 
 # ─────────────────────── Module self-test ─────────────────────────────────
 
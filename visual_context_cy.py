@@ -4,7 +4,7 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 import re
 from typing import Any, Mapping, Optional
 
@@ -373,12 +373,75 @@ def _visual_forecast_period(
     return "representative_daytime"
 
 
+def _stated_facts(facts: Any, lines: list[str]) -> Any:
+    """
+    PostFacts narrowed to the city rows the text prints: a row names the city
+    and shows its «tmax/tmin °C» as post_common renders it; the sea temperature
+    counts only when «🌊 N» is on that row. FORMAT_V2 folds the morning city
+    rows into one greeting, so their facts must not outvote the final text.
+    """
+    stated = []
+    for city in facts.cities:
+        if city.tmax is None:
+            continue
+        temp_part = f"{city.tmax:.0f}/{city.tmin:.0f} °C" if city.tmin is not None else f"{city.tmax:.0f} °C"
+        label = str(city.label or city.name).lower()
+        row = next((line for line in lines if label in line.lower() and temp_part in line), None)
+        if row is None:
+            continue
+        if city.sst is not None and not re.search(rf"🌊\s*{city.sst:.0f}(?![\d.,])", row):
+            city = replace(city, sst=None)
+        stated.append(city)
+    return replace(facts, cities=stated)
+
+
+def _facts_numbers(facts: Any, lines: list[str]) -> dict[str, Any]:
+    """Numeric categories taken from PostFacts; an empty category is parsed from text."""
+    if facts is None:
+        return {}
+    facts = _stated_facts(facts, lines)
+    out: dict[str, Any] = {}
+    city_day_temps: dict[str, float] = {}
+    coastal_day_temps: list[float] = []
+    for city in facts.cities:
+        keys = _cities_in_line(f"{city.name} {city.label}".lower())
+        if city.tmax is None:
+            continue
+        for key in keys:
+            city_day_temps[key] = max(city_day_temps.get(key, city.tmax), city.tmax)
+        if city.coastal or set(keys) & _COASTAL_CITIES:
+            coastal_day_temps.append(city.tmax)
+    temps = facts.temps()
+    if temps:
+        # утреннее приветствие «Теплее всего — …» тоже печатает температуры
+        temps.extend(pair[1] for pair in (facts.warmest, facts.coolest) if pair)
+        out["temps"] = (temps, city_day_temps, coastal_day_temps)
+    winds, gusts = facts.reported_winds()
+    if winds or gusts:
+        # как в тексте: _WIND_RE видит и порывы, _GUST_RE — только порывы
+        out["winds"] = (winds + gusts, gusts)
+    if facts.uv_max is not None:
+        out["uv"] = [float(facts.uv_max)]
+    if facts.air.get("aqi") is not None:
+        out["aqi"] = [float(facts.air["aqi"])]
+    if facts.sea_temps():
+        out["sea_temps"] = facts.sea_temps()
+    return out
+
+
 def parse_visual_context_cy(
     text: str,
     post_type: Optional[str] = None,
     visibility_metadata: Optional[Mapping[str, Any]] = None,
+    facts: Any = None,
 ) -> VisualContextCY:
-    """Parse finalized Cyprus FORMAT_V2 text without network or model calls."""
+    """
+    Parse finalized Cyprus FORMAT_V2 text without network or model calls.
+
+    facts (post_facts.PostFacts) supplies temperatures, wind, UV, AQI and sea
+    temperature directly, city numbers only for the rows the text prints;
+    categories it lacks are still read from the text.
+    """
     if not isinstance(text, str):
         raise TypeError("text must be a string")
 
@@ -440,6 +503,21 @@ def parse_visual_context_cy(
     if visibility_condition == "dust_haze":
         weather_hits.add("dusty")
 
+    from_facts = _facts_numbers(facts, lines)
+    if "temps" in from_facts:
+        temps, city_day_temps, coastal_day_temps = (
+            list(from_facts["temps"][0]),
+            dict(from_facts["temps"][1]),
+            list(from_facts["temps"][2]),
+        )
+    if "winds" in from_facts:
+        winds, gusts = list(from_facts["winds"][0]), list(from_facts["winds"][1])
+    uv_values = list(from_facts.get("uv", uv_values))
+    aqi_values = list(from_facts.get("aqi", aqi_values))
+    sea_temps = list(from_facts.get("sea_temps", sea_temps))
+    if from_facts:
+        evidence["numeric_source"] = "post_facts:" + ",".join(sorted(from_facts))
+
     for line in lines:
         low = line.lower()
         cities = _cities_in_line(low)
@@ -460,65 +538,68 @@ def parse_visual_context_cy(
             coastal_lines.append(line)
             evidence["coastal_lines"].append(line)
 
-        day_night_values: list[float] = []
-        for match in _DAY_NIGHT_TEMP_RE.finditer(line):
-            pair = [_number(match.group(1)), _number(match.group(2))]
-            day_night_values.extend(pair)
-            evidence["temp_candidates"].append({"line": line, "values": pair})
-            if cities:
-                for city in cities:
-                    city_day_temps[city] = max(city_day_temps.get(city, pair[0]), pair[0])
-            if is_coastal:
-                coastal_day_temps.append(pair[0])
-        range_values: list[float] = []
-        if not day_night_values:
-            for match in _RANGE_RE.finditer(line):
+        if "temps" not in from_facts:
+            day_night_values: list[float] = []
+            for match in _DAY_NIGHT_TEMP_RE.finditer(line):
                 pair = [_number(match.group(1)), _number(match.group(2))]
-                range_values.extend(pair)
+                day_night_values.extend(pair)
                 evidence["temp_candidates"].append({"line": line, "values": pair})
-                if is_coastal:
-                    coastal_day_temps.extend(pair)
-        if day_night_values:
-            temps.extend(day_night_values)
-        elif range_values:
-            temps.extend(range_values)
-        else:
-            found_temps = [_number(match.group(1)) for match in _TEMP_RE.finditer(line)]
-            if found_temps:
-                temps.extend(found_temps)
-                evidence["temp_candidates"].append({"line": line, "values": found_temps})
                 if cities:
                     for city in cities:
-                        city_day_temps[city] = max(city_day_temps.get(city, found_temps[0]), found_temps[0])
+                        city_day_temps[city] = max(city_day_temps.get(city, pair[0]), pair[0])
                 if is_coastal:
-                    coastal_day_temps.append(found_temps[0])
-
-        for match in _WIND_RE.finditer(line):
-            value = _to_ms(match.group(1), match.group(2))
-            winds.append(value)
-            evidence["wind_candidates"].append(
-                {"line": line, "kind": "wind", "value_ms": round(value, 2)}
-            )
-        line_gusts: list[float] = []
-        for match in _GUST_RE.finditer(line):
-            value = _to_ms(match.group(1), match.group(2))
-            gusts.append(value)
-            line_gusts.append(value)
-            evidence["wind_candidates"].append(
-                {"line": line, "kind": "gust", "value_ms": round(value, 2)}
-            )
+                    coastal_day_temps.append(pair[0])
+            range_values: list[float] = []
+            if not day_night_values:
+                for match in _RANGE_RE.finditer(line):
+                    pair = [_number(match.group(1)), _number(match.group(2))]
+                    range_values.extend(pair)
+                    evidence["temp_candidates"].append({"line": line, "values": pair})
+                    if is_coastal:
+                        coastal_day_temps.extend(pair)
+            if day_night_values:
+                temps.extend(day_night_values)
+            elif range_values:
+                temps.extend(range_values)
+            else:
+                found_temps = [_number(match.group(1)) for match in _TEMP_RE.finditer(line)]
+                if found_temps:
+                    temps.extend(found_temps)
+                    evidence["temp_candidates"].append({"line": line, "values": found_temps})
+                    if cities:
+                        for city in cities:
+                            city_day_temps[city] = max(city_day_temps.get(city, found_temps[0]), found_temps[0])
+                    if is_coastal:
+                        coastal_day_temps.append(found_temps[0])
+
+        if "winds" not in from_facts:
+            for match in _WIND_RE.finditer(line):
+                value = _to_ms(match.group(1), match.group(2))
+                winds.append(value)
+                evidence["wind_candidates"].append(
+                    {"line": line, "kind": "wind", "value_ms": round(value, 2)}
+                )
+            line_gusts: list[float] = []
+            for match in _GUST_RE.finditer(line):
+                value = _to_ms(match.group(1), match.group(2))
+                gusts.append(value)
+                line_gusts.append(value)
+                evidence["wind_candidates"].append(
+                    {"line": line, "kind": "gust", "value_ms": round(value, 2)}
+                )
 
         humidity_values.extend(_number(m.group(1)) for m in _HUMIDITY_RE.finditer(line))
-        uv_line_values = [_number(m.group(1)) for m in _UV_RE.finditer(line)]
-        if uv_line_values:
-            uv_values.extend(uv_line_values)
-            evidence["uv_candidates"].append({"line": line, "values": uv_line_values})
-        aqi_values.extend(_number(m.group(1)) for m in _AQI_RE.finditer(line))
-
-        line_sea_temps = [_number(m.group(1)) for m in _SEA_TEMP_RE.finditer(line)]
-        line_sea_temps.extend(_number(m.group(1)) for m in _SEA_EMOJI_TEMP_RE.finditer(line))
-        if line_sea_temps:
-            sea_temps.extend(line_sea_temps)
+        if "uv" not in from_facts:
+            uv_line_values = [_number(m.group(1)) for m in _UV_RE.finditer(line)]
+            if uv_line_values:
+                uv_values.extend(uv_line_values)
+                evidence["uv_candidates"].append({"line": line, "values": uv_line_values})
+        if "aqi" not in from_facts:
+            aqi_values.extend(_number(m.group(1)) for m in _AQI_RE.finditer(line))
+
+        if "sea_temps" not in from_facts:
+            sea_temps.extend(_number(m.group(1)) for m in _SEA_TEMP_RE.finditer(line))
+            sea_temps.extend(_number(m.group(1)) for m in _SEA_EMOJI_TEMP_RE.finditer(line))
         if any(word in low for word in _COASTAL_WORDS):
             evidence["sea_lines"].append(line)
             if any(x in low for x in ("волн", "штиль", "спокойн", "бриз", "прибой")):
@@ -5,13 +5,27 @@ weather.py — Open‑Meteo wrapper with caching + fallbacks (VayboMeter).
 
 Goals:
 - Single stable entrypoint: get_weather(lat, lon, tz_name=None, cache_ttl_sec=None)
+- Batched variant: get_weather_many(points) — one Open‑Meteo request for all
+  coordinates (comma-separated latitude/longitude), split back into the same
+  per-coordinate cache entries get_weather() reads
 - Resilient HTTP: retries + timeouts, graceful fallback to cached payload
+- Deadline-aware ladder: get_weather(..., budget_sec=...) or a weather_budget()
+  block caps the whole spec/retry ladder; the first attempt keeps the usual
+  timeout, retries split the remaining time across the attempts still left and,
+  once it is spent, the stale cache is served at once
+- Optional stale-while-revalidate: a cache entry at most WEATHER_SWR_SEC past its
+  TTL is returned at once and refreshed in a background thread (bounded by
+  WEATHER_SWR_DEADLINE_SEC), so a slow Open‑Meteo stays off the critical path
 - Normalized schema: {current, hourly, daily} and backward‑compatible aliases:
     * hourly: wind_speed_10m + windspeed_10m, wind_direction_10m + winddirection_10m,
               wind_gusts_10m + windgusts_10m, weather_code + weathercode
     * daily:  weather_code + weathercode
 - Time strings are returned in ISO 8601 with timezone offset (safer parsing with pendulum).
   Original Open‑Meteo "local" times are preserved in *_local fields.
+- Hourly times are parsed once per fetch: hourly["time_epoch"] holds epoch seconds and
+  payload["time_index"] maps local dates to hourly index ranges / daily indices
+  (see hourly_range_for_date / nearest_hourly_index). Both are stored in the cache,
+  so cache hits skip re-parsing entirely.
 
 Env (optional):
   OPEN_METEO_URL            default: https://api.open-meteo.com/v1/forecast
@@ -20,10 +34,15 @@ Env (optional):
   WEATHER_RETRY_BACKOFF     default: 1.6
   WEATHER_CACHE_TTL_SEC     default: 1800
   WEATHER_TZ_DEFAULT        default: "auto"
+  WEATHER_MEMO_SIZE         default: 64  (in-process LRU entries; 0 disables)
+  WEATHER_SWR_SEC           default: 0   (stale-while-revalidate window past the TTL; 0 = off)
+  WEATHER_SWR_DEADLINE_SEC  default: 30  (hard time budget of one background refresh)
+  WEATHER_MIN_TRY_SEC       default: 2   (under a budget: no new attempt with less time left)
+  WEATHER_CACHE_FORMAT      default: json (or "bin": compact typed-array cache files)
   WEATHER_DEBUG             default: 0/1
 
 This module is intentionally dependency-light:
-- uses requests if installed, otherwise urllib
+- uses the shared pooled client (http_client.py) if requests is installed, otherwise urllib
 - uses pendulum if installed, otherwise keeps times as returned by Open‑Meteo
 """
 
@@ -32,13 +51,30 @@ from __future__ import annotations
 import json
 import logging
 import os
+import struct
+import sys
+import threading
 import time
 import urllib.parse
 import urllib.request
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from itertools import repeat
+from operator import truediv
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover - py<3.9
+    ZoneInfo = None  # type: ignore
+
 from visibility_context import (
     CyprusVisibilityContext,
     build_cyprus_visibility_line,
@@ -47,6 +83,8 @@ from visibility_context import (
     visibility_diagnostics,
 )
 
+from http_client import conditional_headers, http_get, response_validators
+
 try:
     import requests  # type: ignore
 except Exception:
@@ -69,6 +107,10 @@ TIMEOUT_SEC = float(os.getenv("WEATHER_TIMEOUT_SEC", "12") or "12")
 RETRIES = int(os.getenv("WEATHER_RETRIES", "2") or "2")
 BACKOFF = float(os.getenv("WEATHER_RETRY_BACKOFF", "1.6") or "1.6")
 CACHE_TTL_SEC = int(os.getenv("WEATHER_CACHE_TTL_SEC", "1800") or "1800")
+SWR_SEC = int(os.getenv("WEATHER_SWR_SEC", "0") or "0")
+SWR_DEADLINE_SEC = float(os.getenv("WEATHER_SWR_DEADLINE_SEC", "30") or "30")
+MIN_TRY_SEC = float(os.getenv("WEATHER_MIN_TRY_SEC", "2") or "2")
+CACHE_FORMAT = (os.getenv("WEATHER_CACHE_FORMAT") or "json").strip().lower()
 
 TZ_DEFAULT = (os.getenv("WEATHER_TZ_DEFAULT") or "auto").strip()
 DEBUG = str(os.getenv("WEATHER_DEBUG", "")).strip().lower() in ("1", "true", "yes", "on")
@@ -209,6 +251,10 @@ def _now_ts() -> int:
 
 
 def _read_cache(path: Path) -> Optional[Dict[str, Any]]:
+    if CACHE_FORMAT == "bin":
+        obj = _read_cache_bin(path.with_suffix(".bin"))
+        if obj is not None:
+            return obj
     try:
         if not path.exists():
             return None
@@ -221,13 +267,282 @@ def _read_cache(path: Path) -> Optional[Dict[str, Any]]:
 
 
 def _write_cache(path: Path, payload: Dict[str, Any]) -> None:
+    if CACHE_FORMAT == "bin" and _write_cache_bin(path.with_suffix(".bin"), payload):
+        try:
+            path.unlink()  # старый JSON рядом больше не нужен
+        except OSError:
+            pass
+        return
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
     except Exception:
         pass
 
 
+# ---------- Compact binary cache (WEATHER_CACHE_FORMAT=bin) ----------
+# File: b"VBW2" | uint32 meta length | meta JSON | zero pad to 8 | column blob.
+# meta = {"env": cache envelope without "data", "payload": payload skeleton,
+#         "cols": {hourly key: [typecode, offset, count, decimals, has None]},
+#         "times": {key: [fmt, [[first row, utc offset sec], ...]]},
+#         "byteorder": "little"|"big"}
+# Hourly columns are fixed-point integers: int16 ("h") or int32 ("i") with
+# the minimum sentinel as None; decimals = None keeps ints, decimals = k turns
+# x into x / 10**k (correctly rounded, so equal to the float JSON would give).
+# Floats that need more than _BIN_MAX_DECIMALS go as float64 ("d", NaN = None);
+# time_epoch is int64 ("q"). Decoding stays in C where it can (tolist() plus
+# map(truediv)); None sentinels are only searched in columns flagged as having them.
+# hourly time/time_local strings are rebuilt from epochs + UTC-offset runs
+# (no tz lookups, date prefix formatted once per day) when that reproduces
+# them exactly; aliases added by _ensure_aliases are dropped and re-added on read.
+_BIN_MAGIC = b"VBW2"
+_BIN_HEAD = struct.Struct("<4sI")
+_BIN_MAX_DECIMALS = 4
+_BIN_NONE = {"h": -(2 ** 15), "i": -(2 ** 31)}
+_BIN_ALIASES = {
+    "weathercode": "weather_code",
+    "windspeed_10m": "wind_speed_10m",
+    "winddirection_10m": "wind_direction_10m",
+    "windgusts_10m": "wind_gusts_10m",
+    "dew_point_2m": "dewpoint_2m",
+}
+_EPOCH_DATE = datetime(1970, 1, 1).date()
+
+
+def _bin_column(values: Any) -> Optional[Tuple[str, Optional[int], List[Any]]]:
+    """(typecode, decimals, values to pack) or None when the column stays in meta JSON."""
+    if not isinstance(values, list) or not values:
+        return None
+    has_float = False
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return None
+        if isinstance(v, float):
+            if v != v or v in (float("inf"), float("-inf")):
+                return None
+            has_float = True
+    present = [v for v in values if v is not None]
+    decimals: Optional[int] = None
+    ints = present
+    if has_float:
+        for k in range(_BIN_MAX_DECIMALS + 1):
+            scale = 10 ** k
+            scaled = [round(v * scale) for v in present]
+            if all(q / scale == v for q, v in zip(scaled, present)):
+                decimals, ints = k, scaled
+                break
+        else:
+            return "d", None, [float("nan") if v is None else float(v) for v in values]
+    lo, hi = min(ints, default=0), max(ints, default=0)
+    for code in ("h", "i"):
+        none = _BIN_NONE[code]
+        if none < lo and hi < -none:
+            packed = iter(ints)
+            return code, decimals, [none if v is None else next(packed) for v in values]
+    return ("d", None, [float("nan") if v is None else float(v) for v in values]) if has_float else None
+
+
+def _bin_offset_runs(epochs: List[int], tzi: tzinfo) -> List[List[int]]:
+    runs: List[List[int]] = []
+    for i, e in enumerate(epochs):
+        off = int(datetime.fromtimestamp(e, tzi).utcoffset().total_seconds())
+        if not runs or runs[-1][1] != off:
+            runs.append([i, off])
+    return runs
+
+
+def _bin_day(day: int) -> str:
+    return (_EPOCH_DATE + timedelta(days=day)).isoformat()
+
+
+@lru_cache(maxsize=64)
+def _bin_tail(fmt: str, off: int) -> str:
+    if fmt == "local":
+        return ""
+    if fmt == "isoz" and off == 0:
+        return "Z"
+    return datetime(2000, 1, 1, tzinfo=timezone(timedelta(seconds=off))).isoformat()[19:]
+
+
+@lru_cache(maxsize=64)
+def _bin_clock(fmt: str, off: int) -> Tuple[str, ...]:
+    """Time-of-day suffixes for whole hours 00..23 (with the offset tail)."""
+    tail = _bin_tail(fmt, off)
+    return tuple(f"T{h:02d}:00{'' if fmt == 'local' else ':00'}{tail}" for h in range(24))
+
+
+def _bin_format_times(epochs: List[int], runs: List[List[int]], fmt: str) -> List[str]:
+    """Hourly strings as Open-Meteo/_attach_time_index write them ("local", "iso", "isoz")."""
+    out: List[str] = []
+    stops = [r[0] for r in runs[1:]] + [len(epochs)]
+    for (start, off), stop in zip(runs, stops):
+        seg = epochs[start:stop]
+        if not seg:
+            continue
+        first = seg[0] + off
+        if first % 3600 == 0 and seg == list(range(seg[0], seg[0] + 3600 * len(seg), 3600)):
+            # обычный почасовой ряд: префикс даты + готовые «THH:MM» по суткам
+            clock = _bin_clock(fmt, off)
+            day, hour = divmod(first // 3600, 24)
+            left = len(seg)
+            while left > 0:
+                take = min(24 - hour, left)
+                out.extend(map(_bin_day(day).__add__, clock[hour:hour + take]))
+                left -= take
+                day, hour = day + 1, 0
+            continue
+        tail = _bin_tail(fmt, off)
+        for e in seg:
+            day, sec = divmod(e + off, 86400)
+            h, rest = divmod(sec, 3600)
+            m, sc = divmod(rest, 60)
+            hm = f"T{h:02d}:{m:02d}" if fmt == "local" else f"T{h:02d}:{m:02d}:{sc:02d}"
+            out.append(_bin_day(day) + hm + tail)
+    return out
+
+
+def _bin_tzinfo(payload: Dict[str, Any]) -> Optional[tzinfo]:
+    idx = time_index_for(payload)
+    return _payload_tzinfo(idx["tz"], payload) if idx else None
+
+
+def _encode_cache_bin(obj: Dict[str, Any]) -> bytes:
+    payload = obj.get("data")
+    if not isinstance(payload, dict):
+        raise ValueError("no payload")
+    skeleton = dict(payload)
+    hourly = dict(payload.get("hourly") or {})
+    daily = payload.get("daily")
+    if isinstance(daily, dict) and "weathercode" in daily and daily.get("weathercode") == daily.get("weather_code"):
+        skeleton["daily"] = {k: v for k, v in daily.items() if k != "weathercode"}
+    if skeleton.get("current_weather") is not None and skeleton.get("current_weather") == skeleton.get("current"):
+        skeleton.pop("current_weather")
+    for alias, src in _BIN_ALIASES.items():
+        if alias in hourly and src in hourly and hourly[alias] == hourly[src]:
+            hourly.pop(alias)
+
+    cols: Dict[str, List[Any]] = {}
+    times: Dict[str, List[Any]] = {}
+    blob = bytearray()
+
+    def put(name: str, code: str, decimals: Optional[int], values: List[Any], nulls: bool = False) -> None:
+        arr = array(code, values)
+        blob.extend(b"\0" * (-len(blob) % 8))
+        cols[name] = [code, len(blob), len(arr), decimals, nulls]
+        blob.extend(arr.tobytes())
+
+    epochs = hourly.get("time_epoch")
+    tzi = _bin_tzinfo(payload)
+    if isinstance(epochs, list) and epochs and all(isinstance(e, int) and not isinstance(e, bool) for e in epochs):
+        put("time_epoch", "q", None, hourly.pop("time_epoch"))
+        runs = _bin_offset_runs(epochs, tzi) if tzi is not None else []
+        for key in ("time", "time_local"):
+            if not runs or not isinstance(hourly.get(key), list):
+                continue
+            for fmt in ("local", "iso", "isoz"):
+                if _bin_format_times(epochs, runs, fmt) == hourly[key]:
+                    times[key] = [fmt, runs]
+                    hourly.pop(key)
+                    break
+    for key in list(hourly):
+        packed = _bin_column(hourly[key])
+        if packed is not None:
+            put(key, *packed, nulls=None in hourly.pop(key))
+    skeleton["hourly"] = hourly
+
+    meta = {
+        "env": {k: v for k, v in obj.items() if k != "data"},
+        "payload": skeleton,
+        "cols": cols,
+        "times": times,
+        "byteorder": sys.byteorder,
+    }
+    meta_raw = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = _BIN_HEAD.pack(_BIN_MAGIC, len(meta_raw)) + meta_raw
+    return head + b"\0" * (-len(head) % 8) + bytes(blob)
+
+
+def _bin_values(arr: array, code: str, decimals: Optional[int], nulls: bool) -> List[Any]:
+    if code == "d":
+        values = arr.tolist()
+        return [None if x != x else x for x in values] if nulls else values
+    if decimals:
+        values = list(map(truediv, arr.tolist(), repeat(10 ** decimals, len(arr))))
+    elif decimals == 0:
+        values = list(map(float, arr.tolist()))
+    else:
+        values = arr.tolist()
+    if nulls:
+        none = _BIN_NONE[code]
+        for i in [i for i, x in enumerate(arr) if x == none]:
+            values[i] = None
+    return values
+
+
+def _decode_cache_bin(raw: bytes) -> Dict[str, Any]:
+    magic, meta_len = _BIN_HEAD.unpack_from(raw)
+    if magic != _BIN_MAGIC:
+        raise ValueError("bad magic")
+    start = _BIN_HEAD.size
+    meta = json.loads(raw[start:start + meta_len].decode("utf-8"))
+    base = start + meta_len
+    base += -base % 8
+    view = memoryview(raw)
+    swap = meta.get("byteorder") != sys.byteorder
+
+    payload = meta["payload"]
+    hourly = payload.setdefault("hourly", {})
+    for name, (code, off, count, decimals, nulls) in meta["cols"].items():
+        arr = array(code)
+        arr.frombytes(view[base + off: base + off + arr.itemsize * count])
+        if swap:
+            arr.byteswap()
+        hourly[name] = _bin_values(arr, code, decimals, nulls)
+    for key, (fmt, runs) in (meta.get("times") or {}).items():
+        if "time_epoch" not in hourly:
+            raise ValueError("cannot rebuild hourly times")
+        hourly[key] = _bin_format_times(hourly["time_epoch"], runs, fmt)
+    return {**meta["env"], "data": _ensure_aliases(payload)}
+
+
+def _read_cache_bin(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        return _decode_cache_bin(raw)
+    except Exception as e:
+        if DEBUG:
+            LOG.warning("weather: unreadable binary cache %s: %s", path.name, e)
+        return None
+
+
+def _write_cache_bin(path: Path, obj: Dict[str, Any]) -> bool:
+    try:
+        raw = _encode_cache_bin(obj)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, path)
+        return True
+    except Exception as e:
+        if DEBUG:
+            LOG.warning("weather: binary cache write failed (%s): %s", path.name, e)
+        return False
+
+
+def _cached_validators(obj: Optional[Dict[str, Any]], url: str) -> Dict[str, str]:
+    """Validators stored with the cache entry, only if it was fetched from the same URL."""
+    if not isinstance(obj, dict) or obj.get("url") != url:
+        return {}
+    return {k: str(obj[k]) for k in ("etag", "last_modified") if obj.get(k)}
+
+
 def _unwrap_cached(obj: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
     """
     Cache schema:
@@ -246,10 +561,25 @@ def _unwrap_cached(obj: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optio
 
 
 # ---------- HTTP layer ----------
-def _http_get_json(url: str, timeout_sec: float) -> Dict[str, Any]:
+def _http_get_json(
+    url: str,
+    timeout_sec: float,
+    validators: Optional[Dict[str, str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    GET JSON. With `validators` (etag/last_modified of the cached body for this
+    URL) the request is conditional: 304 returns None, and on 200 the dict is
+    refreshed in place with the new validators.
+    """
     if requests is not None:
-        r = requests.get(url, timeout=timeout_sec, headers={"User-Agent": "VayboMeter/1.0"})
+        # повторы делает лестница ATTEMPTS, поэтому у клиента retries=0
+        r = http_get(url, timeout=timeout_sec, retries=0, headers=conditional_headers(validators) or None)
+        if validators and r.status_code == 304:
+            return None
         r.raise_for_status()
+        if validators is not None:
+            validators.clear()
+            validators.update(response_validators(r))
         return r.json()
     with urllib.request.urlopen(url, timeout=timeout_sec) as resp:
         raw = resp.read().decode("utf-8")
@@ -281,6 +611,43 @@ def _build_url(
     return f"{OPEN_METEO_URL}?{qs}"
 
 
+def _build_url_many(
+    points: List[Tuple[float, float]],
+    tz_name: str,
+    spec: _AttemptSpec,
+    forecast_days: int = 8,
+) -> str:
+    """Same query as _build_url(), but with comma-separated coordinate lists."""
+    params: Dict[str, Any] = {
+        "latitude": ",".join(str(float(la)) for la, _ in points),
+        "longitude": ",".join(str(float(lo)) for _, lo in points),
+        "timezone": tz_name or TZ_DEFAULT,
+        "forecast_days": int(forecast_days),
+        "hourly": ",".join(spec.hourly),
+        "daily": ",".join(spec.daily),
+    }
+
+    if spec.current_mode == "current":
+        params["current"] = ",".join(spec.current_fields or CURRENT_MIN)
+    else:
+        params["current_weather"] = "true"
+
+    qs = urllib.parse.urlencode(params, safe=",:")
+    return f"{OPEN_METEO_URL}?{qs}"
+
+
+def _split_many(obj: Any, expected: int) -> Optional[List[Any]]:
+    """
+    Open‑Meteo answers a multi-location query with a JSON list in request order
+    (a single location still comes back as a plain object).
+    """
+    if isinstance(obj, list):
+        return obj if len(obj) == expected else None
+    if isinstance(obj, dict) and expected == 1:
+        return [obj]
+    return None
+
+
 # ---------- Normalization ----------
 def _localize_time_list(times: List[Any], tz_name: str) -> Tuple[List[str], List[str]]:
     """
@@ -360,15 +727,148 @@ def _resolve_tz_name(requested_tz: Optional[str], payload: Dict[str, Any]) -> st
     return tz or "auto"
 
 
+# ---------- Time index ----------
+TIME_INDEX_VERSION = 1
+
+
+def _payload_tzinfo(tz_eff: str, payload: Dict[str, Any]) -> Optional[tzinfo]:
+    if ZoneInfo is not None and tz_eff and tz_eff.lower() != "auto":
+        try:
+            return ZoneInfo(tz_eff)
+        except Exception:
+            pass
+    off = payload.get("utc_offset_seconds")
+    if isinstance(off, (int, float)):
+        return timezone(timedelta(seconds=int(off)))
+    return None
+
+
+def _attach_time_index(payload: Dict[str, Any], tz_eff: str) -> None:
+    """
+    Parse hourly times once and store:
+      hourly["time_epoch"]  — epoch seconds per hourly row
+      payload["time_index"] — {"v", "tz", "hourly": {date: [start, stop]}, "daily": {date: i}}
+
+    The hourly map is only attached when every timestamp parses and each local
+    date forms one contiguous run; otherwise lookups fall back to parsing.
+    """
+    index: Dict[str, Any] = {"v": TIME_INDEX_VERSION, "tz": tz_eff, "daily": {}}
+
+    daily = payload.get("daily")
+    if isinstance(daily, dict):
+        dtimes = daily.get("time") or daily.get("date") or []
+        if isinstance(dtimes, list):
+            for i, t in enumerate(dtimes):
+                key = str(t or "")[:10]
+                if key and key not in index["daily"]:
+                    index["daily"][key] = i
+
+    hourly = payload.get("hourly")
+    times = hourly.get("time") if isinstance(hourly, dict) else None
+    tzi = _payload_tzinfo(tz_eff, payload)
+    if isinstance(times, list) and times and tzi is not None:
+        epochs: List[int] = []
+        ranges: Dict[str, List[int]] = {}
+        last_key: Optional[str] = None
+        ok = True
+        for i, t in enumerate(times):
+            try:
+                dt_i = datetime.fromisoformat(str(t))
+            except (TypeError, ValueError):
+                ok = False
+                break
+            if dt_i.tzinfo is None:
+                dt_i = dt_i.replace(tzinfo=tzi)
+            epochs.append(int(dt_i.timestamp()))
+            key = dt_i.astimezone(tzi).date().isoformat()
+            if key != last_key:
+                if key in ranges:
+                    ok = False
+                    break
+                ranges[key] = [i, i + 1]
+                last_key = key
+            else:
+                ranges[key][1] = i + 1
+        if ok and all(a < b for a, b in zip(epochs, epochs[1:])):
+            hourly["time_epoch"] = epochs
+            index["hourly"] = ranges
+
+    payload["time_index"] = index
+
+
+def time_index_for(payload: Any, tz_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Return payload["time_index"] if present (and built for tz_name, when given)."""
+    if not isinstance(payload, dict):
+        return None
+    idx = payload.get("time_index")
+    if not isinstance(idx, dict) or idx.get("v") != TIME_INDEX_VERSION:
+        return None
+    if tz_name is not None and idx.get("tz") != tz_name:
+        return None
+    return idx
+
+
+def _date_key(date_obj: Any) -> str:
+    try:
+        return date_obj.isoformat()[:10]
+    except Exception:
+        return str(date_obj)[:10]
+
+
+def hourly_range_for_date(payload: Any, tz_name: str, date_obj: Any) -> Optional[range]:
+    """
+    Hourly row indices for one local date via the precomputed index.
+
+    None means "no usable index" (caller should fall back to parsing);
+    an empty range means the index knows the date is absent.
+    """
+    idx = time_index_for(payload, tz_name)
+    ranges = idx.get("hourly") if idx else None
+    if not isinstance(ranges, dict):
+        return None
+    span = ranges.get(_date_key(date_obj))
+    return range(span[0], span[1]) if span else range(0)
+
+
+def nearest_hourly_index(
+    payload: Any,
+    tz_name: str,
+    date_obj: Any,
+    target_ts: int,
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Bisect for the hourly row of `date_obj` closest to epoch `target_ts`.
+    Returns (index, abs diff in seconds); (None, None) if the date has no rows.
+    Ties go to the earlier row, like the linear scans in post_common.
+    """
+    rng = hourly_range_for_date(payload, tz_name, date_obj)
+    if not rng:
+        return None, None
+    epochs = payload["hourly"]["time_epoch"]
+    pos = bisect_left(epochs, target_ts, rng.start, rng.stop)
+    best_i: Optional[int] = None
+    best_diff: Optional[int] = None
+    for i in (pos - 1, pos):
+        if rng.start <= i < rng.stop:
+            diff = abs(epochs[i] - target_ts)
+            if best_diff is None or diff < best_diff:
+                best_i, best_diff = i, diff
+    return best_i, best_diff
+
+
 def _normalize_times(payload: Dict[str, Any], tz_name: str) -> Dict[str, Any]:
     """
     Convert time-like fields to ISO strings with timezone offset (if possible),
-    preserving original local time lists in *_local fields.
+    preserving original local time lists in *_local fields, and attach the
+    parsed time index. Payloads already indexed for this tz (cache hits) are
+    returned untouched.
     """
     if not isinstance(payload, dict):
         return payload
 
     tz_eff = _resolve_tz_name(tz_name, payload)
+    if time_index_for(payload, tz_eff) is not None:
+        return payload
 
     hourly = payload.get("hourly")
     if isinstance(hourly, dict):
@@ -396,6 +896,8 @@ def _normalize_times(payload: Dict[str, Any], tz_name: str) -> Dict[str, Any]:
         if t_off:
             cur["time_local"] = t_local[0]
             cur["time"] = t_off[0]
+
+    _attach_time_index(payload, tz_eff)
     return payload
 
 
@@ -411,12 +913,150 @@ def _is_error_payload(obj: Any) -> bool:
     return False
 
 
+# ---------- In-process memo ----------
+# Per-process LRU over get_weather(): keyed by (rounded lat, lon, tz), holds the
+# already-normalized payload while it is within the caller's TTL. Concurrent
+# callers for a key that is being fetched wait for that single fetch.
+# The on-disk cache remains the cross-run layer.
+MEMO_SIZE = int(os.getenv("WEATHER_MEMO_SIZE", "64") or "64")
+
+_MEMO: "OrderedDict[Tuple[str, str, str], Tuple[Dict[str, Any], int]]" = OrderedDict()
+_INFLIGHT: Dict[Tuple[str, str, str], threading.Event] = {}
+_MEMO_LOCK = threading.Lock()
+
+
+def _memo_key(lat: float, lon: float, tz_name: str) -> Tuple[str, str, str]:
+    return _norm_coord(lat), _norm_coord(lon), tz_name
+
+
+def _memo_get(key: Tuple[str, str, str], ttl: int) -> Optional[Dict[str, Any]]:
+    """Caller holds _MEMO_LOCK."""
+    hit = _MEMO.get(key)
+    if hit is None:
+        return None
+    payload, fetched_at = hit
+    if _now_ts() - fetched_at > ttl:
+        return None
+    _MEMO.move_to_end(key)
+    return payload
+
+
+def _memo_put(key: Tuple[str, str, str], payload: Dict[str, Any], fetched_at: Optional[int]) -> None:
+    if MEMO_SIZE <= 0 or not payload or not isinstance(fetched_at, int):
+        return
+    with _MEMO_LOCK:
+        _MEMO[key] = (payload, fetched_at)
+        _MEMO.move_to_end(key)
+        while len(_MEMO) > MEMO_SIZE:
+            _MEMO.popitem(last=False)
+
+
+def clear_weather_memo() -> None:
+    """Drop the in-process memo (disk cache is untouched)."""
+    with _MEMO_LOCK:
+        _MEMO.clear()
+
+
+# ---------- Stale-while-revalidate ----------
+# One background refresh per cache file. Threads are daemon (as in
+# space_weather.py): a refresh still running at exit is dropped instead of
+# holding the post run; cache writes are atomic, so the next run sees either
+# the old entry or the refreshed one.
+_REFRESHING: Dict[Path, threading.Thread] = {}
+
+
+def _soft_stale(cached_ts: Optional[int], ttl: int) -> bool:
+    if SWR_SEC <= 0 or not isinstance(cached_ts, int):
+        return False
+    return ttl < _now_ts() - cached_ts <= ttl + SWR_SEC
+
+
+def _refresh_in_background(lat: float, lon: float, tz_name_eff: str) -> None:
+    path = _cache_path(lat, lon, tz_name_eff)
+
+    def run() -> None:
+        try:
+            deadline = time.monotonic() + SWR_DEADLINE_SEC
+            payload, fetched_at = _fetch_weather(lat, lon, tz_name_eff, 0, deadline=deadline, revalidate=False)
+            _memo_put(_memo_key(lat, lon, tz_name_eff), payload, fetched_at)
+        except Exception as e:
+            LOG.warning("weather: background refresh failed (%s): %s", path.name, e)
+        finally:
+            with _MEMO_LOCK:
+                _REFRESHING.pop(path, None)
+
+    with _MEMO_LOCK:
+        if path in _REFRESHING:
+            return
+        th = _REFRESHING[path] = threading.Thread(target=run, name=f"weather-swr-{path.stem}", daemon=True)
+    th.start()
+
+
+# ---------- Time budget ----------
+# Deadline (time.monotonic()) shared by every get_weather()/prefetch_weather()
+# call in the current context. Worker threads see it only when they run in a
+# copy of the context (contextvars.copy_context().run), as post_common does.
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("weather_deadline", default=None)
+
+
+@contextmanager
+def weather_budget(seconds: Optional[float]):
+    """
+    Give all weather fetches inside the block one overall time budget.
+    Nested blocks can only shorten the deadline; None/<=0 leaves it as is.
+    """
+    deadline = _DEADLINE.get()
+    if seconds is not None and seconds > 0:
+        own = time.monotonic() + float(seconds)
+        deadline = own if deadline is None else min(deadline, own)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(token)
+
+
+def _effective_deadline(budget_sec: Optional[float] = None) -> Optional[float]:
+    deadline = _DEADLINE.get()
+    if budget_sec is not None and budget_sec > 0:
+        own = time.monotonic() + float(budget_sec)
+        deadline = own if deadline is None else min(deadline, own)
+    return deadline
+
+
+def _try_timeout(deadline: Optional[float], tries_left: int, first: bool = False) -> Optional[float]:
+    """
+    Timeout for the next attempt: without a deadline TIMEOUT_SEC. Under a
+    deadline the first attempt still gets TIMEOUT_SEC (capped by the time left),
+    so a slow but healthy Open-Meteo answer is not cut off; retries get a fair
+    share of the remaining time over the attempts still left (at least
+    MIN_TRY_SEC). None when the budget cannot fit another attempt.
+    """
+    if deadline is None:
+        return TIMEOUT_SEC
+    left = deadline - time.monotonic()
+    if left < MIN_TRY_SEC:
+        return None
+    if first:
+        return min(TIMEOUT_SEC, left)
+    return min(TIMEOUT_SEC, left, max(MIN_TRY_SEC, left / max(1, tries_left)))
+
+
+def _backoff(t: int, deadline: Optional[float]) -> None:
+    delay = BACKOFF ** t
+    if deadline is not None:
+        delay = min(delay, max(0.0, deadline - time.monotonic()))
+    if delay > 0:
+        time.sleep(delay)
+
+
 # ---------- Public API ----------
 def get_weather(
     lat: float,
     lon: float,
     tz_name: Optional[str] = None,
     cache_ttl_sec: Optional[int] = None,
+    budget_sec: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Fetch Open‑Meteo forecast payload for (lat, lon).
@@ -426,11 +1066,73 @@ def get_weather(
       - "daily":  {"time": [...], ...}
     plus "current"/"current_weather" when available.
 
+    Repeated calls within one process are served from the in-process memo:
+    the returned dict is a fresh top-level copy, nested hourly/daily lists are
+    shared and must be treated as read-only.
+
+    `budget_sec` (and/or an enclosing weather_budget() block — the earlier
+    deadline wins) bounds the whole attempt ladder, waiting on another
+    thread's fetch of the same point included.
+
     On network errors, returns cached payload if not too stale; otherwise {}.
     """
     tz_name_eff = (tz_name or TZ_DEFAULT or "auto").strip() or "auto"
     ttl = int(cache_ttl_sec) if isinstance(cache_ttl_sec, int) and cache_ttl_sec > 0 else CACHE_TTL_SEC
+    deadline = _effective_deadline(budget_sec)
+
+    if MEMO_SIZE <= 0:
+        return _fetch_weather(lat, lon, tz_name_eff, ttl, deadline=deadline)[0]
+
+    key = _memo_key(lat, lon, tz_name_eff)
+    while True:
+        with _MEMO_LOCK:
+            hit = _memo_get(key, ttl)
+            if hit is not None:
+                return dict(hit)
+            waiter = _INFLIGHT.get(key)
+            if waiter is None:
+                done = _INFLIGHT[key] = threading.Event()
+                break
+        # Someone else is fetching this key: wait, then re-check the memo.
+        # If that fetch failed, the loop lets this caller run its own ladder.
+        if deadline is None:
+            waiter.wait()
+        elif not waiter.wait(max(0.0, deadline - time.monotonic())):
+            # бюджет кончился раньше чужого запроса — только кэш, без сети
+            return _fetch_weather(lat, lon, tz_name_eff, ttl, deadline=deadline)[0]
+        with _MEMO_LOCK:
+            hit = _memo_get(key, ttl)
+            if hit is not None:
+                return dict(hit)
+            if key not in _INFLIGHT:
+                done = _INFLIGHT[key] = threading.Event()
+                break
+
+    try:
+        payload, fetched_at = _fetch_weather(lat, lon, tz_name_eff, ttl, deadline=deadline)
+        _memo_put(key, payload, fetched_at)
+        return dict(payload) if payload else payload
+    finally:
+        with _MEMO_LOCK:
+            _INFLIGHT.pop(key, None)
+        done.set()
+
 
+def _fetch_weather(
+    lat: float,
+    lon: float,
+    tz_name_eff: str,
+    ttl: int,
+    deadline: Optional[float] = None,
+    revalidate: bool = True,
+) -> Tuple[Dict[str, Any], Optional[int]]:
+    """
+    Disk cache → (soft-stale cache + background refresh) → network ladder → stale cache.
+    Returns (payload, fetched_at). `deadline` (time.monotonic()) is split across
+    the attempts left in the ladder (see _try_timeout); once it cannot fit another
+    attempt the ladder stops and the stale cache is served. `revalidate=False`
+    is the background refresh itself (no nested SWR).
+    """
     cache_path = _cache_path(lat, lon, tz_name_eff)
     cached_obj = _read_cache(cache_path)
     cached_payload, cached_ts = _unwrap_cached(cached_obj) if cached_obj else (None, None)
@@ -443,30 +1145,53 @@ def get_weather(
                 LOG.info("weather: cache hit %s (age=%ss)", cache_path.name, age)
             out = dict(cached_payload)
             out = _ensure_aliases(_normalize_times(out, tz_name_eff))
-            return out
+            return out, cached_ts
+        if revalidate and _soft_stale(cached_ts, ttl):
+            if DEBUG:
+                LOG.info("weather: soft-stale hit %s (age=%ss), refreshing in background", cache_path.name, age)
+            _refresh_in_background(lat, lon, tz_name_eff)
+            return _ensure_aliases(_normalize_times(dict(cached_payload), tz_name_eff)), cached_ts
 
     last_err: Optional[str] = None
+    tries = 1 + max(0, RETRIES)
 
     for attempt_idx, spec in enumerate(ATTEMPTS):
+        if last_err == "deadline":
+            break
         url = _build_url(lat, lon, tz_name_eff, spec)
-        tries = 1 + max(0, RETRIES)
         for t in range(tries):
+            timeout_sec = _try_timeout(deadline, (len(ATTEMPTS) - attempt_idx) * tries - t, attempt_idx == t == 0)
+            if timeout_sec is None:
+                last_err = "deadline"
+                break
             try:
                 if DEBUG:
                     LOG.info("weather: fetch attempt=%s.%s", attempt_idx + 1, t + 1)
-                obj = _http_get_json(url, timeout_sec=TIMEOUT_SEC)
+                validators = _cached_validators(cached_obj, url)
+                obj = _http_get_json(url, timeout_sec=timeout_sec, validators=validators)
+                if obj is None and cached_payload is not None:
+                    # 304 Not Modified: тело то же — просто продлеваем свежесть кэша
+                    fetched_at = _now_ts()
+                    _write_cache(cache_path, {**cached_obj, "fetched_at": fetched_at})
+                    if DEBUG:
+                        LOG.info("weather: 304, cache extended %s", cache_path.name)
+                    return _ensure_aliases(_normalize_times(dict(cached_payload), tz_name_eff)), fetched_at
                 if _is_error_payload(obj):
                     last_err = f"api_error:{obj.get('reason') or 'unknown'}"
                     if DEBUG:
                         LOG.warning("weather: api error payload (%s)", last_err)
                     break  # move to next spec
                 obj2 = _ensure_aliases(_normalize_times(obj, tz_name_eff))
-                _write_cache(cache_path, {"fetched_at": _now_ts(), "data": obj2})
-                return obj2
+                fetched_at = _now_ts()
+                entry: Dict[str, Any] = {"fetched_at": fetched_at, "data": obj2}
+                if validators:
+                    entry.update(url=url, **validators)
+                _write_cache(cache_path, entry)
+                return obj2, fetched_at
             except Exception as e:
                 last_err = str(e)
                 if t < tries - 1:
-                    time.sleep(BACKOFF ** t)
+                    _backoff(t, deadline)
                 else:
                     if DEBUG:
                         LOG.warning("weather: fetch failed (spec=%s, err=%s)", attempt_idx + 1, e)
@@ -478,11 +1203,121 @@ def get_weather(
                 LOG.warning("weather: using stale cache (%s), last_err=%s", cache_path.name, last_err)
             out = dict(cached_payload)
             out = _ensure_aliases(_normalize_times(out, tz_name_eff))
-            return out
+            return out, cached_ts
 
     if DEBUG:
         LOG.error("weather: no data (last_err=%s)", last_err)
-    return {}
+    return {}, None
+
+
+def prefetch_weather(
+    points: List[Tuple[float, float]],
+    tz_name: Optional[str] = None,
+    cache_ttl_sec: Optional[int] = None,
+    retries: Optional[int] = None,
+) -> int:
+    """
+    Warm the per-coordinate disk cache for several points with one request.
+
+    Points whose cache is still fresh (or, with WEATHER_SWR_SEC, soft-stale —
+    get_weather() serves those at once and refreshes them in the background)
+    are skipped; the rest go out as a single
+    multi-location query and every returned payload is written to the same
+    .cache/weather_*.json entry get_weather() would use. Transport errors stop
+    the attempt ladder early (they are not spec-specific) — points that were
+    not filled are simply left for get_weather() and its own fallbacks.
+
+    An enclosing weather_budget() bounds the ladder the same way as in
+    get_weather().
+
+    Returns the number of points written to cache.
+    """
+    tz_name_eff = (tz_name or TZ_DEFAULT or "auto").strip() or "auto"
+    ttl = int(cache_ttl_sec) if isinstance(cache_ttl_sec, int) and cache_ttl_sec > 0 else CACHE_TTL_SEC
+    extra = RETRIES if retries is None else int(retries)
+    deadline = _effective_deadline()
+
+    missing: List[Tuple[float, float]] = []
+    seen: set = set()
+    for la, lo in points or []:
+        try:
+            la, lo = float(la), float(lo)
+        except (TypeError, ValueError):
+            continue
+        path = _cache_path(la, lo, tz_name_eff)
+        if path in seen:
+            continue
+        seen.add(path)
+        cached_obj = _read_cache(path)
+        _, cached_ts = _unwrap_cached(cached_obj) if cached_obj else (None, None)
+        if isinstance(cached_ts, int) and (_now_ts() - cached_ts <= ttl or _soft_stale(cached_ts, ttl)):
+            continue
+        missing.append((la, lo))
+
+    if not missing:
+        return 0
+
+    tries = 1 + max(0, extra)
+    for attempt_idx, spec in enumerate(ATTEMPTS):
+        url = _build_url_many(missing, tz_name_eff, spec)
+        for t in range(tries):
+            timeout_sec = _try_timeout(deadline, (len(ATTEMPTS) - attempt_idx) * tries - t, attempt_idx == t == 0)
+            if timeout_sec is None:
+                if DEBUG:
+                    LOG.warning("weather: batch fetch skipped, time budget spent (n=%s)", len(missing))
+                return 0
+            try:
+                if DEBUG:
+                    LOG.info("weather: batch fetch n=%s attempt=%s.%s", len(missing), attempt_idx + 1, t + 1)
+                obj = _http_get_json(url, timeout_sec=timeout_sec)
+            except Exception as e:
+                if t < tries - 1:
+                    _backoff(t, deadline)
+                    continue
+                if DEBUG:
+                    LOG.warning("weather: batch fetch failed (n=%s, err=%s)", len(missing), e)
+                return 0
+
+            items = _split_many(obj, len(missing))
+            if items is None or any(_is_error_payload(it) for it in items):
+                if DEBUG:
+                    reason = obj.get("reason") if isinstance(obj, dict) else "shape"
+                    LOG.warning("weather: batch api error payload (%s)", reason)
+                break  # move to next spec
+
+            fetched_at = _now_ts()
+            for (la, lo), item in zip(missing, items):
+                data = _ensure_aliases(_normalize_times(item, tz_name_eff))
+                _write_cache(_cache_path(la, lo, tz_name_eff), {"fetched_at": fetched_at, "data": data})
+                _memo_put(_memo_key(la, lo, tz_name_eff), data, fetched_at)
+            return len(missing)
+
+    return 0
+
+
+def get_weather_many(
+    points: List[Tuple[float, float]],
+    tz_name: Optional[str] = None,
+    cache_ttl_sec: Optional[int] = None,
+    budget_sec: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Batched get_weather(): one Open‑Meteo request for every stale point,
+    then per-point reads through get_weather() (cache hits on success, the
+    usual retry/stale-cache ladder for anything the batch did not cover).
+    `budget_sec` is shared by the batch request and all per-point fallbacks.
+
+    Returns payloads in the order of `points`.
+    """
+    pts = list(points or [])
+    with weather_budget(budget_sec):
+        try:
+            prefetch_weather(pts, tz_name=tz_name, cache_ttl_sec=cache_ttl_sec)
+        except Exception as e:
+            if DEBUG:
+                LOG.warning("weather: batch prefetch crashed: %s", e)
+        return [get_weather(la, lo, tz_name=tz_name, cache_ttl_sec=cache_ttl_sec) for la, lo in pts]
+
 
 def _daily_index_for_date(daily_times: Any, target_date: Any, tz_name: str) -> Optional[int]:
     """
@@ -638,11 +1473,18 @@ def fetch_tomorrow_temps(lat: float, lon: float, tz: str = "auto") -> Tuple[Opti
 __all__ = [
     "CyprusVisibilityContext",
     "build_cyprus_visibility_line",
+    "clear_weather_memo",
     "day_night_stats",
     "fetch_tomorrow_temps",
     "get_cyprus_visibility_context",
     "get_weather",
+    "get_weather_many",
+    "hourly_range_for_date",
     "load_cyprus_visibility_diagnostics",
+    "nearest_hourly_index",
+    "prefetch_weather",
     "save_cyprus_visibility_diagnostics",
+    "time_index_for",
     "visibility_air_penalty",
+    "weather_budget",
 ]
@@ -17,8 +17,8 @@ API:
 from __future__ import annotations
 
 import datetime as dt
-import time
-import requests
+
+from http_client import http_get
 
 HDR = {
     "User-Agent": "WorldVibeMeterBot/1.0 (+https://github.com/)",
@@ -31,21 +31,15 @@ HDR = {
 # --------------------------- helpers ---------------------------
 
 def _safe_get(url: str, params: dict | None = None, timeout: int = 25, retries: int = 2):
-    """HTTP GET с мягкими повторами; при ошибке возвращает None (не бросает исключение)."""
-    params = params or {}
-    for i in range(retries + 1):
-        try:
-            r = requests.get(url, params=params, timeout=timeout, headers=HDR)
-            if r.status_code >= 400:
-                # некоторые провайдеры любят 5xx — не валим пайплайн
-                continue
-            return r.json()
-        except Exception:
-            if i < retries:
-                time.sleep(0.6 * (i + 1))
-            else:
-                return None
-    return None
+    """HTTP GET с мягкими повторами (общий http_client); при ошибке возвращает None (не бросает исключение)."""
+    try:
+        r = http_get(url, params=params or {}, timeout=timeout, headers=HDR, retries=retries)
+        if r.status_code >= 400:
+            # некоторые провайдеры любят 5xx — не валим пайплайн
+            return None
+        return r.json()
+    except Exception:
+        return None
 
 
 # -------------------- exchangerate.host (base=any) --------------------
@@ -8,7 +8,9 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-import requests
+from http_client import http_get
+import space_history
+import space_weather
 from astral.sun import sun
 from astral import LocationInfo
 from pytz import UTC
@@ -33,15 +35,10 @@ HEADERS = {
 # ---------- helpers ----------
 
 def _get_json(url: str, params=None, timeout=25):
-    r = requests.get(url, params=params or {}, timeout=timeout, headers=HEADERS)
+    r = http_get(url, params=params or {}, timeout=timeout, headers=HEADERS)
     r.raise_for_status()
     return r.json()
 
-def _get_text(url: str, timeout=25) -> str:
-    r = requests.get(url, timeout=timeout, headers=HEADERS)
-    r.raise_for_status()
-    return r.text
-
 def safe_float(x, default=None):
     try:
         return float(x)
@@ -69,23 +66,12 @@ def place_with_flag(place: str) -> str:
 def fetch_kp_latest() -> Tuple[Optional[float], Optional[str], str]:
     """
     Возвращает (kp_value, trend_emoji, note).
-    Источник: SWPC NOAA 'noaa-planetary-k-index' JSON.
+    Источник: SWPC NOAA 'noaa-planetary-k-index' через общий кэш space_weather.
     """
     try:
-        url = "https://services.swpc.noaa.gov/products/noaa-planetary-k-index.json"
-        data = _get_json(url)
-        rows = [row for row in data if isinstance(row, list) and len(row) >= 2][1:]
-        if len(rows) >= 2:
-            last  = safe_float(rows[-1][1])
-            prev  = safe_float(rows[-2][1])
-            trend = "→"
-            if last is not None and prev is not None:
-                if last > prev + 0.1: trend = "↗"
-                elif last < prev - 0.1: trend = "↘"
-            return last, trend, kp_note(last)
-        elif len(rows) == 1:
-            last = safe_float(rows[-1][1])
-            return last, "→", kp_note(last)
+        reading = space_weather.kp_observed()
+        if reading is not None:
+            return reading.kp, reading.trend, kp_note(reading.kp) + kp_history_note()
     except Exception:
         pass
     return None, "—", "—"
@@ -99,6 +85,24 @@ def kp_note(kp: Optional[float]) -> str:
     if kp < 6.0:   return "storm watch"
     return "storm conditions"
 
+def kp_history_note() -> str:
+    """', rising over 6h' / ', storm for 9h' from the local Kp history (SPACE_HISTORY=1)."""
+    if not space_history.enabled():
+        return ""
+    try:
+        summary = space_history.kp_summary()
+    except Exception:
+        return ""
+    hours = summary.get("storm_hours")
+    if isinstance(hours, (int, float)):
+        return f", storm for {hours:.0f}h"
+    change = summary.get("change_6h")
+    if isinstance(change, (int, float)) and change >= 1.0:
+        return ", rising over 6h"
+    if isinstance(change, (int, float)) and change <= -1.0:
+        return ", easing over 6h"
+    return ""
+
 def vibe_emoji_from_kp(kp: Optional[float]) -> str:
     if kp is None: return "⚪️"
     if kp <= 2.0:  return "🟢"
@@ -128,37 +132,15 @@ def _sanitize_solar(speed, dens):
 def fetch_solar_wind() -> Tuple[Optional[float], Optional[float]]:
     """
     Возвращает (speed_km_s, density_cm3).
-    Пытаемся взять из сводных JSON SWPC; при ошибке возвращаем (None, None).
+    5-минутная плазма DSCOVR/ACE через общий кэш space_weather; при ошибке (None, None).
     """
-    speed = None
-    dens  = None
-
-    # Попытка 1: сводная панель DSCOVR
     try:
-        sp = _get_json("https://services.swpc.noaa.gov/products/summary/solar-wind-speed.json")
-        de = _get_json("https://services.swpc.noaa.gov/products/summary/solar-wind-density.json")
-        if isinstance(sp, list) and len(sp) >= 2 and isinstance(sp[-1], list):
-            speed = safe_float(sp[-1][1])
-        if isinstance(de, list) and len(de) >= 2 and isinstance(de[-1], list):
-            dens = safe_float(de[-1][1])
+        sw = space_weather.solar_wind()
     except Exception:
-        pass
-
-    # Попытка 2: ACE SWEPAM 1m (табличный текст)
-    if speed is None or dens is None:
-        try:
-            txt = _get_text("https://services.swpc.noaa.gov/text/ace-swepam.txt", timeout=15)
-            lines = [ln for ln in txt.splitlines() if ln and ln[0].isdigit()]
-            if lines:
-                cols = re.split(r"\s+", lines[-1].strip())
-                v = safe_float(cols[-2])
-                n = safe_float(cols[-1])
-                if v: speed = v
-                if n: dens  = n
-        except Exception:
-            pass
-
-    return _sanitize_solar(speed, dens)
+        sw = None
+    if sw is None:
+        return None, None
+    return _sanitize_solar(sw.speed_kms, sw.density)
 
 def solar_note(speed_kms: Optional[float], dens_cm3: Optional[float]) -> str:
     if speed_kms is None and dens_cm3 is None:
@@ -293,7 +275,7 @@ def pick_top_short_48h() -> Tuple[Optional[str], Optional[str], Optional[str], O
 
     try:
         # свежие видео канала
-        search = requests.get(
+        search = http_get(
             "https://www.googleapis.com/youtube/v3/search",
             params={"key": api, "channelId": ch, "part": "id",
                     "type": "video", "order": "date", "maxResults": 50,
@@ -305,7 +287,7 @@ def pick_top_short_48h() -> Tuple[Optional[str], Optional[str], Optional[str], O
         # фолбэк: плейлисты
         if not ids and YOUTUBE_PLAYLIST_IDS:
             for pl in YOUTUBE_PLAYLIST_IDS:
-                pl_items = requests.get(
+                pl_items = http_get(
                     "https://www.googleapis.com/youtube/v3/playlistItems",
                     params={"key": api, "playlistId": pl, "part": "contentDetails", "maxResults": 25},
                     timeout=20
@@ -317,7 +299,7 @@ def pick_top_short_48h() -> Tuple[Optional[str], Optional[str], Optional[str], O
         if not ids:
             return None, None, None, None
 
-        stats = requests.get(
+        stats = http_get(
             "https://www.googleapis.com/youtube/v3/videos",
             params={"key": api, "id": ",".join(ids), "part": "snippet,statistics,contentDetails"},
             timeout=20
@@ -6,7 +6,8 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-import requests
+from http_client import http_get
+import space_weather
 from astral import moon
 from astral.sun import sun
 from astral import LocationInfo
@@ -107,7 +108,7 @@ def kp_level_emoji(kp_val) -> str:
 # ---------------- fetch helpers ----------------
 
 def _get_json(url, params=None, timeout=25):
-    r = requests.get(url, params=params or {}, timeout=timeout, headers=HEADERS)
+    r = http_get(url, params=params or {}, timeout=timeout, headers=HEADERS)
     r.raise_for_status()
     return r.json()
 
@@ -174,19 +175,10 @@ def openmeteo_week_extremes():
     return hottest, coldest
 
 def kp_outlook_3d():
-    """Возвращает строку прогноза Kp на 3 дня и список чисел."""
+    """Возвращает строку прогноза Kp на 3 дня (максимум за сутки) и список чисел."""
     try:
-        txt = requests.get(
-            "https://services.swpc.noaa.gov/text/3-day-geomag-forecast.txt",
-            timeout=25, headers=HEADERS
-        ).text
-        lines = [ln for ln in txt.splitlines() if "kp" in ln.lower()]
-        import re
-        nums = []
-        for ln in lines:
-            nums += [int(m.group(0)) for m in re.finditer(r"(?<!\d)[0-9](?!\d)", ln)]
-            if len(nums) >= 3:
-                break
+        days = space_weather.kp_forecast(3)
+        nums = [int(round(day.kp_max)) for day in days]
         if len(nums) >= 3:
             return " / ".join(map(str, nums[:3])), nums[:3]
     except Exception:
@@ -241,7 +233,7 @@ def top_short_7d():
         return None
     cutoff = (dt.datetime.utcnow() - dt.timedelta(days=7)).replace(microsecond=0).isoformat() + "Z"
     try:
-        search = requests.get(
+        search = http_get(
             "https://www.googleapis.com/youtube/v3/search",
             params={"key": api, "channelId": ch, "part":"id", "type":"video",
                     "order":"date", "maxResults": 50, "publishedAfter": cutoff},
@@ -250,7 +242,7 @@ def top_short_7d():
         ids = [it["id"]["videoId"] for it in search.get("items", []) if it.get("id", {}).get("videoId")]
         if not ids:
             return None
-        stats = requests.get(
+        stats = http_get(
             "https://www.googleapis.com/youtube/v3/videos",
             params={"key": api, "id": ",".join(ids), "part":"snippet,statistics,contentDetails"},
             timeout=20